@@ -0,0 +1,4 @@
+"""Core basic objects and data structures to represent a list of entries.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
@@ -0,0 +1,190 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import pickle
+import textwrap
+import unittest
+from unittest import mock
+
+from beancount.core import data
+from beancount.core import compare
+from beancount import loader
+
+
+TEST_INPUT = """
+
+2012-02-01 open Assets:US:Cash
+2012-02-01 open Assets:US:Credit-Card
+2012-02-01 open Expenses:Grocery
+2012-02-01 open Expenses:Coffee
+2012-02-01 open Expenses:Restaurant
+
+2012-05-18 * "Buying food" #dinner
+  Expenses:Restaurant         100 USD
+  Expenses:Grocery            200 USD
+  Assets:US:Cash
+
+2013-06-20 * "Whole Foods Market" | "Buying books" #books #dinner ^ee89ada94a39
+  Expenses:Restaurant         150 USD
+  Assets:US:Credit-Card
+
+2013-06-22 * "La Colombe" | "Buying coffee"  ^ee89ada94a39
+  Expenses:Coffee         5 USD
+  Assets:US:Cash
+
+2014-02-01 close Assets:US:Cash
+2014-02-01 close Assets:US:Credit-Card
+
+"""
+
+class TestCompare(unittest.TestCase):
+
+    def test_hash_entries(self):
+        previous_hashes = None
+        for _ in range(64):
+            entries, errors, options_map = loader.load_string(TEST_INPUT)
+            hashes, errors = compare.hash_entries(entries)
+            self.assertFalse(errors)
+            if previous_hashes is None:
+                previous_hashes = hashes
+            else:
+                self.assertEqual(previous_hashes.keys(), hashes.keys())
+
+    def test_hash_entries_with_duplicates(self):
+        entries, _, __ = loader.load_string("""
+          2014-08-01 price HOOL  603.10 USD
+        """)
+        hashes, errors = compare.hash_entries(entries)
+        self.assertEqual(1, len(hashes))
+
+        entries, _, __ = loader.load_string("""
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+        """)
+        hashes, errors = compare.hash_entries(entries)
+        self.assertEqual(1, len(hashes))
+
+    def test_compare_entries(self):
+        entries1, _, __ = loader.load_string(TEST_INPUT)
+        entries2, _, __ = loader.load_string(TEST_INPUT)
+
+        # Check two equal sets.
+        same, missing1, missing2 = compare.compare_entries(entries1, entries2)
+        self.assertTrue(same)
+        self.assertFalse(missing1)
+        self.assertFalse(missing2)
+
+        # First > Second.
+        same, missing1, missing2 = compare.compare_entries(entries1, entries2[:-1])
+        self.assertFalse(same)
+        self.assertTrue(missing1)
+        self.assertFalse(missing2)
+        self.assertEqual(1, len(missing1))
+        self.assertTrue(isinstance(missing1.pop(), data.Close))
+
+        # First < Second.
+        same, missing1, missing2 = compare.compare_entries(entries1[:-1], entries2)
+        self.assertFalse(same)
+        self.assertFalse(missing1)
+        self.assertTrue(missing2)
+        self.assertEqual(1, len(missing2))
+        self.assertTrue(isinstance(missing2.pop(), data.Close))
+
+        # Both have missing.
+        same, missing1, missing2 = compare.compare_entries(entries1[1:], entries2[:-1])
+        self.assertFalse(same)
+        self.assertTrue(missing1)
+        self.assertTrue(missing2)
+        self.assertEqual(1, len(missing1))
+        self.assertTrue(isinstance(missing1.pop(), data.Close))
+        self.assertEqual(1, len(missing2))
+        self.assertTrue(isinstance(missing2.pop(), data.Open))
+
+    def test_includes_entries(self):
+        entries1, _, __ = loader.load_string(TEST_INPUT)
+        entries2, _, __ = loader.load_string(TEST_INPUT)
+
+        includes, missing = compare.includes_entries(entries1[0:-3], entries2)
+        self.assertTrue(includes)
+        self.assertFalse(missing)
+
+        includes, missing = compare.includes_entries(entries1, entries2[0:-3])
+        self.assertFalse(includes)
+        self.assertEqual(3, len(missing))
+
+    def test_excludes_entries(self):
+        entries1, _, __ = loader.load_string(TEST_INPUT)
+        entries2, _, __ = loader.load_string(TEST_INPUT)
+
+        excludes, extra = compare.excludes_entries(entries1[0:4], entries2)
+        self.assertFalse(excludes)
+        self.assertTrue(extra)
+
+        excludes, extra = compare.excludes_entries(entries1[0:4], entries2[4:])
+        self.assertTrue(excludes)
+        self.assertFalse(extra)
+
+    def test_index_entries(self):
+        entries, _, __ = loader.load_string(TEST_INPUT + textwrap.dedent("""
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+        """))
+        index = compare.index_entries(entries)
+        self.assertEqual(len(entries) - 1, len(index))
+        for entry in entries:
+            self.assertIn(entry, index[compare.hash_entry(entry)])
+        self.assertEqual(entries[-2:], index[compare.hash_entry(entries[-1])])
+
+
+class TestEntryHashCache(unittest.TestCase):
+
+    def test_hash_entry(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        with mock.patch('beancount.core.compare.hash_entry',
+                        wraps=compare.hash_entry) as hash_entry:
+            hashes, errors = compare.hash_entries(entries, hash_cache)
+            self.assertFalse(errors)
+            self.assertEqual(len(entries), hash_entry.call_count)
+            self.assertEqual(len(entries), len(hash_cache))
+
+            # The hashes are the same as those computed without the cache, and
+            # they are not recomputed.
+            self.assertEqual(compare.hash_entries(entries)[0].keys(), hashes.keys())
+            hash_entry.reset_mock()
+            self.assertEqual(hashes.keys(),
+                             compare.index_entries(entries, hash_cache).keys())
+            self.assertEqual(0, hash_entry.call_count)
+
+    def test_retain(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        compare.hash_entries(entries, hash_cache)
+        hash_cache.retain(entries[:3])
+        self.assertEqual(3, len(hash_cache))
+
+        # Only the retained entries are memoized from now on.
+        hash_cache.retain(entries[:4])
+        self.assertEqual(3, len(hash_cache))
+        new_entry = entries[4]._replace(meta=dict(entries[4].meta))
+        self.assertEqual(compare.hash_entry(new_entry), hash_cache.hash_entry(new_entry))
+        self.assertEqual(3, len(hash_cache))
+        hash_cache.hash_entry(entries[3])
+        self.assertEqual(4, len(hash_cache))
+
+    def test_pickle(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        hashes, _ = compare.hash_entries(entries, hash_cache)
+        hash_cache.retain(entries)
+        new_entries, new_hash_cache = pickle.loads(pickle.dumps((entries, hash_cache)))
+        with mock.patch('beancount.core.compare.hash_entry') as hash_entry:
+            self.assertEqual(list(hashes.keys()),
+                             [new_hash_cache.hash_entry(entry) for entry in new_entries])
+            self.assertEqual(0, hash_entry.call_count)
+
+            # The retained entries are carried over.
+            new_hash_cache.hash_entry(entries[0])
+            self.assertEqual(len(entries), len(new_hash_cache))
@@ -0,0 +1,650 @@
+"""Loader code. This is the main entry point to load up a file.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import functools
+import hashlib
+import textwrap
+import importlib
+import collections
+import logging
+import io
+import itertools
+import multiprocessing
+import os
+import pickle
+import warnings
+from os import path
+
+from beancount.utils import misc_utils
+from beancount.core import compare
+from beancount.core import data
+from beancount.parser import parser
+from beancount.parser import booking
+from beancount.parser import options
+from beancount.parser import printer
+from beancount.ops import prices
+from beancount.ops import summarize
+from beancount.ops import validation
+
+
+LoadError = collections.namedtuple('LoadError', 'source message entry')
+
+
+# The cached result of parsing a single input file. See _parse_recursive().
+#
+# Attributes:
+#   digest: A string, the hexadecimal hash of the file's contents (and encoding)
+#     at the time it was parsed.
+#   pickled: A bytes object, the pickled (entries, errors, options_map) tuple
+#     produced by the parser for this file. The results are stored pickled
+#     because the later stages of loading modify the parsed directives and
+#     options in place (e.g., booking inserts metadata); each use of the cache
+#     unpickles a fresh copy of them.
+ParsedFile = collections.namedtuple('ParsedFile', 'digest pickled')
+
+
+# List of default plugins to run.
+DEFAULT_PLUGINS_PRE = [
+    ("beancount.ops.pad", None),
+    ("beancount.ops.documents", None),
+    ]
+
+DEFAULT_PLUGINS_POST = [
+    ("beancount.ops.balance", None),
+    ]
+
+# A mapping of modules to warn about, to their renamed names.
+DEPRECATED_MODULES = {
+    "beancount.ops.auto_accounts": "beancount.plugins.auto_accounts",
+    "beancount.ops.implicit_prices": "beancount.plugins.implicit_prices",
+    }
+
+
+# Filename pattern for the pickle-cache.
+PICKLE_CACHE_FILENAME = '.{filename}.picklecache'
+
+
+def load_file(filename, log_timings=None, log_errors=None, extra_validations=None,
+              encoding=None, parse_cache=None, processes=None, strict=None):
+    """Open a Beancount input file, parse it, run transformations and validate.
+
+    Args:
+      filename: The name of the file to be parsed.
+      log_timings: A file object or function to write timings to,
+        or None, if it should remain quiet.
+      log_errors: A file object or function to write errors to,
+        or None, if it should remain quiet.
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict or None. If provided, the parsed contents of each input
+        file are stored in it and reused on subsequent calls with the same dict,
+        as long as the contents of that file have not changed. The files which
+        are no longer part of the input are removed from it. Use this when
+        reloading the same ledger repeatedly, e.g., from a long-running process.
+      processes: An integer or None, the number of worker processes to parse
+        included files with. If None, the value of the BEANCOUNT_PARSE_PROCESSES
+        environment variable is used, if set. Otherwise files are parsed
+        sequentially.
+      strict: A boolean or None. If true, the validation checks that every
+        transaction balances, including those already found to balance during
+        booking and not modified since (see the 'balanced_transactions' option).
+        If None, strict validation is used if the BEANCOUNT_STRICT_VALIDATION
+        environment variable is set.
+    Returns:
+      A triple of:
+        entries: A date-sorted list of entries from the file.
+        errors: A list of error objects generated while parsing and validating
+          the file.
+        options_map: A dict of the options parsed from the file.
+    """
+    if not path.isabs(filename):
+        filename = path.normpath(path.join(os.getcwd(), filename))
+    if processes is None and os.getenv('BEANCOUNT_PARSE_PROCESSES'):
+        processes = int(os.getenv('BEANCOUNT_PARSE_PROCESSES'))
+    if strict is None:
+        strict = bool(os.getenv('BEANCOUNT_STRICT_VALIDATION'))
+    return _load([(filename, True)], log_timings, log_errors, extra_validations, encoding,
+                 parse_cache, processes, strict)
+
+
+# Alias, for compatibility.
+# pylint: disable=invalid-name
+load = load_file
+
+
+def pickle_cache_function(pattern, function):
+    """Decorate a function to make it loads its result from a pickle cache.
+
+    This only considers the first argument as a variant and assumes it's a
+    filename. It's essentially a special case for an on-disk memoizer. If
+    the file is more recent than the cache, the function is recomputed.
+
+    Args:
+      pattern: A string, the filename pattern for the pickled cache file.
+        A {filename} in it gets replaced by the input filename.
+    Returns:
+      A decorated function which will pull its result from a cache file if
+      it is available.
+    """
+    @functools.wraps(function)
+    def wrapped(filename, *args, **kw):
+        abs_filename = path.abspath(filename)
+        cache_filename = path.join(
+            path.dirname(abs_filename),
+            pattern.format(filename=path.basename(filename)))
+
+        # Attempt to read the result from the cache.
+        if (path.exists(cache_filename) and
+            path.getmtime(filename) < path.getmtime(cache_filename)):
+            with open(cache_filename, 'rb') as file:
+                result = pickle.load(file)
+        else:
+            # We failed; recompute the value and overwrite the cache file.
+            result = function(filename, *args, **kw)
+            try:
+                with open(cache_filename, 'wb') as file:
+                    pickle.dump(result, file)
+            except Exception:
+                logging.warning("Could not write to picklecache file {}".format(
+                    cache_filename))
+        return result
+    return wrapped
+
+
+# If the environment variable is set, use the pickle-cache.
+if os.getenv('BEANCOUNT_LOAD_CACHE'):
+    load_file = pickle_cache_function(PICKLE_CACHE_FILENAME, load_file)
+
+
+def load_string(string, log_timings=None, log_errors=None, extra_validations=None,
+                dedent=False, encoding=None, strict=None):
+
+    """Open a Beancount input string, parse it, run transformations and validate.
+
+    Args:
+      string: A Beancount input string.
+      log_timings: A file object or function to write timings to,
+        or None, if it should remain quiet.
+      log_errors: A file object or function to write errors to,
+        or None, if it should remain quiet.
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+      dedent: A boolean, if set, remove the whitespace in front of the lines.
+      encoding: A string or None, the encoding to decode the input filename with.
+      strict: A boolean or None, whether to use strict validation. See
+        load_file().
+    Returns:
+      A triple of:
+        entries: A date-sorted list of entries from the file.
+        errors: A list of error objects generated while parsing and validating
+          the file.
+        options_map: A dict of the options parsed from the file.
+    """
+    if dedent:
+        string = textwrap.dedent(string)
+    if strict is None:
+        strict = bool(os.getenv('BEANCOUNT_STRICT_VALIDATION'))
+    return _load([(string, False)], log_timings, log_errors, extra_validations, encoding,
+                 strict=strict)
+
+
+def _parse_file(filename, encoding, contents=None):
+    """Parse a single file from disk.
+
+    This is a module-level function so that it can be sent to worker processes.
+
+    Args:
+      filename: A string, the absolute filename of the file to parse.
+      encoding: A string or None, the encoding to decode the input filename with.
+      contents: A bytes object or None. If provided, the contents of the file,
+        which were already read, to parse instead of reading the file again.
+    Returns:
+      A tuple of (entries, errors, options_map), as per parser.parse_file().
+    """
+    if contents is None:
+        return parser.parse_file(filename, encoding=encoding)
+    entries, errors, options_map = parser.parse_string(contents,
+                                                       report_filename=filename,
+                                                       encoding=encoding)
+    options_map['filename'] = filename
+    return entries, errors, options_map
+
+
+def _parse_files(filenames, encoding, parse_cache, pool, log_timings):
+    """Parse a list of files, reusing previously cached results if their contents
+    are unchanged, possibly in parallel.
+
+    Args:
+      filenames: A list of strings, the absolute filenames of the files to parse.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict of absolute filename to ParsedFile instances, or None.
+        If None, the files are always parsed. Otherwise the cache is consulted
+        and updated with the new results for the files that have changed.
+      pool: A multiprocessing.Pool instance to parse the files in, or None,
+        to parse them sequentially in this process.
+      log_timings: A function to write timings to, or None, if it should remain quiet.
+    Returns:
+      A list of (entries, errors, options_map) tuples, as per parser.parse_file(),
+      in the same order as 'filenames'.
+    """
+    # Compute a digest of the contents of each file and figure out which of them
+    # actually need to be parsed. The encoding is part of the key because it
+    # affects how the file is decoded.
+    digests = {}
+    args = []
+    for filename in filenames:
+        if parse_cache is None:
+            args.append((filename, encoding))
+            continue
+        # Parse the contents read for the digest, so as to read each file once.
+        with open(filename, 'rb') as infile:
+            contents = infile.read()
+        md5 = hashlib.md5(contents)
+        md5.update(str(encoding).encode('ascii'))
+        digest = md5.hexdigest()
+
+        parsed = parse_cache.get(filename, None)
+        if parsed is None or parsed.digest != digest:
+            digests[filename] = digest
+            args.append((filename, encoding, contents))
+
+    # Parse the files that are missing or out of date.
+    with misc_utils.log_time('beancount.parser.parser.parse_file',
+                             log_timings, indent=2):
+        if pool is not None and len(args) > 1:
+            results = pool.starmap(_parse_file, args, chunksize=1)
+        else:
+            results = list(itertools.starmap(_parse_file, args))
+
+    if parse_cache is None:
+        return results
+
+    # Store a snapshot of the new results, before they get modified, and
+    # unpickle fresh copies of the others.
+    parsed_map = {}
+    for (filename, _, __), result in zip(args, results):
+        parse_cache[filename] = ParsedFile(digests[filename],
+                                           pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        parsed_map[filename] = result
+    return [parsed_map[filename]
+            if filename in parsed_map
+            else pickle.loads(parse_cache[filename].pickled)
+            for filename in filenames]
+
+
+def _parse_recursive(sources, log_timings, encoding=None, parse_cache=None,
+                     processes=None):
+    """Parse Beancount input, run its transformations and validate it.
+
+    Recursively parse a list of files or strings and their include files and
+    return an aggregate of parsed directives, errors, and the top-level
+    options-map. If the same file is being parsed twice, ignore it and issue an
+    error.
+
+    Sources are processed breadth-first, one level of includes at a time. All
+    the files of a level can be parsed independently, so if 'processes' is
+    set, they are parsed in a pool of worker processes. The results are always
+    merged in the same order as if they were parsed sequentially.
+
+    Args:
+      sources: A list of (filename-or-string, is-filename) where the first
+        element is a string, with either a filename or a string to be parsed directly,
+        and the second arugment is a boolean that is true if the first is a filename.
+        You may provide a list of such arguments to be parsed. Filenames must be absolute
+        paths.
+      log_timings: A function to write timings to, or None, if it should remain quiet.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict of absolute filename to ParsedFile instances, or None.
+        See _parse_files().
+      processes: An integer or None. If greater than one, the number of worker
+        processes to parse files with. Otherwise parse in this process.
+    Returns:
+      A tuple of (entries, parse_errors, options_map).
+    """
+    assert isinstance(sources, list) and all(isinstance(el, tuple) for el in sources)
+
+    # Current parse state.
+    entries, parse_errors = [], []
+    options_map = None
+
+    # A stack of sources to be parsed.
+    source_stack = list(sources)
+
+    # A list of absolute filenames that have been parsed in the past, used to
+    # detect and avoid duplicates (cycles).
+    filenames_seen = set()
+
+    # A list of the absolute filenames of all the files included, directly or
+    # indirectly, in the order they were encountered, and the same as a set.
+    included_filenames = []
+    included_set = set()
+
+    # A pool of worker processes, created lazily when a level has more than one
+    # file to be parsed.
+    pool = None
+
+    try:
+        with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
+            while source_stack:
+                level_sources, source_stack = source_stack, []
+
+                # Resolve the sources of this level to a list of (source, is_file,
+                # error) tuples to process in order, and the files to be parsed.
+                level = []
+                level_filenames = []
+                for source, is_file in level_sources:
+                    if not is_file:
+                        level.append((source, is_file, None))
+                        continue
+
+                    # All filenames here must be absolute.
+                    assert path.isabs(source)
+                    filename = path.normpath(source)
+
+                    # Check for file previously parsed... detect duplicates.
+                    if filename in filenames_seen:
+                        level.append((filename, is_file, LoadError(
+                            data.new_metadata("<load>", 0),
+                            'Duplicate filename parsed: "{}"'.format(filename), None)))
+                        continue
+                    else:
+                        filenames_seen.add(filename)
+
+                    # Check for a file that does not exist.
+                    if not path.exists(filename):
+                        level.append((filename, is_file, LoadError(
+                            data.new_metadata("<load>", 0),
+                            'File "{}" does not exist'.format(filename), None)))
+                        continue
+
+                    level.append((filename, is_file, None))
+                    level_filenames.append(filename)
+
+                # Parse the files from disk directly (or fetch them from the cache).
+                if (pool is None and processes is not None and processes > 1 and
+                    len(level_filenames) > 1):
+                    pool = multiprocessing.Pool(processes)
+                file_results = iter(_parse_files(level_filenames, encoding,
+                                                 parse_cache, pool, log_timings))
+
+                for source, is_file, error in level:
+                    if error is not None:
+                        parse_errors.append(error)
+                        continue
+
+                    is_top_level = options_map is None
+
+                    if is_file:
+                        (src_entries,
+                         src_errors,
+                         src_options_map) = next(file_results)
+
+                        cwd = path.dirname(source)
+                    else:
+                        # Encode the contents if necessary.
+                        if encoding:
+                            if isinstance(source, bytes):
+                                source = source.decode(encoding)
+                            source = source.encode('ascii', 'replace')
+
+                        # Parse a string buffer from memory.
+                        with misc_utils.log_time('beancount.parser.parser.parse_string',
+                                                 log_timings, indent=2):
+                            (src_entries,
+                             src_errors,
+                             src_options_map) = parser.parse_string(source)
+
+                        # If we're parsing a string, the CWD is the current process
+                        # working directory.
+                        cwd = os.getcwd()
+
+                    # Merge the entries resulting from the parsed file.
+                    entries.extend(src_entries)
+                    parse_errors.extend(src_errors)
+
+                    # We need the options from the very top file only (the very
+                    # first file being processed). No merging of options should
+                    # occur.
+                    if is_top_level:
+                        options_map = src_options_map
+
+                    # Add includes to the list of sources to process.
+                    for include_filename in src_options_map['include']:
+                        if not path.isabs(include_filename):
+                            include_filename = path.join(cwd, include_filename)
+                        include_filename = path.normpath(include_filename)
+
+                        # Add the include filenames to be processed later.
+                        source_stack.append((include_filename, True))
+                        if include_filename not in included_set:
+                            included_set.add(include_filename)
+                            included_filenames.append(include_filename)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Evict the files which aren't included anymore from the cache.
+    if parse_cache is not None:
+        for filename in set(parse_cache) - filenames_seen:
+            del parse_cache[filename]
+
+    if options_map is None:
+        options_map = options.OPTIONS_DEFAULTS.copy()
+    else:
+        # Replace the includes of the top-level file by those of all the files,
+        # so that the caller may watch all of them for changes.
+        options_map['include'] = included_filenames
+
+    return entries, parse_errors, options_map
+
+
+def _load(sources, log_timings, log_errors, extra_validations, encoding,
+          parse_cache=None, processes=None, strict=False):
+    """Parse Beancount input, run its transformations and validate it.
+
+    (This is an internal method.)
+    This routine does all that is necessary to obtain a list of entries ready
+    for realization and working with them. This is the principal call for of the
+    scripts that load a ledger. It returns a list of entries transformed and
+    ready for reporting, a list of errors, and parser's options dict.
+
+    Args:
+      sources: A list of (filename-or-string, is-filename) where the first
+        element is a string, with either a filename or a string to be parsed directly,
+        and the second arugment is a boolean that is true if the first is a filename.
+        You may provide a list of such arguments to be parsed. Filenames must be absolute
+        paths.
+      log_timings: A file object or function to write timings to,
+        or None, if it should remain quiet.
+      log_errors: A file object or function to write errors to,
+        or None, if it should remain quiet.
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict or None, a cache of parsed files. See load_file().
+      processes: An integer or None, the number of processes to parse with.
+        See load_file().
+      strict: A boolean, true to check the balance of all the transactions
+        during validation. See load_file().
+    Returns:
+      See load() or load_string().
+    """
+    assert isinstance(sources, list) and all(isinstance(el, tuple) for el in sources)
+
+    if hasattr(log_timings, 'write'):
+        log_timings = log_timings.write
+
+    # Parse all the files recursively.
+    entries, parse_errors, options_map = _parse_recursive(sources, log_timings, encoding,
+                                                          parse_cache, processes)
+
+    # Run interpolation on incomplete entries. Unless strict validation is
+    # requested, keep track of the transactions found to balance at this stage.
+    if not strict:
+        options_map['balanced_transactions'] = {}
+    entries, balance_errors = booking.book(entries, options_map)
+    parse_errors.extend(balance_errors)
+
+    # Transform the entries.
+    options_map['entry_hashes'] = compare.EntryHashCache()
+    entries, errors = run_transformations(entries, parse_errors, options_map, log_timings)
+
+    # Validate the list of entries.
+    with misc_utils.log_time('beancount.ops.validate', log_timings, indent=1):
+        valid_errors = validation.validate(entries, options_map, log_timings,
+                                           extra_validations)
+        errors.extend(valid_errors)
+
+        # Note: We could go hardcode here and further verify that the entries
+        # haven't been modified by user-provided validation routines, by
+        # comparing hashes before and after. Not needed for now.
+
+    # Release the references to the original postings.
+    options_map['balanced_transactions'] = None
+
+    # Only keep, and from now on only memoize, the hashes of the final entries.
+    options_map['entry_hashes'].retain(entries)
+
+    # Build the price map once for all the consumers of these entries.
+    with misc_utils.log_time('beancount.ops.prices', log_timings, indent=1):
+        options_map['price_map'] = prices.build_price_map(entries)
+        options_map['price_map'].entries = entries
+
+    # Index the balances over time of the final entries; this is filled lazily.
+    options_map['balance_snapshots'] = summarize.BalanceSnapshots(entries)
+
+    if log_errors and errors:
+        if hasattr(log_errors, 'write'):
+            printer.print_errors(errors, file=log_errors)
+        else:
+            error_io = io.StringIO()
+            printer.print_errors(errors, file=error_io)
+            log_errors(error_io.getvalue())
+
+    return entries, errors, options_map
+
+
+def run_transformations(entries, parse_errors, options_map, log_timings):
+    """Run the various transformations on the entries.
+
+    This is where entries are being synthesized, checked, plugins are run, etc.
+
+    Args:
+      entries: A list of directives as read from the parser.
+      parse_errors: A list of errors so far.
+      options_map: An options dict as read from the parser.
+      log_timings: A function to write timing log entries to, or None, if it
+        should be quiet.
+    Returns:
+      A list of modified entries, and a list of errors, also possibly modified.
+    """
+    # A list of errors to extend (make a copy to avoid modifying the input).
+    errors = list(parse_errors)
+
+    # Ensure that the entries are sorted before running the plugins.
+    entries.sort(key=data.entry_sortkey)
+
+    # Process the plugins.
+    if options_map['plugin_processing_mode'] == 'raw':
+        plugins_iter = options_map["plugin"]
+    elif options_map['plugin_processing_mode'] == 'default':
+        plugins_iter = itertools.chain(DEFAULT_PLUGINS_PRE,
+                                       options_map["plugin"],
+                                       DEFAULT_PLUGINS_POST)
+    else:
+        assert "Invalid value for plugin_processing_mode: {}".format(
+            options_map['plugin_processing_mode'])
+
+    for plugin_name, plugin_config in plugins_iter:
+
+        # Issue a warning on a deprecated module.
+        renamed_name = DEPRECATED_MODULES.get(plugin_name, None)
+        if renamed_name:
+            warnings.warn("Deprecation notice: Module '{}' has been renamed to '{}'; "
+                          "please adjust your plugin directive.".format(
+                              plugin_name, renamed_name))
+            plugin_name = renamed_name
+
+        # Try to import the module.
+        try:
+            module = importlib.import_module(plugin_name)
+            if not hasattr(module, '__plugins__'):
+                continue
+
+            with misc_utils.log_time(plugin_name, log_timings, indent=1):
+
+                # Run each transformer function in the plugin.
+                for function_name in module.__plugins__:
+                    callback = getattr(module, function_name)
+
+                    if plugin_config is not None:
+                        entries, plugin_errors = callback(entries, options_map,
+                                                          plugin_config)
+                    else:
+                        entries, plugin_errors = callback(entries, options_map)
+                    errors.extend(plugin_errors)
+
+            # Ensure that the entries are sorted. Don't trust the plugins
+            # themselves.
+            entries.sort(key=data.entry_sortkey)
+
+        except ImportError as exc:
+            # Upon failure, just issue an error.
+            errors.append(LoadError(data.new_metadata("<load>", 0),
+                                    'Error importing "{}": {}'.format(
+                                        plugin_name, str(exc)), None))
+
+    return entries, errors
+
+
+# FIXME: Deprecate this eventually.
+def loaddoc(*args, **kw):
+    warnings.warn("loaddoc() is obsolete; use load_doc() instead.")
+    return load_doc(*args, **kw)
+
+def load_doc(expect_errors=False):
+    """A factory of decorators that loads the docstring and calls the function with entries.
+
+    This is an incredibly convenient tool to write lots of tests. Write a
+    unittest using the standard TestCase class and put the input entries in the
+    function's docstring.
+
+    Args:
+      expect_errors: A boolean or None, with the following semantics,
+        True: Expect errors and fail if there are none.
+        False: Expect no errors and fail if there are some.
+        None: Do nothing, no check.
+    Returns:
+      A wrapped method that accepts a single 'self' argument.
+    """
+    def decorator(fun):
+        """A decorator that parses the function's docstring as an argument.
+
+        Args:
+          fun: A callable method, that accepts the three return arguments that
+              load() returns.
+        Returns:
+          A decorated test function.
+        """
+        @functools.wraps(fun)
+        def wrapper(self):
+            entries, errors, options_map = load_string(fun.__doc__, dedent=True)
+
+            if expect_errors is not None:
+                if expect_errors is False and errors:
+                    oss = io.StringIO()
+                    printer.print_errors(errors, file=oss)
+                    self.fail("Unexpected errors found:\n{}".format(oss.getvalue()))
+                elif expect_errors is True and not errors:
+                    self.fail("Expected errors, none found:")
+
+            return fun(self, entries, errors, options_map)
+
+        wrapper.__input__ = wrapper.__doc__
+        wrapper.__doc__ = None
+        return wrapper
+
+    return decorator
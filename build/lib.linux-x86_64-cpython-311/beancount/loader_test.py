@@ -0,0 +1,455 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import logging
+import unittest
+import tempfile
+import textwrap
+import re
+import os
+import pickle
+import sys
+from unittest import mock
+from os import path
+
+from beancount import loader
+from beancount.core import compare
+from beancount.parser import parser
+from beancount.ops import prices
+from beancount.ops import summarize
+from beancount.utils import test_utils
+
+
+TEST_INPUT = """
+
+2014-01-01 open Assets:MyBank:Checking   USD
+2014-01-01 open Expenses:Restaurant   USD
+
+2014-02-22 * "Something happened."
+  Assets:MyBank:Checking       100.00 USD
+  Expenses:Restaurant         -100.00 USD
+
+2015-01-01 close Assets:MyBank:Checking
+2015-01-01 close Expenses:Restaurant
+
+"""
+
+
+class TestLoader(unittest.TestCase):
+
+    def test_run_transformations(self):
+        # Test success case.
+        entries, errors, options_map = parser.parse_string(TEST_INPUT)
+        trans_entries, trans_errors = loader.run_transformations(
+            entries, errors, options_map, None)
+        self.assertEqual(0, len(trans_errors))
+
+        # Test an invalid plugin name.
+        entries, errors, options_map = parser.parse_string(
+            'plugin "invalid.module.name"\n\n' + TEST_INPUT)
+        trans_entries, trans_errors = loader.run_transformations(
+            entries, errors, options_map, None)
+        self.assertEqual(1, len(trans_errors))
+
+    def test_load(self):
+        with test_utils.capture():
+            with tempfile.NamedTemporaryFile('w') as tmpfile:
+                tmpfile.write(TEST_INPUT)
+                tmpfile.flush()
+                entries, errors, options_map = loader.load_file(tmpfile.name)
+                self.assertTrue(isinstance(entries, list))
+                self.assertTrue(isinstance(errors, list))
+                self.assertTrue(isinstance(options_map, dict))
+
+                entries, errors, options_map = loader.load_file(tmpfile.name,
+                                                                log_timings=logging.info)
+                self.assertTrue(isinstance(entries, list))
+                self.assertTrue(isinstance(errors, list))
+                self.assertTrue(isinstance(options_map, dict))
+
+    def test_load_string(self):
+        with test_utils.capture():
+            entries, errors, options_map = loader.load_string(TEST_INPUT)
+            self.assertTrue(isinstance(entries, list))
+            self.assertTrue(isinstance(errors, list))
+            self.assertTrue(isinstance(options_map, dict))
+
+            entries, errors, options_map = loader.load_string(TEST_INPUT,
+                                                              log_timings=logging.info)
+            self.assertTrue(isinstance(entries, list))
+            self.assertTrue(isinstance(errors, list))
+            self.assertTrue(isinstance(options_map, dict))
+
+    def test_load_price_map(self):
+        entries, errors, options_map = loader.load_string("""
+          2014-01-01 price USD 1.10 CAD
+          2014-02-01 price USD 1.20 CAD
+        """, dedent=True)
+        self.assertFalse(errors)
+        price_map = options_map['price_map']
+        self.assertTrue(isinstance(price_map, prices.PriceMap))
+        self.assertEqual(prices.build_price_map(entries), price_map)
+        self.assertIs(entries, price_map.entries)
+
+    def test_load_entry_hashes(self):
+        entries, errors, options_map = loader.load_string("""
+          plugin "beancount.plugins.noduplicates"
+        """ + TEST_INPUT, dedent=True)
+        self.assertFalse(errors)
+        hash_cache = options_map['entry_hashes']
+        self.assertTrue(isinstance(hash_cache, compare.EntryHashCache))
+        # Only the final entries' hashes are kept.
+        self.assertEqual(len(entries), len(hash_cache))
+        new_entry = entries[0]._replace(meta=dict(entries[0].meta))
+        hash_cache.hash_entry(new_entry)
+        self.assertEqual(len(entries), len(hash_cache))
+
+    def test_load_balance_snapshots(self):
+        entries, errors, options_map = loader.load_string(TEST_INPUT, dedent=True)
+        self.assertFalse(errors)
+        snapshots = options_map['balance_snapshots']
+        self.assertTrue(isinstance(snapshots, summarize.BalanceSnapshots))
+        self.assertIs(entries, snapshots.entries)
+
+    def test_load_strict(self):
+        # Capture the transactions recorded as balanced by booking.
+        balanced = []
+        def validate(entries, options_map, *args):
+            balanced.append(options_map['balanced_transactions'])
+            return []
+        with mock.patch('beancount.ops.validation.validate', validate):
+            loader.load_string(TEST_INPUT, dedent=True)
+            loader.load_string(TEST_INPUT, dedent=True, strict=True)
+            with mock.patch.dict(os.environ, {'BEANCOUNT_STRICT_VALIDATION': '1'}):
+                loader.load_string(TEST_INPUT, dedent=True)
+                loader.load_string(TEST_INPUT, dedent=True, strict=False)
+        self.assertEqual([1, 0, 0, 1], [len(transactions or {})
+                                        for transactions in balanced])
+
+    def test_load_plugin_modifying_position(self):
+        # A plugin which unbalances the transactions by modifying the position
+        # of one of their postings in place must not escape validation.
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'modify_position.py': """
+                  __plugins__ = ('modify_position',)
+
+                  def modify_position(entries, options_map):
+                      for entry in entries:
+                          if hasattr(entry, 'postings'):
+                              entry.postings[0].position.number *= 2
+                      return entries, []
+                """})
+            with mock.patch('sys.path', [tmp] + sys.path):
+                entries, errors, _ = loader.load_string(
+                    'plugin "modify_position"\n' + TEST_INPUT, dedent=True)
+        self.assertEqual(['Transaction does not balance'],
+                         [error.message.split(':')[0] for error in errors])
+
+    def test_load_nonexist(self):
+        entries, errors, options_map = loader.load_file('/some/bullshit/filename.beancount')
+        self.assertEqual([], entries)
+        self.assertTrue(errors)
+        self.assertTrue(re.search('does not exist', errors[0].message))
+
+    @mock.patch.dict(loader.DEPRECATED_MODULES,
+                     {"beancount.ops.auto_accounts": "beancount.plugins.auto_accounts"},
+                     clear=True)
+    @mock.patch('warnings.warn')
+    def test_deprecated_plugin_warnings(self, warn):
+        with test_utils.capture('stderr'):
+            entries, errors, options_map = loader.load_string("""
+              plugin "beancount.ops.auto_accounts"
+            """, dedent=True)
+        self.assertTrue(warn.called)
+        self.assertFalse(errors)
+
+
+class TestLoadDoc(unittest.TestCase):
+
+    def test_load_doc(self):
+        def test_function(self_, entries, errors, options_map):
+            self.assertTrue(isinstance(entries, list))
+            self.assertTrue(isinstance(errors, list))
+            self.assertTrue(isinstance(options_map, dict))
+
+        test_function.__doc__ = TEST_INPUT
+        test_function = loader.load_doc(test_function)
+        test_function(self)
+
+    @loader.load_doc()
+    def test_load_doc_empty(self, entries, errors, options_map):
+        """
+        """
+        self.assertTrue(isinstance(entries, list))
+        self.assertTrue(isinstance(errors, list))
+        self.assertTrue(isinstance(options_map, dict))
+
+    @loader.load_doc(expect_errors=True)
+    def test_load_doc_plugin(self, entries, errors, options_map):
+        """
+        plugin "beancount.does.not.exist"
+        """
+        self.assertTrue(isinstance(entries, list))
+        self.assertTrue(isinstance(options_map, dict))
+        self.assertTrue([loader.LoadError], list(map(type, errors)))
+
+
+class TestLoadIncludes(unittest.TestCase):
+
+    def test_load_file_nonexist(self):
+        entries, errors, options_map = loader.load_file('/bull/bla/root.beancount')
+        self.assertEqual(1, len(errors))
+        self.assertTrue(re.search('does not exist', errors[0].message))
+
+    def test_load_file_with_nonexist_include(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'root.beancount': """
+                  include "/some/file/that/does/not/exist.beancount"
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'root.beancount'))
+            self.assertEqual(1, len(errors))
+            self.assertTrue(re.search('does not exist', errors[0].message))
+
+    def test_load_file_with_absolute_include(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "{root}/fruits/oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'))
+        self.assertFalse(errors)
+        self.assertEqual(2, len(entries))
+
+    def test_load_file_with_relative_include(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'))
+        self.assertFalse(errors)
+        self.assertEqual(2, len(entries))
+
+    def test_load_file_with_multiple_includes(self):
+        # Including recursive includes and mixed and absolute.
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  include "{root}/legumes/patates.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  include "../legumes/tomates.beancount"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'legumes/tomates.beancount': """
+                  2014-01-03 open Assets:Tomates
+                """,
+                'legumes/patates.beancount': """
+                  2014-01-04 open Assets:Patates
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'))
+        self.assertFalse(errors)
+        self.assertEqual(4, len(entries))
+
+        # All the included files are listed, including indirect ones.
+        self.assertEqual([path.join(tmp, 'fruits/oranges.beancount'),
+                          path.join(tmp, 'legumes/patates.beancount'),
+                          path.join(tmp, 'legumes/tomates.beancount')],
+                         options_map['include'])
+
+    def test_load_file_with_duplicate_includes(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  include "{root}/legumes/tomates.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  include "../legumes/tomates.beancount"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'legumes/tomates.beancount': """
+                  2014-01-03 open Assets:Tomates
+                """,
+                'legumes/patates.beancount': """
+                  2014-01-04 open Assets:Patates
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'))
+        self.assertTrue(errors)
+        self.assertEqual(3, len(entries))
+
+    def test_load_string_with_relative_include(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            try:
+                cwd = os.getcwd()
+                os.chdir(tmp)
+                entries, errors, options_map = loader.load_file(
+                    path.join(tmp, 'apples.beancount'))
+            finally:
+                os.chdir(cwd)
+        self.assertFalse(errors)
+        self.assertEqual(2, len(entries))
+
+
+class TestLoadParseCache(unittest.TestCase):
+
+    def test_load_file_with_parse_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            parse_cache = {}
+            with mock.patch('beancount.parser.parser.parse_string',
+                            side_effect=parser.parse_string) as parse_file:
+                entries, errors, options_map = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(2, parse_file.call_count)
+                self.assertEqual(2, len(parse_cache))
+
+                # Reloading without changes reparses nothing.
+                entries2, errors2, options_map2 = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(2, parse_file.call_count)
+                self.assertEqual(entries, entries2)
+                self.assertEqual(options_map.keys(), options_map2.keys())
+                self.assertEqual(filename, options_map2['filename'])
+
+                # Modifying an included file reparses only that file.
+                with open(path.join(tmp, 'fruits/oranges.beancount'), 'a') as file:
+                    file.write('2014-01-03 open Assets:Bananas\n')
+                entries3, errors3, _ = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(3, parse_file.call_count)
+                self.assertFalse(errors3)
+                self.assertEqual(3, len(entries3))
+
+                # Removing the include evicts the included file from the cache.
+                with open(filename, 'w') as file:
+                    file.write('2014-01-01 open Assets:Apples\n')
+                entries4, errors4, options_map4 = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertFalse(errors4)
+                self.assertEqual([], options_map4['include'])
+                self.assertEqual([filename], list(parse_cache))
+
+    def test_load_file_with_parse_cache__isolated(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 open Assets:Oranges
+
+                  2014-01-02 *
+                    Assets:Apples       1.00 USD
+                    Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            parse_cache = {}
+            entries, _, options_map = loader.load_file(filename, parse_cache=parse_cache)
+            self.assertIn('__tolerances__', entries[-1].meta)
+            options_map['operating_currency'].append('USD')
+
+            # The cached results aren't modified by the loading stages.
+            cached_entries, _, cached_options_map = pickle.loads(
+                parse_cache[filename].pickled)
+            self.assertNotIn('__tolerances__', cached_entries[-1].meta)
+            self.assertEqual([], cached_options_map['operating_currency'])
+
+            entries2, _, options_map2 = loader.load_file(filename, parse_cache=parse_cache)
+            self.assertEqual(entries, entries2)
+            self.assertIsNot(entries[-1], entries2[-1])
+            self.assertEqual([], options_map2['operating_currency'])
+
+
+class TestLoadParallel(unittest.TestCase):
+
+    def test_load_file_parallel(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  include "{root}/legumes/patates.beancount"
+                  include "fruits/bananas.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  include "../legumes/tomates.beancount"
+                  include "bananas.beancount"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'fruits/bananas.beancount': """
+                  2014-01-05 open Assets:Bananas
+                """,
+                'legumes/tomates.beancount': """
+                  2014-01-03 open Assets:Tomates
+                  2014-01-03 open Assets:Tomates
+                """,
+                'legumes/patates.beancount': """
+                  include "/some/file/that/does/not/exist.beancount"
+                  2014-01-04 open Assets:Patates
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            entries, errors, options_map = loader.load_file(filename)
+            par_entries, par_errors, par_options_map = loader.load_file(
+                filename, processes=4)
+            cache_entries, cache_errors, _ = loader.load_file(
+                filename, processes=4, parse_cache={})
+
+        self.assertEqual(6, len(entries))
+        self.assertEqual(entries, par_entries)
+        self.assertEqual(entries, cache_entries)
+        self.assertEqual([error.message for error in errors],
+                         [error.message for error in par_errors])
+        self.assertEqual([error.message for error in errors],
+                         [error.message for error in cache_errors])
+        self.assertEqual(options_map['filename'], par_options_map['filename'])
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_string_unicode(self):
+        utf8_bytes = textwrap.dedent("""
+          2015-01-01 open Assets:Something
+          2015-05-23 note Assets:Something "¡¢£¤¥¦§¨©ª«¬®¯°±²³´µ¶·¸¹º»¼ "
+        """).encode('utf-8')
+        entries, errors, options_map = loader.load_string(utf8_bytes, encoding='utf8')
+        self.assertFalse(errors)
+
+    def test_string_latin1(self):
+        utf8_bytes = textwrap.dedent("""
+          2015-01-01 open Assets:Something
+          2015-05-23 note Assets:Something "¡¢£¤¥¦§¨©ª«¬®¯°±²³´µ¶·¸¹º»¼ "
+        """).encode('latin1')
+        entries, errors, options_map = loader.load_string(utf8_bytes, encoding='latin1')
+        self.assertFalse(errors)
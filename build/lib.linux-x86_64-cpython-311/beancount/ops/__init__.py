@@ -0,0 +1,5 @@
+"""Operations on the entries defined in the core modules.
+
+This package contains various functions which operate on lists of entries.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
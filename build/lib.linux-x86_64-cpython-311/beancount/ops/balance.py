@@ -0,0 +1,149 @@
+"""Automatic padding of gaps between entries.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import collections
+
+from beancount.core.number import D
+from beancount.core.number import ONE
+from beancount.core.number import ZERO
+from beancount.core.data import Transaction
+from beancount.core.data import Balance
+from beancount.core import amount
+from beancount.core import account
+
+__plugins__ = ('check',)
+
+
+BalanceError = collections.namedtuple('BalanceError', 'source message entry')
+
+
+def get_tolerance(balance_entry, options_map):
+    """Get the tolerance amount for a single entry.
+
+    Args:
+      balance_entry: An instance of data.Balance
+      options_map: An options dict, as per the parser.
+    Returns:
+      A Decimal, the amount of tolerance implied by the directive.
+    """
+    if options_map['use_legacy_fixed_tolerances']:
+        # This is to support the legacy behavior to ease the transition
+        # for some users.
+        tolerance = D('0.015')
+
+    elif (options_map["experiment_explicit_tolerances"] and
+          balance_entry.tolerance is not None):
+        # Use the balance-specific tolerance override if it is provided.
+        tolerance = balance_entry.tolerance
+
+    else:
+        expo = balance_entry.amount.number.as_tuple().exponent
+        if expo < 0:
+            # Be generous and always allow twice the multiplier on Balance and
+            # Pad because the user creates these and the rounding of those
+            # balances may often be further off than those used within a single
+            # transaction.
+            tolerance = options_map["inferred_tolerance_multiplier"] * 2
+            tolerance = ONE.scaleb(expo) * tolerance
+        else:
+            tolerance = ZERO
+
+    return tolerance
+
+
+def check(entries, options_map):
+    """Process the balance assertion directives.
+
+    For each Balance directive, check that their expected balance corresponds to
+    the actual balance computed at that time and replace failing ones by new
+    ones with a flag that indicates failure.
+
+    Args:
+      entries: A list of directives.
+      options_map: A dict of options, parsed from the input file.
+    Returns:
+      A pair of a list of directives and a list of balance check errors.
+    """
+    new_entries = []
+    check_errors = []
+
+    # This is similar to realization, but performed in a different order, and
+    # where we only accumulate balances for accounts that have balance
+    # assertions in them (this saves on time). Here we process the entries one
+    # by one along with the balance checks. The balance of an asserted account
+    # includes that of all its sub-accounts, so that we can make checks on
+    # parent accounts. We only need the units of each currency for this, so we
+    # accumulate those directly.
+
+    # Figure out the set of accounts for which we need to compute a running
+    # balance, and create a dict of currency to units for each of them.
+    asserted_units = {entry.account: {}
+                      for entry in entries
+                      if isinstance(entry, Balance)}
+
+    # A dict of posting account to the list of unit dicts of the asserted
+    # accounts it rolls up into, i.e., itself and its parents. This is filled in
+    # lazily, as accounts are encountered.
+    rollup_map = {}
+
+    for entry in entries:
+        if isinstance(entry, Transaction):
+            # For each of the postings' accounts, update the balances of the
+            # account and its asserted parents.
+            for posting in entry.postings:
+                try:
+                    rollup_units = rollup_map[posting.account]
+                except KeyError:
+                    rollup_units = rollup_map[posting.account] = [
+                        asserted_units[parent_account]
+                        for parent_account in account.parents(posting.account)
+                        if parent_account in asserted_units]
+
+                # Note: Always allow negative lots for the purpose of balancing.
+                # This error should show up somewhere else than here.
+                position = posting.position
+                currency = position.lot.currency
+                for units in rollup_units:
+                    units[currency] = units.get(currency, ZERO) + position.number
+
+        elif isinstance(entry, Balance):
+            # Check the balance against the check entry.
+            expected_amount = entry.amount
+
+            # Get the current balance of this account and its sub-accounts, in
+            # the desired currency only.
+            balance_amount = amount.Amount(
+                asserted_units[entry.account].get(expected_amount.currency, ZERO),
+                expected_amount.currency)
+
+            # Check if the amount is within bounds of the expected amount.
+            diff_amount = amount.amount_sub(balance_amount, expected_amount)
+
+            # Use the specified tolerance or automatically infer it.
+            tolerance = get_tolerance(entry, options_map)
+
+            if abs(diff_amount.number) > tolerance:
+                check_errors.append(
+                    BalanceError(entry.meta,
+                                 ("Balance failed for '{}': "
+                                  "expected {} != accumulated {} ({} {})").format(
+                                      entry.account, expected_amount, balance_amount,
+                                      abs(diff_amount.number),
+                                      ('too much'
+                                       if diff_amount.number > 0
+                                       else 'too little')),
+                                 entry))
+
+                # Substitute the entry by a failing entry, with the diff_amount
+                # field set on it. I'm not entirely sure that this is the best
+                # of ideas, maybe leaving the original check intact and insert a
+                # new error entry might be more functional or easier to
+                # understand.
+                entry = entry._replace(
+                    meta=entry.meta.copy(),
+                    diff_amount=diff_amount)
+
+        new_entries.append(entry)
+
+    return new_entries, check_errors
@@ -0,0 +1,625 @@
+"""This module has code that can build a database of historical prices at
+various times, from which unrealized capital gains and market value can be
+deduced.
+
+Prices are deduced from Price entries found in the file, or perhaps
+created by scripts (for example you could build a script that will fetch
+live prices online and create entries on-the-fly).
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import bisect
+import collections
+
+from beancount.core.number import ONE
+from beancount.core.number import ZERO
+from beancount.core.data import Price
+from beancount.core import amount
+from beancount.core import data
+from beancount.core import inventory
+from beancount.core import position
+from beancount.utils import misc_utils
+from beancount.utils import bisect_key
+
+
+def get_last_price_entries(entries, date):
+    """Run through the entries until the given date and return the last
+    Price entry encountered for each (currency, cost-currency) pair.
+
+    Args:
+      entries: A list of directives.
+      date: An instance of datetime.date. If None, the very latest price
+        is returned.
+    Returns:
+      A list of price entries.
+    """
+    price_entry_map = {}
+    for entry in entries:
+        if date is not None and entry.date >= date:
+            break
+        if isinstance(entry, Price):
+            base_quote = (entry.currency, entry.amount.currency)
+            price_entry_map[base_quote] = entry
+    return sorted(price_entry_map.values(), key=data.entry_sortkey)
+
+
+# The maximum number of (base, quote, date) lookups memoized in a price map.
+PRICE_CACHE_SIZE = 4096
+
+
+class PriceMap(dict):
+    """A price map dictionary.
+
+    The keys include both the set of forward (base, quote) pairs and their
+    inverse. In order to determine which are the forward pairs, access the
+    'forward_pairs' attribute
+
+    Each list of (date, rate) pairs is also unzipped into separate sorted lists
+    of dates and rates, so that lookups by date can use a plain bisect instead
+    of a key function.
+
+    Pairs that are not directly available in the map are converted through a
+    path of intermediate currencies, e.g. JPY -> USD -> CAD, if one exists. The
+    shortest such path is computed on demand and cached per (base, quote).
+
+    Atttributes:
+      forward_pairs: A list of (base, quote) keys for the forward pairs.
+      dates: A dict of (base, quote) keys to sorted lists of dates.
+      rates: A dict of (base, quote) keys to lists of rates, parallel to the
+        lists in 'dates'.
+      cache: An OrderedDict of (base, quote, date) to the (date, rate) pair
+        returned by get_price(), in order of least to most recently used.
+      paths: A dict of (base, quote) to the list of (base, quote) legs to
+        convert through, or None if there is no path between them.
+      entries: The list of directives the map was built from, if it is known to
+        hold all of their prices, or None. The loader sets this for its map.
+    """
+    __slots__ = ('forward_pairs', 'dates', 'rates', 'cache', 'paths', 'entries')
+
+    def reindex(self):
+        """Rebuild the date and rate lists from the contents of the map.
+
+        This must be called after the (date, rate) lists are modified. It also
+        clears the cache of memoized lookups and conversion paths.
+        """
+        self.dates = {}
+        self.rates = {}
+        for base_quote, date_rates in self.items():
+            self.dates[base_quote] = [date for date, _ in date_rates]
+            self.rates[base_quote] = [rate for _, rate in date_rates]
+        self.cache = collections.OrderedDict()
+        self.paths = {}
+
+    def add_prices(self, entries):
+        """Insert the prices of new Price entries into the map, in place.
+
+        Each price is inserted in date order in the list of the pair it was
+        already stored under, i.e., the forward pair or its inverse, and the
+        opposite list is kept in sync. A price at a date that already has one
+        replaces it, as later entries do in build_price_map(). Unlike the
+        latter, the direction in which an existing pair is stored is never
+        reconsidered.
+
+        This is not safe against lookups from other threads running
+        concurrently.
+
+        Args:
+          entries: A list of directives; only the Price entries are considered.
+        """
+        forward_pairs = set(self.forward_pairs)
+        for entry in entries:
+            if not isinstance(entry, Price):
+                continue
+            base_quote = (entry.currency, entry.amount.currency)
+            base, quote = base_quote
+            rate = entry.amount.number
+            if base_quote not in forward_pairs:
+                if (quote, base) in forward_pairs:
+                    # A zero price cannot be inverted; ignore it.
+                    if rate == ZERO:
+                        continue
+                    base_quote = (quote, base)
+                    base, quote = base_quote
+                    rate = ONE/rate
+                else:
+                    # A new pair; this changes the graph of conversion paths.
+                    forward_pairs.add(base_quote)
+                    self.forward_pairs.append(base_quote)
+                    for pair in (base_quote, (quote, base)):
+                        self[pair] = []
+                        self.dates[pair] = []
+                        self.rates[pair] = []
+                    self.paths = {}
+
+            self._insert_rate(base_quote, entry.date, rate)
+            if rate != ZERO:
+                self._insert_rate((quote, base), entry.date, ONE/rate)
+            else:
+                self._insert_rate((quote, base), entry.date, None)
+        self.cache = collections.OrderedDict()
+
+    def _insert_rate(self, base_quote, date, rate):
+        """Insert or replace the rate of a pair at a date.
+
+        Args:
+          base_quote: A (base, quote) key present in the map.
+          date: A datetime.date instance.
+          rate: A Decimal, or None to remove the rate at that date, if any.
+        """
+        dates = self.dates[base_quote]
+        index = bisect.bisect_left(dates, date)
+        exists = index < len(dates) and dates[index] == date
+        if rate is None:
+            if exists:
+                del dates[index]
+                del self.rates[base_quote][index]
+                del self[base_quote][index]
+        elif exists:
+            self.rates[base_quote][index] = rate
+            self[base_quote][index] = (date, rate)
+        else:
+            dates.insert(index, date)
+            self.rates[base_quote].insert(index, rate)
+            self[base_quote].insert(index, (date, rate))
+
+    def get_path(self, base_quote):
+        """Find the shortest conversion path between two currencies.
+
+        Args:
+          base_quote: A pair of (base, quote) currency strings.
+        Returns:
+          A list of (base, quote) pairs available in the map, each of which
+          quotes the base currency of the next, from 'base' to 'quote'. None is
+          returned if the two currencies are not connected.
+        """
+        try:
+            return self.paths[base_quote]
+        except KeyError:
+            pass
+
+        # Breadth-first search over the pairs that have at least one price.
+        base, quote = base_quote
+        graph = collections.defaultdict(list)
+        for (pair_base, pair_quote), dates in self.dates.items():
+            if dates:
+                graph[pair_base].append(pair_quote)
+        parents = {base: None}
+        queue = collections.deque([base])
+        while queue and quote not in parents:
+            currency = queue.popleft()
+            for next_currency in graph[currency]:
+                if next_currency not in parents:
+                    parents[next_currency] = currency
+                    queue.append(next_currency)
+
+        if quote in parents:
+            path = []
+            currency = quote
+            while parents[currency] is not None:
+                path.append((parents[currency], currency))
+                currency = parents[currency]
+            path.reverse()
+        else:
+            path = None
+        self.paths[base_quote] = path
+        return path
+
+
+def build_price_map(entries):
+    """Build a price map from a list of arbitrary entries.
+
+    If multiple prices are found for the same (currency, cost-currency) pair at
+    the same date, the latest date is kept and the earlier ones (for that day)
+    are discarded.
+
+    If inverse price pairs are found, e.g. USD in AUD and AUD in USD, the
+    inverse that has the smallest number of price points is converted into the
+    one that has the most price points. In that way they are reconciled into a
+    single one.
+
+    Args:
+      entries: A list of directives, hopefully including some Price and/or
+      Transaction entries.
+    Returns:
+      A dict of (currency, cost-currency) keys to sorted lists of (date, number)
+      pairs, where 'date' is the date the price occurs at and 'number' a Decimal
+      that represents the price, or rate, between these two
+      currencies/commodities. Each date occurs only once in the sorted list of
+      prices of a particular key. All of the inverses are automatically
+      generated in the price map.
+    """
+    # Fetch a list of all the price entries seen in the ledger.
+    price_entries = [entry
+                     for entry in entries
+                     if isinstance(entry, Price)]
+
+    # Build a map of exchange rates between these units.
+    # (base-currency, quote-currency) -> List of (date, rate).
+    price_map = collections.defaultdict(list)
+    for price in price_entries:
+        base_quote = (price.currency, price.amount.currency)
+        price_map[base_quote].append((price.date, price.amount.number))
+
+    # Find pairs of inversed units.
+    inversed_units = []
+    for base_quote, values in price_map.items():
+        base, quote = base_quote
+        if (quote, base) in price_map:
+            inversed_units.append(base_quote)
+
+    # Find pairs of inversed units, and swallow the conversion with the smaller
+    # number of rates into the other one.
+    for base, quote in inversed_units:
+        bq_prices = price_map[(base, quote)]
+        qb_prices = price_map[(quote, base)]
+        remove = ((base, quote)
+                  if len(bq_prices) < len(qb_prices)
+                  else (quote, base))
+        base, quote = remove
+
+        remove_list = price_map[remove]
+        insert_list = price_map[(quote, base)]
+        del price_map[remove]
+
+        inverted_list = [(date, ONE/rate)
+                         for (date, rate) in remove_list]
+        insert_list.extend(inverted_list)
+
+    # Unzip and sort each of the entries and eliminate duplicates on the date.
+    sorted_price_map = PriceMap({
+        base_quote: list(misc_utils.sorted_uniquify(date_rates, lambda x: x[0], last=True))
+        for (base_quote, date_rates) in price_map.items()})
+
+    # Compute and insert all the inverted rates.
+    forward_pairs = list(sorted_price_map.keys())
+    for (base, quote), price_list in list(sorted_price_map.items()):
+        # Note: You have to filter out zero prices for zero-cost postings, like
+        # gifted options.
+        sorted_price_map[(quote, base)] = [
+            (date, ONE/price) for date, price in price_list
+            if price != ZERO]
+
+    sorted_price_map.forward_pairs = forward_pairs
+    sorted_price_map.entries = None
+    sorted_price_map.reindex()
+    return sorted_price_map
+
+
+def normalize_base_quote(base_quote):
+    """Convert a slash-separated string to a pair of strings.
+
+    Args:
+      base_quote: A pair of strings, the base currency to lookup, and the quote
+        currency to lookup, which expresses which units the base currency is
+        denominated in. This may also just be a string, with a '/' separator.
+    Returns:
+      A pair of strings.
+    """
+    if isinstance(base_quote, str):
+        base_quote_norm = tuple(base_quote.split('/'))
+        assert len(base_quote_norm) == 2, base_quote
+        base_quote = base_quote_norm
+    assert isinstance(base_quote, tuple), base_quote
+    return base_quote
+
+
+def _lookup_price_and_inverse(price_map, base_quote):
+    """Lookup the (base, quote) tuple in the price map and its inverse.
+    If not found, raise an appropriate exception.
+
+    Note: this is meant to be an INTERNAL helper function, use the get_*
+    functions to obtain values from a price_map object.
+
+    Args:
+      price_map: A price map, which is a dict of (base, quote) -> list of (date,
+        number) tuples, as created by build_price_map.
+      base_quote: A pair of strings, (base, quote) currencies.
+        No normalizatin is done.
+    Returns:
+      A list of price-dates, if succesful.
+    Raises:
+      KeyError: If the base_quote and its inverse both weren't able to be looked
+      up.
+    """
+    try:
+        return price_map[base_quote]
+    except KeyError as exc:
+        base, quote = base_quote
+        prices = price_map.get((quote, base), None)
+        if prices:
+            return prices
+        else:
+            raise exc
+
+
+def get_all_prices(price_map, base_quote):
+    """Return a sorted list of all (date, number) price pairs.
+
+    Args:
+      price_map: A price map, which is a dict of (base, quote) -> list of (date,
+        number) tuples, as created by build_price_map.
+      base_quote: A pair of strings, the base currency to lookup, and the quote
+        currency to lookup, which expresses which units the base currency is
+        denominated in. This may also just be a string, with a '/' separator.
+    Returns:
+      A list of (date, Decimal) pairs, sorted by date.
+    Raises:
+      KeyError: If the base/quote could not be found.
+    """
+    base_quote = normalize_base_quote(base_quote)
+    return _lookup_price_and_inverse(price_map, base_quote)
+
+
+def get_latest_price(price_map, base_quote):
+    """Return the latest price/rate from a prica map for the given base/quote pair.
+    This is often used to just get the 'current' price if you're looking at the
+    entire set of entries.
+
+    Args:
+      price_map: A price map, which is a dict of (base, quote) -> list of (date,
+        number) tuples, as created by build_price_map.
+    Returns:
+      A pair of (date, number), where 'date' is a datetime.date instancea dn
+      'number' is a Decimal of the price, or rate, at that date. The date is the
+      latest date which we have an available price for in the price map.
+    """
+    base_quote = normalize_base_quote(base_quote)
+
+    # Handle the degenerate case of a currency priced into its own.
+    base, quote = base_quote
+    if quote is None or base == quote:
+        return (None, ONE)
+
+    if isinstance(price_map, PriceMap):
+        return _get_price_indexed(price_map, base_quote, None)
+
+    # Look up the list and return the latest element. The lists are assumed to
+    # be sorted.
+    try:
+        price_list = _lookup_price_and_inverse(price_map, base_quote)
+    except KeyError:
+        price_list = None
+    if price_list:
+        return price_list[-1]
+    else:
+        return None, None
+
+
+def get_price(price_map, base_quote, date=None):
+    """Return the price as of the given date.
+
+    If the date is unspecified, return the latest price. If the price map is a
+    PriceMap, pairs without any direct price are converted through other
+    currencies where possible.
+
+    Args:
+      price_map: A price map, which is a dict of (base, quote) -> list of (date,
+        number) tuples, as created by build_price_map.
+      base_quote: A pair of strings, the base currency to lookup, and the quote
+        currency to lookup, which expresses which units the base currency is
+        denominated in. This may also just be a string, with a '/' separator.
+      date: A datetime.date instance, the date at which we want the conversion
+        rate.
+    Returns:
+      A pair of (datetime.date, Decimal) instance. If no price information could
+      be found, return (None, None).
+    """
+    if date is None:
+        return get_latest_price(price_map, base_quote)
+
+    base_quote = normalize_base_quote(base_quote)
+
+    # Handle the degenerate case of a currency priced into its own.
+    base, quote = base_quote
+    if quote is None or base == quote:
+        return (None, ONE)
+
+    if isinstance(price_map, PriceMap):
+        return _get_price_indexed(price_map, base_quote, date)
+
+    try:
+        price_list = _lookup_price_and_inverse(price_map, base_quote)
+        index = bisect_key.bisect_right_with_key(price_list, date, key=lambda x: x[0])
+        if index == 0:
+            return None, None
+        else:
+            return price_list[index-1]
+    except KeyError:
+        return None, None
+
+
+def _get_price_indexed(price_map, base_quote, date):
+    """Look up a price in a PriceMap using its date lists, with memoization.
+
+    If neither the pair nor its inverse are in the map, the rate is the product
+    of the rates of each leg of the conversion path between them, at the given
+    date. The date returned for such a rate is that of its oldest leg.
+
+    Note: this is meant to be an INTERNAL helper function for get_price().
+
+    Args:
+      price_map: An instance of PriceMap, as created by build_price_map.
+      base_quote: A normalized pair of (base, quote) strings.
+      date: A datetime.date instance, the date at which we want the rate, or
+        None for the latest rate.
+    Returns:
+      A pair of (datetime.date, Decimal) instance, or (None, None) if no price
+      could be found.
+    """
+    cache = price_map.cache
+    key = base_quote + (date,)
+    try:
+        result = cache[key]
+        # The cache may be shared between threads; the key may have been
+        # evicted in the meantime.
+        try:
+            cache.move_to_end(key)
+        except KeyError:
+            pass
+        return result
+    except KeyError:
+        pass
+
+    base, quote = base_quote
+    if base_quote in price_map.dates or (quote, base) in price_map.dates:
+        result = _get_pair_price(price_map, base_quote, date)
+    else:
+        path = price_map.get_path(base_quote)
+        result = (None, None)
+        if path:
+            path_date, path_rate = None, ONE
+            for leg in path:
+                leg_date, leg_rate = _get_pair_price(price_map, leg, date)
+                if leg_rate is None:
+                    break
+                if path_date is None or leg_date < path_date:
+                    path_date = leg_date
+                path_rate *= leg_rate
+            else:
+                result = (path_date, path_rate)
+
+    cache[key] = result
+    while len(cache) > PRICE_CACHE_SIZE:
+        try:
+            cache.popitem(last=False)
+        except KeyError:
+            break
+    return result
+
+
+def _get_pair_price(price_map, base_quote, date):
+    """Look up the rate of a pair or its inverse in a PriceMap.
+
+    Note: this is meant to be an INTERNAL helper function for get_price().
+
+    Args:
+      price_map: An instance of PriceMap, as created by build_price_map.
+      base_quote: A normalized pair of (base, quote) strings.
+      date: A datetime.date instance, or None for the latest rate.
+    Returns:
+      A pair of (datetime.date, Decimal) instance, or (None, None) if no price
+      could be found.
+    """
+    if base_quote not in price_map.dates:
+        base, quote = base_quote
+        base_quote = (quote, base)
+    dates = price_map.dates.get(base_quote, None)
+    if not dates:
+        return None, None
+    index = len(dates) if date is None else bisect.bisect_right(dates, date)
+    if index == 0:
+        return None, None
+    return dates[index-1], price_map.rates[base_quote][index-1]
+
+
+def convert_amount(price_map, target_currency, amount_, date=None):
+    """Convert commodities held at a cost that differ from the value currency.
+
+    Args:
+      price_map: A price map dict, as created by build_price_map.
+      target_currency: A string, the currency to convert to.
+      amount_: An Amount instance, the amount to convert from.
+      date: A datetime.date instance, the date at which to convert. If None,
+        the latest price is used.
+    Returns:
+      An instance of Amount, or None, if we could not convert it to the target
+      currency.
+    """
+    if amount_.currency != target_currency:
+        base_quote = (amount_.currency, target_currency)
+        _, rate = get_price(price_map, base_quote, date)
+        if rate is not None:
+            converted_amount = amount.Amount(amount_.number * rate, target_currency)
+        else:
+            # If a rate is not found, simply remove the market value.
+            converted_amount = None
+    else:
+        converted_amount = amount_
+    return converted_amount
+
+
+def convert_amounts(price_map, target_currency, amounts, date=None):
+    """Convert a list of amounts to a single currency at a single date.
+
+    This is equivalent to calling convert_amount() on each amount, but looks up
+    the rate only once per distinct currency.
+
+    Args:
+      price_map: A price map dict, as created by build_price_map.
+      target_currency: A string, the currency to convert to.
+      amounts: A list of Amount instances to convert from.
+      date: A datetime.date instance, the date at which to convert. If None,
+        the latest prices are used.
+    Returns:
+      A list of Amount instances, in the same order as 'amounts', with None in
+      place of the amounts that could not be converted.
+    """
+    rates = {target_currency: None}
+    for amount_ in amounts:
+        if amount_.currency not in rates:
+            _, rates[amount_.currency] = get_price(
+                price_map, (amount_.currency, target_currency), date)
+
+    converted_amounts = []
+    for amount_ in amounts:
+        if amount_.currency == target_currency:
+            converted_amounts.append(amount_)
+        else:
+            rate = rates[amount_.currency]
+            converted_amounts.append(
+                None
+                if rate is None
+                else amount.Amount(amount_.number * rate, target_currency))
+    return converted_amounts
+
+
+def get_position_market_value(position_, date, price_map):
+    """Compute the market value of the position at a particular date.
+
+    If the price map does not contain price information, we avoid converting the
+    position and return itself, unchanged.
+
+    Args:
+      position: An instance of Position
+      date: A datetime.date instance, the date at which to market the instruments.
+        If the date provided is None, the inventory is valued at the latest market
+        prices.
+      price_map: A price map, as created by beancount.ops.prices.
+    Returns:
+      An inventory of market values per currency.
+
+    """
+    lot = position_.lot
+    cost_currency = lot.cost.currency if lot.cost else None
+    if cost_currency:
+        base_quote = (lot.currency, cost_currency)
+        price_date, price_number = get_price(price_map, base_quote, date)
+        if price_number is None:
+            return position_
+        else:
+            new_amount = amount.Amount(position_.number * price_number, cost_currency)
+    else:
+        new_amount = amount.Amount(position_.number, lot.currency)
+    return position.from_amounts(new_amount)
+
+
+def get_inventory_market_value(balance, date, price_map):
+    """Compute the market value of the inventory in a currency at a date.
+
+    This function converts all the positions to their market value, in their
+    respective cost currencies.
+
+    Args:
+      balance: An instance of Inventory.
+      date: A datetime.date instance, the date at which to market the instruments.
+        If the date provided is None, the inventory is valued at the latest market
+        prices.
+      price_map: A price map, as created by beancount.ops.prices.
+    Returns:
+      An inventory of market values per currency.
+    """
+    new_balance = inventory.Inventory()
+    for position_ in balance.get_positions():
+        new_balance.add_position(
+            get_position_market_value(position_, date, price_map))
+    return new_balance
@@ -0,0 +1,626 @@
+"""Validation checks.
+
+These checks are intended to be run after all the plugins have transformed the
+list of entries, just before serving them or generating reports from them. The
+idea is to ensure a reasonable set of invariants and generate errors if those
+invariants are violated. They are not sanity checks--user data is subject to
+constraints which are hopefully detected here and which will result in errors
+trickled up to the user.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+from os import path
+import collections
+import time
+
+from beancount.core.data import Open
+from beancount.core.data import Close
+from beancount.core.data import Transaction
+from beancount.core.data import Document
+from beancount.core.data import Note
+from beancount.core import data
+from beancount.core import getters
+from beancount.core import interpolate
+from beancount.utils import misc_utils
+
+
+# An error from one of the checks.
+ValidationError = collections.namedtuple('ValidationError', 'source message entry')
+
+
+# Directive types that should be allowed after the account is closed.
+ALLOW_AFTER_CLOSE = (Document, Note)
+
+
+class Validator:
+    """Base class for the validations that check entries one at a time.
+
+    All the validators of a call to run_validators() are fed the entries from a
+    single traversal of the list of entries. Each validator declares the
+    directive types it wants to see in the dict returned by its handlers()
+    method; a handler registered for a base type, e.g. 'object', receives all
+    the directives of the other types. The errors are collected at the end of
+    the traversal, by calling finish().
+
+    Attributes:
+      options_map: An options map.
+      errors: A list of the errors found so far.
+    """
+
+    def __init__(self, options_map):
+        self.options_map = options_map
+        self.errors = []
+
+    def handlers(self):
+        """Return the handlers of this validator.
+
+        Returns:
+          A dict of directive type to a function that accepts a directive of
+          that type.
+        """
+        return {}
+
+    def finish(self):
+        """Complete the validation, after all the entries have been seen.
+
+        Returns:
+          A list of new errors, if any were found.
+        """
+        return self.errors
+
+
+def get_type_handlers(validators, entry_type):
+    """Find the handlers of a list of validators for a directive type.
+
+    Args:
+      validators: A list of Validator instances.
+      entry_type: A directive type.
+    Returns:
+      A list of pairs of (validator index, handler function), in the order of
+      the validators.
+    """
+    type_handlers = []
+    for index, validator in enumerate(validators):
+        handlers = validator.handlers()
+        for base_type in entry_type.__mro__:
+            if base_type in handlers:
+                type_handlers.append((index, handlers[base_type]))
+                break
+    return type_handlers
+
+
+def run_validators(entries, options_map, validator_classes, log_timings=None):
+    """Run a list of validators over the entries, in a single traversal.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+      validator_classes: A list of subclasses of Validator.
+      log_timings: An optional function to use for logging the time spent in
+        each of the validators.
+    Returns:
+      A list of lists of errors, one for each of the validator classes.
+    """
+    validators = [validator_class(options_map)
+                  for validator_class in validator_classes]
+
+    # A dict of directive type to the list of its handlers, filled in lazily.
+    dispatch = {}
+
+    if log_timings is None:
+        for entry in entries:
+            try:
+                type_handlers = dispatch[type(entry)]
+            except KeyError:
+                type_handlers = dispatch[type(entry)] = get_type_handlers(
+                    validators, type(entry))
+            for _, handler in type_handlers:
+                handler(entry)
+        return [validator.finish() for validator in validators]
+
+    # Measure the time spent in each validator separately.
+    elapsed = [0.] * len(validators)
+    for entry in entries:
+        try:
+            type_handlers = dispatch[type(entry)]
+        except KeyError:
+            type_handlers = dispatch[type(entry)] = get_type_handlers(
+                validators, type(entry))
+        for index, handler in type_handlers:
+            time1 = time.time()
+            handler(entry)
+            elapsed[index] += time.time() - time1
+
+    errors_list = []
+    for index, (validator_class, validator) in enumerate(zip(validator_classes,
+                                                             validators)):
+        time1 = time.time()
+        errors_list.append(validator.finish())
+        elapsed[index] += time.time() - time1
+        log_timings("Operation: {:48} Time: {}{:6.0f} ms".format(
+            "'validator: {}'".format(validator_class.__name__),
+            '      '*2, elapsed[index] * 1000))
+    return errors_list
+
+
+class OpenCloseValidator(Validator):
+    """See validate_open_close()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.open_map = {}
+        self.close_map = {}
+
+    def handlers(self):
+        return {Open: self.open, Close: self.close}
+
+    def open(self, entry):
+        if entry.account in self.open_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate open directive for {}".format(entry.account),
+                    entry))
+        else:
+            self.open_map[entry.account] = entry
+
+    def close(self, entry):
+        if entry.account in self.close_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate close directive for {}".format(entry.account),
+                    entry))
+        else:
+            try:
+                open_entry = self.open_map[entry.account]
+                if entry.date <= open_entry.date:
+                    self.errors.append(
+                        ValidationError(
+                            entry.meta,
+                            "Internal error: closing date for {} "
+                            "appears before opening date".format(entry.account),
+                            entry))
+            except KeyError:
+                self.errors.append(
+                    ValidationError(
+                        entry.meta,
+                        "Unopened account {} is being closed".format(entry.account),
+                        entry))
+
+            self.close_map[entry.account] = entry
+
+
+def validate_open_close(entries, options_map):
+    """Check constraints on open and close directives themselves.
+
+    This method checks two kinds of constraints:
+
+    1. An open or a close directive may only show up once for each account. If a
+       duplicate is detected, an error is generated.
+
+    2. Close directives may only appears if an open directive has been seen
+       previous (chronologically).
+
+    3. The date of close directives must be strictly greater than their
+      corresponding open directive.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [OpenCloseValidator])[0]
+
+
+class DuplicateBalancesValidator(Validator):
+    """See validate_duplicate_balances()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # Mapping of (account, currency, date) to Balance entry.
+        self.balance_entries = {}
+
+    def handlers(self):
+        return {data.Balance: self.balance}
+
+    def balance(self, entry):
+        key = (entry.account, entry.amount.currency, entry.date)
+        try:
+            previous_entry = self.balance_entries[key]
+            if entry.amount != previous_entry.amount:
+                self.errors.append(
+                    ValidationError(
+                        entry.meta,
+                        "Duplicate balance assertion with different amounts",
+                        entry))
+        except KeyError:
+            self.balance_entries[key] = entry
+
+
+def validate_duplicate_balances(entries, options_map):
+    """Check that balance entries occur only once per day.
+
+    Because we do not support time, and the declaration order of entries is
+    meant to be kept irrelevant, two balance entries with different amounts
+    should not occur in the file. We do allow two identical balance assertions,
+    however, because this may occur during import.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [DuplicateBalancesValidator])[0]
+
+
+class DuplicateCommoditiesValidator(Validator):
+    """See validate_duplicate_commodities()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # Mapping of currency to Commodity entry.
+        self.commodity_entries = {}
+
+    def handlers(self):
+        return {data.Commodity: self.commodity}
+
+    def commodity(self, entry):
+        key = entry.currency
+        try:
+            previous_entry = self.commodity_entries[key]
+            if previous_entry:
+                self.errors.append(
+                    ValidationError(
+                        entry.meta,
+                        "Duplicate commodity directives for '{}'".format(key),
+                        entry))
+        except KeyError:
+            self.commodity_entries[key] = entry
+
+
+def validate_duplicate_commodities(entries, options_map):
+    """Check that commodty entries are unique for each commodity.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [DuplicateCommoditiesValidator])[0]
+
+
+class ActiveAccountsValidator(Validator):
+    """See validate_active_accounts()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.error_pairs = []
+        self.active_set = set()
+        self.opened_accounts = set()
+
+    def handlers(self):
+        return {data.Open: self.open, data.Close: self.close, object: self.other}
+
+    def open(self, entry):
+        self.active_set.add(entry.account)
+        self.opened_accounts.add(entry.account)
+
+    def close(self, entry):
+        self.active_set.discard(entry.account)
+
+    def other(self, entry):
+        for account in getters.get_entry_accounts(entry):
+            if account not in self.active_set:
+                # Allow document and note directives that occur after an
+                # account is closed.
+                if (isinstance(entry, ALLOW_AFTER_CLOSE) and
+                    account in self.opened_accounts):
+                    continue
+
+                # Register an error to be logged later, with an appropriate
+                # message.
+                self.error_pairs.append((account, entry))
+
+    def finish(self):
+        # Refine the error message to disambiguate between the case of an account
+        # that has never been seen and one that was simply not active at the time.
+        for account, entry in self.error_pairs:
+            if account in self.opened_accounts:
+                message = "Invalid reference to inactive account '{}'".format(account)
+            else:
+                message = "Invalid reference to unknown account '{}'".format(account)
+            self.errors.append(ValidationError(entry.meta, message, entry))
+        return self.errors
+
+
+def validate_active_accounts(entries, options_map):
+    """Check that all references to accounts occurs on active accounts.
+
+    We basically check that references to accounts from all directives other
+    than Open and Close occur at dates the open-close interval of that account.
+    This should be good for all of the directive types where we can extract an
+    account name.
+
+    Note that this is more strict a check than comparing the dates: we actually
+    check that no references to account are made on the same day before the open
+    directive appears for that account. This is a nice property to have, and is
+    supported by our custom sorting routine that will sort open entries before
+    transaction entries, given the same date.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [ActiveAccountsValidator])[0]
+
+
+class CurrencyConstraintsValidator(Validator):
+    """See validate_currency_constraints()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # A dict of every opened account to its Open entry.
+        self.open_map = {}
+        # A list of (entry, posting) pairs on accounts not opened yet, to be
+        # checked against their Open entry once all of them have been seen.
+        self.deferred = []
+
+    def handlers(self):
+        return {Open: self.open, Transaction: self.transaction}
+
+    def open(self, entry):
+        self.open_map[entry.account] = entry
+
+    def transaction(self, entry):
+        for posting in entry.postings:
+            try:
+                open_entry = self.open_map[posting.account]
+            except KeyError:
+                self.deferred.append((entry, posting))
+                continue
+            self.check_posting(entry, posting, open_entry)
+
+    def check_posting(self, entry, posting, open_entry):
+        # Skip the check if the account specifies no valid currencies.
+        valid_currencies = open_entry.currencies
+        if not valid_currencies:
+            return
+
+        # Perform the check.
+        if posting.position.lot.currency not in valid_currencies:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Invalid currency {} for account '{}'".format(
+                        posting.position.lot.currency, posting.account),
+                    entry))
+
+    def finish(self):
+        for entry, posting in self.deferred:
+            open_entry = self.open_map.get(posting.account, None)
+            if open_entry is not None:
+                self.check_posting(entry, posting, open_entry)
+        return self.errors
+
+
+def validate_currency_constraints(entries, options_map):
+    """Check the currency constraints from account open declarations.
+
+    Open directives admit an optional list of currencies that specify the only
+    types of commodities that the running inventory for this account may
+    contain. This function checks that all postings are only made in those
+    commodities.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [CurrencyConstraintsValidator])[0]
+
+
+class DocumentsPathsValidator(Validator):
+    """See validate_documents_paths()."""
+
+    def handlers(self):
+        return {Document: self.document}
+
+    def document(self, entry):
+        if not path.isabs(entry.filename):
+            self.errors.append(
+                ValidationError(entry.meta, "Invalid relative path for entry", entry))
+
+
+def validate_documents_paths(entries, options_map):
+    """Check that all filenames in resolved Document entries are absolute filenames.
+
+    The processing of document entries is assumed to result in absolute paths.
+    Relative paths are resolved at the parsing stage and at point we want to
+    make sure we don't have to do any further processing on them.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [DocumentsPathsValidator])[0]
+
+
+class DataTypesValidator(Validator):
+    """See validate_data_types()."""
+
+    def handlers(self):
+        return {object: self.entry}
+
+    def entry(self, entry):
+        try:
+            data.sanity_check_types(entry)
+        except AssertionError as exc:
+            self.errors.append(
+                ValidationError(entry.meta,
+                                "Invalid data types: {}".format(exc),
+                                entry))
+
+
+def validate_data_types(entries, options_map):
+    """Check that all the data types of the attributes of entries are as expected.
+
+    Users are provided with a means to filter the list of entries. They're able to
+    write code that manipulates those tuple objects without any type constraints.
+    With discipline, this mostly works, but I know better: check, just to make sure.
+    This routine checks all the data types and assumptions on entries.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [DataTypesValidator])[0]
+
+
+class TransactionBalancesValidator(Validator):
+    """See validate_check_transaction_balances()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.default_tolerances = options_map['default_tolerance']
+        self.balanced_transactions = options_map.get('balanced_transactions', None) or {}
+
+    def handlers(self):
+        return {Transaction: self.transaction}
+
+    def transaction(self, entry):
+        # IMPORTANT: This validation is _crucial_ and cannot be skipped.
+        # This is where we actually detect and warn on unbalancing
+        # transactions. This _must_ come after the user routines, because
+        # unbalancing input is legal, as those types of transactions may be
+        # "fixed up" by a user-plugin. In other words, we want to allow
+        # users to input unbalancing transactions as long as the final
+        # transactions objects that appear on the stream (after processing
+        # the plugins) are balanced. See {9e6c14b51a59}.
+        #
+        # Skip the transactions which were found to balance during booking,
+        # if their postings have not been replaced or modified since.
+        try:
+            postings, contents = self.balanced_transactions[id(entry.postings)]
+            if (postings is entry.postings and
+                contents == interpolate.get_balance_contents(postings)):
+                return
+        except KeyError:
+            pass
+
+        # Detect complete sets of postings that have residual balance;
+        residual = interpolate.compute_residual(entry.postings)
+        tolerances = interpolate.infer_tolerances(entry.postings, self.options_map)
+        if not residual.is_small(tolerances, self.default_tolerances):
+            self.errors.append(
+                ValidationError(entry.meta,
+                                "Transaction does not balance: {}".format(residual),
+                                entry))
+
+
+def validate_check_transaction_balances(entries, options_map):
+    """Check again that all transaction postings balance, as users may have
+    transformed transactions.
+
+    If the options include the transactions which were found to balance during
+    booking, those whose postings have not been changed since are not checked
+    again.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    return run_validators(entries, options_map, [TransactionBalancesValidator])[0]
+
+
+# A mapping of the validation functions above to their Validator class, so that
+# validate() can run all of them in a single traversal of the entries.
+VALIDATOR_CLASSES = {
+    validate_open_close: OpenCloseValidator,
+    validate_active_accounts: ActiveAccountsValidator,
+    validate_currency_constraints: CurrencyConstraintsValidator,
+    validate_duplicate_balances: DuplicateBalancesValidator,
+    validate_duplicate_commodities: DuplicateCommoditiesValidator,
+    validate_documents_paths: DocumentsPathsValidator,
+    validate_data_types: DataTypesValidator,
+    validate_check_transaction_balances: TransactionBalancesValidator,
+    }
+
+
+# A list of reasonably fast validations to always run by default.
+BASIC_VALIDATIONS = [validate_open_close,
+                     validate_active_accounts,
+                     validate_currency_constraints,
+                     validate_duplicate_balances,
+                     validate_duplicate_commodities,
+                     validate_documents_paths,
+                     validate_check_transaction_balances]
+
+# These are slower, and thus only turned on in the check() routine. They share
+# the traversal of the basic validations, so they only add the cost of the
+# checks themselves. This can be enabled by modifying the 'VALIDATIONS'
+# attribute below.
+HARDCORE_VALIDATIONS = [validate_data_types]
+
+# The list of validations to run.
+VALIDATIONS = BASIC_VALIDATIONS
+
+
+def validate(entries, options_map, log_timings=None, extra_validations=None):
+    """Perform all the standard checks on parsed contents.
+
+    The validations which have a Validator class in VALIDATOR_CLASSES are all
+    run together, in a single traversal of the entries. Other validation
+    functions are called on their own.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+      log_timings: An optional function to use for logging the time of individual
+        operations.
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    validation_tests = list(VALIDATIONS)
+    if extra_validations:
+        validation_tests.extend(extra_validations)
+
+    # Run the validators defined above in a single pass.
+    fused_tests = [validation_function
+                   for validation_function in validation_tests
+                   if validation_function in VALIDATOR_CLASSES]
+    with misc_utils.log_time('validators', log_timings, indent=2):
+        fused_errors = run_validators(
+            entries, options_map,
+            [VALIDATOR_CLASSES[validation_function]
+             for validation_function in fused_tests],
+            log_timings)
+    errors_map = dict(zip(fused_tests, fused_errors))
+
+    # Run the other validation routines and collect the errors in order.
+    errors = []
+    for validation_function in validation_tests:
+        try:
+            new_errors = errors_map[validation_function]
+        except KeyError:
+            with misc_utils.log_time(
+                    'function: {}'.format(validation_function.__name__),
+                    log_timings, indent=2):
+                new_errors = validation_function(entries, options_map)
+        errors.extend(new_errors)
+
+    return errors
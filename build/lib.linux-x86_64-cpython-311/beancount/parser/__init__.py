@@ -0,0 +1,4 @@
+"""
+Parser module for beancount input files.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
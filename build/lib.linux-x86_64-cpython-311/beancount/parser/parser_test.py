@@ -0,0 +1,251 @@
+"""
+Tests for parser.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import unittest
+import tempfile
+import textwrap
+import sys
+import subprocess
+import threading
+
+from beancount.parser import parser
+from beancount.parser import lexer
+from beancount.utils import test_utils
+
+
+class TestCompareTestFunctions(unittest.TestCase):
+
+    def test_has_auto_postings(self):
+        entries, _, __ = parser.parse_string("""
+
+          2014-01-27 * "UNION MARKET"
+            Liabilities:US:Amex:BlueCash    -22.02 USD
+            Expenses:Food:Grocery            22.02 USD
+
+        """, dedent=True)
+        self.assertFalse(parser.has_auto_postings(entries))
+
+        entries, _, __ = parser.parse_string("""
+
+          2014-01-27 * "UNION MARKET"
+            Liabilities:US:Amex:BlueCash    -22.02 USD
+            Expenses:Food:Grocery
+
+        """, dedent=True)
+        self.assertTrue(parser.has_auto_postings(entries))
+
+
+class TestParserDoc(unittest.TestCase):
+
+    @parser.parse_doc(expect_errors=None)
+    def test_parse_doc__disabled(self, entries, errors, options_map):
+        """
+        2013-05-40 * "Nice dinner at Mermaid Inn"
+          Expenses:Restaurant         100 USD
+          Assets:US:Cash
+        """
+        self.assertTrue(errors)
+
+    # Note: nose does not honor expectedFailure as of 1.3.4. We would use it
+    # here instead of doing this manually.
+    def test_parse_doc__errors(self):
+        @parser.parse_doc(expect_errors=True)
+        def test_function(self, entries, errors, options_map):
+            """
+            2013-05-40 * "Nice dinner at Mermaid Inn"
+              Expenses:Restaurant         100 USD
+              Assets:US:Cash
+            """
+        try:
+            test_function(unittest.TestCase())
+            self.fail("Test should have failed.")
+        except AssertionError:
+            pass
+
+    # Note: nose does not honor expectedFailure as of 1.3.4. We would use it
+    # here instead of doing this manually.
+    def test_parse_doc__noerrors(self):
+        @parser.parse_doc(expect_errors=False)
+        def test_function(self, entries, errors, options_map):
+            """
+            2013-05-40 * "Nice dinner at Mermaid Inn"
+              Expenses:Restaurant         100 USD
+              Assets:US:Cash
+            """
+        try:
+            test_function(unittest.TestCase())
+            self.fail("Test should have failed.")
+        except AssertionError:
+            pass
+
+
+class TestParserInputs(unittest.TestCase):
+    """Try difference sources for the parser's input."""
+
+    INPUT = """
+      2013-05-18 * "Nice dinner at Mermaid Inn"
+        Expenses:Restaurant         100 USD
+        Assets:US:Cash
+    """
+
+    def test_parse_string(self):
+        entries, errors, _ = parser.parse_string(self.INPUT)
+        self.assertEqual(1, len(entries))
+        self.assertEqual(0, len(errors))
+
+    def test_parse_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(self.INPUT)
+            file.flush()
+            entries, errors, _ = parser.parse_file(file.name)
+            self.assertEqual(1, len(entries))
+            self.assertEqual(0, len(errors))
+
+    @classmethod
+    def parse_stdin(cls):
+        entries, errors, _ = parser.parse_file("-")
+        assert entries, "Empty entries: {}".format(entries)
+        assert not errors, "Errors: {}".format(errors)
+
+    def test_parse_stdin(self):
+        code = ('import beancount.parser.parser_test as p; '
+                'p.TestParserInputs.parse_stdin()')
+        pipe = subprocess.Popen([sys.executable, '-c', code, __file__],
+                                env=test_utils.subprocess_env(),
+                                stdin=subprocess.PIPE)
+        output, errors = pipe.communicate(self.INPUT.encode('utf-8'))
+        self.assertEqual(0, pipe.returncode)
+
+    def test_parse_string_None(self):
+        input_string = report_filename = None
+        with self.assertRaises(TypeError):
+            entries, errors, _ = parser.parse_string(input_string)
+        with self.assertRaises(TypeError):
+            entries, errors, _ = parser.parse_string("something", None, report_filename)
+
+
+class TestParserThreads(unittest.TestCase):
+
+    def test_parse_string_concurrently(self):
+        inputs = ["""
+          2013-05-{:02d} * "Dinner number {}"
+            Expenses:Restaurant         {} USD
+            Assets:US:Cash
+        """.format(day, day, day) * 50 for day in range(1, 9)]
+        expected = [parser.parse_string(input_string, dedent=True)[0]
+                    for input_string in inputs]
+
+        results = [[] for _ in inputs]
+        def parse(index):
+            for _ in range(10):
+                entries, _, __ = parser.parse_string(inputs[index], dedent=True)
+                results[index].append(entries)
+        threads = [threading.Thread(target=parse, args=(index,))
+                   for index in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for entries, entries_list in zip(expected, results):
+            self.assertEqual([entries] * 10, entries_list)
+
+    def test_parse_and_lex_file_concurrently(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(textwrap.dedent("""
+              2013-05-01 open Assets:US:Cash
+              2013-05-01 open Expenses:Restaurant
+            """))
+            for day in range(1, 29):
+                file.write(textwrap.dedent("""
+                  2013-05-{:02d} * "Dinner number {}"
+                    Expenses:Restaurant         {} USD
+                    Assets:US:Cash
+                """.format(day, day, day)) * 10)
+            file.flush()
+            expected_entries = parser.parse_file(file.name)[0]
+            expected_tokens = list(lexer.lex_iter(file.name))
+
+            results = []
+            def parse():
+                for _ in range(10):
+                    results.append(parser.parse_file(file.name)[0] == expected_entries)
+            def lex():
+                for _ in range(10):
+                    results.append(list(lexer.lex_iter(file.name)) == expected_tokens)
+            threads = [threading.Thread(target=target)
+                       for target in (parse, parse, lex, lex)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([True] * 40, results)
+
+    def test_lex_iter_partially_consumed(self):
+        # A lexer iterator left half-consumed does not block parsing elsewhere.
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(textwrap.dedent("""
+              2013-05-01 open Assets:US:Cash
+              2013-05-01 open Expenses:Restaurant
+            """))
+            file.flush()
+            tokens = lexer.lex_iter(file.name)
+            next(tokens)
+            results = []
+            thread = threading.Thread(
+                target=lambda: results.append(parser.parse_file(file.name)[0]))
+            thread.start()
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(2, len(results[0]))
+            self.assertTrue(list(tokens))
+
+
+class TestUnicodeErrors(unittest.TestCase):
+
+    test_utf8_string = textwrap.dedent("""
+      2015-05-23 note Assets:Something "a¡¢£¤¥¦§¨©ª«¬®¯°±²³´µ¶·¸¹º»¼ z"
+    """)
+    expected_utf8_string = "a¡¢£¤¥¦§¨©ª«¬®¯°±²³´µ¶·¸¹º»¼ z"
+
+    test_latin1_string = textwrap.dedent("""
+      2015-05-23 note Assets:Something "école Floß søllerød"
+    """)
+    expected_latin1_string = "école Floß søllerød"
+
+    # Test providing utf8 bytes to the lexer.
+    def test_bytes_encoded_utf8(self):
+        utf8_bytes = self.test_utf8_string.encode('utf8')
+        entries, errors, _ = parser.parse_string(utf8_bytes)
+        self.assertEqual(1, len(entries))
+        self.assertFalse(errors)
+        # Check that the lexer correctly parsed the UTF8 string.
+        self.assertEqual(self.expected_utf8_string, entries[0].comment)
+
+    # Test providing latin1 bytes to the lexer when it is expecting utf8.
+    def test_bytes_encoded_incorrect(self):
+        latin1_bytes = self.test_utf8_string.encode('latin1')
+        entries, errors, _ = parser.parse_string(latin1_bytes)
+        self.assertEqual(1, len(entries))
+        self.assertFalse(errors)
+        # Check that the lexer failed to convert the string but did not cause
+        # other errors.
+        self.assertNotEqual(self.expected_utf8_string, entries[0].comment)
+
+    # Test providing latin1 bytes to the lexer with an encoding.
+    def test_bytes_encoded_latin1(self):
+        latin1_bytes = self.test_latin1_string.encode('latin1')
+        entries, errors, _ = parser.parse_string(latin1_bytes, encoding='latin1')
+        self.assertEqual(1, len(entries))
+        self.assertFalse(errors)
+        # Check that the lexer correctly parsed the latin1 string.
+        self.assertEqual(self.expected_latin1_string, entries[0].comment)
+
+    # Test using a garbage invalid encoding.
+    def test_bytes_encoded_invalid(self):
+        latin1_bytes = self.test_latin1_string.encode('latin1')
+        entries, errors, _ = parser.parse_string(latin1_bytes, encoding='garbage')
+        self.assertEqual(1, len(errors))
+        self.assertRegexpMatches(errors[0].message, "unknown encoding")
+        self.assertFalse(entries)
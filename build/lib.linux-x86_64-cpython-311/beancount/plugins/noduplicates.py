@@ -0,0 +1,24 @@
+"""This plugin validates that there are no duplicate transactions.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+from beancount.core import compare
+
+__plugins__ = ('validate_no_duplicates',)
+
+
+def validate_no_duplicates(entries, options_map):
+    """Check that the entries are unique, by computing hashes.
+
+    The hashes are memoized in the loader's cache, if there is one, for reuse
+    by later consumers of the same entries.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    unused_hashes, errors = compare.hash_entries(entries,
+                                                 options_map.get('entry_hashes'))
+    return entries, errors
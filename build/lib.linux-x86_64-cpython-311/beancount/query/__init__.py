@@ -0,0 +1,3 @@
+"""Transaction and postings filtering syntax parser.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
@@ -0,0 +1,214 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import datetime
+import operator
+import unittest
+
+from beancount.query import query_compile as qc
+from beancount.query import query_env as qe
+from beancount.query import query_execute as qx
+from beancount.query import query_optimize as qo
+from beancount.query import query_parser
+from beancount.query import query_table
+from beancount import loader
+
+
+class OptimizeBase(unittest.TestCase):
+
+    def compile_where(self, where_string):
+        expr = query_parser.Parser().parse(
+            'SELECT * WHERE {}'.format(where_string)).where_clause
+        return qc.compile_expression(expr, qe.FilterPostingsEnvironment())
+
+
+class TestFoldConstants(OptimizeBase):
+
+    def test_fold_operators(self):
+        self.assertEqual(qc.EvalConstant(True),
+                         qo.fold_constants(self.compile_where('2 > 1 AND NOT FALSE')))
+        self.assertEqual(qc.EvalConstant(False),
+                         qo.fold_constants(self.compile_where('"abc" ~ "B$"')))
+
+    def test_fold_logical(self):
+        c_account = self.compile_where('account = "Assets:Cash"')
+        self.assertEqual(c_account,
+                         qo.fold_constants(self.compile_where(
+                             'TRUE AND account = "Assets:Cash"')))
+        self.assertEqual(c_account,
+                         qo.fold_constants(self.compile_where(
+                             'account = "Assets:Cash" AND TRUE')))
+        self.assertEqual(c_account,
+                         qo.fold_constants(self.compile_where(
+                             'account = "Assets:Cash" OR 1 = 2')))
+        self.assertEqual(qc.EvalConstant(False),
+                         qo.fold_constants(self.compile_where(
+                             'account = "Assets:Cash" AND 1 = 2')))
+        self.assertEqual(qc.EvalConstant(True),
+                         qo.fold_constants(self.compile_where(
+                             'TRUE OR account = "Assets:Cash"')))
+
+    def test_fold_does_not_modify_input(self):
+        c_where = self.compile_where('account = "Assets:Cash" AND (1 = 1)')
+        c_copy = self.compile_where('account = "Assets:Cash" AND (1 = 1)')
+        qo.fold_constants(c_where)
+        self.assertEqual(c_copy, c_where)
+
+    def test_fold_inherited_operands(self):
+        # A node class declaring its own slots still has its base's operands.
+        class EvalTaggedEqual(qc.EvalEqual):
+            __slots__ = ('tag',)
+            def __init__(self, left, right):
+                super().__init__(left, right)
+                self.tag = 'tagged'
+
+        c_account = self.compile_where('account = "Assets:Cash"')
+        c_not = qc.EvalNot(qc.EvalConstant(False))
+        c_expr = qo.fold_constants(EvalTaggedEqual(c_account, c_not))
+        self.assertIsInstance(c_expr, EvalTaggedEqual)
+        self.assertEqual(['dtype', 'left', 'right', 'operator', 'tag'],
+                         c_expr.attributes())
+        self.assertIs(c_account, c_expr.left)
+        self.assertEqual(qc.EvalConstant(True), c_expr.right)
+        self.assertEqual('tagged', c_expr.tag)
+
+    def test_fold_errors_deferred(self):
+        c_where = self.compile_where('"abc" > 1')
+        self.assertEqual(c_where, qo.fold_constants(c_where))
+
+
+class TestOptimizeWhere(OptimizeBase):
+
+    def test_date_range(self):
+        self.assertEqual(
+            qo.EvalDateRange(datetime.date(2014, 1, 1), datetime.date(2014, 3, 2)),
+            qo.optimize_where(self.compile_where(
+                'date >= 2014-01-01 AND date <= 2014-03-01')))
+        self.assertEqual(
+            qo.EvalDateRange(datetime.date(2014, 1, 2), datetime.date(2015, 1, 1)),
+            qo.optimize_where(self.compile_where(
+                '2014-01-01 < date AND year = 2014')))
+        self.assertEqual(
+            qo.EvalDateRange(None, datetime.date(2014, 1, 1)),
+            qo.optimize_where(self.compile_where('year < 2014')))
+
+    def test_account_filter(self):
+        c_where = qo.optimize_where(self.compile_where(
+            'narration ~ "x" AND account ~ "^Assets" AND "Assets:Cash" = account'))
+        c_conjuncts = qc.get_conjuncts(c_where)
+        self.assertEqual([qo.EvalAccountFilter, qo.EvalAccountFilter, qc.EvalMatch],
+                         list(map(type, c_conjuncts)))
+        self.assertEqual(operator.eq, c_conjuncts[1].operator)
+        self.assertEqual('Assets:Cash', c_conjuncts[1].value)
+
+    def test_order(self):
+        c_where = qo.optimize_where(self.compile_where(
+            'number > 0 AND account ~ "Cash" AND date >= 2014-01-01'))
+        self.assertEqual([qo.EvalDateRange, qo.EvalAccountFilter, qc.EvalGreater],
+                         list(map(type, qc.get_conjuncts(c_where))))
+
+    def test_disjunction_not_pushed(self):
+        c_where = self.compile_where('date >= 2014-01-01 OR account ~ "Cash"')
+        self.assertEqual(c_where, qo.optimize_where(c_where))
+
+    def test_none(self):
+        self.assertIsNone(qo.optimize_where(None))
+
+
+class TestOptimizedExecution(OptimizeBase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Bank:Checking
+        2014-01-01 open Assets:Cash
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-03 * "Dinner"
+          Expenses:Restaurant        50.02 USD
+          Assets:Bank:Checking
+
+        2014-03-04 * "Withdrawal"
+          Assets:Cash               100.00 USD
+          Assets:Bank:Checking
+
+        2014-12-31 * "Lunch"
+          Expenses:Restaurant        12.00 USD
+          Assets:Cash
+
+        2015-04-05 * "Lunch"
+          Expenses:Restaurant        14.00 USD
+          Assets:Cash
+        """
+        self.entries = entries
+        self.options_map = options_map
+
+    def check_equivalent(self, query_string):
+        statement = query_parser.Parser().parse(query_string)
+        c_query = qc.compile_select(statement,
+                                    qe.TargetsEnvironment(),
+                                    qe.FilterPostingsEnvironment(),
+                                    qe.FilterEntriesEnvironment())
+        expected = qx.execute_query(c_query, self.entries, self.options_map)
+        actual = qx.execute_query(qo.optimize(c_query), self.entries, self.options_map)
+        self.assertEqual(expected, actual)
+        return actual
+
+    def test_equivalent(self):
+        for where in ['date >= 2014-03-04',
+                      'date > 2014-03-04 AND date < 2015-01-01',
+                      'year = 2014 AND account ~ "Cash"',
+                      'account = "Assets:Bank:Checking"',
+                      'account ~ "Assets" AND number > 0',
+                      'year = 2016',
+                      '1 = 2',
+                      'TRUE']:
+            self.check_equivalent(
+                'SELECT date, account, position WHERE {}'.format(where))
+            self.check_equivalent(
+                'SELECT date, account, position, balance WHERE {}'.format(where))
+            self.check_equivalent(
+                'SELECT account, sum(position) WHERE {} GROUP BY account'.format(where))
+
+    def test_equivalent_from(self):
+        _, rows = self.check_equivalent(
+            'SELECT date, account FROM CLOSE ON 2015-01-01 '
+            'WHERE date >= 2014-03-01 AND account ~ "Cash"')
+        self.assertEqual([(datetime.date(2014, 3, 4), 'Assets:Cash'),
+                          (datetime.date(2014, 12, 31), 'Assets:Cash')], rows)
+
+    def test_select_rows(self):
+        table = query_table.PostingTable(self.entries)
+        c_where = qo.optimize_where(self.compile_where(
+            'date >= 2014-03-01 AND account ~ "Cash"'))
+        self.assertEqual([2, 5, 7], query_table.select_rows(table, None, c_where))
+
+    def test_explain(self):
+        statement = query_parser.Parser().parse(
+            'SELECT * WHERE year = 2014 AND account ~ "Cash" AND number > 0')
+        c_query = qo.optimize(qc.compile_select(statement,
+                                                qe.TargetsEnvironment(),
+                                                qe.FilterPostingsEnvironment(),
+                                                qe.FilterEntriesEnvironment()))
+        steps = qo.explain(c_query)
+        self.assertEqual(3, len(steps))
+        self.assertEqual('Bisect postings by date: [2014-01-01, 2015-01-01)', steps[0])
+        self.assertEqual("Lookup postings by account: account ~ 'Cash'", steps[1])
+        self.assertTrue(steps[2].startswith('Filter postings: EvalGreater'))
+
+        c_query = c_query._replace(c_where=None)
+        self.assertEqual(['Scan all postings'], qo.explain(c_query))
+
+    def test_explain_balance(self):
+        # The running balance disables the indexes.
+        statement = query_parser.Parser().parse(
+            'SELECT date, balance WHERE year = 2014 AND account ~ "Cash"')
+        c_query = qo.optimize(qc.compile_select(statement,
+                                                qe.TargetsEnvironment(),
+                                                qe.FilterPostingsEnvironment(),
+                                                qe.FilterEntriesEnvironment()))
+        steps = qo.explain(c_query)
+        self.assertEqual(3, len(steps))
+        self.assertEqual('Scan all postings, one at a time for the running balance',
+                         steps[0])
+        self.assertTrue(steps[1].startswith('Filter postings: EvalDateRange'))
+        self.assertTrue(steps[2].startswith('Filter postings: EvalAccountFilter'))
@@ -0,0 +1,4 @@
+"""Routines to produce various reports, either to HTML or to text.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
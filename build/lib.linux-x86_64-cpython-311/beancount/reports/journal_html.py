@@ -0,0 +1,364 @@
+"""HTML rendering routines for serving a lists of postings/entries.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import collections
+import itertools
+from os import path
+
+from beancount.core import data
+from beancount.core import interpolate
+from beancount.core import realization
+from beancount.core import flags
+
+
+# Names to render for transaction rows.
+FLAG_ROWTYPES = {
+    flags.FLAG_PADDING  : 'Padding',
+    flags.FLAG_SUMMARIZE: 'Summarize',
+    flags.FLAG_TRANSFER : 'Transfer',
+}
+
+
+# A rendered row.
+#
+# Attributes:
+#   entry: The parent entry we are rendering postings for. This can be of
+#     any valid directive type, not just Transaction instances.
+#   leg_postings: A list of postings that apply to this row.
+#   rowtype: A renderable string that dscribes the type of this row's directive.
+#   extra_class: A CSS class to be add to the row. This is used for marking some
+#     rows as warning rows.
+#   flag: The flag attached to this row, if Transaction, or an empty string.
+#   description: A string, the narration to render on the row.
+#   links: A list of link strings to render, if desired.
+#   change_str: A string, the rendered inventory of changes being posted by this row.
+#   balance_str: A string, the rendered inventory of the resulting balance after
+#     applying the change to this row.
+#
+Row = collections.namedtuple('Row',
+                             'entry leg_postings rowtype extra_class flag '
+                             'description links amount_str balance_str')
+
+
+def iterate_html_postings(txn_postings, formatter, start=0, checkpoints=None):
+    """Iterate through the list of transactions with rendered HTML strings for each cell.
+
+    This pre-renders all the data for each row to HTML. This is reused by the entries
+    table rendering routines.
+
+    Args:
+      txn_postings: A list of TxnPosting or directive instances.
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      start: An integer, the number of rows to skip at the beginning.
+      checkpoints: An optional instance of realization.BalanceCheckpoints for
+        'txn_postings', used to skip rows without recomputing their balances.
+    Yields:
+      Instances of Row tuples. See above.
+    """
+    for entry_line in realization.iterate_with_balance(txn_postings, start, checkpoints):
+        entry, leg_postings, change, entry_balance = entry_line
+
+        # Prepare the data to be rendered for this row.
+        balance_str = formatter.render_inventory(entry_balance)
+
+        rowtype = entry.__class__.__name__
+        flag = ''
+        extra_class = ''
+        links = None
+
+        if isinstance(entry, data.Transaction):
+            rowtype = FLAG_ROWTYPES.get(entry.flag, 'Transaction')
+            extra_class = 'warning' if entry.flag == flags.FLAG_WARNING else ''
+            flag = entry.flag
+            description = '<span class="narration">{}</span>'.format(entry.narration)
+            if entry.payee:
+                description = ('<span class="payee">{}</span>'
+                               '<span class="pnsep">|</span>'
+                               '{}').format(entry.payee, description)
+            amount_str = formatter.render_inventory(change)
+
+            if entry.links and formatter:
+                links = [formatter.render_link(link) for link in entry.links]
+
+        elif isinstance(entry, data.Balance):
+            # Check the balance here and possibly change the rowtype
+            if entry.diff_amount is None:
+                description = 'Balance {} has {}'.format(
+                    formatter.render_account(entry.account),
+                    entry.amount)
+            else:
+                description = ('Balance in {} fails; '
+                               'expected = {}, balance = {}, difference = {}').format(
+                                   formatter.render_account(entry.account),
+                                   entry.amount,
+                                   entry_balance.get_units(entry.amount.currency),
+                                   entry.diff_amount)
+                extra_class = 'fail'
+
+            amount_str = formatter.render_amount(entry.amount)
+
+        elif isinstance(entry, (data.Open, data.Close)):
+            description = '{} {}'.format(entry.__class__.__name__,
+                                         formatter.render_account(entry.account))
+            amount_str = ''
+
+        elif isinstance(entry, data.Note):
+            description = '{} {}'.format(entry.__class__.__name__, entry.comment)
+            amount_str = ''
+            balance_str = ''
+
+        elif isinstance(entry, data.Document):
+            assert path.isabs(entry.filename)
+            description = 'Document for {}: {}'.format(
+                formatter.render_account(entry.account),
+                formatter.render_doc(entry.filename))
+            amount_str = ''
+            balance_str = ''
+
+        else:
+            description = entry.__class__.__name__
+            amount_str = ''
+            balance_str = ''
+
+        yield Row(entry, leg_postings,
+                  rowtype, extra_class,
+                  flag, description, links, amount_str, balance_str)
+
+
+def html_entries_table_with_balance(oss, txn_postings, formatter, render_postings=True,
+                                    offset=0, limit=None, reverse=False, checkpoints=None):
+    """Render a list of entries into an HTML table, with a running balance.
+
+    (This function returns nothing, it write to oss as a side-effect.)
+
+    Args:
+      oss: A file object to write the output to.
+      txn_postings: A list of Posting or directive instances.
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      render_postings: A boolean; if true, render the postings as rows under the
+        main transaction row.
+      offset: An integer, the number of rows to skip.
+      limit: An integer, the maximum number of rows to render, or None, to
+        render all of them.
+      reverse: A boolean; if true, render the rows newest first, and count the
+        offset from the end of the list.
+      checkpoints: An optional instance of realization.BalanceCheckpoints for
+        'txn_postings'. Provide this to avoid recomputing the running balance
+        from the beginning when rendering a page deep into the list.
+    """
+    for html in iter_html_entries_table_with_balance(txn_postings, formatter,
+                                                     render_postings,
+                                                     offset, limit, reverse,
+                                                     checkpoints):
+        oss.write(html)
+
+
+def iter_html_entries_table_with_balance(txn_postings, formatter, render_postings=True,
+                                         offset=0, limit=None, reverse=False,
+                                         checkpoints=None):
+    """Render a list of entries into an HTML table incrementally.
+
+    This is the same as html_entries_table_with_balance(), except that the HTML
+    is generated in chunks, so that it can be streamed as it is rendered.
+
+    Args:
+      See html_entries_table_with_balance().
+    Yields:
+      Strings of HTML.
+    """
+    yield '''
+      <table class="entry-table">
+      <thead>
+        <tr>
+         <th class="datecell">Date</th>
+         <th class="flag">F</th>
+         <th class="description">Narration/Payee</th>
+         <th class="position">Position</th>
+         <th class="price">Price</th>
+         <th class="cost">Cost</th>
+         <th class="change">Change</th>
+         <th class="balance">Balance</th>
+      </thead>
+    ''' + '\n'
+
+    if reverse:
+        # The running balance is always accumulated in date order, so select the
+        # page of rows in that order and reverse them after rendering.
+        if checkpoints is None:
+            checkpoints = realization.compute_balance_checkpoints(txn_postings)
+        stop = max(0, checkpoints.num_rows - offset)
+        start = max(0, stop - limit) if limit is not None else 0
+        rows = list(itertools.islice(
+            iterate_html_postings(txn_postings, formatter, start, checkpoints),
+            stop - start))
+        rows.reverse()
+    else:
+        rows = itertools.islice(
+            iterate_html_postings(txn_postings, formatter, offset, checkpoints),
+            limit)
+
+    for row in rows:
+        yield render_row_with_balance(row, formatter, render_postings)
+
+    yield '</table>\n'
+
+
+def render_row_with_balance(row, formatter, render_postings=True):
+    """Render a single row of an entries table with a running balance.
+
+    Args:
+      row: An instance of Row, as produced by iterate_html_postings().
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      render_postings: A boolean; if true, render the postings as rows under the
+        main transaction row.
+    Returns:
+      A string of HTML.
+    """
+    entry = row.entry
+    lines = []
+    write = lambda data: (lines.append(data), lines.append('\n'))
+
+    description = row.description
+    if row.links:
+        description += render_links(row.links)
+
+    # Render a row.
+    write('''
+          <tr class="{} {}" title="{}">
+            <td class="datecell"><a href="{}">{}</a></td>
+            <td class="flag">{}</td>
+            <td class="description" colspan="4">{}</td>
+            <td class="change num">{}</td>
+            <td class="balance num">{}</td>
+          <tr>
+        '''.format(row.rowtype, row.extra_class,
+                   '{}:{}'.format(entry.meta["filename"], entry.meta["lineno"]),
+                   formatter.render_context(entry), entry.date,
+                   row.flag, description,
+                   row.amount_str, row.balance_str))
+
+    if render_postings and isinstance(entry, data.Transaction):
+        for posting in entry.postings:
+
+            classes = ['Posting']
+            if posting.flag == flags.FLAG_WARNING:
+                classes.append('warning')
+            if posting in row.leg_postings:
+                classes.append('leg')
+
+            write('''
+                  <tr class="{}">
+                    <td class="datecell"></td>
+                    <td class="flag">{}</td>
+                    <td class="description">{}</td>
+                    <td class="position num">{}</td>
+                    <td class="price num">{}</td>
+                    <td class="cost num">{}</td>
+                    <td class="change num"></td>
+                    <td class="balance num"></td>
+                  <tr>
+                '''.format(' '.join(classes),
+                           posting.flag or '',
+                           formatter.render_account(posting.account),
+                           posting.position,
+                           posting.price or '',
+                           interpolate.get_posting_weight(posting)))
+
+    return ''.join(lines)
+
+
+def html_entries_table(oss, txn_postings, formatter, render_postings=True):
+    """Render a list of entries into an HTML table, with no running balance.
+
+    This is appropriate for rendering tables of entries for postings with
+    multiple accounts, whereby computing the running balances makes little
+    sense.
+
+    (This function returns nothing, it write to oss as a side-effect.)
+
+    Args:
+      oss: A file object to write the output to.
+      txn_postings: A list of Posting or directive instances.
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      render_postings: A boolean; if true, render the postings as rows under the
+        main transaction row.
+    """
+    write = lambda data: (oss.write(data), oss.write('\n'))
+
+    write('''
+      <table class="entry-table">
+      <thead>
+        <tr>
+         <th class="datecell">Date</th>
+         <th class="flag">F</th>
+         <th class="description">Narration/Payee</th>
+         <th class="amount">Amount</th>
+         <th class="cost">Cost</th>
+         <th class="price">Price</th>
+         <th class="balance">Balance</th>
+      </thead>
+    ''')
+
+    for row in iterate_html_postings(txn_postings, formatter):
+        entry = row.entry
+
+        description = row.description
+        if row.links:
+            description += render_links(row.links)
+
+        # Render a row.
+        write('''
+          <tr class="{} {}" title="{}">
+            <td class="datecell"><a href="{}">{}</a></td>
+            <td class="flag">{}</td>
+            <td class="description" colspan="5">{}</td>
+          <tr>
+        '''.format(row.rowtype, row.extra_class,
+                   '{}:{}'.format(entry.meta["filename"], entry.meta["lineno"]),
+                   formatter.render_context(entry), entry.date,
+                   row.flag, description))
+
+        if render_postings and isinstance(entry, data.Transaction):
+            for posting in entry.postings:
+
+                classes = ['Posting']
+                if posting.flag == flags.FLAG_WARNING:
+                    classes.append('warning')
+
+                write('''
+                  <tr class="{}">
+                    <td class="datecell"></td>
+                    <td class="flag">{}</td>
+                    <td class="description">{}</td>
+                    <td class="amount num">{}</td>
+                    <td class="cost num">{}</td>
+                    <td class="price num">{}</td>
+                    <td class="balance num">{}</td>
+                  <tr>
+                '''.format(' '.join(classes),
+                           posting.flag or '',
+                           formatter.render_account(posting.account),
+                           posting.position.get_units(),
+                           posting.position.lot.cost or '',
+                           posting.price or '',
+                           interpolate.get_posting_weight(posting)))
+
+    write('</table>')
+
+
+def render_links(links):
+    """Render Transaction links to HTML.
+
+    Args:
+      links: A list of set of strings, transaction "links" to be rendered.
+    Returns:
+      A string, a snippet of HTML to be rendering somewhere.
+    """
+    return '<span class="links">{}</span>'.format(
+        ''.join('<a href="{}">^</a>'.format(link)
+                for link in links))
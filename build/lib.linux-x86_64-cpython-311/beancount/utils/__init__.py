@@ -0,0 +1,5 @@
+"""
+Generic utility packages and functions.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
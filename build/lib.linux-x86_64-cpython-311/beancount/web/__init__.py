@@ -0,0 +1,5 @@
+"""
+Web server reporting front-end.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
@@ -0,0 +1,295 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+from os import path
+import collections
+import concurrent.futures
+import re
+import argparse
+import urllib.request
+import urllib.parse
+import logging
+import os
+import zlib
+
+import lxml.html
+
+from beancount.web import web
+
+
+def iterlinks(html, html_path):
+    """Find links targets in HTML text.
+
+    This deals with both absolute and relative links, and it external links to
+    external sites.
+
+    Args:
+      html: An lxml document node.
+      html_path: The URL of the document node.
+    Yields:
+      URL strings, where found.
+
+    """
+    html_dir = path.dirname(html_path)
+    for element, attribute, link, pos in lxml.html.iterlinks(html):
+        url = urllib.parse.urlparse(link)
+        if url.scheme or url.netloc:
+            continue  # Skip external urls.
+        link = url.path
+        if not link:
+            continue
+        if not path.isabs(link):
+            link = path.join(html_dir, link)
+        yield link
+
+
+def get_view_key(url):
+    """Compute the key used to assign a URL to one of several servers.
+
+    All the pages of a view share the same key, so that each view is only ever
+    built by a single server. Other pages are keyed by their own URL.
+
+    Args:
+      url: A string, the path of a page.
+    Returns:
+      A string, the key of the page.
+    """
+    components = url.split('/')
+    if len(components) > 2 and components[1] == 'view':
+        # See the depths of the views in web.handle_view().
+        depth = 2 if components[2] == 'all' else 3
+        return '/'.join(components[:depth+1])
+    return url
+
+
+def fetch_url(url_format, url):
+    """Fetch a page and parse it if it is an HTML document.
+
+    Args:
+      url_format: The pattern for building links from relative paths.
+      url: A string, the path of the page to fetch.
+    Returns:
+      A triple of the http response as per urlopen, the contents of the page
+      as bytes, and the lxml root node of the document, or None, if the page is
+      not an HTML document.
+    """
+    # Fetch the URL and check its return status.
+    response = urllib.request.urlopen(url_format.format(url))
+
+    # Generate errors on redirects.
+    redirected_url = urllib.parse.urlparse(response.geturl()).path
+    if redirected_url != url:
+        logging.error("Redirected: %s -> %s", url, redirected_url)
+
+    # Read the contents. This can only be done once.
+    response_contents = response.read()
+
+    if response.info().get_content_type() == 'text/html':
+        html_root = lxml.html.document_fromstring(response_contents)
+    else:
+        html_root = None
+    return response, response_contents, html_root
+
+
+def scrape_urls(url_format, callback, ignore_regexp=None, num_workers=1):
+    """Recursively scrape pages from a web address.
+
+    With more than one worker, the pages are fetched and parsed concurrently by
+    a pool of threads, while the links of the fetched pages are extracted and
+    scheduled, and the callback invoked, from the calling thread. The pages are
+    processed in the order they were scheduled in, so the order of the crawl
+    only depends on the number of workers.
+
+    Args:
+      url_format: The pattern for building links from relative paths, or a list
+        of such patterns, one for each of several servers serving the same
+        pages. In the latter case, all the pages of a view are fetched from the
+        same server (see get_view_key()).
+      callback: A callback function to invoke on each page to validate it.
+        The function is called with the response and the url as arguments.
+        This function should trigger an error on failure (via an exception).
+      ignore_regexp: A regular expression string, the urls to ignore.
+      num_workers: An integer, the number of pages to fetch concurrently.
+    Returns:
+      A set of all the processed URLs and a set of all the skipped URLs.
+    """
+    url_formats = [url_format] if isinstance(url_format, str) else url_format
+
+    # The set of all URLs seen so far.
+    seen = set()
+
+    # The list of all URLs to process. We use a list here so we have
+    # reproducible order if we repeat the test.
+    process_list = ["/"]
+
+    # A set of all the URLs processed and skipped everywhere.
+    all_processed_urls = set()
+    all_skipped_urls = set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        # The fetches in progress, in the order they were scheduled in.
+        pending = collections.deque()
+
+        # Loop over all URLs remaining to process.
+        while process_list or pending:
+            # Keep the workers busy.
+            while process_list and len(pending) < num_workers:
+                url = process_list.pop()
+                logging.debug("Processing: %s", url)
+                all_processed_urls.add(url)
+                server_format = url_formats[
+                    zlib.crc32(get_view_key(url).encode('utf8')) % len(url_formats)]
+                pending.append((url, executor.submit(fetch_url, server_format, url)))
+
+            # Process the oldest fetch.
+            url, future = pending.popleft()
+            response, response_contents, html_root = future.result()
+
+            skipped_urls = set()
+            if html_root is not None:
+                # Process all the links in the page and register all the unseen
+                # links to be processed.
+                for link in iterlinks(html_root, url):
+
+                    # Skip URLs to be ignored.
+                    if ignore_regexp and re.match(ignore_regexp, link):
+                        logging.debug("Skipping: %s", link)
+                        skipped_urls.add(link)
+                        all_skipped_urls.add(link)
+                        continue
+
+                    # Check if link has already been seen.
+                    if link in seen:
+                        logging.debug('Seen: "%s"', link)
+                        continue
+
+                    # Schedule the link for scraping.
+                    logging.debug('Scheduling: "%s"', link)
+                    process_list.append(link)
+                    seen.add(link)
+
+            # Call back for processing.
+            callback(url, response, response_contents, html_root, skipped_urls)
+
+    return all_processed_urls, all_skipped_urls
+
+
+def scrape(filename, callback, port, ignore_regexp, quiet=True, extra_args=None,
+           num_workers=1):
+    """Run a web server on a Beancount file and scrape it.
+
+    This is the main entry point of this module.
+
+    Args:
+      filename: A string, the name of the file to parse.
+      callback: A callback function to invoke on each page to validate it.
+        The function is called with the response and the url as arguments.
+        This function should trigger an error on failure (via an exception).
+      port: An integer, a free port to use for serving the pages.
+      ignore_regexp: A regular expression string, the urls to ignore.
+      quiet: True if we shouldn't log the web server pages.
+      extra_args: Extra arguments to bean-web that we want to start the
+        server with.
+      num_workers: An integer, the number of pages to fetch concurrently. If
+        more than one, as many servers are started in separate processes, on
+        consecutive ports from 'port', each loading its own copy of the ledger
+        and building its own share of the views.
+    Returns:
+      A set of all the processed URLs and a set of all the skipped URLs.
+    """
+    # Create a set of valid arguments to run the app.
+    argparser = argparse.ArgumentParser()
+    group = web.add_web_arguments(argparser)
+    if extra_args is None:
+        extra_args = argparse.Namespace()
+    extra_args.port = port
+    extra_args.quiet = quiet
+    args = argparser.parse_args(args=[filename], namespace=extra_args)
+
+    # Skips:
+    # - Docs cannot be read for external files.
+    #
+    # - Components views... well there are just too many, makes the tests
+    #   impossibly slow. Just keep the A's so some are covered.
+    if num_workers > 1:
+        # Serve from as many processes; a single server would be bound to one
+        # core by the GIL.
+        processes = []
+        try:
+            for index in range(num_workers):
+                process_args = argparse.Namespace(**vars(args))
+                process_args.port = port + index
+                processes.append(web.process_server_start(process_args))
+            url_formats = ['http://localhost:{}{{}}'.format(port + index)
+                           for index in range(num_workers)]
+            url_lists = scrape_urls(url_formats, callback, ignore_regexp, num_workers)
+        finally:
+            for process in processes:
+                web.process_server_shutdown(process)
+    else:
+        url_format = 'http://localhost:{}{{}}'.format(port)
+        thread = web.thread_server_start(args)
+        url_lists = scrape_urls(url_format, callback, ignore_regexp)
+        web.thread_server_shutdown(thread)
+
+    return url_lists
+
+
+def validate_local_links(filename):
+    """Open and parse the given HTML filename and verify all local targets exist.
+
+    This checks that all the files pointed to by the file we're processing are
+    files that exist on disk. This can be used to validate that a baked output
+    does not have links to files that do not exist, that all the links are valid.
+
+    Args:
+      filename: A string, the name of the HTML file to process.
+    Returns:
+      A pair of:
+        missing: A set of strings, the names of links to files that do not exist.
+        empty: A boolean, true if this file is empty.
+    """
+    filedir = path.dirname(filename)
+    contents = open(filename, 'rb').read()
+
+    empty = len(contents) == 0
+    missing = set()
+    if not empty:
+        html = lxml.html.document_fromstring(contents)
+        if html is not None:
+            for element, attribute, link, pos in lxml.html.iterlinks(html):
+                urlpath = urllib.parse.urlparse(link)
+                if urlpath.scheme or urlpath.netloc:
+                    continue
+                if path.isabs(urlpath.path):
+                    continue
+                target = path.normpath(path.join(filedir, urlpath.path))
+                if not path.exists(target):
+                    missing.add(target)
+
+    return missing, empty
+
+
+def validate_local_links_in_dir(directory):
+    """Find all the files under the given directory and validate all their links.
+
+    Args:
+      directory: A string, the root directory whose files to process.
+    Returns:
+      A tuple of:
+        files: A list of all the filenames found and processed.
+        missing: A set of strings, the names of links to files that do not exist.
+        empty: A boolean, true if this file is empty.
+    """
+    logging.basicConfig(level=logging.INFO,
+                        format='%(levelname)-8s: %(message)s')
+    allfiles = []
+    missing, empty = set(), set()
+    for root, dirs, files in os.walk(directory):
+        for filename in files:
+            afilename = path.join(root, filename)
+            allfiles.append(afilename)
+            logging.info("Validating: '%s'", afilename)
+            missing, is_empty = validate_local_links(afilename)
+            if is_empty:
+                empty.add(afilename)
+    return allfiles, missing, empty
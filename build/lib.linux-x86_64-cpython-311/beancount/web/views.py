@@ -0,0 +1,646 @@
+"""Views are filters on the global list of entries, which produces a subset of entries.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import collections
+import copy
+import datetime
+import logging
+import sys
+import threading
+
+from beancount.core import data
+from beancount.core import number
+from beancount.core import position
+from beancount.ops import summarize
+from beancount.core import realization
+from beancount.parser import options
+from beancount.utils import misc_utils
+
+
+# Options which do not affect the contents of a view, and which are ignored
+# when checking whether a view is still valid for a new list of entries.
+VIEW_INDEPENDENT_OPTIONS = ({'dcontext', 'commodities', 'include'} |
+                            options.RUNTIME_OPTIONS)
+
+
+def get_view_options(options_map):
+    """Select the options which affect the contents of views.
+
+    Args:
+      options_map: A dict of options, as produced by the parser.
+    Returns:
+      A dict of options.
+    """
+    return {key: value
+            for key, value in options_map.items()
+            if key not in VIEW_INDEPENDENT_OPTIONS}
+
+
+class View:
+    """A container for filtering a subset of entries and realizing that for
+    display."""
+
+    def __init__(self, all_entries, options_map, title):
+        """Build a View instance.
+
+        Args:
+          all_entries: The full list of directives as output from the loader.
+          options_map: The options dict, as output by the parser.
+          title: A string, the title of this view to render.
+        """
+
+        # A reference to the full list of padded entries.
+        self.all_entries = all_entries
+
+        # List of filterered entries for this view, and index at the beginning
+        # of the period transactions, past the opening balances. These are
+        # computed in _initialize().
+        self.entries = None
+        self.opening_entries = None
+        self.closing_entries = None
+
+        # Title.
+        self.title = title
+
+        # Realization of the filtered entries to display. These are computed in
+        # _initialize().
+        self.real_accounts = None
+        self.opening_real_accounts = None
+        self.closing_real_accounts = None
+
+        # A cache of the lists of postings and balance checkpoints of the
+        # journals rendered from this view. See get_journal().
+        self.journal_cache = {}
+
+        # The options the view was created with, to detect changes.
+        self.view_options = get_view_options(options_map)
+
+        # Realize now, we don't need to do this lazily because we create these
+        # view objects on-demand and cache them.
+        self._initialize(options_map)
+
+    def _initialize(self, options_map):
+        """Compute the list of filtered entries and realization trees."""
+
+        # Get the filtered list of entries.
+        self.entries, self.begin_index = self.apply_filter(self.all_entries, options_map)
+
+        # Compute the list of entries for the opening balances sheet.
+        self.opening_entries = (self.entries[:self.begin_index]
+                                if self.begin_index is not None
+                                else [])
+
+        # Compute the list of entries that includes transfer entries of the
+        # income/expenses amounts to the balance sheet's equity (as "net
+        # income"). This is used to render the end-period balance sheet, with
+        # the current period's net income, closing the period.
+        self.closing_entries = summarize.cap_opt(self.entries, options_map)
+
+        # Realize the three sets of entries.
+        account_types = options.get_account_types(options_map)
+        with misc_utils.log_time('realize_opening', logging.info):
+            self.opening_real_accounts = realization.realize(self.opening_entries,
+                                                             account_types)
+
+        with misc_utils.log_time('realize', logging.info):
+            self.real_accounts = realization.realize(self.entries,
+                                                     account_types)
+
+        with misc_utils.log_time('realize_closing', logging.info):
+            self.closing_real_accounts = realization.realize(self.closing_entries,
+                                                             account_types)
+
+        assert self.real_accounts is not None
+        assert self.closing_real_accounts is not None
+
+    def update(self, all_entries, options_map):
+        """Create a copy of this view updated for a new list of entries.
+
+        This is used to carry over views when the input file is reloaded: the
+        filter of this view is applied to the new entries, and if the result is
+        the same as before, the realizations are kept as they are. Otherwise,
+        the entries which differ are removed from and added to copies of the
+        realizations with realization.update(), instead of realizing all the
+        entries again. This view itself is not modified, as it may still be in
+        use for rendering.
+
+        Args:
+          all_entries: The new full list of directives.
+          options_map: The new options dict.
+        Returns:
+          A new instance of View for the new entries, or None, if the options
+          affecting the view have changed, or if too many of its entries have
+          changed for an update to be worthwhile; a new view should be created
+          instead.
+        """
+        if get_view_options(options_map) != self.view_options:
+            return None
+        entries, begin_index = self.apply_filter(all_entries, options_map)
+
+        view = copy.copy(self)
+        view.all_entries = all_entries
+
+        entries, removed, added = diff_entries(self.entries, entries)
+        if not (removed or added) and begin_index == self.begin_index:
+            return view
+        if len(removed) + len(added) > len(entries) // 2:
+            return None
+
+        opening_entries = (entries[:begin_index]
+                           if begin_index is not None
+                           else [])
+        opening_entries, opening_removed, opening_added = diff_entries(
+            self.opening_entries, opening_entries)
+        closing_entries, closing_removed, closing_added = diff_entries(
+            self.closing_entries, summarize.cap_opt(entries, options_map))
+
+        view.entries = entries
+        view.begin_index = begin_index
+        view.opening_entries = opening_entries
+        view.closing_entries = closing_entries
+        view.opening_real_accounts = update_realization(
+            self.opening_real_accounts, opening_added, opening_removed)
+        view.real_accounts = update_realization(
+            self.real_accounts, added, removed)
+        view.closing_real_accounts = update_realization(
+            self.closing_real_accounts, closing_added, closing_removed)
+        view.journal_cache = {}
+        return view
+
+    def get_journal(self, account_name, closing=False):
+        """Get the postings of an account and its children, for rendering a journal.
+
+        The postings are gathered and the running balance checkpoints computed
+        on the first request for an account, and cached in this view.
+
+        Args:
+          account_name: A string, the name of the account, or the empty string
+            for the postings of all the accounts.
+          closing: A boolean, true to fetch the postings from the closing
+            realization instead of the realization of the period.
+        Returns:
+          A pair of a sorted list of postings or directives and an instance of
+          realization.BalanceCheckpoints for it, or None, if the account does
+          not exist.
+        """
+        key = (account_name, closing)
+        try:
+            return self.journal_cache[key]
+        except KeyError:
+            pass
+        real_root = self.closing_real_accounts if closing else self.real_accounts
+        real_account = (realization.get(real_root, account_name)
+                        if account_name
+                        else real_root)
+        if real_account is None:
+            return None
+        txn_postings = realization.get_postings(real_account)
+        checkpoints = realization.compute_balance_checkpoints(txn_postings)
+        journal = self.journal_cache[key] = (txn_postings, checkpoints)
+        return journal
+
+    def apply_filter(self, entries):
+        """Filter the list of entries.
+
+        This is used to obtain the filtered list of entries.
+
+        Args:
+          entries: A list of directives to filter.
+        Returns:
+          A pair of
+            1. a list of filtered entries, and
+            2. an integer, the index at which the beginning of the entries for
+              the period begin, one directive past the opening
+              balances/initialization entries.
+        """
+        raise NotImplementedError
+
+
+class EmptyView(View):
+    """An empty view, for testing."""
+
+    def __init__(self, entries, options_map, title, *args, **kw):
+        """Create an empty view.
+
+        Args:
+          entries: A list of directives.
+          options_map: A dict of options, as produced by the parser.
+          title: A string, the title of this view.
+          *args: Ignored.
+          **kw: Ignored.
+        """
+        View.__init__(self, entries, options_map, title)
+
+    def apply_filter(self, _, __):
+        "Return the list of entries unmodified."
+        return ([], None)
+
+
+class AllView(View):
+    """A view that includes all the entries, unmodified."""
+
+    def apply_filter(self, entries, options_map):
+        return (entries, None)
+
+
+class YearView(View):
+    """A view of the entries for just a single year."""
+
+    def __init__(self, entries, options_map, title, year, first_month=1):
+        """Create a view clamped to one year.
+
+        Note: this is the only view where the entries are summarized and
+        clamped.
+
+        Args:
+          entries: A list of directives.
+          options_map: A dict of options, as produced by the parser.
+          title: A string, the title of this view.
+          year: An integer, the year of the exercise period.
+          first_month: The calendar month (starting with 1) with which the year opens.
+        """
+        self.year = year
+        self.first_month = first_month
+        if not (1 <= first_month <= 12):
+            raise ValueError("Invalid month: {}".format(first_month))
+        View.__init__(self, entries, options_map, title)
+
+    def apply_filter(self, entries, options_map):
+        # Clamp to the desired period.
+        begin_date = datetime.date(self.year, self.first_month, 1)
+        end_date = datetime.date(self.year+1, self.first_month, 1)
+        with misc_utils.log_time('clamp', logging.info):
+            entries, index = summarize.clamp_opt(entries,
+                                                          begin_date, end_date,
+                                                          options_map)
+        return entries, index
+
+
+class TagView(View):
+    """A view that includes only entries some specific tags."""
+
+    def __init__(self, entries, options_map, title, tags):
+        """Create a view with only entries tagged with the given tags.
+
+        Note: this is the only view where the entries are summarized and
+        clamped.
+
+        Args:
+          entries: A list of directives.
+          options_map: A dict of options, as produced by the parser.
+          title: A string, the title of this view.
+          tags: A set of strings, the tags to include. Entries with at least
+            one of these tags will be included in the output.
+        """
+        assert isinstance(tags, (set, frozenset, list, tuple))
+        self.tags = tags
+        View.__init__(self, entries, options_map, title)
+
+    def apply_filter(self, entries, options_map):
+        tags = self.tags
+        tagged_entries = [
+            entry
+            for entry in entries
+            if isinstance(entry, data.Transaction) and entry.tags and (entry.tags & tags)]
+
+        return tagged_entries, None
+
+
+class PayeeView(View):
+    """A view that includes entries with some specific payee."""
+
+    def __init__(self, entries, options_map, title, payee):
+        """Create a view clamped to one year.
+
+        Note: this is the only view where the entries are summarized and
+        clamped.
+
+        Args:
+          entries: A list of directives.
+          options_map: A dict of options, as produced by the parser.
+          title: A string, the title of this view.
+          payee: A string, the payee whose transactions to include.
+        """
+        assert isinstance(payee, str)
+        self.payee = payee
+        View.__init__(self, entries, options_map, title)
+
+    def apply_filter(self, entries, options_map):
+        payee = self.payee
+        payee_entries = [entry
+                         for entry in entries
+                         if isinstance(entry, data.Transaction) and (entry.payee == payee)]
+
+        return payee_entries, None
+
+
+class ComponentView(View):
+    """A view that includes transactions with at least one posting with an account
+    that includes a given component."""
+
+    def __init__(self, entries, options_map, title, component):
+        """Create a view clamped to one year.
+
+        Note: this is the only view where the entries are summarized and
+        clamped.
+
+        Args:
+          entries: A list of directives.
+          options_map: A dict of options, as produced by the parser.
+          title: A string, the title of this view.
+          compnent: A string, the name of an account component to include.
+        """
+        assert isinstance(component, str)
+        self.component = component
+        View.__init__(self, entries, options_map, title)
+
+    def apply_filter(self, entries, options_map):
+        component = self.component
+        component_entries = [entry
+                             for entry in entries
+                             if data.has_entry_account_component(entry, component)]
+
+        return component_entries, None
+
+
+# Estimates of the sizes, in bytes, of the objects held by the views, which are
+# not worth measuring individually.
+TXN_POSTING_SIZE = sys.getsizeof(data.TxnPosting(None, None))
+POSITION_SIZE = sum(map(sys.getsizeof, [
+    position.Position(position.Lot('USD', None, None), number.ZERO),
+    position.Lot('USD', None, None),
+    number.ZERO]))
+
+
+def estimate_inventory_size(inv):
+    """Estimate the memory used by an inventory.
+
+    Args:
+      inv: An instance of Inventory.
+    Returns:
+      An integer, a number of bytes.
+    """
+    return (sys.getsizeof(inv) +
+            sys.getsizeof(inv._positions) +  # pylint: disable=protected-access
+            len(inv) * POSITION_SIZE)
+
+
+def estimate_realization_size(real_root):
+    """Estimate the memory used by a realization tree.
+
+    Args:
+      real_root: An instance of RealAccount, the root of the tree.
+    Returns:
+      An integer, a number of bytes.
+    """
+    size = 0
+    for real_account in realization.iter_children(real_root):
+        size += (sys.getsizeof(real_account) +
+                 sys.getsizeof(real_account.txn_postings) +
+                 len(real_account.txn_postings) * TXN_POSTING_SIZE +
+                 estimate_inventory_size(real_account.balance))
+    return size
+
+
+def diff_entries(old_entries, new_entries):
+    """Find the entries which differ between two versions of a list of entries.
+
+    The lists are compared from both ends, so this is cheap when the changes
+    are localized, e.g., when entries were appended at the end.
+
+    Args:
+      old_entries: A list of directives.
+      new_entries: A list of directives.
+    Returns:
+      A triple of a list of entries equal to 'new_entries', in which the
+      unchanged entries are the instances from 'old_entries', the list of old
+      entries which were removed, and the list of new entries which were added.
+    """
+    num_old, num_new = len(old_entries), len(new_entries)
+    max_common = min(num_old, num_new)
+    prefix = 0
+    while prefix < max_common and old_entries[prefix] == new_entries[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < max_common - prefix and
+           old_entries[num_old - suffix - 1] == new_entries[num_new - suffix - 1]):
+        suffix += 1
+    removed = old_entries[prefix:num_old - suffix]
+    added = new_entries[prefix:num_new - suffix]
+    if not (removed or added):
+        return old_entries, removed, added
+    return (old_entries[:prefix] + added + old_entries[num_old - suffix:],
+            removed, added)
+
+
+def update_realization(real_root, added_entries, removed_entries):
+    """Apply added and removed entries to a copy of a realization.
+
+    The tree of accounts is copied, but not the lists of postings and balances,
+    which realization.update() replaces rather than modifies.
+
+    Args:
+      real_root: An instance of RealAccount, the root of a realization.
+      added_entries: A list of directives to add.
+      removed_entries: A list of directives to remove.
+    Returns:
+      A new instance of RealAccount, or 'real_root' itself if there are no
+      changes.
+    """
+    if not (added_entries or removed_entries):
+        return real_root
+    def copy_tree(real_account):
+        new_account = real_account.copy()
+        for key, real_child in real_account.items():
+            dict.__setitem__(new_account, key, copy_tree(real_child))
+        return new_account
+    new_root = copy_tree(real_root)
+    realization.update(new_root, added_entries, removed_entries)
+    return new_root
+
+
+def estimate_view_size(view):
+    """Estimate the memory used by a view.
+
+    This accounts for the realizations, the lists of filtered entries and the
+    cached journals of the view. The directives themselves are mostly shared
+    with the full list of entries and are not counted.
+
+    Args:
+      view: An instance of View.
+    Returns:
+      An integer, a number of bytes.
+    """
+    size = sys.getsizeof(view)
+    for entries in (view.entries, view.opening_entries, view.closing_entries):
+        size += sys.getsizeof(entries)
+    for real_root in (view.opening_real_accounts,
+                      view.real_accounts,
+                      view.closing_real_accounts):
+        size += estimate_realization_size(real_root)
+    for txn_postings, checkpoints in view.journal_cache.values():
+        size += (sys.getsizeof(txn_postings) +
+                 sys.getsizeof(checkpoints.indexes) +
+                 sys.getsizeof(checkpoints.rows) +
+                 sys.getsizeof(checkpoints.balances) +
+                 sum(map(estimate_inventory_size, checkpoints.balances)))
+    return size
+
+
+class ViewCache:
+    """A cache of views, bounded in number of views and estimated memory.
+
+    When either budget is exceeded, the least recently used views are evicted
+    (they are recreated on demand). The most recently used view is always
+    kept, even if it alone exceeds the memory budget.
+
+    Attributes:
+      max_entries: An integer, the maximum number of views to keep, or None,
+        if unbounded.
+      max_bytes: An integer, the maximum estimated size of the views to keep,
+        or None, if unbounded.
+      hits: An integer, the number of lookups that found their view.
+      misses: An integer, the number of lookups that did not.
+      evictions: An integer, the number of views evicted to fit the budgets.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """Create an empty cache.
+
+        Args:
+          max_entries: An integer, the maximum number of views, or None.
+          max_bytes: An integer, the maximum estimated number of bytes, or None.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # An ordered dict of view id to a pair of (view, estimated size), in
+        # order of least to most recently used.
+        self._views = collections.OrderedDict()
+        self._total_bytes = 0
+
+        # The cache is shared between the server threads and the reloader.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._views)
+
+    def __contains__(self, viewid):
+        return viewid in self._views
+
+    @property
+    def total_bytes(self):
+        """The estimated size of all the views in the cache."""
+        return self._total_bytes
+
+    def get(self, viewid):
+        """Look up a view and mark it as most recently used.
+
+        Args:
+          viewid: A string, the id of the view.
+        Returns:
+          An instance of View, or None, if it is not in the cache.
+        """
+        with self._lock:
+            try:
+                view, _ = self._views[viewid]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._views.move_to_end(viewid)
+            self.hits += 1
+            return view
+
+    def put(self, viewid, view):
+        """Insert a view as most recently used, evicting others to fit the budgets.
+
+        Args:
+          viewid: A string, the id of the view.
+          view: An instance of View.
+        """
+        size = estimate_view_size(view)
+        with self._lock:
+            self._insert(viewid, view, size)
+            self._evict()
+
+    def resize(self, viewid):
+        """Update the estimated size of a view after it has grown.
+
+        Views grow as their journals get cached; call this after rendering a
+        page from a view. This does nothing if the view has been evicted.
+
+        Args:
+          viewid: A string, the id of the view.
+        """
+        with self._lock:
+            try:
+                view, _ = self._views[viewid]
+            except KeyError:
+                return
+        size = estimate_view_size(view)
+        with self._lock:
+            if viewid in self._views:
+                self._views.move_to_end(viewid)
+                self._insert(viewid, view, size)
+                self._evict()
+
+    def _insert(self, viewid, view, size):
+        """Insert or replace a view, as most recently used. Hold the lock."""
+        try:
+            _, old_size = self._views.pop(viewid)
+            self._total_bytes -= old_size
+        except KeyError:
+            pass
+        self._views[viewid] = (view, size)
+        self._total_bytes += size
+
+    def _evict(self):
+        """Evict the least recently used views until within budget. Hold the lock."""
+        while len(self._views) > 1 and (
+                (self.max_entries is not None and len(self._views) > self.max_entries) or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)):
+            viewid, (_, size) = self._views.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            logging.info('Evicted view %s (%d bytes)', viewid, size)
+
+    def items(self):
+        """List the cached views.
+
+        Returns:
+          A list of triples of (view id, view, estimated size), in order of least
+          to most recently used.
+        """
+        with self._lock:
+            return [(viewid, view, size)
+                    for viewid, (view, size) in self._views.items()]
+
+    def carry_over(self, all_entries, options_map):
+        """Create a cache for a new list of entries, with the views still valid.
+
+        Each view is updated with View.update(); those which cannot be updated
+        are dropped. The budgets and statistics are carried over.
+
+        Args:
+          all_entries: The new full list of directives.
+          options_map: The new options dict.
+        Returns:
+          A new instance of ViewCache.
+        """
+        new_cache = ViewCache(self.max_entries, self.max_bytes)
+        new_cache.hits = self.hits
+        new_cache.misses = self.misses
+        new_cache.evictions = self.evictions
+        for viewid, view, size in self.items():
+            new_view = view.update(all_entries, options_map)
+            if new_view is None:
+                continue
+            if new_view.entries is not view.entries:
+                size = estimate_view_size(new_view)
+            new_cache._insert(viewid, new_view, size)  # pylint: disable=protected-access
+        new_cache._evict()  # pylint: disable=protected-access
+        return new_cache
@@ -0,0 +1,1512 @@
+"""
+Web server for Beancount ledgers.
+This uses the Bottle single-file micro web framework (with no plugins).
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import argparse
+from os import path
+import collections
+import io
+import itertools
+import logging
+import multiprocessing
+import re
+import socket
+import sys
+import time
+import threading
+import types
+import urllib.parse
+
+import bottle
+from bottle import response
+from bottle import request
+
+from beancount.core import data
+from beancount.core import getters
+from beancount.core import account
+from beancount.core import account_types
+from beancount.core import compare
+from beancount.ops import basicops
+from beancount.utils import misc_utils
+from beancount.utils import text_utils
+from beancount.web import bottle_utils
+from beancount.parser import options
+from beancount.parser import printer
+from beancount import loader
+from beancount.web import views
+from beancount.reports import html_formatter
+from beancount.reports import balance_reports
+from beancount.reports import journal_html
+from beancount.reports import journal_reports
+from beancount.reports import holdings_reports
+from beancount.reports import price_reports
+from beancount.reports import misc_reports
+from beancount.reports import context
+
+
+# The default view page to redirect to.
+DEFAULT_VIEW_REDIRECT = 'balsheet'
+
+
+class HTMLFormatter(html_formatter.HTMLFormatter):
+    """A formatter object that can be used to render accounts links.
+
+    Attributes:
+      build_url: A function used to render links to a Bottle application.
+      leafonly: a boolean, if true, render only the name of the leaf nodes.
+      entry_hashes: The EntryHashCache of the ledger state being rendered.
+    """
+    def __init__(self, dcontext, build_url, leaf_only, view_links=True):
+        super().__init__(dcontext)
+        self.build_url = build_url
+        self.leaf_only = leaf_only
+        self.view_links = view_links
+        # Note: capture this here, because journals may be rendered lazily,
+        # after the request handler has returned.
+        self.entry_hashes = request.ledger.options['entry_hashes']
+
+    def build_global(self, *args, **kwds):
+        "Render to global application."
+        return app.router.build(*args, **kwds)
+
+    EMS_PER_COMPONENT = 1.5
+
+    def render_account(self, account_name):
+        """See base class."""
+        if self.view_links:
+            if self.leaf_only:
+                # Calculate the number of components to figure out the indent to
+                # render at.
+                components = account.split(account_name)
+                indent = '{:.1f}'.format(len(components) * self.EMS_PER_COMPONENT)
+                anchor = '<a href="{}" class="account">{}</a>'.format(
+                    self.build_url('journal', account_name=account_name),
+                    account.leaf(account_name))
+                return '<span "account" style="padding-left: {}em">{}</span>'.format(
+                    indent, anchor)
+            else:
+                anchor = '<a href="{}" class="account">{}</a>'.format(
+                    self.build_url('journal', account_name=account_name),
+                    account_name)
+                return '<span "account">{}</span>'.format(anchor)
+        else:
+            if self.leaf_only:
+                # Calculate the number of components to figure out the indent to
+                # render at.
+                components = account.split(account_name)
+                indent = '{:.1f}'.format(len(components) * self.EMS_PER_COMPONENT)
+                account_name = account.leaf(account_name)
+                return '<span "account" style="padding-left: {}em">{}</span>'.format(
+                    indent, account_name)
+            else:
+                return '<span "account">{}</span>'.format(account_name)
+
+    def render_inventory(self, inv):
+        """Override this formatter to convert the inventory to units only."""
+        return super().render_inventory(inv.units())
+
+    def render_context(self, entry):
+        """See base class."""
+        # Note: rendering to global application.
+        # Note(2): we could avoid rendering links to summarizing and transfer
+        # entries which are not going to be found.
+        return self.build_global('context', ehash=self.entry_hashes.hash_entry(entry))
+
+    def render_link(self, link):
+        """See base class."""
+        # Note: rendering to global application.
+        return self.build_global('link', link=link)
+
+    def render_doc(self, filename):
+        """See base class."""
+        return '<a href="{}" class="filename">{}</a>'.format(
+            self.build_url('doc', filename=filename.lstrip('/')),
+            path.basename(filename))
+
+    def render_event_type(self, event):
+        """See base class."""
+        return '<a href="{}">{}</a>'.format(self.build_url('event', event=event),
+                                            event)
+
+    def render_commodity(self, base_quote):
+        """See base class."""
+        base, quote = base_quote
+        return '<a href="{}">{} / {}</a>'.format(
+            self.build_url('prices', base=base, quote=quote), base, quote)
+
+    def render_source(self, source):
+        """See base class."""
+        return '{}#{}'.format(app.get_url('source'), source.lineno)
+
+
+def render_report(report_class, entries, args=None,
+                  css_id=None, css_class=None, center=False, leaf_only=True):
+    """Instantiate a report and rendering it to a string.
+
+    Args:
+      report_class: A class, the type of the report to render.
+      real_root: An instance of RealAccount to render.
+      args: A list of strings, the arguments to initialize the report with.
+      css_id: An optional string, the CSS id for the div to render.
+      css_class: An optional string, the CSS class for the div to render.
+      center: A boolean flag, if true, wrap the results in a <center> tag.
+      leaf_only: A boolean, whether to render the leaf names only.
+    Returns:
+      A string, the rendered report.
+    """
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
+                              request.app.get_url, leaf_only)
+    oss = io.StringIO()
+    if center:
+        oss.write('<center>\n')
+    report_ = report_class.from_args(args,
+                                     formatter=formatter,
+                                     css_id=css_id,
+                                     css_class=css_class)
+    report_.render_htmldiv(entries, request.ledger.errors, request.ledger.options, oss)
+    if center:
+        oss.write('</center>\n')
+    return oss.getvalue()
+
+
+def render_real_report(report_class, real_root, args=None, leaf_only=False):
+    """Instantiate a report and rendering it to a string.
+
+    This is intended to be called in the context of a Bottle view app request
+    (it uses 'request').
+
+    Args:
+      report_class: A class, the type of the report to render.
+      real_root: An instance of RealAccount to render.
+      args: A list of strings, the arguments to initialize the report with.
+      leaf_only: A boolean, whether to render the leaf names only.
+    Returns:
+      A string, the rendered report.
+    """
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
+                              request.app.get_url, leaf_only)
+    oss = io.StringIO()
+    report_ = report_class.from_args(args, formatter=formatter)
+    report_.render_real_htmldiv(real_root, request.ledger.options, oss)
+    return oss.getvalue()
+
+
+#--------------------------------------------------------------------------------
+# Global application pages.
+
+
+NOT_IMPLEMENTED = '''
+<p style="color:red; font-weight: bold; font-style: italic;">
+  (Feature not implemented yet.)
+</p>
+'''
+
+# pylint: disable=invalid-name
+app = bottle.Bottle()
+A = bottle_utils.AttrMapper(app.router.build)
+
+
+def render_overlay():
+    """Render an overlay with the current errors.
+
+    This is used to bring up new errors on any page when they occur.
+
+    Returns:
+      A string of HTML for the contents of the errors overlay.
+    """
+    return '''
+      <div class="navigation" id="nav-right">
+        <ul>
+          <li><a href="{}">Errors</a></li>
+        </ul>
+      </div>'''.format(app.router.build('errors'))
+
+    # It would be nice to have a fancy overlay here, that automatically appears
+    # after parsing if there are errors and that automatically smoothly fades
+    # out.
+
+
+# A placeholder for the contents of the page, used to split the template for
+# streaming.
+CONTENTS_PLACEHOLDER = '\0CONTENTS\0'
+
+
+def stream_view(contents, *args, **kw):
+    """Render a view page, streaming its contents.
+
+    The page template is rendered immediately, and the contents are produced
+    lazily, as the response is being sent.
+
+    Args:
+      contents: An iterable of strings, the contents of the page.
+      *args: A tuple of values for the HTML template.
+      *kw: A dict of optional values for the HTML template.
+    Returns:
+      A generator of strings of HTML.
+    """
+    header, footer = render_view(*args, contents=CONTENTS_PLACEHOLDER, **kw).split(
+        CONTENTS_PLACEHOLDER)
+    def iter_page():
+        yield header
+        yield from contents
+        yield footer
+    return iter_page()
+
+
+def get_url_builder():
+    """Create a function to build URLs for the current application and request.
+
+    Bottle builds URLs relative to the script name of the request at the time
+    they are built, and this is no longer valid when the body of a streamed
+    response is being generated, after the handler has returned. The function
+    returned here captures it beforehand.
+
+    Returns:
+      A function with the same signature as Bottle.get_url().
+    """
+    router = request.app.router
+    base_url = urllib.parse.urljoin(
+        '/', request.environ.get('SCRIPT_NAME', '').strip('/') + '/')
+    def build_url(routename, **kwargs):
+        return urllib.parse.urljoin(base_url, router.build(routename, **kwargs).lstrip('/'))
+    return build_url
+
+
+def render_global(*args, **kw):
+    """Render the title and contents in our standard template for a global page.
+
+    Args:
+      *args: A tuple of values for the HTML template.
+      *kw: A dict of optional values for the HTML template.
+    Returns:
+      An HTML string of the rendered template.
+    """
+    response.content_type = 'text/html'
+    kw['A'] = A # Application mapper
+    kw['V'] = V # View mapper
+    kw['title'] = request.ledger.options['title']
+    kw['view_title'] = ''
+    kw['navigation'] = GLOBAL_NAVIGATION
+    kw['scripts'] = kw.get('scripts', '')
+    kw['overlay'] = (render_overlay()
+                     if request.params.pop('render_overlay', True)
+                     else '')
+    return template.render(*args, **kw)
+
+
+@app.route('/', name='root')
+def root():
+    "Redirect the root page to the home page."
+    bottle.redirect(app.get_url('toc'))
+
+
+@app.route('/index', name='toc')
+def toc():
+    entries = request.ledger.entries
+    entries_no_open_close = [entry for entry in entries
+                             if not isinstance(entry, (data.Open, data.Close))]
+    if entries_no_open_close:
+        mindate, maxdate = None, None
+    else:
+        mindate, maxdate = getters.get_min_max_dates(entries_no_open_close)
+
+    def view_url(name, **kw):
+        return app.router.build(name, path=DEFAULT_VIEW_REDIRECT, **kw)
+
+    viewboxes = []
+    if app.args.view:
+        # Render a single link to a view, the view selected from --view.
+        viewboxes.append(('selected', None,
+                          [('/', 'Selected View')]))
+    else:
+        # Render a menu of various views.
+
+        # Global views.
+        viewboxes.append(('global', None,
+                          [(view_url('all'), 'All Transactions')]))
+
+        # By year views.
+        viewboxes.append(
+            ('year', 'By Year',
+             [(view_url('year', year=year), 'Year {}'.format(year))
+              for year in reversed(list(getters.get_active_years(entries)))]))
+
+        # By tag views.
+        viewboxes.append(('tag', 'Tags',
+                          [(view_url('tag', tag=tag), '#{}'.format(tag))
+                           for tag in getters.get_all_tags(entries)]))
+
+        # By component.
+        components = getters.get_account_components(entries)
+        viewboxes.append(
+            ('component', 'Component',
+             [(view_url('component', component=component), '{}'.format(component))
+              for component in components]))
+
+        # Note: With the filtering language, payees will be added and much many more
+        # options. Don't worry.
+
+    oss = io.StringIO()
+    oss.write('<div id="viewboxes">\n')
+    for cssid, title, viewbox in viewboxes:
+        view_items = ['<li><a href="{}">{}</a></li>'.format(url, title)
+                      for url, title in viewbox]
+        oss.write("""
+          <div id="{cssid}" class="viewbox">
+            {title}
+            <ul>
+              {view_items}
+            </ul>
+          </div>
+          <hr/>
+        """.format(cssid=cssid,
+                   title='<h2>{}</h2>'.format(title) if title else '',
+                   view_items='\n'.join(view_items)))
+    oss.write('</div> <!-- viewboxes -->\n')
+
+    return render_global(
+        pagetitle="Table of Contents",
+        contents=oss.getvalue())
+
+
+@app.route('/errors', name='errors')
+def errors():
+    "Report error encountered during parsing, checking and realization."
+    return render_global(
+        pagetitle="Errors",
+        contents=render_report(misc_reports.ErrorReport, [], leaf_only=False))
+
+
+@app.route('/source', name='source')
+def source():
+    "Render the source file, allowing scrolling at a specific line."
+
+    contents = io.StringIO()
+    if app.args.no_source:
+        contents.write("Source hidden.")
+    else:
+        contents.write('<div id="source">')
+        for i, line in enumerate(request.ledger.source.splitlines()):
+            lineno = i+1
+            contents.write(
+                '<pre id="{}">{}  {}</pre>\n'.format(
+                    lineno, lineno, line.rstrip()))
+        contents.write('</div>')
+
+    return render_global(
+        pagetitle="Source",
+        contents=contents.getvalue()
+        )
+
+
+@app.route('/cache', name='cache')
+def cache():
+    "Render the statistics and contents of the cache of views."
+    view_cache = request.ledger.views
+    oss = io.StringIO()
+
+    def budget(value, unit=''):
+        return 'unlimited' if value is None else '{:,}{}'.format(value, unit)
+
+    oss.write('<table>\n')
+    for name, value in [
+            ("Views", '{:,} / {}'.format(len(view_cache),
+                                        budget(view_cache.max_entries))),
+            ("Estimated Size", '{:,} / {}'.format(view_cache.total_bytes,
+                                                  budget(view_cache.max_bytes,
+                                                         ' bytes'))),
+            ("Hits", '{:,}'.format(view_cache.hits)),
+            ("Misses", '{:,}'.format(view_cache.misses)),
+            ("Evictions", '{:,}'.format(view_cache.evictions)),
+    ]:
+        oss.write('<tr><td>{}</td><td class="num">{}</td></tr>\n'.format(name, value))
+    oss.write('</table>\n')
+
+    oss.write('<h2>Cached Views (most recently used first)</h2>\n')
+    oss.write('<table>\n')
+    oss.write('<thead><tr><th>View</th><th>Title</th><th>Journals</th>'
+              '<th>Estimated Size</th></tr></thead>\n')
+    for viewid, view, size in reversed(view_cache.items()):
+        oss.write('<tr><td><a href="{}/">{}</a></td><td>{}</td>'
+                  '<td class="num">{}</td><td class="num">{:,}</td></tr>\n'.format(
+                      viewid, viewid, view.title, len(view.journal_cache), size))
+    oss.write('</table>\n')
+
+    return render_global(
+        pagetitle="View Cache",
+        contents=oss.getvalue())
+
+
+@app.route('/link/<link:re:.*>', name='link')
+def link(link=None):
+    "Serve journals for links."
+
+    linked_entries = basicops.filter_link(link, request.ledger.entries)
+
+    oss = io.StringIO()
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
+                              request.app.get_url, False, view_links=False)
+    journal_html.html_entries_table_with_balance(oss, linked_entries, formatter)
+    return render_global(
+        pagetitle="Link: {}".format(link),
+        contents=oss.getvalue())
+
+
+@app.route('/context/<ehash:re:[a-fA-F0-9]*>', name='context')
+def context_(ehash=None):
+    "Render the before & after context around a transaction entry."
+
+    matching_entries = get_entry_index(request.ledger).get(ehash, [])
+
+    oss = io.StringIO()
+    if len(matching_entries) == 0:
+        print("ERROR: Could not find matching entry for '{}'".format(ehash),
+              file=oss)
+
+    elif len(matching_entries) > 1:
+        print("ERROR: Ambiguous entries for '{}'".format(ehash),
+              file=oss)
+        print(file=oss)
+        dcontext = request.ledger.options['dcontext']
+        printer.print_entries(matching_entries, dcontext, file=oss)
+
+    else:
+        dcontext = request.ledger.options['dcontext']
+        oss.write("<pre>\n")
+        for entry in matching_entries:
+            oss.write(context.render_entry_context(
+                request.ledger.entries, request.ledger.options, dcontext,
+                entry.meta["filename"], entry.meta["lineno"]))
+        oss.write("</pre>\n")
+
+    return render_global(
+        pagetitle="Context: {}".format(ehash),
+        contents=oss.getvalue())
+
+
+
+
+
+
+
+
+
+GLOBAL_NAVIGATION = bottle.SimpleTemplate("""
+<ul>
+  <li><a href="{{A.toc}}">Table of Contents</a></li>
+  <li><a href="{{A.errors}}">Errors</a></li>
+  <li><a href="{{A.source}}">Source</a></li>
+</ul>
+""").render(A=A)
+
+
+@app.route('/resources/web.css', name='style')
+def style():
+    "Stylesheet for the entire document."
+    response.content_type = 'text/css'
+    if app.args.debug:
+        with open(path.join(path.dirname(__file__), 'web.css')) as f:
+            global STYLE; STYLE = f.read()
+    return STYLE
+
+
+@app.get('/favicon.ico')
+def favicon():
+    return bottle.static_file('favicon.ico', path.dirname(__file__))
+
+
+@app.get('/third_party/<filename:re:.*>')
+def third_party(filename=None):
+    return bottle.static_file(request.path[1:], path.dirname(__file__))
+
+
+doc_name = 'doc'
+@app.route('/doc/<filename:re:.*>', name=doc_name)
+def doc(filename=None):
+    "Serve static filenames for documents directives."
+
+    filename = '/' + filename
+
+    # Check that there is a document directive that has this filename.
+    # This is for security; we don't want to be able to serve just any file.
+    for entry in misc_utils.filter_type(request.ledger.entries, data.Document):
+        if entry.filename == filename:
+            break
+    else:
+        raise bottle.HTTPError(404, "Not found")
+
+    # Just serve the file ourselves.
+    return bottle.static_file(path.basename(filename),
+                              path.dirname(filename))
+
+
+#--------------------------------------------------------------------------------
+# View application pages.
+
+viewapp = bottle.Bottle()
+V = bottle_utils.AttrMapper(lambda *args, **kw: request.app.get_url(*args, **kw))
+
+
+def render_view(*args, **kw):
+    """Render the title and contents in our standard template for a view page.
+
+    Args:
+      *args: A tuple of values for the HTML template.
+      *kw: A dict of optional values for the HTML template.
+    Returns:
+      An HTML string of the rendered template.
+    """
+    response.content_type = 'text/html'
+    kw['A'] = A # Application mapper
+    kw['V'] = V # View mapper
+    kw['title'] = request.ledger.options['title']
+    kw['view_title'] = ' - ' + request.view.title
+    kw['navigation'] = APP_NAVIGATION.render(A=A, V=V, view_title=request.view.title)
+    kw['scripts'] = kw.get('scripts', '')
+    kw['overlay'] = (render_overlay()
+                     if request.params.pop('render_overlay', False)
+                     else '')
+    return template.render(*args, **kw)
+
+APP_NAVIGATION = bottle.SimpleTemplate("""
+<ul>
+  <li><a href="{{A.toc}}">Table of Contents</a></li>
+  <li><span class="ledger-name">{{view_title}}:</span></li>
+  <li><a href="{{V.balsheet}}">Balance Sheet</a></li>
+  <li><a href="{{V.income}}">Income Statement</a></li>
+  <li><a href="{{V.holdings}}">Equity/Holdings</a></li>
+  <li><a href="{{V.trial}}">Trial Balance</a></li>
+  <li><a href="{{V.journal_all}}">General Journal</a></li>
+  <li><a href="{{V.index}}">Index</a></li>
+</ul>
+""")
+
+
+@viewapp.route('/', name='approot')
+def approot():
+    bottle.redirect(request.app.get_url(DEFAULT_VIEW_REDIRECT))
+
+
+@viewapp.route('/index', name='index')
+def index():
+    "Index of all pages, so that navigation need not have all links."
+
+    oss = io.StringIO()
+    oss.write('<ul>\n')
+    for title, page in [
+            ("Balances", "trial"),
+            ("Balance Sheet", "balsheet"),
+            ("Opening Balances", "openbal"),
+            ("Income Statement", "income"),
+            ("General Journal", "journal_all"),
+            ("Conversions", "conversions"),
+            ("Documents", "documents"),
+            ("Holdings (Full Detail)", "holdings"),
+            ("Holdings by Account", "holdings_byaccount"),
+            ("Holdings by Root Account", "holdings_byrootaccount"),
+            ("Holdings by Commodity", "holdings_bycommodity"),
+            ("Holdings by Currency", "holdings_bycurrency"),
+            ("Net Worth", "networth"),
+            ("Commodities", "commodities"),
+            ("Events", "event_index"),
+            ("Activity/Update", "activity"),
+            ("Statistics (Types)", "stats_types"),
+            ("Statistics (Postings)", "stats_postings"),
+    ]:
+        oss.write('<li><a href={}>{}</a></li>\n'.format(
+            request.app.get_url(page), title))
+    oss.write('</ul>\n')
+
+    return render_view(
+        pagetitle="Index",
+        contents=oss.getvalue())
+
+
+@viewapp.route('/trial', name='trial')
+def trial():
+    "Trial balance / Chart of Accounts."
+    return render_view(
+        pagetitle="Trial Balance",
+        contents=render_real_report(balance_reports.BalancesReport,
+                                    request.view.real_accounts,
+                                    leaf_only=True))
+
+
+@viewapp.route('/balsheet', name='balsheet')
+def balsheet():
+    "Balance sheet."
+    return render_view(pagetitle="Balance Sheet",
+                       contents=render_real_report(balance_reports.BalanceSheetReport,
+                                                   request.view.closing_real_accounts,
+                                                   leaf_only=True))
+
+
+@viewapp.route('/openbal', name='openbal')
+def openbal():
+    "Opening balances."
+    return render_view(pagetitle="Opening Balances",
+                       contents=render_real_report(balance_reports.BalanceSheetReport,
+                                                   request.view.opening_real_accounts,
+                                                   leaf_only=True))
+
+
+@viewapp.route('/income', name='income')
+def income():
+    "Income statement."
+    return render_view(pagetitle="Income Statement",
+                       contents=render_real_report(balance_reports.IncomeStatementReport,
+                                                   request.view.real_accounts,
+                                                   leaf_only=True))
+
+
+@viewapp.route('/equity/holdings', name='holdings')
+def holdings_():
+    "Render a detailed table of all holdings."
+    html_table = render_report(holdings_reports.HoldingsReport, request.view.entries,
+                               [],
+                               css_class='holdings detail-table sortable', center=True)
+    return render_view(
+        pagetitle="Holdings",
+        contents=html_table,
+        scripts='<script src="/third_party/sorttable.js"></script>')
+
+@viewapp.route('/equity/holdings_byaccount', name='holdings_byaccount')
+def holdings_byaccount():
+    "Render a table of holdings by account."
+
+    html_table = render_report(holdings_reports.HoldingsReport, request.view.entries,
+                               ['--by', 'account'],
+                               css_class='holdings detail-table sortable', center=True)
+    return render_view(
+        pagetitle="Holdings by Account",
+        contents=html_table,
+        scripts='<script src="/third_party/sorttable.js"></script>')
+
+@viewapp.route('/equity/holdings_byrootaccount', name='holdings_byrootaccount')
+def holdings_byrootaccount():
+    "Render a table of holdings by account."
+
+    html_table = render_report(holdings_reports.HoldingsReport, request.view.entries,
+                               ['--by', 'root-account'],
+                               css_class='holdings detail-table sortable', center=True)
+    return render_view(
+        pagetitle="Holdings by Account",
+        contents=html_table,
+        scripts='<script src="/third_party/sorttable.js"></script>')
+
+@viewapp.route('/equity/holdings_bycommodity', name='holdings_bycommodity')
+def holdings_bycommodity():
+    "Render a table of holdings by commodity."
+
+    html_table = render_report(holdings_reports.HoldingsReport, request.view.entries,
+                               ['--by', 'commodity'],
+                               css_class='holdings detail-table sortable', center=True)
+    return render_view(
+        pagetitle="Holdings by Commodity",
+        contents=html_table,
+        scripts='<script src="/third_party/sorttable.js"></script>')
+
+@viewapp.route('/equity/holdings_bycurrency', name='holdings_bycurrency')
+def holdings_bycurrency():
+    "Render a table of holdings by currency."
+
+    html_table = render_report(holdings_reports.HoldingsReport, request.view.entries,
+                               ['--by', 'currency'],
+                               css_class='holdings detail-table sortable', center=True)
+    return render_view(
+        pagetitle="Holdings by Currency",
+        contents=html_table,
+        scripts='<script src="/third_party/sorttable.js"></script>')
+
+@viewapp.route('/equity/networth', name='networth')
+def networth():
+    "Render a table of the net worth for this filter."
+
+    html_table = render_report(holdings_reports.NetWorthReport, request.view.entries)
+    return render_view(
+        pagetitle="Net Worth",
+        contents=html_table)
+
+
+
+@viewapp.route('/journal/all', name='journal_all')
+def journal_all():
+    "A list of all the entries in this realization."
+    bottle.redirect(request.app.get_url('journal', account_name=''))
+
+
+@viewapp.route('/journal/<account_name:re:.*>', name='journal')
+def journal_(account_name=None):
+    "A list of all the entries for this account realization."
+
+    # Ensure we support slashes and colons equally.
+    # Old style used to be slashes; now we're using colons, it works everywhere.
+    account_name = account_name.strip('/').replace('/', account.sep)
+
+    # Figure out which account to render this from.
+    closing = bool(account_name and
+                   account_types.is_balance_sheet_account(account_name,
+                                                          request.ledger.account_types))
+    journal = request.view.get_journal(account_name, closing)
+    if journal is None:
+        raise bottle.HTTPError(404, "Invalid account name: {}".format(account_name))
+    txn_postings, checkpoints = journal
+
+    # Get the page to render. By default, render the most recent entries first.
+    try:
+        offset = int(request.params.get('offset', 0))
+        limit = int(request.params.get('limit', app.args.journal_page_size))
+    except ValueError:
+        raise bottle.HTTPError(400, "Invalid offset or limit")
+    order = request.params.get('order', 'desc')
+    if offset < 0 or limit < 0 or order not in ('asc', 'desc'):
+        raise bottle.HTTPError(400, "Invalid offset, limit or order")
+
+    render_postings = request.params.get('postings', True)
+    if isinstance(render_postings, str):
+        render_postings = render_postings.lower() in ('1', 'true')
+
+    formatter = HTMLFormatter(request.ledger.options['dcontext'], get_url_builder(), False)
+    pagination = render_journal_pagination(account_name, offset, limit, order,
+                                           checkpoints.num_rows)
+    contents = itertools.chain(
+        [pagination],
+        journal_html.iter_html_entries_table_with_balance(txn_postings, formatter,
+                                                          render_postings,
+                                                          offset, limit or None,
+                                                          order == 'desc',
+                                                          checkpoints),
+        [pagination])
+
+    return stream_view(contents,
+                       pagetitle='{}'.format(account_name or
+                                             'General Ledger (All Accounts)'))
+
+
+def render_journal_pagination(account_name, offset, limit, order, num_rows):
+    """Render links to the previous and next pages of a journal.
+
+    Args:
+      account_name: A string, the name of the account of the journal.
+      offset: An integer, the number of rows skipped to render this page.
+      limit: An integer, the number of rows on a page, or zero, if the journal
+        is not paginated.
+      order: A string, 'asc' or 'desc', the order of the rows.
+      num_rows: An integer, the total number of rows of the journal.
+    Returns:
+      A string of HTML, empty if the journal fits on a single page.
+    """
+    if not limit or (offset == 0 and num_rows <= limit):
+        return ''
+
+    def page_link(page_offset, title):
+        url = '{}?{}'.format(
+            request.app.get_url('journal', account_name=account_name),
+            urllib.parse.urlencode([('offset', page_offset),
+                                    ('limit', limit),
+                                    ('order', order)]))
+        return '<a href="{}">{}</a>'.format(url, title)
+
+    links = []
+    if offset > 0:
+        links.append(page_link(max(0, min(offset, num_rows) - limit),
+                               'Newer' if order == 'desc' else 'Previous'))
+    if offset < num_rows:
+        links.append('Rows {}-{} of {}'.format(offset + 1,
+                                               min(offset + limit, num_rows),
+                                               num_rows))
+    else:
+        links.append('{} rows'.format(num_rows))
+    if offset + limit < num_rows:
+        links.append(page_link(offset + limit,
+                               'Older' if order == 'desc' else 'Next'))
+    return '<div class="pagination">{}</div>\n'.format(' | '.join(links))
+
+
+@viewapp.route('/conversions', name='conversions')
+def conversions():
+    "Render the list of transactions with conversions."
+    return render_view(
+        pagetitle="Conversions",
+        contents=render_report(journal_reports.ConversionsReport,
+                               request.view.entries, leaf_only=False))
+
+
+# Note: these redirects are necessary to let the view router create global links
+# from routines that work from a single build_url() argument being passed in. We
+# can just pass in the view's request.app.get_url() function and it can call
+# this with 'doc' or 'link' and a redirect moves it to the corresponding global
+# page.
+@viewapp.route('/doc/<filename:re:.*>', name=doc_name)
+def doc__view(filename=None):
+    # Redirect to global page.
+    bottle.redirect(app.router.build('doc', filename=filename))
+
+@viewapp.route('/documents', name='documents')
+def documents():
+    "Render a tree with all the documents found."
+    return render_view(
+        pagetitle="Documents",
+        contents=render_report(journal_reports.DocumentsReport,
+                               request.view.entries, leaf_only=False))
+
+
+@viewapp.route('/prices'
+               '/<base:re:[A-Z][A-Z0-9\'\.\_\-]{0,22}[A-Z0-9]>'
+               '/<quote:re:[A-Z][A-Z0-9\'\.\_\-]{0,22}[A-Z0-9]>', name='prices')
+def prices_values(base=None, quote=None):
+    "Render all the values for a particular price pair."
+    html_table = render_report(price_reports.CommodityPricesReport, request.view.entries,
+                               ['--commodity', '{}/{}'.format(base, quote)],
+                               css_id='price-index')
+    return render_view(
+        pagetitle="Price: {} / {}".format(base, quote),
+        contents=html_table)
+
+
+@viewapp.route('/commodities', name='commodities')
+def commodities():
+    "Render a list commodities with list their prices page."
+    html_table = render_report(price_reports.CommoditiesReport, request.view.entries,
+                               [],
+                               css_id='price-index')
+    return render_view(
+        pagetitle="Commodities",
+        contents=html_table)
+
+
+@viewapp.route('/event/<event:re:([A-Za-z0-9\-_/.]+)?>', name='event')
+def event(event=None):
+    "Render all values of a particular event."
+    if not event:
+        bottle.redirect(app.get_url('event_index'))
+    return render_view(
+        pagetitle="Event: {}".format(event),
+        contents=render_report(misc_reports.EventsReport, request.ledger.entries,
+                               ['--expr', event]))
+
+
+@viewapp.route('/event', name='event_index')
+def event_index():
+    "Render the latest values of all events and an index."
+    return render_view(
+        pagetitle="Events Index",
+        contents=render_report(misc_reports.CurrentEventsReport,
+                               request.view.entries))
+
+
+@viewapp.route('/activity', name='activity')
+def activity():
+    "Render the update activity."
+    return render_global(
+        pagetitle="Update Activity",
+        contents=render_real_report(misc_reports.ActivityReport,
+                                    request.view.real_accounts,
+                                    leaf_only=False))
+
+@viewapp.route('/stats_types', name='stats_types')
+def stats_types():
+    "Compute and render statistics about the input file."
+    return render_view(
+        pagetitle="Directives Statistics",
+        contents=render_report(misc_reports.StatsDirectivesReport,
+                               request.view.entries))
+
+@viewapp.route('/stats_postings', name='stats_postings')
+def stats_postings():
+    "Compute and render statistics about the input file."
+    return render_view(
+        pagetitle="Postings Statistics",
+        contents=render_report(misc_reports.StatsPostingsReport,
+                               request.view.entries))
+
+
+#--------------------------------------------------------------------------------
+# Views.
+
+
+def handle_view(path_depth):
+    """A decorator for handlers which create views lazily.
+    If you decorate a method with this, the wrapper does the redirect
+    handling and your method is just a factory for a View instance,
+    which is cached.
+
+    Args:
+      path_depth: An integer, the number of components that form the view id.
+    Returns:
+      A decorator function, used to wrap view handlers.
+    """
+    def view_populator(callback):
+        def wrapper(*args, **kwargs):
+            components = request.path.split('/')
+            viewid = '/'.join(components[:path_depth+1])
+            # Try fetching the view from the cache.
+            view_cache = request.ledger.views
+            view = view_cache.get(viewid)
+            if view is None:
+                # We need to create the view.
+                view = callback(*args, **kwargs)
+                view_cache.put(viewid, view)
+
+            # Save the view for the subrequest and redirect. populate_view()
+            # picks this up and saves it in request.view.
+            request.environ['VIEW'] = view
+            contents = bottle_utils.internal_redirect(viewapp, path_depth)
+
+            # Rendering the page may have grown the view, e.g. by caching a
+            # journal; account for it.
+            view_cache.resize(viewid)
+            return contents
+        return wrapper
+    return view_populator
+
+
+def populate_view(callback):
+    """A plugin that will populate the request with the current view instance.
+
+    Args:
+      callback: A continuation function to call to handle the request.
+    Returns:
+      A function to call to install view-specific parameters on the request.
+    """
+    def wrapper(*args, **kwargs):
+        request.view = request.environ['VIEW']
+        return callback(*args, **kwargs)
+    return wrapper
+
+viewapp.install(populate_view)
+
+
+def url_restrict_generator(url_prefix):
+    """Restrict to only a single prefix.
+
+    Args:
+      url_prefix: A string, a URL prefix to restrict to.
+      callback: The function to wrap.
+    Returns:
+      A handler decorator.
+    """
+    # A list of URLs that should always be accepted, even when restricted.
+    allowed_regexps = [re.compile(regexp).match
+                       for regexp in ['/web.css',
+                                      '/favicon.ico',
+                                      '/toc',
+                                      '/errors',
+                                      '/source',
+                                      '/link',
+                                      '/context',
+                                      '/third_party']]
+
+    def url_restrict_handler(callback):
+        def wrapper(*args, **kwargs):
+            if (any(match(request.path) for match in allowed_regexps) or
+                request.path.startswith(url_prefix)):
+                return callback(*args, **kwargs)
+            if request.path == '/':
+                bottle.redirect(url_prefix)
+
+            # Note: we issue a "202 Accepted" status in order to satisfy bean-bake,
+            # we want to distinguish between an actual 404 error and this case.
+            raise bottle.HTTPError(202, "URLs restricted to '{}'".format(url_prefix))
+
+        return wrapper
+    return url_restrict_handler
+
+
+def get_all_view(app):
+    """Return a view of all transactions.
+
+    Returns:
+      An instance of AllView, that covers all transactions.
+    """
+    return views.AllView(request.ledger.entries, request.ledger.options,
+                         'All Transactions')
+
+
+@app.route(r'/view/all/<path:re:.*>', name='all')
+@handle_view(2)
+def all(path=None):
+    return get_all_view(app)
+
+
+@app.route(r'/view/year/<year:re:\d\d\d\d>/<path:re:.*>', name='year')
+@handle_view(3)
+def year(year=None, path=None):
+    year = int(year)
+    first_month = app.args.first_month
+    return views.YearView(request.ledger.entries, request.ledger.options,
+                          'Year {:4d}'.format(year),
+                          year, first_month)
+
+
+@app.route(r'/view/tag/<tag:re:[^/]*>/<path:re:.*>', name='tag')
+@handle_view(3)
+def tag(tag=None, path=None):
+    return views.TagView(request.ledger.entries, request.ledger.options,
+                         'Tag {}'.format(tag), set([tag]))
+
+
+@app.route(r'/view/payee/<payee:re:[^/]*>/<path:re:.*>', name='payee')
+@handle_view(3)
+def payee(payee=None, path=None):
+    return views.PayeeView(request.ledger.entries, request.ledger.options,
+                           'Payee {}'.format(payee), payee)
+
+@app.route(r'/view/component/<component:re:[^/]*>/<path:re:.*>', name='component')
+@handle_view(3)
+def component(component=None, path=None):
+    return views.ComponentView(request.ledger.entries, request.ledger.options,
+                               'Component: {}'.format(component), component)
+
+
+#--------------------------------------------------------------------------------
+# Bootstrapping and main program.
+
+
+# The state of the loaded ledger, as served by the application. This is replaced
+# as a whole when the input files change, so that the requests being served
+# keep using the state they started with (see request.ledger).
+#
+# Attributes:
+#   entries: A list of directives, as loaded from the input file.
+#   errors: A list of errors from loading the input file.
+#   options: A dict of options, as produced by the parser.
+#   account_types: An instance of AccountTypes, for the options.
+#   price_map: A price map of the entries, as built by the loader.
+#   source: A string, the contents of the top-level input file.
+#   mtimes: A dict of the absolute names of all the input files, including the
+#     included ones, to their modification times when they were loaded, or None,
+#     if they did not exist.
+#   views: An instance of views.ViewCache, a cache of the views that have been
+#     created (on access).
+#   entry_index: A dict of entry hash to the list of entries with that hash,
+#     filled in on first access. See get_entry_index().
+LedgerState = collections.namedtuple(
+    'LedgerState',
+    'entries errors options account_types price_map source mtimes views entry_index')
+
+
+def get_entry_index(ledger):
+    """Return the index of the entries of a ledger state by hash.
+
+    The index is built on the first call for each ledger state and reused by
+    the following requests. It reuses the entry hashes computed by the loader,
+    e.g., by the noduplicates plugin.
+
+    Args:
+      ledger: An instance of LedgerState.
+    Returns:
+      A dict of hash strings to lists of entries.
+    """
+    if not ledger.entry_index and ledger.entries:
+        # Note: concurrent requests may build it at the same time; this is
+        # harmless, they compute the same contents.
+        ledger.entry_index.update(compare.index_entries(
+            ledger.entries, ledger.options['entry_hashes']))
+    return ledger.entry_index
+
+
+def get_mtimes(filenames):
+    """Get the modification times of a list of files.
+
+    Args:
+      filenames: A list of strings, the names of the files.
+    Returns:
+      A dict of filename to modification time, or None, if the file does not
+      exist.
+    """
+    mtimes = {}
+    for filename in filenames:
+        try:
+            mtimes[filename] = path.getmtime(filename)
+        except OSError:
+            mtimes[filename] = None
+    return mtimes
+
+
+def load_ledger(filename, parse_cache, previous=None):
+    """Load the input file and prepare a new state for the application.
+
+    The views cached in the previous state whose entries are unaffected by the
+    changes to the input are carried over to the new state.
+
+    Args:
+      filename: A string, the name of the top-level input file.
+      parse_cache: A dict, a cache of parsed files for the loader.
+      previous: An instance of LedgerState, the state being replaced, or None.
+    Returns:
+      An instance of LedgerState.
+    """
+    logging.info('Reloading...')
+
+    # Note the modification times first, so that changes made while we are
+    # loading trigger another reload.
+    filenames = [filename]
+    if previous is not None:
+        filenames.extend(previous.options['include'])
+    mtimes = get_mtimes(filenames)
+
+    # Save the source for later, to render.
+    with open(filename, encoding='utf8') as f:
+        source = f.read()
+
+    # Parse the beancount file.
+    entries, errors, options_map = loader.load_file(filename, parse_cache=parse_cache)
+
+    # Print out the list of errors.
+    if errors:
+        print(',----------------------------------------------------------------')
+        printer.print_errors(errors, file=sys.stdout)
+        print('`----------------------------------------------------------------')
+
+    # Watch the set of files that was actually included this time.
+    for include_filename in options_map['include']:
+        if include_filename not in mtimes:
+            mtimes.update(get_mtimes([include_filename]))
+
+    # Carry over the views that are unaffected by the changes.
+    if previous is not None:
+        views_cache = previous.views.carry_over(entries, options_map)
+        logging.info('Kept %d of %d views', len(views_cache), len(previous.views))
+    else:
+        views_cache = views.ViewCache(app.args.view_cache_entries or None,
+                                      (app.args.view_cache_megabytes * 1024 * 1024
+                                       or None))
+
+    return LedgerState(entries,
+                       errors,
+                       options_map,
+                       options.get_account_types(options_map),
+                       options_map['price_map'],
+                       source,
+                       mtimes,
+                       views_cache,
+                       {})
+
+
+ReloadError = collections.namedtuple('ReloadError', 'source message entry')
+
+
+def reload_failed(previous, mtimes, exc):
+    """Prepare the state to keep serving after a failed reload.
+
+    The previous entries keep being served, and the failure is reported along
+    with their errors, in place of that of an earlier failed reload.
+
+    Args:
+      previous: An instance of LedgerState, the state that failed to reload.
+      mtimes: A dict of filename to modification time, those of the attempt.
+      exc: The exception raised by the reload.
+    Returns:
+      An instance of LedgerState.
+    """
+    errors = [error
+              for error in previous.errors
+              if not isinstance(error, ReloadError)]
+    errors.append(ReloadError(data.new_metadata(app.args.filename, 0),
+                              "Could not reload the input file: {}".format(exc),
+                              None))
+    return previous._replace(errors=errors, mtimes=mtimes)
+
+
+def reload_ledger():
+    """Reload the input file in a background thread.
+
+    The new state is swapped in when it is ready; until then, the current
+    state keeps being served. This does nothing if a reload is already in
+    progress. If the reload fails, the current state keeps being served with
+    the failure added to its errors (see reload_failed()), until the input
+    files change again.
+    """
+    with app.reload_lock:
+        if app.reload_thread is not None and app.reload_thread.is_alive():
+            return
+        previous = app.ledger
+
+        def reload_target():
+            # Note the modification times of the attempt, so that a failed
+            # reload is not retried until the files change again.
+            mtimes = get_mtimes(previous.mtimes.keys())
+            try:
+                app.ledger = load_ledger(app.args.filename, app.parse_cache, previous)
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.exception('Could not reload the input file')
+                app.ledger = reload_failed(previous, mtimes, exc)
+
+        app.reload_thread = threading.Thread(target=reload_target)
+        app.reload_thread.daemon = True
+        app.reload_thread.start()
+
+
+def auto_reload_input_file(callback):
+    """A plugin that automatically reloads the input file if it or any of the files
+    it includes changed since it was last loaded."""
+    def wrapper(*posargs, **kwargs):
+        if app.ledger is None:
+            # Load the file for the first time; there is nothing to serve yet.
+            with app.reload_lock:
+                if app.ledger is None:
+                    app.ledger = load_ledger(app.args.filename, app.parse_cache)
+        elif get_mtimes(app.ledger.mtimes.keys()) != app.ledger.mtimes:
+            reload_ledger()
+
+        # Use the same state for the entire request.
+        request.ledger = app.ledger
+
+        # For now, the overlay is a link to the errors page. Always render
+        # it on the right when there are errors.
+        if request.ledger.errors:
+            request.params['render_overlay'] = True
+
+        return callback(*posargs, **kwargs)
+    return wrapper
+
+app.install(auto_reload_input_file)
+
+
+def incognito(callback):
+    """A plugin that converts all numbers rendered into X's, in order
+    to hide the actual values in the ledger. This is used for doing
+    public demos using my real ledger, where I don't necessarily
+    want to share the detail of my financial life with the viewers
+    but when I still want an interesting ledger, with enough
+    detail that looks realistic."""
+
+    def wrapper(*posargs, **kwargs):
+        contents = callback(*posargs, **kwargs)
+        # pylint: disable=bad-continuation
+        if response.content_type in ('text/html', ''):
+            if isinstance(contents, str):
+                contents = text_utils.replace_numbers(contents)
+            elif isinstance(contents, types.GeneratorType):
+                # A streamed page (see stream_view()).
+                contents = map(text_utils.replace_numbers, contents)
+        return contents
+
+    return wrapper
+
+
+# Global template.
+template = None
+
+def run_app(args, quiet=None):
+    logging.basicConfig(level=logging.INFO,
+                        format='%(levelname)-8s: %(message)s')
+
+    app_installs = []
+    view_installs = []
+
+    # Hide the numbers in incognito mode. We do this on response text via a plug-in.
+    if args.incognito:
+        args.no_source = True
+        app.install(incognito)
+        app_installs.append(incognito)
+        viewapp.install(incognito)
+        view_installs.append(incognito)
+
+    # Install code that will restrict all resources to a particular view.
+    if args.view:
+        view_url_prefix = '/view/{}/'.format(args.view)
+        url_restrictor = url_restrict_generator(view_url_prefix)
+        app.install(url_restrictor)
+        app_installs.append(url_restrictor)
+
+    # Clear the state in order to insure a load on the first page.
+    app.ledger = None
+    app.reload_lock = threading.Lock()
+    app.reload_thread = None
+
+    # A cache of parsed input files, so that reloads only reparse modified files.
+    app.parse_cache = {}
+
+    # Load templates.
+    with open(path.join(path.dirname(__file__), 'web.html')) as f:
+        global template
+        template = bottle.SimpleTemplate(f)
+
+    with open(path.join(path.dirname(__file__), 'web.css')) as f:
+        global STYLE; STYLE = f.read()
+
+    # Run the server.
+    app.args = args
+    bind_address = '0.0.0.0' if args.public else 'localhost'
+    app.run(host=bind_address, port=args.port,
+            debug=args.debug, reloader=False,
+            quiet=args.quiet if hasattr(args, 'quiet') else quiet)
+
+    # Uninstall applications.
+    for function in app_installs:
+        app.uninstall(function)
+    for function in view_installs:
+        viewapp.uninstall(function)
+
+
+# The global server instance.
+server = None
+
+def setup_monkey_patch_for_server_shutdown():
+    """Setup globals to steal access to the server reference.
+    This is required to initiate shutdown, unfortunately.
+    (Bottle could easily remedy that.)"""
+
+    # Save the original function.
+    from wsgiref.simple_server import make_server
+
+    # Create a decorator that will save the server upon start.
+    def stealing_make_server(*args, **kw):
+        global server
+        server = make_server(*args, **kw)
+        return server
+
+    # Patch up wsgiref itself with the decorated function.
+    import wsgiref.simple_server
+    wsgiref.simple_server.make_server = stealing_make_server
+
+setup_monkey_patch_for_server_shutdown()
+
+def wait_ready():
+    """Wait until the 'server' global has been set.
+    This tells us the server is running.
+    """
+    while server is None:
+        time.sleep(0.05)
+
+def shutdown():
+    """Request for the server to shutdown."""
+    server.shutdown()
+
+
+def add_web_arguments(argparser):
+    group = argparser.add_argument_group("Web server arguments")
+
+    group.add_argument('filename',
+                       help="Beancount input filename to serve.")
+
+    group.add_argument('--port', action='store', type=int, default=8080,
+                       help="Which port to listen on.")
+
+    group.add_argument('--debug', action='store_true',
+                       help="Enable debugging features (auto-reloading of css).")
+
+    group.add_argument('--incognito', action='store_true',
+                       help=("Filter the output in order to hide all the numbers. "
+                             "This is great for demos using my real file."))
+
+    group.add_argument('--no-source', action='store_true',
+                       help=("Don't render the source."))
+
+    group.add_argument('--view', action='store',
+                       help="Render only the specified view (identify by URL)")
+
+    group.add_argument('--public', '--inaddr-any', action='store_true',
+                       help="Bind server to listen to any address, not just localhost.")
+
+    group.add_argument('--first-month', action='store', type=int, default=1,
+                       help="The first month of the calendar year.")
+
+    group.add_argument('--journal-page-size', action='store', type=int, default=1000,
+                       help=("The number of rows to render on each page of a journal, "
+                             "or 0 to render the journals on a single page."))
+
+    group.add_argument('--view-cache-entries', action='store', type=int, default=32,
+                       help=("The maximum number of views to keep in memory, "
+                             "or 0 for no limit. See the /cache page for statistics."))
+
+    group.add_argument('--view-cache-megabytes', action='store', type=int, default=512,
+                       help=("The maximum estimated memory used by the views kept "
+                             "in memory, in megabytes, or 0 for no limit."))
+
+    return group
+
+
+def main():
+    """Main web service runner. This runs the event loop and blocks indefinitely."""
+
+    argparser = argparse.ArgumentParser(description=__doc__.strip())
+    add_web_arguments(argparser)
+    args = argparser.parse_args()
+
+    run_app(args)
+
+
+def thread_server_start(web_args, **kwargs):
+    """Start a server in a new thread.
+
+    Args:
+      argparse_args: An argparse parsed options object, with all the options
+        from add_web_arguments().
+    Returns:
+      A new Thread instance.
+
+    """
+    thread = threading.Thread(
+        target=run_app,
+        args=(web_args,),
+        kwargs=kwargs)
+    thread.daemon = True # Automatically exit if the process comes dwn.
+    thread.start()
+
+    # Ensure the server has at least started before running the scraper.
+    wait_ready()
+    time.sleep(0.1)
+
+    return thread
+
+
+def thread_server_shutdown(thread):
+    """Shutdown the server running in the given thread.
+
+    Unfortauntely, in the meantime this has a side-effect on all servers.
+    This returns after waiting that the thread has stopped.
+
+    Args:
+      thread: A threading.Thread instance.
+    """
+    # Clean shutdown: request to stop, then join the thread.
+    # Note that because we daemonize, we could forego this elegant detail.
+    shutdown()
+    thread.join()
+
+
+def process_server_start(web_args):
+    """Start a server in a new process.
+
+    Unlike servers started with thread_server_start(), any number of these may
+    run at the same time, on different ports.
+
+    Args:
+      web_args: An argparse parsed options object, with all the options
+        from add_web_arguments().
+    Returns:
+      A new multiprocessing.Process instance.
+    Raises:
+      OSError: If the server exits before accepting connections.
+    """
+    process = multiprocessing.Process(target=run_app, args=(web_args,))
+    process.daemon = True # Automatically exit if this process comes down.
+    process.start()
+
+    # Ensure the server accepts connections before running the scraper.
+    while True:
+        try:
+            socket.create_connection(('localhost', web_args.port)).close()
+            break
+        except OSError:
+            if not process.is_alive():
+                raise OSError("Server on port {} exited with code {}".format(
+                    web_args.port, process.exitcode))
+            time.sleep(0.05)
+
+    return process
+
+
+def process_server_shutdown(process):
+    """Shutdown the server running in the given process.
+
+    Args:
+      process: A multiprocessing.Process instance.
+    """
+    process.terminate()
+    process.join()
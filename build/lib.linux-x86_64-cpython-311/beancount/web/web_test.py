@@ -0,0 +1,84 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import argparse
+import unittest
+import urllib.parse
+from os import path
+from unittest import mock
+
+from beancount.web import scrape
+from beancount.web import web
+from beancount.utils import test_utils
+
+
+class TestWeb(unittest.TestCase):
+
+    # Docs cannot be read for external files.
+    #
+    # Components views... well there are just too many, makes the tests
+    # impossibly slow. Just keep the A's so some are covered for testing.
+    ####ignore_regexp = '^/(doc/|context/|view/component/[^A])'
+    ignore_regexp = '^(/context/|/view/component/[^A]|.*/doc/)'
+
+    def check_page_okay(self, url, response, _, __, ___):
+        self.assertIn(response.status, (200, 202),
+                      "Requested URL: {}".format(url))
+        redirected_path = urllib.parse.urlparse(response.geturl()).path
+        requested_path = urllib.parse.urlparse(response.url).path
+        self.assertEqual(requested_path, redirected_path)
+
+    def scrape(self, filename, **extra):
+        abs_filename = path.join(test_utils.find_repository_root(__file__),
+                                 'examples', filename)
+        scrape.scrape(abs_filename,
+                      self.check_page_okay,
+                      test_utils.get_test_port(),
+                      self.ignore_regexp,
+                      **extra)
+
+    @test_utils.docfile
+    def test_scrape_empty_file(self, filename):
+        """
+        ;; A file with no entries in it.
+        """
+        self.scrape(filename)
+
+    def test_scrape_basic(self):
+        self.scrape('simple/basic.beancount')
+
+    def test_scrape_basic_view(self):
+        self.scrape('simple/basic.beancount',
+                    extra_args=argparse.Namespace(view='year/2013')
+)
+
+    def test_scrape_basic__processes(self):
+        self.scrape('simple/basic.beancount', num_workers=2)
+
+    def test_scrape_starterkit(self):
+        self.scrape('simple/starter.beancount')
+
+    # Note: Great idea, but sorry, too slow (approx. 50s on MBA). We need to
+    # find some way to enable this on demand.
+    def __test_scrape_example(self):
+        self.scrape('example.beancount')
+
+
+class TestReloadFailed(unittest.TestCase):
+
+    @mock.patch.object(web.app, 'args', argparse.Namespace(filename='/tmp/input'),
+                       create=True)
+    def test_reload_failed(self):
+        previous = web.LedgerState([], ['parse error'], {}, None, None, '',
+                                   {'/tmp/input': 1.0}, None, {})
+        ledger = web.reload_failed(previous, {'/tmp/input': None},
+                                   OSError('No such file'))
+        self.assertEqual({'/tmp/input': None}, ledger.mtimes)
+        self.assertEqual('parse error', ledger.errors[0])
+        self.assertIsInstance(ledger.errors[1], web.ReloadError)
+        self.assertRegex(ledger.errors[1].message, 'No such file')
+
+        # The failure of an earlier reload is replaced.
+        ledger = web.reload_failed(ledger, {'/tmp/input': 2.0},
+                                   OSError('Permission denied'))
+        self.assertEqual(2, len(ledger.errors))
+        self.assertRegex(ledger.errors[1].message, 'Permission denied')
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Measure the cost of adding positions to an inventory as the number of lots grows.
+
+This simulates an account accumulating many distinct lots (e.g., reinvested
+dividends), each add augmenting one of the existing lots at random, and prints
+the average time per add for increasing numbers of lots. The time per add
+should remain flat.
+"""
+__author__ = 'Martin Blais <blais@furius.ca>'
+
+import datetime
+import random
+import time
+
+from beancount.core.number import D
+from beancount.core.amount import Amount
+from beancount.core.position import Lot
+from beancount.core.position import Position
+from beancount.core.inventory import Inventory
+
+
+def bench_adds(num_lots, num_adds):
+    """Time adding to an inventory with a given number of lots.
+
+    Args:
+      num_lots: An integer, the number of distinct lots in the inventory.
+      num_adds: An integer, the number of additions to time.
+    Returns:
+      A float, the average number of microseconds per add.
+    """
+    date = datetime.date(2000, 1, 1)
+    lots = [Lot('HOOL', Amount(D(str(100 + index)), 'USD'),
+                date + datetime.timedelta(days=index))
+            for index in range(num_lots)]
+    inventory = Inventory()
+    for lot in lots:
+        inventory.add_position(Position(lot, D('10')))
+
+    positions = [Position(random.choice(lots), D('1')) for _ in range(num_adds)]
+    time1 = time.time()
+    for position in positions:
+        inventory.add_position(position)
+    time2 = time.time()
+    return (time2 - time1) / num_adds * 1e6
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--num-adds', type=int, default=20000,
+                        help="Number of additions to time for each size")
+    args = parser.parse_args()
+
+    for num_lots in 1, 10, 100, 1000, 10000:
+        print('{:>8} lots: {:8.2f} us/add'.format(num_lots,
+                                                  bench_adds(num_lots, args.num_adds)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Measure the memory used by a loaded ledger, per posting.
+
+This loads a ledger (e.g., the one generated by bean-example) with memory
+tracing enabled and reports the number of bytes allocated by the loader which
+are still alive after loading, divided by the number of postings.
+"""
+__author__ = 'Martin Blais <blais@furius.ca>'
+
+import gc
+import tracemalloc
+
+from beancount.core import data
+from beancount import loader
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('filename', help='Ledger filename')
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    entries, errors, options_map = loader.load_file(args.filename)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    num_postings = sum(len(entry.postings)
+                       for entry in entries
+                       if isinstance(entry, data.Transaction))
+    print('Entries:          {:>10}'.format(len(entries)))
+    print('Postings:         {:>10}'.format(num_postings))
+    print('Memory (bytes):   {:>10}'.format(size))
+    print('Bytes/posting:    {:>10.1f}'.format(size / num_postings))
+
+
+if __name__ == '__main__':
+    main()
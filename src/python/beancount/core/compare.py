@@ -60,22 +60,93 @@ def hash_entry(entry):
     return stable_hash_namedtuple(entry, IGNORED_FIELD_NAMES)
 
 
-def hash_entries(entries):
+class EntryHashCache:
+    """A memo of the stable hashes of entries.
+
+    Entries aren't hashable, so they are keyed by identity. A reference to each
+    entry is kept along with its hash, so that the id of a hashed entry cannot
+    be reused by another object. Entries must not be modified after they have
+    been hashed.
+
+    Once retain() has been called, only the hashes of the retained entries are
+    memoized; the hashes of other entries, e.g., entries synthesized for
+    rendering, are computed every time, so that they don't accumulate.
+    """
+
+    def __init__(self):
+        # A dict of id(entry) to a pair of (entry, hash).
+        self._hashes = {}
+
+        # A dict of id(entry) to entry, the entries whose hashes may be
+        # memoized, or None, if all of them may.
+        self._retained = None
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __getstate__(self):
+        return (list(self._hashes.values()),
+                None if self._retained is None else list(self._retained.values()))
+
+    def __setstate__(self, state):
+        # Unpickled entries are new objects; key them by their new ids.
+        hashes, retained = state
+        self._hashes = {id(entry): (entry, hash_) for entry, hash_ in hashes}
+        self._retained = (None
+                          if retained is None
+                          else {id(entry): entry for entry in retained})
+
+    def hash_entry(self, entry):
+        """Compute the stable hash of a single entry, or fetch it from the cache.
+
+        Args:
+          entry: A directive instance.
+        Returns:
+          A stable hexadecimal hash of this entry, as per hash_entry().
+        """
+        try:
+            cached_entry, hash_ = self._hashes[id(entry)]
+            if cached_entry is entry:
+                return hash_
+        except KeyError:
+            pass
+        hash_ = hash_entry(entry)
+        if self._retained is None or self._retained.get(id(entry), None) is entry:
+            self._hashes[id(entry)] = (entry, hash_)
+        return hash_
+
+    def retain(self, entries):
+        """Drop the hashes of all the entries but the given ones, and from now on,
+        only memoize the hashes of those.
+
+        Args:
+          entries: A list of directives whose hashes to keep.
+        """
+        self._retained = {id(entry): entry for entry in entries}
+        self._hashes = {key: value
+                        for key, value in self._hashes.items()
+                        if key in self._retained}
+
+
+def hash_entries(entries, hash_cache=None):
     """Compute unique hashes of each of the entries and return a map of them.
 
     This is used for comparisons between sets of entries.
 
     Args:
       entries: A list of directives.
+      hash_cache: An instance of EntryHashCache to compute the hashes with, or
+        None, to compute all of them.
     Returns:
       A dict of hash-value to entry (for all entries) and a list of errors.
       Errors are created when duplicate entries are found.
     """
+    hash_function = hash_entry if hash_cache is None else hash_cache.hash_entry
     entry_hash_dict = {}
     errors = []
     num_legal_duplicates = 0
     for entry in entries:
-        hash_ = hash_entry(entry)
+        hash_ = hash_function(entry)
 
         if hash_ in entry_hash_dict:
             if isinstance(entry, Price):
@@ -98,6 +169,27 @@ def hash_entries(entries):
     return entry_hash_dict, errors
 
 
+def index_entries(entries, hash_cache=None):
+    """Build an index of entries by their stable hash.
+
+    Unlike hash_entries(), duplicate entries are not considered an error; they
+    are all found under the same hash.
+
+    Args:
+      entries: A list of directives.
+      hash_cache: An instance of EntryHashCache to compute the hashes with, or
+        None, to compute all of them.
+    Returns:
+      A dict of hash-value to the list of entries with that hash, in the order
+      they appear in 'entries'.
+    """
+    hash_function = hash_entry if hash_cache is None else hash_cache.hash_entry
+    entry_index = collections.defaultdict(list)
+    for entry in entries:
+        entry_index[hash_function(entry)].append(entry)
+    return dict(entry_index)
+
+
 def compare_entries(entries1, entries2):
     """Compare two lists of entries. This is used for testing.
 
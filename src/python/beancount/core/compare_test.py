@@ -1,6 +1,9 @@
 __author__ = "Martin Blais <blais@furius.ca>"
 
+import pickle
+import textwrap
 import unittest
+from unittest import mock
 
 from beancount.core import data
 from beancount.core import compare
@@ -122,3 +125,66 @@ class TestCompare(unittest.TestCase):
         excludes, extra = compare.excludes_entries(entries1[0:4], entries2[4:])
         self.assertTrue(excludes)
         self.assertFalse(extra)
+
+    def test_index_entries(self):
+        entries, _, __ = loader.load_string(TEST_INPUT + textwrap.dedent("""
+          2014-08-01 price HOOL  603.10 USD
+          2014-08-01 price HOOL  603.10 USD
+        """))
+        index = compare.index_entries(entries)
+        self.assertEqual(len(entries) - 1, len(index))
+        for entry in entries:
+            self.assertIn(entry, index[compare.hash_entry(entry)])
+        self.assertEqual(entries[-2:], index[compare.hash_entry(entries[-1])])
+
+
+class TestEntryHashCache(unittest.TestCase):
+
+    def test_hash_entry(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        with mock.patch('beancount.core.compare.hash_entry',
+                        wraps=compare.hash_entry) as hash_entry:
+            hashes, errors = compare.hash_entries(entries, hash_cache)
+            self.assertFalse(errors)
+            self.assertEqual(len(entries), hash_entry.call_count)
+            self.assertEqual(len(entries), len(hash_cache))
+
+            # The hashes are the same as those computed without the cache, and
+            # they are not recomputed.
+            self.assertEqual(compare.hash_entries(entries)[0].keys(), hashes.keys())
+            hash_entry.reset_mock()
+            self.assertEqual(hashes.keys(),
+                             compare.index_entries(entries, hash_cache).keys())
+            self.assertEqual(0, hash_entry.call_count)
+
+    def test_retain(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        compare.hash_entries(entries, hash_cache)
+        hash_cache.retain(entries[:3])
+        self.assertEqual(3, len(hash_cache))
+
+        # Only the retained entries are memoized from now on.
+        hash_cache.retain(entries[:4])
+        self.assertEqual(3, len(hash_cache))
+        new_entry = entries[4]._replace(meta=dict(entries[4].meta))
+        self.assertEqual(compare.hash_entry(new_entry), hash_cache.hash_entry(new_entry))
+        self.assertEqual(3, len(hash_cache))
+        hash_cache.hash_entry(entries[3])
+        self.assertEqual(4, len(hash_cache))
+
+    def test_pickle(self):
+        entries, _, __ = loader.load_string(TEST_INPUT)
+        hash_cache = compare.EntryHashCache()
+        hashes, _ = compare.hash_entries(entries, hash_cache)
+        hash_cache.retain(entries)
+        new_entries, new_hash_cache = pickle.loads(pickle.dumps((entries, hash_cache)))
+        with mock.patch('beancount.core.compare.hash_entry') as hash_entry:
+            self.assertEqual(list(hashes.keys()),
+                             [new_hash_cache.hash_entry(entry) for entry in new_entries])
+            self.assertEqual(0, hash_entry.call_count)
+
+            # The retained entries are carried over.
+            new_hash_cache.hash_entry(entries[0])
+            self.assertEqual(len(entries), len(new_hash_cache))
@@ -71,6 +71,27 @@ def has_nontrivial_balance(posting):
     return lot.cost or posting.price
 
 
+def get_balance_contents(postings):
+    """Get the values which determine how a list of complete postings balances.
+
+    Positions and prices may be modified in place, so comparing the postings
+    themselves is not enough to tell whether a transaction could balance
+    differently than it did before. This snapshots their contents as well.
+
+    Args:
+      postings: A list of complete Posting instances.
+    Returns:
+      A tuple of (posting, lot, number, price number, price currency) tuples.
+      Two such tuples are equal only if the postings balance in the same way.
+    """
+    return tuple((posting,
+                  posting.position.lot,
+                  posting.position.number,
+                  posting.price.number if posting.price is not None else None,
+                  posting.price.currency if posting.price is not None else None)
+                 for posting in postings)
+
+
 def compute_residual(postings):
     """Compute the residual of a set of complete postings, and the per-currency precision.
 
@@ -420,9 +441,35 @@ def balance_incomplete_postings(entry, options_map):
     Returns:
       A list of errors, or None, if none occurred.
     """
+    errors, unused_residual, unused_tolerances = balance_incomplete_postings_residual(
+        entry, options_map)
+    return errors
+
+
+def balance_incomplete_postings_residual(entry, options_map):
+    """Balance an entry with incomplete postings and return its residual.
+
+    This is like balance_incomplete_postings(), but also returns the residual
+    and tolerances of the balanced postings, which are the same as those
+    compute_residual() and infer_tolerances() would compute from them.
+
+    WARNING: This destructively modifies entry itself!
+
+    Args:
+      entry: An instance of a valid directive. This entry is modified by
+        having new postings inserted to it.
+      options_map: A dict of options, as produced by the parser.
+    Returns:
+      A tuple of:
+        errors: A list of errors, or None, if none occurred.
+        residual: An Inventory instance, the residual of the balanced postings,
+          or None if the entry has no postings.
+        tolerances: A dict of currency to tolerance, as inferred from the
+          postings, or None if the entry has no postings.
+    """
     # No postings... nothing to do.
     if not entry.postings:
-        return None
+        return None, None, None
 
     # Get the list of corrected postings.
     (postings, unused_inserted, errors,
@@ -447,7 +494,7 @@ def balance_incomplete_postings(entry, options_map):
         entry.meta = {}
     entry.meta['__tolerances__'] = tolerances
 
-    return errors or None
+    return errors or None, residual, tolerances
 
 
 def compute_entries_balance(entries, prefix=None, date=None):
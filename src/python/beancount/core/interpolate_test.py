@@ -72,6 +72,20 @@ class TestBalance(cmptest.TestCase):
         posting = posting._replace(price=A("2.00 CAD"))
         self.assertTrue(interpolate.has_nontrivial_balance(posting))
 
+    def test_get_balance_contents(self):
+        postings = [P(None, "Assets:Bank:Checking", "105.50", "USD"),
+                    P(None, "Assets:Bank:Savings", "-95.00", "EUR")._replace(
+                        price=A("1.11 USD"))]
+        contents = interpolate.get_balance_contents(postings)
+        self.assertEqual(contents, interpolate.get_balance_contents(postings))
+
+        # Modifying a position or a price in place changes the contents.
+        postings[0].position.number = D("105.51")
+        self.assertNotEqual(contents, interpolate.get_balance_contents(postings))
+        contents = interpolate.get_balance_contents(postings)
+        postings[1].price.number = D("1.12")
+        self.assertNotEqual(contents, interpolate.get_balance_contents(postings))
+
     def test_compute_residual(self):
 
         # Try with two accounts.
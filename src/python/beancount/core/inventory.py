@@ -1,7 +1,7 @@
 """A container for an inventory of positions.
 
-This module provides a container class that can hold positions. An inventory is an
-association list of positions, where each position is defined as
+This module provides a container class that can hold positions. An inventory is a
+mapping of lots to positions, where each position is defined as
 
   (currency, cost, lot-date) -> number
 
@@ -68,25 +68,58 @@ class Booking(Enum):
     AUGMENTED = 3 # An existing lot was augmented.
 
 
-class Inventory(list):
+class Inventory:
     """An Inventory is a set of positions.
 
     Attributes:
-      positions: A list of Position instances, held in this Inventory object.
-        Because the lists are always very short, we prefer to avoid using mappings
-        for the sake of simplicity.
+      _positions: A dict of Lot to Position instances, held in this Inventory
+        object. Most inventories are very short, but some accounts accumulate
+        hundreds of lots (e.g., reinvested dividends), and a mapping allows us
+        to find the position for a lot in constant time. Dicts preserve
+        insertion order, so iteration order is the order in which the lots were
+        first added, just like the list we used to use.
     """
+    __slots__ = ('_positions',)
+
     def __init__(self, positions=None):
         """Create a new inventory using a list of existing positions.
 
         Args:
           positions: A list of Position instances.
         """
+        self._positions = {}
         if positions:
             assert isinstance(positions, list), positions
             for position in positions:
                 self.add_position(position)
 
+    def __iter__(self):
+        """Iterate over the positions of this inventory.
+
+        Returns:
+          An iterator of Position instances.
+        """
+        return iter(self._positions.values())
+
+    def __len__(self):
+        """Return the number of positions in this inventory.
+
+        Returns:
+          An integer.
+        """
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        """Return the position at the given index, in iteration order. This is
+        provided for compatibility only and is not efficient; prefer iterating.
+
+        Args:
+          index: An integer or slice.
+        Returns:
+          An instance of Position, or a list of them if 'index' is a slice.
+        """
+        return list(self._positions.values())[index]
+
     def to_string(self, dformat=DEFAULT_FORMATTER):
         """Convert an Inventory instance to a printable string.
 
@@ -114,7 +147,7 @@ class Inventory(list):
         Returns:
           A boolean.
         """
-        return len(self) == 0
+        return not self._positions
 
     def __bool__(self):
         # Don't define this, be explicit by using is_empty() instead.
@@ -128,7 +161,10 @@ class Inventory(list):
         Returns:
           An instance of Inventory, equal to this one.
         """
-        return Inventory(list(map(copy.copy, self)))
+        new_inventory = Inventory()
+        new_inventory._positions = {lot: copy.copy(position)
+                                    for lot, position in self._positions.items()}
+        return new_inventory
 
     def __eq__(self, other):
         """Equality predicate.
@@ -140,6 +176,17 @@ class Inventory(list):
         """
         return sorted(self) == sorted(other)
 
+    def __lt__(self, other):
+        """Ordering predicate, comparing the lists of positions. This is used to
+        sort rows of inventories.
+
+        Args:
+          other: Another instance of Inventory.
+        Returns:
+          True if this inventory's positions compare less than the other's.
+        """
+        return list(self) < list(other)
+
     def is_small(self, tolerances, default_tolerances={}):
         """Return true if all the positions in the inventory are small.
 
@@ -233,9 +280,7 @@ class Inventory(list):
         Returns:
           An instance of Position for the matching lot.
         """
-        for position in self:
-            if position.lot == lot:
-                return position
+        return self._positions.get(lot, None)
 
     def get_units(self, currency):
         """Fetch the total amount across all the position in the given currency.
@@ -336,16 +381,11 @@ class Inventory(list):
               Position instance that was created for this lot.
             created: A boolean, true if the position had to be created.
         """
-        for position in self:
-            if position.lot == lot:
-                found = position
-                created = False
-                break
-        else:
-            found = Position(lot, ZERO)
-            self.append(found)
-            created = True
-        return found, created
+        found = self._positions.get(lot, None)
+        if found is None:
+            found = self._positions[lot] = Position(lot, ZERO)
+            return found, True
+        return found, False
 
     def add_amount(self, amount, cost=None, lot_date=None):
         """Add to this inventory using amount, cost and date. This adds with strict lot
@@ -419,7 +459,7 @@ class Inventory(list):
         # If the resulting position is a zero position, remove it. We want to
         # avoid zero positions in the Inventory as an invariant.
         if position.number == ZERO:
-            self.remove(position)
+            del self._positions[lot]
 
         return position, (
             Booking.REDUCED if reducing else
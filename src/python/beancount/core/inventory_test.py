@@ -164,6 +164,36 @@ class TestInventory(unittest.TestCase):
         inv.add_amount(A('100 CAD'))
         self.assertEqual(2, len(inv))
 
+    def test_iteration_order(self):
+        inv = Inventory.from_string('100 USD, 10 HOOL {5 USD}, 20 HOOL {6 USD}, 30 CAD')
+        self.assertEqual(['100 USD', '10 HOOL {5 USD}', '20 HOOL {6 USD}', '30 CAD'],
+                         [pos.to_string() for pos in inv])
+        self.assertEqual('20 HOOL {6 USD}', inv[2].to_string())
+
+        # Removing a lot preserves the order of the others; adding it back
+        # appends it at the end.
+        inv.add_amount(A('-10 HOOL'), A('5 USD'))
+        self.assertEqual(['100 USD', '20 HOOL {6 USD}', '30 CAD'],
+                         [pos.to_string() for pos in inv])
+        inv.add_amount(A('7 HOOL'), A('5 USD'))
+        self.assertEqual(['100 USD', '20 HOOL {6 USD}', '30 CAD', '7 HOOL {5 USD}'],
+                         [pos.to_string() for pos in inv])
+
+    def test_many_lots(self):
+        inv = Inventory()
+        for index in range(1, 1001):
+            inv.add_amount(A('1 HOOL'), amount.Amount(D(index), 'USD'))
+        self.assertEqual(1000, len(inv))
+        for index in range(1, 1001, 2):
+            inv.add_amount(A('-1 HOOL'), amount.Amount(D(index), 'USD'))
+        self.assertEqual(500, len(inv))
+        self.assertEqual(A('500 HOOL'), inv.get_units('HOOL'))
+        self.assertEqual(
+            Position(Lot('HOOL', amount.Amount(D(2), 'USD'), None), D('1')),
+            inv.get_position(Lot('HOOL', amount.Amount(D(2), 'USD'), None)))
+        self.assertIsNone(
+            inv.get_position(Lot('HOOL', amount.Amount(D(1), 'USD'), None)))
+
     def test_str(self):
         inv = Inventory.from_string('100.00 USD, 101.00 CAD')
         self.assertEqual('(100.00 USD, 101.00 CAD)', str(inv))
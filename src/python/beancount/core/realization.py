@@ -17,8 +17,10 @@ list of desired directives to display and call the realize() function with them.
 """
 __author__ = "Martin Blais <blais@furius.ca>"
 
+import bisect
 import io
 import collections
+import itertools
 import operator
 import copy
 
@@ -270,6 +272,83 @@ def realize(entries, min_accounts=None, compute_balance=True):
     return real_root
 
 
+def update(real_root, added_entries=None, removed_entries=None, compute_balance=True):
+    """Incrementally update a realization with added and removed entries.
+
+    This modifies the tree of realized accounts in place, such that it becomes
+    equivalent to the realization of the updated list of entries. Only the
+    accounts referenced by the given entries are touched: their lists of
+    postings are updated and their balances are adjusted by the positions of
+    the added and removed postings, without recomputing them from scratch.
+    Accounts whose lists of postings become empty are left in the tree.
+
+    The lists of postings and the balances of the updated accounts are replaced
+    by new objects rather than modified, so that other realizations sharing
+    them (e.g. created with filter()) are unaffected.
+
+    Args:
+      real_root: An instance of RealAccount, the root of a realization, as
+        returned by realize().
+      added_entries: A list of directives to add to the realization, or None.
+      removed_entries: A list of directives to remove from the realization, or
+        None. They must be the same instances as were realized; directives that
+        are not in the realization are ignored.
+      compute_balance: A boolean, true if we should update the balances of the
+        accounts. This should match the argument used with realize().
+    Returns:
+      A set of the names of the accounts that were updated.
+    """
+    added_map = postings_by_account(added_entries or [])
+    removed_map = postings_by_account(removed_entries or [])
+
+    updated_accounts = set(added_map.keys()) | set(removed_map.keys())
+    for account_name in updated_accounts:
+        real_account = get_or_create(real_root, account_name)
+        txn_postings = real_account.txn_postings
+        if compute_balance:
+            balance = copy.copy(real_account.balance)
+
+        removed = removed_map.get(account_name, None)
+        if removed:
+            # Match the removed postings by identity of their parent entries. A
+            # Pad entry may appear in both of its accounts, but never twice in
+            # the same one.
+            removed_ids = {id(txn_posting.txn
+                              if isinstance(txn_posting, TxnPosting)
+                              else txn_posting)
+                           for txn_posting in removed}
+            kept_postings = []
+            for txn_posting in txn_postings:
+                if isinstance(txn_posting, TxnPosting):
+                    if id(txn_posting.txn) in removed_ids:
+                        if compute_balance:
+                            balance.add_position(-txn_posting.posting.position)
+                        continue
+                elif id(txn_posting) in removed_ids:
+                    continue
+                kept_postings.append(txn_posting)
+            txn_postings = kept_postings
+        else:
+            txn_postings = list(txn_postings)
+
+        added = added_map.get(account_name, None)
+        if added:
+            if compute_balance:
+                for txn_posting in added:
+                    if isinstance(txn_posting, TxnPosting):
+                        balance.add_position(txn_posting.posting.position)
+            # Merge the new postings in. The list is already mostly sorted, so
+            # this is cheap.
+            txn_postings.extend(added)
+            txn_postings.sort(key=data.posting_sortkey)
+
+        real_account.txn_postings = txn_postings
+        if compute_balance:
+            real_account.balance = balance
+
+    return updated_accounts
+
+
 def postings_by_account(entries):
     """Create lists of postings and balances by account.
 
@@ -354,7 +433,78 @@ def get_postings(real_account):
     return accumulator
 
 
-def iterate_with_balance(txn_postings):
+# The default minimum number of postings between two balance checkpoints.
+CHECKPOINT_INTERVAL = 512
+
+
+# An index of snapshots of the running balance of a list of postings, used to
+# resume iterating over it in the middle of the list. See
+# compute_balance_checkpoints().
+#
+# Attributes:
+#   indexes: A list of integers, the index in the list of postings at which
+#     each checkpoint lies. Each of them is the index of the first posting or
+#     entry of a new date.
+#   rows: A list of integers, the number of rows yielded by
+#     iterate_with_balance() before each checkpoint.
+#   balances: A list of Inventory instances, the running balance before each
+#     checkpoint. These must not be modified.
+#   num_rows: An integer, the total number of rows yielded by
+#     iterate_with_balance() over the entire list.
+BalanceCheckpoints = collections.namedtuple('BalanceCheckpoints',
+                                            'indexes rows balances num_rows')
+
+
+def compute_balance_checkpoints(txn_postings, interval=CHECKPOINT_INTERVAL):
+    """Snapshot the running balance of a list of postings at regular intervals.
+
+    The first checkpoint is always at the beginning of the list, with an empty
+    balance. The others lie at the first date boundary at least 'interval'
+    postings past the previous checkpoint.
+
+    Args:
+      txn_postings: A list of postings or directive instances, as for
+        iterate_with_balance().
+      interval: An integer, the minimum number of postings between two
+        checkpoints.
+    Returns:
+      An instance of BalanceCheckpoints.
+    """
+    indexes, rows, balances = [0], [0], [inventory.Inventory()]
+    balance = inventory.Inventory()
+    num_rows = 0
+    prev_date = None
+
+    # The ids of the transactions and the number of other entries seen at the
+    # current date. Like iterate_with_balance(), this collapses the postings
+    # of a transaction at the same date into a single row.
+    date_txn_ids = set()
+    num_date_entries = 0
+
+    for index, txn_posting in enumerate(txn_postings):
+        is_posting = isinstance(txn_posting, TxnPosting)
+        entry = txn_posting.txn if is_posting else txn_posting
+        if entry.date != prev_date:
+            prev_date = entry.date
+            num_rows += len(date_txn_ids) + num_date_entries
+            date_txn_ids.clear()
+            num_date_entries = 0
+            if index - indexes[-1] >= interval:
+                indexes.append(index)
+                rows.append(num_rows)
+                balances.append(copy.copy(balance))
+
+        if is_posting:
+            date_txn_ids.add(id(entry))
+            balance.add_position(txn_posting.posting.position)
+        else:
+            num_date_entries += 1
+
+    num_rows += len(date_txn_ids) + num_date_entries
+    return BalanceCheckpoints(indexes, rows, balances, num_rows)
+
+
+def iterate_with_balance(txn_postings, start=0, checkpoints=None):
     """Iterate over the entries, accumulating the running balance.
 
     For each entry, this yields tuples of the form:
@@ -391,12 +541,47 @@ def iterate_with_balance(txn_postings):
     Args:
       txn_postings: A list of postings or directive instances.
         Postings affect the balance; other entries do not.
+      start: An integer, the number of rows to skip at the beginning.
+      checkpoints: An instance of BalanceCheckpoints for 'txn_postings', or
+        None. If provided, the iteration resumes from the last checkpoint
+        before the 'start' row, instead of accumulating the balance from the
+        beginning of the list.
     Yields:
       Tuples of (entry, postings, change, balance) as described above.
     """
+    index, row, balance = 0, 0, None
+    if checkpoints is not None and start > 0:
+        checkpoint = bisect.bisect_right(checkpoints.rows, start) - 1
+        index = checkpoints.indexes[checkpoint]
+        row = checkpoints.rows[checkpoint]
+        balance = checkpoints.balances[checkpoint]
+
+    # Slice the list directly: islice() would step over the first 'index'
+    # elements one at a time, which is what the checkpoints are meant to avoid.
+    if index > 0:
+        txn_postings = txn_postings[index:]
+    iterator = _iterate_with_balance(txn_postings, balance)
+    if start > row:
+        iterator = itertools.islice(iterator, start - row, None)
+    return iterator
+
+
+def _iterate_with_balance(txn_postings, initial_balance=None):
+    """Iterate over the entries, accumulating the running balance.
 
+    See iterate_with_balance() for details.
+
+    Args:
+      txn_postings: An iterable of postings or directive instances.
+      initial_balance: An Inventory instance, the balance before the first
+        posting, or None. It is not modified.
+    Yields:
+      Tuples of (entry, postings, change, balance).
+    """
     # The running balance.
-    running_balance = inventory.Inventory()
+    running_balance = (copy.copy(initial_balance)
+                       if initial_balance is not None
+                       else inventory.Inventory())
 
     # Previous date.
     prev_date = None
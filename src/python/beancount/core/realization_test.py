@@ -321,6 +321,86 @@ class TestRealization(unittest.TestCase):
         self.assertEqual(expected_balance, ra0_movie.balance)
 
 
+class TestRealizationUpdate(unittest.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, __):
+        """
+        option "plugin_processing_mode" "raw"
+
+        2012-01-01 open Expenses:Restaurant
+        2012-01-01 open Expenses:Movie
+        2012-01-01 open Assets:Cash
+        2012-01-01 open Liabilities:CreditCard
+        2012-01-01 open Equity:Opening-Balances
+
+        2012-01-15 pad Liabilities:CreditCard Equity:Opening-Balances
+
+        2012-03-01 * "Food"
+          Expenses:Restaurant     100 CAD
+          Assets:Cash
+
+        2012-03-10 * "Food again"
+          Expenses:Restaurant      80 CAD
+          Liabilities:CreditCard
+
+        2012-03-15 * "Two Movies"
+          Expenses:Movie           10 CAD
+          Expenses:Movie           10 CAD
+          Liabilities:CreditCard
+
+        2012-03-20 note Liabilities:CreditCard "Called Amex"
+
+        2013-04-01 balance Liabilities:CreditCard   -100 CAD
+        """
+        self.entries = entries
+
+    def test_update_add(self):
+        for index in range(len(self.entries)):
+            entries = self.entries[:index] + self.entries[index+1:]
+            real_root = realization.realize(entries)
+            updated = realization.update(real_root, [self.entries[index]])
+            self.assertEqual(realization.realize(self.entries), real_root)
+            self.assertTrue(updated)
+
+    def test_update_remove(self):
+        all_accounts = [real_account.account
+                        for real_account in realization.iter_children(
+                            realization.realize(self.entries))
+                        if real_account.account]
+        for index in range(len(self.entries)):
+            entries = self.entries[:index] + self.entries[index+1:]
+            real_root = realization.realize(self.entries)
+            realization.update(real_root, None, [self.entries[index]])
+            self.assertEqual(realization.realize(entries, all_accounts), real_root)
+
+    def test_update_replace(self):
+        old_entry = self.entries[8]
+        self.assertEqual('Two Movies', old_entry.narration)
+        new_entry = old_entry._replace(postings=old_entry.postings[:1])
+
+        real_root = realization.realize(self.entries)
+        real_cash = realization.get(real_root, 'Assets:Cash')
+        updated = realization.update(real_root, [new_entry], [old_entry])
+        self.assertEqual({'Expenses:Movie', 'Liabilities:CreditCard'}, updated)
+
+        entries = list(self.entries)
+        entries[8] = new_entry
+        self.assertEqual(realization.realize(entries), real_root)
+        self.assertIs(real_cash, realization.get(real_root, 'Assets:Cash'))
+        expected_balance = inventory.Inventory()
+        expected_balance.add_amount(A('10 CAD'))
+        self.assertEqual(expected_balance,
+                         realization.get(real_root, 'Expenses:Movie').balance)
+
+    def test_update_does_not_modify_shared(self):
+        real_root = realization.realize(self.entries)
+        real_copy = realization.filter(real_root, lambda _: True)
+        realization.update(real_root, None, [self.entries[6]])
+        self.assertEqual(realization.realize(self.entries), real_copy)
+        self.assertNotEqual(real_copy, real_root)
+
+
 class TestRealFilter(unittest.TestCase):
 
     def test_filter_to_empty(self):
@@ -569,6 +649,62 @@ class TestRealOther(test_utils.TestCase):
         with self.assertRaises(AssertionError):
             list(realization.iterate_with_balance(postings))
 
+    @loader.load_doc()
+    def test_iterate_with_balance__checkpoints(self, entries, _, __):
+        """
+        2012-01-01 open Assets:Bank:Checking
+        2012-01-01 open Expenses:Restaurant
+
+        2012-03-01 * "Single"
+          Expenses:Restaurant     11.11 CAD
+          Assets:Bank:Checking
+
+        2012-03-02 * "Two legs"
+          Expenses:Restaurant     20.01 CAD
+          Expenses:Restaurant     20.02 CAD
+          Assets:Bank:Checking
+
+        2012-03-02 note Expenses:Restaurant  "This was good"
+
+        2012-03-02 * "Another one"
+          Expenses:Restaurant      3.00 CAD
+          Assets:Bank:Checking
+
+        2012-03-05 * "Last"
+          Expenses:Restaurant      4.00 USD
+          Assets:Bank:Checking
+        """
+        root_account = realization.realize(entries)
+        txn_postings = realization.get(root_account, 'Expenses:Restaurant').txn_postings
+
+        def simplify_rtuple(rtuple):
+            return [(entry, postings, str(change), str(balance))
+                    for entry, postings, change, balance in rtuple]
+
+        expected = simplify_rtuple(realization.iterate_with_balance(txn_postings))
+        self.assertEqual(6, len(expected))
+        for interval in range(1, 8):
+            checkpoints = realization.compute_balance_checkpoints(txn_postings, interval)
+            self.assertEqual(0, checkpoints.indexes[0])
+            self.assertEqual(len(expected), checkpoints.num_rows)
+            for start in range(len(expected) + 1):
+                self.assertEqual(
+                    expected[start:],
+                    simplify_rtuple(realization.iterate_with_balance(
+                        txn_postings, start, checkpoints)))
+
+        # Checkpoints lie on date boundaries only.
+        checkpoints = realization.compute_balance_checkpoints(txn_postings, 1)
+        self.assertEqual([0, 1, 2, 6], checkpoints.indexes)
+        self.assertEqual([0, 1, 2, 5], checkpoints.rows)
+        self.assertEqual(['()', '()', '(11.11 CAD)', '(54.14 CAD)'],
+                         list(map(str, checkpoints.balances)))
+        self.assertEqual(6, checkpoints.num_rows)
+
+        # The checkpoints are not modified by iterating.
+        list(realization.iterate_with_balance(txn_postings, 3, checkpoints))
+        self.assertEqual('(11.11 CAD)', str(checkpoints.balances[2]))
+
     def test_compute_balance(self):
         real_root = create_real([('Assets:US:Bank:Checking', '100 USD'),
                                  ('Assets:US:Bank:Savings', '200 USD'),
@@ -3,29 +3,47 @@
 __author__ = "Martin Blais <blais@furius.ca>"
 
 import functools
+import hashlib
 import textwrap
 import importlib
 import collections
 import logging
 import io
 import itertools
+import multiprocessing
 import os
 import pickle
 import warnings
 from os import path
 
 from beancount.utils import misc_utils
+from beancount.core import compare
 from beancount.core import data
 from beancount.parser import parser
 from beancount.parser import booking
 from beancount.parser import options
 from beancount.parser import printer
+from beancount.ops import prices
+from beancount.ops import summarize
 from beancount.ops import validation
 
 
 LoadError = collections.namedtuple('LoadError', 'source message entry')
 
 
+# The cached result of parsing a single input file. See _parse_recursive().
+#
+# Attributes:
+#   digest: A string, the hexadecimal hash of the file's contents (and encoding)
+#     at the time it was parsed.
+#   pickled: A bytes object, the pickled (entries, errors, options_map) tuple
+#     produced by the parser for this file. The results are stored pickled
+#     because the later stages of loading modify the parsed directives and
+#     options in place (e.g., booking inserts metadata); each use of the cache
+#     unpickles a fresh copy of them.
+ParsedFile = collections.namedtuple('ParsedFile', 'digest pickled')
+
+
 # List of default plugins to run.
 DEFAULT_PLUGINS_PRE = [
     ("beancount.ops.pad", None),
@@ -48,7 +66,7 @@ PICKLE_CACHE_FILENAME = '.{filename}.picklecache'
 
 
 def load_file(filename, log_timings=None, log_errors=None, extra_validations=None,
-              encoding=None):
+              encoding=None, parse_cache=None, processes=None, strict=None):
     """Open a Beancount input file, parse it, run transformations and validate.
 
     Args:
@@ -60,6 +78,20 @@ def load_file(filename, log_timings=None, log_errors=None, extra_validations=Non
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict or None. If provided, the parsed contents of each input
+        file are stored in it and reused on subsequent calls with the same dict,
+        as long as the contents of that file have not changed. The files which
+        are no longer part of the input are removed from it. Use this when
+        reloading the same ledger repeatedly, e.g., from a long-running process.
+      processes: An integer or None, the number of worker processes to parse
+        included files with. If None, the value of the BEANCOUNT_PARSE_PROCESSES
+        environment variable is used, if set. Otherwise files are parsed
+        sequentially.
+      strict: A boolean or None. If true, the validation checks that every
+        transaction balances, including those already found to balance during
+        booking and not modified since (see the 'balanced_transactions' option).
+        If None, strict validation is used if the BEANCOUNT_STRICT_VALIDATION
+        environment variable is set.
     Returns:
       A triple of:
         entries: A date-sorted list of entries from the file.
@@ -69,7 +101,12 @@ def load_file(filename, log_timings=None, log_errors=None, extra_validations=Non
     """
     if not path.isabs(filename):
         filename = path.normpath(path.join(os.getcwd(), filename))
-    return _load([(filename, True)], log_timings, log_errors, extra_validations, encoding)
+    if processes is None and os.getenv('BEANCOUNT_PARSE_PROCESSES'):
+        processes = int(os.getenv('BEANCOUNT_PARSE_PROCESSES'))
+    if strict is None:
+        strict = bool(os.getenv('BEANCOUNT_STRICT_VALIDATION'))
+    return _load([(filename, True)], log_timings, log_errors, extra_validations, encoding,
+                 parse_cache, processes, strict)
 
 
 # Alias, for compatibility.
@@ -122,7 +159,7 @@ if os.getenv('BEANCOUNT_LOAD_CACHE'):
 
 
 def load_string(string, log_timings=None, log_errors=None, extra_validations=None,
-                dedent=False, encoding=None):
+                dedent=False, encoding=None, strict=None):
 
     """Open a Beancount input string, parse it, run transformations and validate.
 
@@ -136,6 +173,8 @@ def load_string(string, log_timings=None, log_errors=None, extra_validations=Non
         this list of entries.
       dedent: A boolean, if set, remove the whitespace in front of the lines.
       encoding: A string or None, the encoding to decode the input filename with.
+      strict: A boolean or None, whether to use strict validation. See
+        load_file().
     Returns:
       A triple of:
         entries: A date-sorted list of entries from the file.
@@ -145,10 +184,98 @@ def load_string(string, log_timings=None, log_errors=None, extra_validations=Non
     """
     if dedent:
         string = textwrap.dedent(string)
-    return _load([(string, False)], log_timings, log_errors, extra_validations, encoding)
+    if strict is None:
+        strict = bool(os.getenv('BEANCOUNT_STRICT_VALIDATION'))
+    return _load([(string, False)], log_timings, log_errors, extra_validations, encoding,
+                 strict=strict)
+
+
+def _parse_file(filename, encoding, contents=None):
+    """Parse a single file from disk.
 
+    This is a module-level function so that it can be sent to worker processes.
 
-def _parse_recursive(sources, log_timings, encoding=None):
+    Args:
+      filename: A string, the absolute filename of the file to parse.
+      encoding: A string or None, the encoding to decode the input filename with.
+      contents: A bytes object or None. If provided, the contents of the file,
+        which were already read, to parse instead of reading the file again.
+    Returns:
+      A tuple of (entries, errors, options_map), as per parser.parse_file().
+    """
+    if contents is None:
+        return parser.parse_file(filename, encoding=encoding)
+    entries, errors, options_map = parser.parse_string(contents,
+                                                       report_filename=filename,
+                                                       encoding=encoding)
+    options_map['filename'] = filename
+    return entries, errors, options_map
+
+
+def _parse_files(filenames, encoding, parse_cache, pool, log_timings):
+    """Parse a list of files, reusing previously cached results if their contents
+    are unchanged, possibly in parallel.
+
+    Args:
+      filenames: A list of strings, the absolute filenames of the files to parse.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict of absolute filename to ParsedFile instances, or None.
+        If None, the files are always parsed. Otherwise the cache is consulted
+        and updated with the new results for the files that have changed.
+      pool: A multiprocessing.Pool instance to parse the files in, or None,
+        to parse them sequentially in this process.
+      log_timings: A function to write timings to, or None, if it should remain quiet.
+    Returns:
+      A list of (entries, errors, options_map) tuples, as per parser.parse_file(),
+      in the same order as 'filenames'.
+    """
+    # Compute a digest of the contents of each file and figure out which of them
+    # actually need to be parsed. The encoding is part of the key because it
+    # affects how the file is decoded.
+    digests = {}
+    args = []
+    for filename in filenames:
+        if parse_cache is None:
+            args.append((filename, encoding))
+            continue
+        # Parse the contents read for the digest, so as to read each file once.
+        with open(filename, 'rb') as infile:
+            contents = infile.read()
+        md5 = hashlib.md5(contents)
+        md5.update(str(encoding).encode('ascii'))
+        digest = md5.hexdigest()
+
+        parsed = parse_cache.get(filename, None)
+        if parsed is None or parsed.digest != digest:
+            digests[filename] = digest
+            args.append((filename, encoding, contents))
+
+    # Parse the files that are missing or out of date.
+    with misc_utils.log_time('beancount.parser.parser.parse_file',
+                             log_timings, indent=2):
+        if pool is not None and len(args) > 1:
+            results = pool.starmap(_parse_file, args, chunksize=1)
+        else:
+            results = list(itertools.starmap(_parse_file, args))
+
+    if parse_cache is None:
+        return results
+
+    # Store a snapshot of the new results, before they get modified, and
+    # unpickle fresh copies of the others.
+    parsed_map = {}
+    for (filename, _, __), result in zip(args, results):
+        parse_cache[filename] = ParsedFile(digests[filename],
+                                           pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        parsed_map[filename] = result
+    return [parsed_map[filename]
+            if filename in parsed_map
+            else pickle.loads(parse_cache[filename].pickled)
+            for filename in filenames]
+
+
+def _parse_recursive(sources, log_timings, encoding=None, parse_cache=None,
+                     processes=None):
     """Parse Beancount input, run its transformations and validate it.
 
     Recursively parse a list of files or strings and their include files and
@@ -156,6 +283,11 @@ def _parse_recursive(sources, log_timings, encoding=None):
     options-map. If the same file is being parsed twice, ignore it and issue an
     error.
 
+    Sources are processed breadth-first, one level of includes at a time. All
+    the files of a level can be parsed independently, so if 'processes' is
+    set, they are parsed in a pool of worker processes. The results are always
+    merged in the same order as if they were parsed sequentially.
+
     Args:
       sources: A list of (filename-or-string, is-filename) where the first
         element is a string, with either a filename or a string to be parsed directly,
@@ -164,6 +296,10 @@ def _parse_recursive(sources, log_timings, encoding=None):
         paths.
       log_timings: A function to write timings to, or None, if it should remain quiet.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict of absolute filename to ParsedFile instances, or None.
+        See _parse_files().
+      processes: An integer or None. If greater than one, the number of worker
+        processes to parse files with. Otherwise parse in this process.
     Returns:
       A tuple of (entries, parse_errors, options_map).
     """
@@ -180,88 +316,133 @@ def _parse_recursive(sources, log_timings, encoding=None):
     # detect and avoid duplicates (cycles).
     filenames_seen = set()
 
-    with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
-        while source_stack:
-            source, is_file = source_stack.pop(0)
-            is_top_level = options_map is None
-
-            if is_file:
-                # All filenames here must be absolute.
-                assert path.isabs(source)
-                filename = path.normpath(source)
-
-                # Check for file previously parsed... detect duplicates.
-                if filename in filenames_seen:
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'Duplicate filename parsed: "{}"'.format(filename),
-                                  None))
-                    continue
-                else:
-                    filenames_seen.add(filename)
-
-                # Check for a file that does not exist.
-                if not path.exists(filename):
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'File "{}" does not exist'.format(filename), None))
-                    continue
-
-                # Parse a file from disk directly.
-                with misc_utils.log_time('beancount.parser.parser.parse_file',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_file(filename, encoding=encoding)
-
-                cwd = path.dirname(filename)
-            else:
-                # Encode the contents if necessary.
-                if encoding:
-                    if isinstance(source, bytes):
-                        source = source.decode(encoding)
-                    source = source.encode('ascii', 'replace')
-
-                # Parse a string buffer from memory.
-                with misc_utils.log_time('beancount.parser.parser.parse_string',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_string(source)
-
-                # If we're parsing a string, the CWD is the current process
-                # working directory.
-                cwd = os.getcwd()
-
-            # Merge the entries resulting from the parsed file.
-            entries.extend(src_entries)
-            parse_errors.extend(src_errors)
-
-            # We need the options from the very top file only (the very
-            # first file being processed). No merging of options should
-            # occur.
-            if is_top_level:
-                options_map = src_options_map
-
-            # Add includes to the list of sources to process.
-            for include_filename in src_options_map['include']:
-                if not path.isabs(include_filename):
-                    include_filename = path.join(cwd, include_filename)
-                include_filename = path.normpath(include_filename)
-
-                # Add the include filenames to be processed later.
-                source_stack.append((include_filename, True))
-
-    # Note: We could easily save the set of parsed filenames in options_map
-    # here, if useful. Let's refrain for now, until we need it.
+    # A list of the absolute filenames of all the files included, directly or
+    # indirectly, in the order they were encountered, and the same as a set.
+    included_filenames = []
+    included_set = set()
+
+    # A pool of worker processes, created lazily when a level has more than one
+    # file to be parsed.
+    pool = None
+
+    try:
+        with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
+            while source_stack:
+                level_sources, source_stack = source_stack, []
+
+                # Resolve the sources of this level to a list of (source, is_file,
+                # error) tuples to process in order, and the files to be parsed.
+                level = []
+                level_filenames = []
+                for source, is_file in level_sources:
+                    if not is_file:
+                        level.append((source, is_file, None))
+                        continue
+
+                    # All filenames here must be absolute.
+                    assert path.isabs(source)
+                    filename = path.normpath(source)
+
+                    # Check for file previously parsed... detect duplicates.
+                    if filename in filenames_seen:
+                        level.append((filename, is_file, LoadError(
+                            data.new_metadata("<load>", 0),
+                            'Duplicate filename parsed: "{}"'.format(filename), None)))
+                        continue
+                    else:
+                        filenames_seen.add(filename)
+
+                    # Check for a file that does not exist.
+                    if not path.exists(filename):
+                        level.append((filename, is_file, LoadError(
+                            data.new_metadata("<load>", 0),
+                            'File "{}" does not exist'.format(filename), None)))
+                        continue
+
+                    level.append((filename, is_file, None))
+                    level_filenames.append(filename)
+
+                # Parse the files from disk directly (or fetch them from the cache).
+                if (pool is None and processes is not None and processes > 1 and
+                    len(level_filenames) > 1):
+                    pool = multiprocessing.Pool(processes)
+                file_results = iter(_parse_files(level_filenames, encoding,
+                                                 parse_cache, pool, log_timings))
+
+                for source, is_file, error in level:
+                    if error is not None:
+                        parse_errors.append(error)
+                        continue
+
+                    is_top_level = options_map is None
+
+                    if is_file:
+                        (src_entries,
+                         src_errors,
+                         src_options_map) = next(file_results)
+
+                        cwd = path.dirname(source)
+                    else:
+                        # Encode the contents if necessary.
+                        if encoding:
+                            if isinstance(source, bytes):
+                                source = source.decode(encoding)
+                            source = source.encode('ascii', 'replace')
+
+                        # Parse a string buffer from memory.
+                        with misc_utils.log_time('beancount.parser.parser.parse_string',
+                                                 log_timings, indent=2):
+                            (src_entries,
+                             src_errors,
+                             src_options_map) = parser.parse_string(source)
+
+                        # If we're parsing a string, the CWD is the current process
+                        # working directory.
+                        cwd = os.getcwd()
+
+                    # Merge the entries resulting from the parsed file.
+                    entries.extend(src_entries)
+                    parse_errors.extend(src_errors)
+
+                    # We need the options from the very top file only (the very
+                    # first file being processed). No merging of options should
+                    # occur.
+                    if is_top_level:
+                        options_map = src_options_map
+
+                    # Add includes to the list of sources to process.
+                    for include_filename in src_options_map['include']:
+                        if not path.isabs(include_filename):
+                            include_filename = path.join(cwd, include_filename)
+                        include_filename = path.normpath(include_filename)
+
+                        # Add the include filenames to be processed later.
+                        source_stack.append((include_filename, True))
+                        if include_filename not in included_set:
+                            included_set.add(include_filename)
+                            included_filenames.append(include_filename)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Evict the files which aren't included anymore from the cache.
+    if parse_cache is not None:
+        for filename in set(parse_cache) - filenames_seen:
+            del parse_cache[filename]
 
     if options_map is None:
         options_map = options.OPTIONS_DEFAULTS.copy()
+    else:
+        # Replace the includes of the top-level file by those of all the files,
+        # so that the caller may watch all of them for changes.
+        options_map['include'] = included_filenames
 
     return entries, parse_errors, options_map
 
 
-def _load(sources, log_timings, log_errors, extra_validations, encoding):
+def _load(sources, log_timings, log_errors, extra_validations, encoding,
+          parse_cache=None, processes=None, strict=False):
     """Parse Beancount input, run its transformations and validate it.
 
     (This is an internal method.)
@@ -283,6 +464,11 @@ def _load(sources, log_timings, log_errors, extra_validations, encoding):
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: A dict or None, a cache of parsed files. See load_file().
+      processes: An integer or None, the number of processes to parse with.
+        See load_file().
+      strict: A boolean, true to check the balance of all the transactions
+        during validation. See load_file().
     Returns:
       See load() or load_string().
     """
@@ -292,13 +478,18 @@ def _load(sources, log_timings, log_errors, extra_validations, encoding):
         log_timings = log_timings.write
 
     # Parse all the files recursively.
-    entries, parse_errors, options_map = _parse_recursive(sources, log_timings, encoding)
+    entries, parse_errors, options_map = _parse_recursive(sources, log_timings, encoding,
+                                                          parse_cache, processes)
 
-    # Run interpolation on incomplete entries.
+    # Run interpolation on incomplete entries. Unless strict validation is
+    # requested, keep track of the transactions found to balance at this stage.
+    if not strict:
+        options_map['balanced_transactions'] = {}
     entries, balance_errors = booking.book(entries, options_map)
     parse_errors.extend(balance_errors)
 
     # Transform the entries.
+    options_map['entry_hashes'] = compare.EntryHashCache()
     entries, errors = run_transformations(entries, parse_errors, options_map, log_timings)
 
     # Validate the list of entries.
@@ -311,6 +502,20 @@ def _load(sources, log_timings, log_errors, extra_validations, encoding):
         # haven't been modified by user-provided validation routines, by
         # comparing hashes before and after. Not needed for now.
 
+    # Release the references to the original postings.
+    options_map['balanced_transactions'] = None
+
+    # Only keep, and from now on only memoize, the hashes of the final entries.
+    options_map['entry_hashes'].retain(entries)
+
+    # Build the price map once for all the consumers of these entries.
+    with misc_utils.log_time('beancount.ops.prices', log_timings, indent=1):
+        options_map['price_map'] = prices.build_price_map(entries)
+        options_map['price_map'].entries = entries
+
+    # Index the balances over time of the final entries; this is filled lazily.
+    options_map['balance_snapshots'] = summarize.BalanceSnapshots(entries)
+
     if log_errors and errors:
         if hasattr(log_errors, 'write'):
             printer.print_errors(errors, file=log_errors)
@@ -6,11 +6,16 @@ import tempfile
 import textwrap
 import re
 import os
+import pickle
+import sys
 from unittest import mock
 from os import path
 
 from beancount import loader
+from beancount.core import compare
 from beancount.parser import parser
+from beancount.ops import prices
+from beancount.ops import summarize
 from beancount.utils import test_utils
 
 
@@ -74,6 +79,72 @@ class TestLoader(unittest.TestCase):
             self.assertTrue(isinstance(errors, list))
             self.assertTrue(isinstance(options_map, dict))
 
+    def test_load_price_map(self):
+        entries, errors, options_map = loader.load_string("""
+          2014-01-01 price USD 1.10 CAD
+          2014-02-01 price USD 1.20 CAD
+        """, dedent=True)
+        self.assertFalse(errors)
+        price_map = options_map['price_map']
+        self.assertTrue(isinstance(price_map, prices.PriceMap))
+        self.assertEqual(prices.build_price_map(entries), price_map)
+        self.assertIs(entries, price_map.entries)
+
+    def test_load_entry_hashes(self):
+        entries, errors, options_map = loader.load_string("""
+          plugin "beancount.plugins.noduplicates"
+        """ + TEST_INPUT, dedent=True)
+        self.assertFalse(errors)
+        hash_cache = options_map['entry_hashes']
+        self.assertTrue(isinstance(hash_cache, compare.EntryHashCache))
+        # Only the final entries' hashes are kept.
+        self.assertEqual(len(entries), len(hash_cache))
+        new_entry = entries[0]._replace(meta=dict(entries[0].meta))
+        hash_cache.hash_entry(new_entry)
+        self.assertEqual(len(entries), len(hash_cache))
+
+    def test_load_balance_snapshots(self):
+        entries, errors, options_map = loader.load_string(TEST_INPUT, dedent=True)
+        self.assertFalse(errors)
+        snapshots = options_map['balance_snapshots']
+        self.assertTrue(isinstance(snapshots, summarize.BalanceSnapshots))
+        self.assertIs(entries, snapshots.entries)
+
+    def test_load_strict(self):
+        # Capture the transactions recorded as balanced by booking.
+        balanced = []
+        def validate(entries, options_map, *args):
+            balanced.append(options_map['balanced_transactions'])
+            return []
+        with mock.patch('beancount.ops.validation.validate', validate):
+            loader.load_string(TEST_INPUT, dedent=True)
+            loader.load_string(TEST_INPUT, dedent=True, strict=True)
+            with mock.patch.dict(os.environ, {'BEANCOUNT_STRICT_VALIDATION': '1'}):
+                loader.load_string(TEST_INPUT, dedent=True)
+                loader.load_string(TEST_INPUT, dedent=True, strict=False)
+        self.assertEqual([1, 0, 0, 1], [len(transactions or {})
+                                        for transactions in balanced])
+
+    def test_load_plugin_modifying_position(self):
+        # A plugin which unbalances the transactions by modifying the position
+        # of one of their postings in place must not escape validation.
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'modify_position.py': """
+                  __plugins__ = ('modify_position',)
+
+                  def modify_position(entries, options_map):
+                      for entry in entries:
+                          if hasattr(entry, 'postings'):
+                              entry.postings[0].position.number *= 2
+                      return entries, []
+                """})
+            with mock.patch('sys.path', [tmp] + sys.path):
+                entries, errors, _ = loader.load_string(
+                    'plugin "modify_position"\n' + TEST_INPUT, dedent=True)
+        self.assertEqual(['Transaction does not balance'],
+                         [error.message.split(':')[0] for error in errors])
+
     def test_load_nonexist(self):
         entries, errors, options_map = loader.load_file('/some/bullshit/filename.beancount')
         self.assertEqual([], entries)
@@ -195,6 +266,12 @@ class TestLoadIncludes(unittest.TestCase):
         self.assertFalse(errors)
         self.assertEqual(4, len(entries))
 
+        # All the included files are listed, including indirect ones.
+        self.assertEqual([path.join(tmp, 'fruits/oranges.beancount'),
+                          path.join(tmp, 'legumes/patates.beancount'),
+                          path.join(tmp, 'legumes/tomates.beancount')],
+                         options_map['include'])
+
     def test_load_file_with_duplicate_includes(self):
         with test_utils.tempdir() as tmp:
             test_utils.create_temporary_files(tmp, {
@@ -239,6 +316,126 @@ class TestLoadIncludes(unittest.TestCase):
         self.assertEqual(2, len(entries))
 
 
+class TestLoadParseCache(unittest.TestCase):
+
+    def test_load_file_with_parse_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            parse_cache = {}
+            with mock.patch('beancount.parser.parser.parse_string',
+                            side_effect=parser.parse_string) as parse_file:
+                entries, errors, options_map = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(2, parse_file.call_count)
+                self.assertEqual(2, len(parse_cache))
+
+                # Reloading without changes reparses nothing.
+                entries2, errors2, options_map2 = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(2, parse_file.call_count)
+                self.assertEqual(entries, entries2)
+                self.assertEqual(options_map.keys(), options_map2.keys())
+                self.assertEqual(filename, options_map2['filename'])
+
+                # Modifying an included file reparses only that file.
+                with open(path.join(tmp, 'fruits/oranges.beancount'), 'a') as file:
+                    file.write('2014-01-03 open Assets:Bananas\n')
+                entries3, errors3, _ = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertEqual(3, parse_file.call_count)
+                self.assertFalse(errors3)
+                self.assertEqual(3, len(entries3))
+
+                # Removing the include evicts the included file from the cache.
+                with open(filename, 'w') as file:
+                    file.write('2014-01-01 open Assets:Apples\n')
+                entries4, errors4, options_map4 = loader.load_file(
+                    filename, parse_cache=parse_cache)
+                self.assertFalse(errors4)
+                self.assertEqual([], options_map4['include'])
+                self.assertEqual([filename], list(parse_cache))
+
+    def test_load_file_with_parse_cache__isolated(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 open Assets:Oranges
+
+                  2014-01-02 *
+                    Assets:Apples       1.00 USD
+                    Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            parse_cache = {}
+            entries, _, options_map = loader.load_file(filename, parse_cache=parse_cache)
+            self.assertIn('__tolerances__', entries[-1].meta)
+            options_map['operating_currency'].append('USD')
+
+            # The cached results aren't modified by the loading stages.
+            cached_entries, _, cached_options_map = pickle.loads(
+                parse_cache[filename].pickled)
+            self.assertNotIn('__tolerances__', cached_entries[-1].meta)
+            self.assertEqual([], cached_options_map['operating_currency'])
+
+            entries2, _, options_map2 = loader.load_file(filename, parse_cache=parse_cache)
+            self.assertEqual(entries, entries2)
+            self.assertIsNot(entries[-1], entries2[-1])
+            self.assertEqual([], options_map2['operating_currency'])
+
+
+class TestLoadParallel(unittest.TestCase):
+
+    def test_load_file_parallel(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/oranges.beancount"
+                  include "{root}/legumes/patates.beancount"
+                  include "fruits/bananas.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  include "../legumes/tomates.beancount"
+                  include "bananas.beancount"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'fruits/bananas.beancount': """
+                  2014-01-05 open Assets:Bananas
+                """,
+                'legumes/tomates.beancount': """
+                  2014-01-03 open Assets:Tomates
+                  2014-01-03 open Assets:Tomates
+                """,
+                'legumes/patates.beancount': """
+                  include "/some/file/that/does/not/exist.beancount"
+                  2014-01-04 open Assets:Patates
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            entries, errors, options_map = loader.load_file(filename)
+            par_entries, par_errors, par_options_map = loader.load_file(
+                filename, processes=4)
+            cache_entries, cache_errors, _ = loader.load_file(
+                filename, processes=4, parse_cache={})
+
+        self.assertEqual(6, len(entries))
+        self.assertEqual(entries, par_entries)
+        self.assertEqual(entries, cache_entries)
+        self.assertEqual([error.message for error in errors],
+                         [error.message for error in par_errors])
+        self.assertEqual([error.message for error in errors],
+                         [error.message for error in cache_errors])
+        self.assertEqual(options_map['filename'], par_options_map['filename'])
+
+
 class TestEncoding(unittest.TestCase):
 
     def test_string_unicode(self):
@@ -11,9 +11,6 @@ from beancount.core.data import Transaction
 from beancount.core.data import Balance
 from beancount.core import amount
 from beancount.core import account
-from beancount.core import inventory
-from beancount.core import realization
-from beancount.core import getters
 
 __plugins__ = ('check',)
 
@@ -72,58 +69,53 @@ def check(entries, options_map):
     check_errors = []
 
     # This is similar to realization, but performed in a different order, and
-    # where we only accumulate inventories for accounts that have balance
+    # where we only accumulate balances for accounts that have balance
     # assertions in them (this saves on time). Here we process the entries one
-    # by one along with the balance checks. We use a temporary realization in
-    # order to hold the incremental tree of balances, so that we can easily get
-    # the amounts of an account's subaccounts for making checks on parent
-    # accounts.
-    real_root = realization.RealAccount('')
+    # by one along with the balance checks. The balance of an asserted account
+    # includes that of all its sub-accounts, so that we can make checks on
+    # parent accounts. We only need the units of each currency for this, so we
+    # accumulate those directly.
 
     # Figure out the set of accounts for which we need to compute a running
-    # inventory balance.
-    asserted_accounts = {entry.account
-                         for entry in entries
-                         if isinstance(entry, Balance)}
-
-    # Add all children accounts of an asserted account to be calculated as well,
-    # and pre-create these accounts, and only those (we're just being tight to
-    # make sure).
-    asserted_match_list = [account.parent_matcher(account_)
-                           for account_ in asserted_accounts]
-    for account_ in getters.get_accounts(entries):
-        if (account_ in asserted_accounts or
-            any(match(account_) for match in asserted_match_list)):
-            realization.get_or_create(real_root, account_)
+    # balance, and create a dict of currency to units for each of them.
+    asserted_units = {entry.account: {}
+                      for entry in entries
+                      if isinstance(entry, Balance)}
+
+    # A dict of posting account to the list of unit dicts of the asserted
+    # accounts it rolls up into, i.e., itself and its parents. This is filled in
+    # lazily, as accounts are encountered.
+    rollup_map = {}
 
     for entry in entries:
         if isinstance(entry, Transaction):
-            # For each of the postings' accounts, update the balance inventory.
+            # For each of the postings' accounts, update the balances of the
+            # account and its asserted parents.
             for posting in entry.postings:
-                real_account = realization.get(real_root, posting.account)
-
-                # The account will have been created only if we're meant to track it.
-                if real_account is not None:
-                    # Note: Always allow negative lots for the purpose of balancing.
-                    # This error should show up somewhere else than here.
-                    real_account.balance.add_position(posting.position)
+                try:
+                    rollup_units = rollup_map[posting.account]
+                except KeyError:
+                    rollup_units = rollup_map[posting.account] = [
+                        asserted_units[parent_account]
+                        for parent_account in account.parents(posting.account)
+                        if parent_account in asserted_units]
+
+                # Note: Always allow negative lots for the purpose of balancing.
+                # This error should show up somewhere else than here.
+                position = posting.position
+                currency = position.lot.currency
+                for units in rollup_units:
+                    units[currency] = units.get(currency, ZERO) + position.number
 
         elif isinstance(entry, Balance):
             # Check the balance against the check entry.
             expected_amount = entry.amount
 
-            real_account = realization.get(real_root, entry.account)
-            assert real_account is not None, "Missing {}".format(entry.account)
-
-            # Sum up the current balances for this account and its
-            # sub-accounts. We want to support checks for parent accounts
-            # for the total sum of their subaccounts.
-            subtree_balance = inventory.Inventory()
-            for real_child in realization.iter_children(real_account, False):
-                subtree_balance += real_child.balance
-
-            # Get only the amount in the desired currency.
-            balance_amount = subtree_balance.get_units(expected_amount.currency)
+            # Get the current balance of this account and its sub-accounts, in
+            # the desired currency only.
+            balance_amount = amount.Amount(
+                asserted_units[entry.account].get(expected_amount.currency, ZERO),
+                expected_amount.currency)
 
             # Check if the amount is within bounds of the expected amount.
             diff_amount = amount.amount_sub(balance_amount, expected_amount)
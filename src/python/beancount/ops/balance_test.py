@@ -274,6 +274,47 @@ class TestBalance(unittest.TestCase):
         self.assertEqual([], list(map(type, errors)))
 
 
+    @loader.load_doc(expect_errors=True)
+    def test_nested_parents(self, entries, errors, __):
+        """
+          2013-05-01 open Assets:Bank
+          2013-05-01 open Assets:Bank:US
+          2013-05-01 open Assets:Bank:US:Checking
+          2013-05-01 open Assets:Bank:US:Invest
+          2013-05-01 open Assets:Bank:CA:Checking
+          2013-05-01 open Assets:Bank-Other
+          2013-05-01 open Equity:Opening-Balances
+
+          2013-05-02 *
+            Assets:Bank:US:Checking             100 USD
+            Assets:Bank:CA:Checking              50 CAD
+            Assets:Bank-Other                    30 USD
+            Equity:Opening-Balances            -130 USD
+            Equity:Opening-Balances             -50 CAD
+
+          2013-05-03 *
+            Assets:Bank:US:Invest                 2 HOOL {10 USD}
+            Assets:Bank:US:Checking             -20 USD
+
+          2013-05-04 balance Assets:Bank:US          80 USD
+          2013-05-04 balance Assets:Bank:US           2 HOOL
+          2013-05-04 balance Assets:Bank             80 USD
+          2013-05-04 balance Assets:Bank             50 CAD
+
+          2013-05-05 *
+            Assets:Bank:US:Invest                -1 HOOL {10 USD}
+            Assets:Bank:US:Checking              10 USD
+
+          2013-05-06 balance Assets:Bank:US           1 HOOL
+          2013-05-06 balance Assets:Bank             91 USD
+        """
+        self.assertEqual([balance.BalanceError], list(map(type, errors)))
+        diff_amounts = [entry.diff_amount
+                        for entry in entries
+                        if isinstance(entry, balance.Balance)]
+        self.assertEqual([None, None, None, None, None, A('-1 USD')], diff_amounts)
+
+
 class TestBalancePrecision(unittest.TestCase):
 
     @loader.load_doc(expect_errors=True)
@@ -3,6 +3,7 @@ __author__ = "Martin Blais <blais@furius.ca>"
 import unittest
 import datetime
 import re
+from unittest import mock
 
 from beancount.core.number import D
 from beancount.core.amount import A
@@ -206,6 +207,174 @@ class TestPriceMap(unittest.TestCase):
                          prices.convert_amount(price_map, 'EUR',
                                                A('100 USD')))
 
+    @loader.load_doc()
+    def test_convert_amount_date(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-07-01 price  USD  1.20 CAD
+        """
+        price_map = prices.build_price_map(entries)
+        self.assertEqual(A('110 CAD'),
+                         prices.convert_amount(price_map, 'CAD', A('100 USD'),
+                                               datetime.date(2013, 6, 15)))
+        self.assertEqual(None,
+                         prices.convert_amount(price_map, 'CAD', A('100 USD'),
+                                               datetime.date(2013, 5, 15)))
+
+    @loader.load_doc()
+    def test_convert_amounts(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-07-01 price  USD  1.20 CAD
+        2013-06-01 price  EUR  1.50 CAD
+        """
+        price_map = prices.build_price_map(entries)
+        amounts = [A('100 USD'), A('10 CAD'), A('200 EUR'), A('5 JPY'), A('1 USD')]
+        self.assertEqual([A('110 CAD'), A('10 CAD'), A('300 CAD'), None, A('1.10 CAD')],
+                         prices.convert_amounts(price_map, 'CAD', amounts,
+                                                datetime.date(2013, 6, 15)))
+        self.assertEqual([A('120 CAD'), A('10 CAD'), A('300 CAD'), None, A('1.20 CAD')],
+                         prices.convert_amounts(price_map, 'CAD', amounts))
+        self.assertEqual([], prices.convert_amounts(price_map, 'CAD', []))
+
+    @loader.load_doc()
+    def test_price_map_dates_rates(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-06-10 price  USD  1.20 CAD
+        """
+        price_map = prices.build_price_map(entries)
+        for base_quote, price_list in price_map.items():
+            self.assertEqual([date for date, _ in price_list],
+                             price_map.dates[base_quote])
+            self.assertEqual([rate for _, rate in price_list],
+                             price_map.rates[base_quote])
+
+    @loader.load_doc()
+    def test_get_price_cache(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-06-10 price  USD  1.20 CAD
+        """
+        price_map = prices.build_price_map(entries)
+        date = datetime.date(2013, 6, 5)
+        expected = (datetime.date(2013, 6, 1), D('1.10'))
+        self.assertEqual(expected, prices.get_price(price_map, 'USD/CAD', date))
+        self.assertEqual(expected, price_map.cache[('USD', 'CAD', date)])
+        self.assertEqual(expected, prices.get_price(price_map, 'USD/CAD', date))
+        self.assertEqual(1, len(price_map.cache))
+
+        # Reindexing clears the memoized lookups.
+        price_map.reindex()
+        self.assertEqual(0, len(price_map.cache))
+
+        # The cache is bounded.
+        with mock.patch.object(prices, 'PRICE_CACHE_SIZE', 3):
+            for day in range(1, 11):
+                prices.get_price(price_map, 'USD/CAD', datetime.date(2013, 7, day))
+        self.assertEqual([datetime.date(2013, 7, day) for day in (8, 9, 10)],
+                         [key[2] for key in price_map.cache])
+
+    @loader.load_doc()
+    def test_get_path(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-06-01 price  EUR  1.20 USD
+        2013-06-01 price  JPY  0.01 USD
+        2013-06-01 price  GBP  1.10 EUR
+        2013-06-01 price  HOOL 500 JPY
+        """
+        price_map = prices.build_price_map(entries)
+        self.assertEqual([('JPY', 'USD'), ('USD', 'CAD')],
+                         price_map.get_path(('JPY', 'CAD')))
+        self.assertEqual([('GBP', 'EUR'), ('EUR', 'USD'), ('USD', 'JPY')],
+                         price_map.get_path(('GBP', 'JPY')))
+        self.assertEqual([('USD', 'CAD')], price_map.get_path(('USD', 'CAD')))
+        self.assertEqual(None, price_map.get_path(('USD', 'AUD')))
+        self.assertIn(('JPY', 'CAD'), price_map.paths)
+
+    @loader.load_doc()
+    def test_get_price_transitive(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-07-01 price  USD  1.20 CAD
+        2013-06-15 price  JPY  0.01 USD
+        2013-07-15 price  JPY  0.02 USD
+        """
+        price_map = prices.build_price_map(entries)
+
+        # Each leg is taken at the requested date; the date is the oldest leg's.
+        self.assertEqual((datetime.date(2013, 6, 1), D('0.0110')),
+                         prices.get_price(price_map, 'JPY/CAD',
+                                          datetime.date(2013, 6, 20)))
+        self.assertEqual((datetime.date(2013, 6, 15), D('0.0120')),
+                         prices.get_price(price_map, 'JPY/CAD',
+                                          datetime.date(2013, 7, 5)))
+        self.assertEqual((datetime.date(2013, 7, 1), D('0.0240')),
+                         prices.get_price(price_map, 'JPY/CAD'))
+        date, rate = prices.get_price(price_map, 'CAD/JPY', datetime.date(2013, 6, 20))
+        self.assertEqual(datetime.date(2013, 6, 1), date)
+        self.assertEqual(D('90.91'), rate.quantize(D('0.01')))
+
+        # A missing leg at that date yields no price.
+        self.assertEqual((None, None),
+                         prices.get_price(price_map, 'JPY/CAD',
+                                          datetime.date(2013, 6, 10)))
+        self.assertEqual((None, None), prices.get_price(price_map, 'JPY/AUD'))
+
+        self.assertEqual(A('240 CAD'),
+                         prices.convert_amount(price_map, 'CAD', A('10000 JPY')))
+
+    @loader.load_doc()
+    def test_add_prices(self, entries, _, __):
+        """
+        2013-06-01 price  USD  1.10 CAD
+        2013-06-10 price  USD  1.20 CAD
+        2013-06-05 price  CAD  0.80 USD
+        2013-06-05 price  EUR  1.30 USD
+        2013-06-20 price  USD  1.25 CAD
+        2013-06-10 price  USD  1.30 CAD
+        2013-06-07 price  HOOL 0 USD
+        2013-06-08 price  HOOL 5 USD
+        """
+        # Add prices before, between and at the same dates as existing ones.
+        first_dates = {datetime.date(2013, 6, 1), datetime.date(2013, 6, 10)}
+        first = [entry for entry in entries if entry.date in first_dates]
+        second = [entry for entry in entries if entry.date not in first_dates]
+        price_map = prices.build_price_map(first)
+        self.assertEqual(datetime.date(2013, 6, 10),
+                         prices.get_price(price_map, 'USD/CAD')[0])
+        self.assertEqual((None, None), prices.get_price(price_map, 'EUR/CAD'))
+
+        price_map.add_prices(second)
+        expected = prices.build_price_map(entries)
+        self.assertEqual(set(expected), set(price_map))
+        for base_quote, price_list in expected.items():
+            self.assertEqual([(date, rate.quantize(D('0.0001')))
+                              for date, rate in price_list],
+                             [(date, rate.quantize(D('0.0001')))
+                              for date, rate in price_map[base_quote]])
+            self.assertEqual([date for date, _ in price_list],
+                             price_map.dates[base_quote])
+            self.assertEqual(price_map.rates[base_quote],
+                             [rate for _, rate in price_map[base_quote]])
+        self.assertEqual([('USD', 'CAD'), ('EUR', 'USD'), ('HOOL', 'USD')],
+                         price_map.forward_pairs)
+        self.assertEqual([datetime.date(2013, 6, 8)], price_map.dates[('USD', 'HOOL')])
+
+        # The memoized lookups and paths are invalidated.
+        self.assertEqual((datetime.date(2013, 6, 20), D('1.25')),
+                         prices.get_price(price_map, 'USD/CAD'))
+        self.assertEqual((datetime.date(2013, 6, 5), D('1.6250')),
+                         prices.get_price(price_map, 'EUR/CAD',
+                                          datetime.date(2013, 6, 6)))
+
+    def test_get_price_plain_dict(self):
+        price_map = {('USD', 'CAD'): [(datetime.date(2013, 6, 1), D('1.10'))]}
+        self.assertEqual((datetime.date(2013, 6, 1), D('1.10')),
+                         prices.get_price(price_map, 'USD/CAD',
+                                          datetime.date(2013, 6, 2)))
+
     @loader.load_doc()
     def test_ordering_same_date(self, entries, _, __):
         """
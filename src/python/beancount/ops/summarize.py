@@ -8,8 +8,11 @@ total amount of that account.
 """
 __author__ = "Martin Blais <blais@furius.ca>"
 
+import bisect
+import copy
 import datetime
 import collections
+import threading
 
 from beancount.core.number import ZERO
 from beancount.core.data import Transaction
@@ -33,7 +36,8 @@ def open(entries,
          conversion_currency,
          account_earnings,
          account_opening,
-         account_conversions):
+         account_conversions,
+         snapshots=None):
     """Summarize entries before a date and transfer income/expenses to equity.
 
     This method essentially prepares a list of directives to contain only
@@ -73,6 +77,8 @@ def open(entries,
         opening balances account.
       account_conversions: A string, tne name of the equity account to
         book currency conversions against.
+      snapshots: An optional instance of BalanceSnapshots for 'entries', used
+        to speed up the computation of the balances at the given date.
     Returns:
       A new list of entries is returned, and the index that points to the first
       original transaction after the beginning date of the period. This index
@@ -80,16 +86,24 @@ def open(entries,
       sheet fed with only the summarized entries.
 
     """
+    # The new entries are all inserted on the day before the open date.
+    insert_date = date - datetime.timedelta(days=1)
+
     # Insert conversion entries.
-    entries = conversions(entries, account_conversions, conversion_currency, date)
+    new_entries = conversions(entries, account_conversions, conversion_currency, date,
+                              snapshots)
+    snapshots = derive_snapshots(snapshots, entries, new_entries, insert_date)
+    entries = new_entries
 
     # Transfer income and expenses before the period to equity.
-    entries, _ = clear(entries, date, account_types, account_earnings)
+    new_entries, _ = clear(entries, date, account_types, account_earnings, snapshots)
+    snapshots = derive_snapshots(snapshots, entries, new_entries, insert_date)
+    entries = new_entries
 
     # Summarize all the previous balances, after transferring the income and
     # expense balances, so all entries for those accounts before the begin date
     # should now disappear.
-    entries, index = summarize(entries, date, account_opening)
+    entries, index = summarize(entries, date, account_opening, snapshots)
 
     return entries, index
 
@@ -97,7 +111,8 @@ def open(entries,
 def close(entries,
           date,
           conversion_currency,
-          account_conversions):
+          account_conversions,
+          snapshots=None):
     """Truncate entries that occur after a particular date and ensure balance.
 
     This method essentially removes entries after a date. It truncates the
@@ -121,6 +136,8 @@ def close(entries,
         on the conversion entry.
       account_conversions: A string, tne name of the equity account to
         book currency conversions against.
+      snapshots: An optional instance of BalanceSnapshots for 'entries', used
+        to speed up the computation of the balance at the given date.
     Returns:
       A new list of entries is returned, and the index that points to one beyond
       the last original transaction that was provided. Further entries may have
@@ -130,14 +147,17 @@ def close(entries,
 
     # Truncate the entries after the date, if a date has been provided.
     if date is not None:
-        entries = truncate(entries, date)
+        new_entries = truncate(entries, date)
+        snapshots = derive_snapshots(snapshots, entries, new_entries, date)
+        entries = new_entries
 
     # Keep an index to the truncated list of entries (before conversions).
     index = len(entries)
 
     # Insert a conversions entry to ensure the total balance of all accounts is
     # flush zero.
-    entries = conversions(entries, account_conversions, conversion_currency, date)
+    entries = conversions(entries, account_conversions, conversion_currency, date,
+                          snapshots)
 
     return entries, index
 
@@ -145,7 +165,8 @@ def close(entries,
 def clear(entries,
           date,
           account_types,
-          account_earnings):
+          account_earnings,
+          snapshots=None):
     """Transfer income and expenses balances at the given date to the equity accounts.
 
     This method insert entries to zero out balances on income and expenses
@@ -160,6 +181,8 @@ def clear(entries,
       account_earnings: A string, the name of the account to transfer
         previous earnings from the income statement accounts to the balance
         sheet.
+      snapshots: An optional instance of BalanceSnapshots for 'entries', used
+        to speed up the computation of the balances at the given date.
     Returns:
       A new list of entries is returned, and the index that points to one before
       the last original transaction before the transfers.
@@ -170,7 +193,8 @@ def clear(entries,
     income_statement_account_pred = (
         lambda account: is_income_statement_account(account, account_types))
     new_entries = transfer_balances(entries, date,
-                                    income_statement_account_pred, account_earnings)
+                                    income_statement_account_pred, account_earnings,
+                                    snapshots)
 
     return new_entries, index
 
@@ -181,21 +205,24 @@ def open_opt(entries, date, options_map):
     account_types = options.get_account_types(options_map)
     previous_accounts = options.get_previous_accounts(options_map)
     conversion_currency = options_map['conversion_currency']
-    return open(entries, date, account_types, conversion_currency, *previous_accounts)
+    return open(entries, date, account_types, conversion_currency, *previous_accounts,
+                snapshots=options_map.get('balance_snapshots', None))
 
 def close_opt(entries, date, options_map):
     """Convenience function to close() using an options map.
     """
     conversion_currency = options_map['conversion_currency']
     current_accounts = options.get_current_accounts(options_map)
-    return close(entries, date, conversion_currency, current_accounts[1])
+    return close(entries, date, conversion_currency, current_accounts[1],
+                 options_map.get('balance_snapshots', None))
 
 def clear_opt(entries, date, options_map):
     """Convenience function to clear() using an options map.
     """
     account_types = options.get_account_types(options_map)
     current_accounts = options.get_current_accounts(options_map)
-    return clear(entries, date, account_types, current_accounts[0])
+    return clear(entries, date, account_types, current_accounts[0],
+                 options_map.get('balance_snapshots', None))
 
 
 def clamp(entries,
@@ -204,7 +231,8 @@ def clamp(entries,
           conversion_currency,
           account_earnings,
           account_opening,
-          account_conversions):
+          account_conversions,
+          snapshots=None):
     """Filter entries to include only those during a specified time period.
 
     Firstly, this method will transfer all balances for the income and expense
@@ -237,6 +265,8 @@ def clamp(entries,
         opening balances account.
       account_conversions: A string, tne name of the equity account to
         book currency conversions against.
+      snapshots: An optional instance of BalanceSnapshots for 'entries', used
+        to speed up the computation of the balances at the beginning date.
     Returns:
       A new list of entries is returned, and the index that points to the first
       original transaction after the beginning date of the period. This index
@@ -246,13 +276,17 @@ def clamp(entries,
     # Transfer income and expenses before the period to equity.
     income_statement_account_pred = (
         lambda account: is_income_statement_account(account, account_types))
-    entries = transfer_balances(entries, begin_date,
-                                income_statement_account_pred, account_earnings)
+    new_entries = transfer_balances(entries, begin_date,
+                                    income_statement_account_pred, account_earnings,
+                                    snapshots)
+    snapshots = derive_snapshots(snapshots, entries, new_entries,
+                                 begin_date - datetime.timedelta(days=1))
+    entries = new_entries
 
     # Summarize all the previous balances, after transferring the income and
     # expense balances, so all entries for those accounts before the begin date
     # should now disappear.
-    entries, index = summarize(entries, begin_date, account_opening)
+    entries, index = summarize(entries, begin_date, account_opening, snapshots)
 
     # Truncate the entries after this.
     entries = truncate(entries, end_date)
@@ -282,14 +316,16 @@ def clamp_opt(entries, begin_date, end_date, options_map):
     return clamp(entries, begin_date, end_date,
                  account_types,
                  conversion_currency,
-                 *previous_accounts)
+                 *previous_accounts,
+                 snapshots=options_map.get('balance_snapshots', None))
 
 
 def cap(entries,
         account_types,
         conversion_currency,
         account_earnings,
-        account_conversions):
+        account_conversions,
+        snapshots=None):
     """Transfer net income to equity and insert a final conversion entry.
 
     This is used to move and nullify balances from the income and expense
@@ -305,6 +341,8 @@ def cap(entries,
         final balances of the income and expense accounts to.
       account_conversions: A string, the name of the equity account to use as
         the source for currency conversions.
+      snapshots: An optional instance of BalanceSnapshots for 'entries', used
+        to speed up the computation of the final balances.
     Returns:
       A modified list of entries, with the income and expense accounts
       transferred.
@@ -314,12 +352,17 @@ def cap(entries,
     # income.
     income_statement_account_pred = (
         lambda account: is_income_statement_account(account, account_types))
-    entries = transfer_balances(entries, None,
-                                income_statement_account_pred,
-                                account_earnings)
+    new_entries = transfer_balances(entries, None,
+                                    income_statement_account_pred,
+                                    account_earnings,
+                                    snapshots)
+    if entries:
+        snapshots = derive_snapshots(snapshots, entries, new_entries, entries[-1].date)
+    entries = new_entries
 
     # Insert final conversion entries.
-    entries = conversions(entries, account_conversions, conversion_currency, None)
+    entries = conversions(entries, account_conversions, conversion_currency, None,
+                          snapshots)
 
     return entries
 
@@ -341,10 +384,11 @@ def cap_opt(entries, options_map):
     return cap(entries,
                account_types,
                conversion_currency,
-               *current_accounts)
+               *current_accounts,
+               snapshots=options_map.get('balance_snapshots', None))
 
 
-def transfer_balances(entries, date, account_pred, transfer_account):
+def transfer_balances(entries, date, account_pred, transfer_account, snapshots=None):
     """Synthesize transactions to transfer balances from some accounts at a given date.
 
     For all accounts that match the 'account_pred' predicate, create new entries
@@ -365,6 +409,7 @@ def transfer_balances(entries, date, account_pred, transfer_account):
         true if the account is meant to be transferred.
       transfer_account: A string, the name of the source account to be used on
         the transfer entries to receive balances at the given date.
+      snapshots: An optional instance of BalanceSnapshots for 'entries'.
     Returns:
       A new list of entries, with the new transfer entries added in.
     """
@@ -373,7 +418,7 @@ def transfer_balances(entries, date, account_pred, transfer_account):
         return entries
 
     # Compute balances at date.
-    balances, index = balance_by_account(entries, date)
+    balances, index = balance_by_account(entries, date, snapshots)
 
     # Filter out to keep only the accounts we want.
     transfer_balances = {account: balance
@@ -403,7 +448,7 @@ def transfer_balances(entries, date, account_pred, transfer_account):
     return (entries[:index] + transfer_entries + after_entries)
 
 
-def summarize(entries, date, account_opening):
+def summarize(entries, date, account_opening, snapshots=None):
     """Summarize all entries before a date by replacing then with summarization entries.
 
     This function replaces the transactions up to (and not including) the given
@@ -421,12 +466,13 @@ def summarize(entries, date, account_opening):
       date: A datetime.date instance, the cutoff date before which to summararize.
       account_opening: A string, the name of the source account to book summarization
         entries against.
+      snapshots: An optional instance of BalanceSnapshots for 'entries'.
     Returns:
       The function returns a list of new entries and the integer index at which
       the entries on or after the cutoff date begin.
     """
     # Compute balances at date.
-    balances, index = balance_by_account(entries, date)
+    balances, index = balance_by_account(entries, date, snapshots)
 
     # We need to insert the entries with a date previous to subsequent checks,
     # to maintain ensure the open directives show up before any transaction.
@@ -453,7 +499,8 @@ def summarize(entries, date, account_opening):
     return (before_entries + after_entries), len(before_entries)
 
 
-def conversions(entries, conversion_account, conversion_currency, date=None):
+def conversions(entries, conversion_account, conversion_currency, date=None,
+                snapshots=None):
     """Insert a conversion entry at date 'date' at the given account.
 
     Args:
@@ -464,11 +511,15 @@ def conversions(entries, conversion_account, conversion_currency, date=None):
       date: The date before which to insert the conversion entry. The new
         entry will be inserted as the last entry of the date just previous
         to this date.
+      snapshots: An optional instance of BalanceSnapshots for 'entries'.
     Returns:
       A modified list of entries.
     """
     # Compute the balance at the given date.
-    conversion_balance = interpolate.compute_entries_balance(entries, date=date)
+    if snapshots is not None and snapshots.entries is entries:
+        _, conversion_balance, _ = snapshots.get_balances(date)
+    else:
+        conversion_balance = interpolate.compute_entries_balance(entries, date=date)
 
     # Early exit if there is nothing to do.
     if conversion_balance.is_empty():
@@ -571,7 +622,7 @@ def create_entries_from_balances(balances, date, source_account, direction,
     return new_entries
 
 
-def balance_by_account(entries, date=None):
+def balance_by_account(entries, date=None, snapshots=None):
     """Sum up the balance per account for all entries strictly before 'date'.
 
     Args:
@@ -579,12 +630,19 @@ def balance_by_account(entries, date=None):
       date: An optional datetime.date instance. If provided, stop accumulating
         on and after this date. This is useful for summarization before a
         specific date.
+      snapshots: An optional instance of BalanceSnapshots. If it was built for
+        this very list of entries, the balances are accumulated from its
+        closest snapshot before the date rather than from the first entry.
     Returns:
       A pair of a dict of account string to instance Inventory (the balance of
       this account before the given date), and the index in the list of entries
       where the date was encountered. If all entries are located before the
       cutoff date, an index one beyond the last entry is returned.
     """
+    if snapshots is not None and snapshots.entries is entries:
+        balances, _, index = snapshots.get_balances(date)
+        return balances, index
+
     balances = collections.defaultdict(inventory.Inventory)
     for index, entry in enumerate(entries):
         if date and entry.date >= date:
@@ -608,6 +666,169 @@ def balance_by_account(entries, date=None):
     return balances, index
 
 
+class BalanceSnapshots:
+    """An index of the balances of all the accounts at regular dates.
+
+    This stores the balance of each account and the total balance of all the
+    postings at the beginning of every month (or year) of a list of entries, so
+    that the balances at any date can be computed by accumulating only the
+    entries from the closest snapshot before it, instead of from the beginning
+    of the list. The snapshots are computed lazily, as later dates are
+    requested. An instance is only valid for the very list of entries it was
+    created for; use derive_snapshots() to carry it over to a modified copy.
+
+    Attributes:
+      entries: The list of directives the snapshots are computed from.
+      period: A string, 'month' or 'year', the interval between the snapshots.
+      dates: A sorted list of the datetime.date instances of the snapshots.
+      snapshots: A list of (index, balances, total) for each date, where
+        'index' is the index of the first entry on or after the date,
+        'balances' is a dict of account to its Inventory before the date and
+        'total' is an Inventory of the sum of all the postings before the date.
+        These inventories are never modified.
+      lock: A lock protecting the lists of snapshots.
+    """
+
+    def __init__(self, entries, period='month'):
+        """Create an empty index of snapshots.
+
+        Args:
+          entries: A sorted list of directives.
+          period: A string, 'month' or 'year', the interval between snapshots.
+        """
+        if period not in ('month', 'year'):
+            raise ValueError("Invalid period: {}".format(period))
+        self.entries = entries
+        self.period = period
+        self.dates = []
+        self.snapshots = []
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # The snapshots are recomputed lazily after unpickling.
+        return (self.entries, self.period)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def get_period_date(self, date):
+        """Return the date of the snapshot for the period of a date.
+
+        Args:
+          date: A datetime.date instance.
+        Returns:
+          A datetime.date instance, the beginning of the month or year of 'date'.
+        """
+        if self.period == 'year':
+            return datetime.date(date.year, 1, 1)
+        else:
+            return datetime.date(date.year, date.month, 1)
+
+    def get_balances(self, date=None):
+        """Compute the balances of the accounts for all entries strictly before 'date'.
+
+        Args:
+          date: An optional datetime.date instance. If not provided, sum up all
+            the entries.
+        Returns:
+          A triple of a dict of account string to a new Inventory instance (the
+          balance of this account before the given date), an Inventory of the
+          total of all the postings before that date, and the index of the first
+          entry on or after the date, as for balance_by_account().
+        """
+        entries = self.entries
+        with self.lock:
+            # Start from the latest snapshot at or before the date.
+            num_snapshots = (len(self.dates)
+                             if date is None
+                             else bisect.bisect_right(self.dates, date))
+            if num_snapshots > 0:
+                start, balances, total = self.snapshots[num_snapshots - 1]
+                balances = collections.defaultdict(
+                    inventory.Inventory, copy_balances(balances))
+                total = copy.copy(total)
+            else:
+                start = 0
+                balances = collections.defaultdict(inventory.Inventory)
+                total = inventory.Inventory()
+
+            # Record new snapshots along the way only past the latest one.
+            record = num_snapshots == len(self.dates)
+
+            for index in range(start, len(entries)):
+                entry = entries[index]
+                if date is not None and entry.date >= date:
+                    break
+
+                if record:
+                    period_date = self.get_period_date(entry.date)
+                    if not self.dates or period_date > self.dates[-1]:
+                        self.snapshots.append(
+                            (index, copy_balances(balances), copy.copy(total)))
+                        self.dates.append(period_date)
+
+                if isinstance(entry, Transaction):
+                    for posting in entry.postings:
+                        # See balance_by_account() about negative lots at cost.
+                        balances[posting.account].add_position(posting.position)
+                        total.add_position(posting.position)
+            else:
+                index = len(entries)
+
+        return balances, total, index
+
+    def derive(self, new_entries, date):
+        """Create an index for a copy of the entries modified on or after a date.
+
+        Args:
+          new_entries: A sorted list of directives, which contains the very same
+            entries as this instance's entries strictly before 'date'.
+          date: A datetime.date instance.
+        Returns:
+          A new instance of BalanceSnapshots for 'new_entries', sharing the
+          snapshots of this instance at or before 'date'.
+        """
+        with self.lock:
+            num_snapshots = bisect.bisect_right(self.dates, date)
+            new_snapshots = BalanceSnapshots(new_entries, self.period)
+            new_snapshots.dates = self.dates[:num_snapshots]
+            new_snapshots.snapshots = self.snapshots[:num_snapshots]
+        return new_snapshots
+
+
+def copy_balances(balances):
+    """Copy a dict of account balances.
+
+    Args:
+      balances: A dict of account string to Inventory instance.
+    Returns:
+      A new dict of account string to new Inventory instances.
+    """
+    return {account: copy.copy(balance)
+            for account, balance in balances.items()}
+
+
+def derive_snapshots(snapshots, entries, new_entries, date):
+    """Carry over the snapshots of a list of entries to a modified copy of it.
+
+    Args:
+      snapshots: An instance of BalanceSnapshots, or None.
+      entries: A list of directives.
+      new_entries: A list of directives, which contains the very same entries
+        as 'entries' strictly before 'date'.
+      date: A datetime.date instance.
+    Returns:
+      An instance of BalanceSnapshots for 'new_entries', or None, if
+      'snapshots' is None or is not an index of 'entries'.
+    """
+    if snapshots is None or snapshots.entries is not entries:
+        return None
+    return snapshots.derive(new_entries, date)
+
+
 def get_open_entries(entries, date):
     """Gather the list of active Open entries at date.
 
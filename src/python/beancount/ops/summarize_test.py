@@ -7,8 +7,10 @@ __author__ = "Martin Blais <blais@furius.ca>"
 from datetime import date
 import datetime
 import collections
+import pickle
 import re
 
+from beancount.core import amount
 from beancount.core import inventory
 from beancount.core import data
 from beancount.core import flags
@@ -1128,6 +1130,123 @@ class TestBalanceByAccount(cmptest.TestCase):
             'Equity:Opening-Balances': inventory.from_string('-10 USD'),
             }, balances)
 
+    def test_balance_by_account__snapshots(self):
+        snapshots = summarize.BalanceSnapshots(self.entries)
+        for date_ in (None, datetime.date(2014, 2, 1), datetime.date(2014, 2, 10)):
+            self.assertEqual(summarize.balance_by_account(self.entries, date_),
+                             summarize.balance_by_account(self.entries, date_, snapshots))
+        self.assertEqual(3, len(snapshots))
+
+        # Snapshots for another list of entries are ignored.
+        balances, index = summarize.balance_by_account(self.entries[:4], None, snapshots)
+        self.assertEqual(4, index)
+        self.assertEqual(2, len(balances))
+
+
+class TestBalanceSnapshots(cmptest.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, options_map):
+        """
+        2013-12-01 open Assets:Checking
+        2013-12-01 open Assets:Investing
+        2013-12-01 open Equity:Opening-Balances
+
+        2013-12-15 *
+          Assets:Checking          1000 USD
+          Equity:Opening-Balances
+
+        2014-01-10 *
+          Assets:Investing         2 HOOL {300 USD}
+          Assets:Checking
+
+        2014-01-20 *
+          Assets:Investing        -1 HOOL {300 USD}
+          Assets:Checking
+
+        2014-04-01 *
+          Assets:Checking           100 CAD
+          Equity:Opening-Balances
+        """
+        self.entries = entries
+        self.options_map = options_map
+        self.dates = [datetime.date(2013, 11, 1) + datetime.timedelta(days=days)
+                      for days in range(0, 200, 3)]
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            summarize.BalanceSnapshots(self.entries, 'week')
+
+    def test_get_balances(self):
+        for period, num_snapshots in [('month', 3), ('year', 2)]:
+            snapshots = summarize.BalanceSnapshots(self.entries, period)
+            for date_ in reversed(self.dates):
+                balances, total, index = snapshots.get_balances(date_)
+                self.assertEqual(summarize.balance_by_account(self.entries, date_),
+                                 (balances, index))
+                self.assertEqual(
+                    interpolate.compute_entries_balance(self.entries, date=date_),
+                    total)
+            self.assertEqual(num_snapshots, len(snapshots))
+
+    def test_get_balances__lazy(self):
+        snapshots = summarize.BalanceSnapshots(self.entries)
+        snapshots.get_balances(datetime.date(2014, 1, 15))
+        self.assertEqual([datetime.date(2013, 12, 1), datetime.date(2014, 1, 1)],
+                         snapshots.dates)
+        snapshots.get_balances()
+        self.assertEqual([datetime.date(2013, 12, 1), datetime.date(2014, 1, 1),
+                          datetime.date(2014, 4, 1)], snapshots.dates)
+
+    def test_get_balances__copies(self):
+        snapshots = summarize.BalanceSnapshots(self.entries)
+        balances, total, _ = snapshots.get_balances()
+        balances['Assets:Checking'].add_amount(amount.from_string('1 USD'))
+        total.add_amount(amount.from_string('1 USD'))
+        self.assertEqual(summarize.balance_by_account(self.entries),
+                         summarize.balance_by_account(self.entries, None, snapshots))
+
+    def test_derive(self):
+        snapshots = summarize.BalanceSnapshots(self.entries)
+        snapshots.get_balances()
+        date_ = datetime.date(2014, 1, 15)
+        new_entries = summarize.truncate(self.entries, date_)
+        self.assertIsNone(
+            summarize.derive_snapshots(snapshots, new_entries, new_entries, date_))
+        new_snapshots = summarize.derive_snapshots(snapshots, self.entries,
+                                                   new_entries, date_)
+        self.assertIs(new_entries, new_snapshots.entries)
+        self.assertEqual(snapshots.dates[:2], new_snapshots.dates)
+        self.assertEqual(summarize.balance_by_account(new_entries),
+                         summarize.balance_by_account(new_entries, None, new_snapshots))
+
+    def test_pickle(self):
+        snapshots = summarize.BalanceSnapshots(self.entries, 'year')
+        snapshots.get_balances()
+        entries, new_snapshots = pickle.loads(pickle.dumps((self.entries, snapshots)))
+        self.assertIs(entries, new_snapshots.entries)
+        self.assertEqual('year', new_snapshots.period)
+        self.assertEqual(0, len(new_snapshots))
+        self.assertEqual(snapshots.get_balances(), new_snapshots.get_balances())
+
+    def test_clamp_open_close(self):
+        snapshots = self.options_map['balance_snapshots']
+        self.assertIs(self.entries, snapshots.entries)
+        options_map = dict(self.options_map, balance_snapshots=None)
+        for date_ in self.dates:
+            end_date = date_ + datetime.timedelta(days=40)
+            for function, args in [(summarize.open_opt, (date_,)),
+                                   (summarize.close_opt, (date_,)),
+                                   (summarize.clear_opt, (date_,)),
+                                   (summarize.clamp_opt, (date_, end_date))]:
+                expected_entries, expected_index = function(self.entries, *args,
+                                                            options_map)
+                entries, index = function(self.entries, *args, self.options_map)
+                self.assertEqual(expected_index, index)
+                self.assertEqualEntries(expected_entries, entries)
+        self.assertEqualEntries(summarize.cap_opt(self.entries, options_map),
+                                summarize.cap_opt(self.entries, self.options_map))
+        self.assertEqual(3, len(snapshots))
 
 
 class TestOpenAtDate(cmptest.TestCase):
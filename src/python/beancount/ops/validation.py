@@ -11,6 +11,7 @@ __author__ = "Martin Blais <blais@furius.ca>"
 
 from os import path
 import collections
+import time
 
 from beancount.core.data import Open
 from beancount.core.data import Close
@@ -31,7 +32,166 @@ ValidationError = collections.namedtuple('ValidationError', 'source message entr
 ALLOW_AFTER_CLOSE = (Document, Note)
 
 
-def validate_open_close(entries, unused_options_map):
+class Validator:
+    """Base class for the validations that check entries one at a time.
+
+    All the validators of a call to run_validators() are fed the entries from a
+    single traversal of the list of entries. Each validator declares the
+    directive types it wants to see in the dict returned by its handlers()
+    method; a handler registered for a base type, e.g. 'object', receives all
+    the directives of the other types. The errors are collected at the end of
+    the traversal, by calling finish().
+
+    Attributes:
+      options_map: An options map.
+      errors: A list of the errors found so far.
+    """
+
+    def __init__(self, options_map):
+        self.options_map = options_map
+        self.errors = []
+
+    def handlers(self):
+        """Return the handlers of this validator.
+
+        Returns:
+          A dict of directive type to a function that accepts a directive of
+          that type.
+        """
+        return {}
+
+    def finish(self):
+        """Complete the validation, after all the entries have been seen.
+
+        Returns:
+          A list of new errors, if any were found.
+        """
+        return self.errors
+
+
+def get_type_handlers(validators, entry_type):
+    """Find the handlers of a list of validators for a directive type.
+
+    Args:
+      validators: A list of Validator instances.
+      entry_type: A directive type.
+    Returns:
+      A list of pairs of (validator index, handler function), in the order of
+      the validators.
+    """
+    type_handlers = []
+    for index, validator in enumerate(validators):
+        handlers = validator.handlers()
+        for base_type in entry_type.__mro__:
+            if base_type in handlers:
+                type_handlers.append((index, handlers[base_type]))
+                break
+    return type_handlers
+
+
+def run_validators(entries, options_map, validator_classes, log_timings=None):
+    """Run a list of validators over the entries, in a single traversal.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options map.
+      validator_classes: A list of subclasses of Validator.
+      log_timings: An optional function to use for logging the time spent in
+        each of the validators.
+    Returns:
+      A list of lists of errors, one for each of the validator classes.
+    """
+    validators = [validator_class(options_map)
+                  for validator_class in validator_classes]
+
+    # A dict of directive type to the list of its handlers, filled in lazily.
+    dispatch = {}
+
+    if log_timings is None:
+        for entry in entries:
+            try:
+                type_handlers = dispatch[type(entry)]
+            except KeyError:
+                type_handlers = dispatch[type(entry)] = get_type_handlers(
+                    validators, type(entry))
+            for _, handler in type_handlers:
+                handler(entry)
+        return [validator.finish() for validator in validators]
+
+    # Measure the time spent in each validator separately.
+    elapsed = [0.] * len(validators)
+    for entry in entries:
+        try:
+            type_handlers = dispatch[type(entry)]
+        except KeyError:
+            type_handlers = dispatch[type(entry)] = get_type_handlers(
+                validators, type(entry))
+        for index, handler in type_handlers:
+            time1 = time.time()
+            handler(entry)
+            elapsed[index] += time.time() - time1
+
+    errors_list = []
+    for index, (validator_class, validator) in enumerate(zip(validator_classes,
+                                                             validators)):
+        time1 = time.time()
+        errors_list.append(validator.finish())
+        elapsed[index] += time.time() - time1
+        log_timings("Operation: {:48} Time: {}{:6.0f} ms".format(
+            "'validator: {}'".format(validator_class.__name__),
+            '      '*2, elapsed[index] * 1000))
+    return errors_list
+
+
+class OpenCloseValidator(Validator):
+    """See validate_open_close()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.open_map = {}
+        self.close_map = {}
+
+    def handlers(self):
+        return {Open: self.open, Close: self.close}
+
+    def open(self, entry):
+        if entry.account in self.open_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate open directive for {}".format(entry.account),
+                    entry))
+        else:
+            self.open_map[entry.account] = entry
+
+    def close(self, entry):
+        if entry.account in self.close_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate close directive for {}".format(entry.account),
+                    entry))
+        else:
+            try:
+                open_entry = self.open_map[entry.account]
+                if entry.date <= open_entry.date:
+                    self.errors.append(
+                        ValidationError(
+                            entry.meta,
+                            "Internal error: closing date for {} "
+                            "appears before opening date".format(entry.account),
+                            entry))
+            except KeyError:
+                self.errors.append(
+                    ValidationError(
+                        entry.meta,
+                        "Unopened account {} is being closed".format(entry.account),
+                        entry))
+
+            self.close_map[entry.account] = entry
+
+
+def validate_open_close(entries, options_map):
     """Check constraints on open and close directives themselves.
 
     This method checks two kinds of constraints:
@@ -47,55 +207,39 @@ def validate_open_close(entries, unused_options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
-    open_map = {}
-    close_map = {}
-    for entry in entries:
+    return run_validators(entries, options_map, [OpenCloseValidator])[0]
 
-        if isinstance(entry, Open):
-            if entry.account in open_map:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Duplicate open directive for {}".format(entry.account),
-                        entry))
-            else:
-                open_map[entry.account] = entry
 
-        elif isinstance(entry, Close):
-            if entry.account in close_map:
-                errors.append(
+class DuplicateBalancesValidator(Validator):
+    """See validate_duplicate_balances()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # Mapping of (account, currency, date) to Balance entry.
+        self.balance_entries = {}
+
+    def handlers(self):
+        return {data.Balance: self.balance}
+
+    def balance(self, entry):
+        key = (entry.account, entry.amount.currency, entry.date)
+        try:
+            previous_entry = self.balance_entries[key]
+            if entry.amount != previous_entry.amount:
+                self.errors.append(
                     ValidationError(
                         entry.meta,
-                        "Duplicate close directive for {}".format(entry.account),
+                        "Duplicate balance assertion with different amounts",
                         entry))
-            else:
-                try:
-                    open_entry = open_map[entry.account]
-                    if entry.date <= open_entry.date:
-                        errors.append(
-                            ValidationError(
-                                entry.meta,
-                                "Internal error: closing date for {} "
-                                "appears before opening date".format(entry.account),
-                                entry))
-                except KeyError:
-                    errors.append(
-                        ValidationError(
-                            entry.meta,
-                            "Unopened account {} is being closed".format(entry.account),
-                            entry))
-
-                close_map[entry.account] = entry
-
-    return errors
+        except KeyError:
+            self.balance_entries[key] = entry
 
 
-def validate_duplicate_balances(entries, unused_options_map):
+def validate_duplicate_balances(entries, options_map):
     """Check that balance entries occur only once per day.
 
     Because we do not support time, and the declaration order of entries is
@@ -105,66 +249,95 @@ def validate_duplicate_balances(entries, unused_options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
+    return run_validators(entries, options_map, [DuplicateBalancesValidator])[0]
 
-    # Mapping of (account, currency, date) to Balance entry.
-    balance_entries = {}
-    for entry in entries:
-        if not isinstance(entry, data.Balance):
-            continue
 
-        key = (entry.account, entry.amount.currency, entry.date)
+class DuplicateCommoditiesValidator(Validator):
+    """See validate_duplicate_commodities()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # Mapping of currency to Commodity entry.
+        self.commodity_entries = {}
+
+    def handlers(self):
+        return {data.Commodity: self.commodity}
+
+    def commodity(self, entry):
+        key = entry.currency
         try:
-            previous_entry = balance_entries[key]
-            if entry.amount != previous_entry.amount:
-                errors.append(
+            previous_entry = self.commodity_entries[key]
+            if previous_entry:
+                self.errors.append(
                     ValidationError(
                         entry.meta,
-                        "Duplicate balance assertion with different amounts",
+                        "Duplicate commodity directives for '{}'".format(key),
                         entry))
         except KeyError:
-            balance_entries[key] = entry
-
-    return errors
+            self.commodity_entries[key] = entry
 
 
-def validate_duplicate_commodities(entries, unused_options_map):
+def validate_duplicate_commodities(entries, options_map):
     """Check that commodty entries are unique for each commodity.
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
+    return run_validators(entries, options_map, [DuplicateCommoditiesValidator])[0]
 
-    # Mapping of (account, currency, date) to Balance entry.
-    commodity_entries = {}
-    for entry in entries:
-        if not isinstance(entry, data.Commodity):
-            continue
 
-        key = entry.currency
-        try:
-            previous_entry = commodity_entries[key]
-            if previous_entry:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Duplicate commodity directives for '{}'".format(key),
-                        entry))
-        except KeyError:
-            commodity_entries[key] = entry
+class ActiveAccountsValidator(Validator):
+    """See validate_active_accounts()."""
 
-    return errors
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.error_pairs = []
+        self.active_set = set()
+        self.opened_accounts = set()
+
+    def handlers(self):
+        return {data.Open: self.open, data.Close: self.close, object: self.other}
+
+    def open(self, entry):
+        self.active_set.add(entry.account)
+        self.opened_accounts.add(entry.account)
+
+    def close(self, entry):
+        self.active_set.discard(entry.account)
+
+    def other(self, entry):
+        for account in getters.get_entry_accounts(entry):
+            if account not in self.active_set:
+                # Allow document and note directives that occur after an
+                # account is closed.
+                if (isinstance(entry, ALLOW_AFTER_CLOSE) and
+                    account in self.opened_accounts):
+                    continue
 
+                # Register an error to be logged later, with an appropriate
+                # message.
+                self.error_pairs.append((account, entry))
 
-def validate_active_accounts(entries, unused_options_map):
+    def finish(self):
+        # Refine the error message to disambiguate between the case of an account
+        # that has never been seen and one that was simply not active at the time.
+        for account, entry in self.error_pairs:
+            if account in self.opened_accounts:
+                message = "Invalid reference to inactive account '{}'".format(account)
+            else:
+                message = "Invalid reference to unknown account '{}'".format(account)
+            self.errors.append(ValidationError(entry.meta, message, entry))
+        return self.errors
+
+
+def validate_active_accounts(entries, options_map):
     """Check that all references to accounts occurs on active accounts.
 
     We basically check that references to accounts from all directives other
@@ -180,45 +353,60 @@ def validate_active_accounts(entries, unused_options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    error_pairs = []
-    active_set = set()
-    opened_accounts = set()
-    for entry in entries:
-        if isinstance(entry, data.Open):
-            active_set.add(entry.account)
-            opened_accounts.add(entry.account)
+    return run_validators(entries, options_map, [ActiveAccountsValidator])[0]
 
-        elif isinstance(entry, data.Close):
-            active_set.discard(entry.account)
 
-        else:
-            for account in getters.get_entry_accounts(entry):
-                if account not in active_set:
-                    # Allow document and note directives that occur after an
-                    # account is closed.
-                    if (isinstance(entry, ALLOW_AFTER_CLOSE) and
-                        account in opened_accounts):
-                        continue
-
-                    # Register an error to be logged later, with an appropriate
-                    # message.
-                    error_pairs.append((account, entry))
-
-    # Refine the error message to disambiguate between the case of an account
-    # that has never been seen and one that was simply not active at the time.
-    errors = []
-    for account, entry in error_pairs:
-        if account in opened_accounts:
-            message = "Invalid reference to inactive account '{}'".format(account)
-        else:
-            message = "Invalid reference to unknown account '{}'".format(account)
-        errors.append(ValidationError(entry.meta, message, entry))
+class CurrencyConstraintsValidator(Validator):
+    """See validate_currency_constraints()."""
 
-    return errors
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        # A dict of every opened account to its Open entry.
+        self.open_map = {}
+        # A list of (entry, posting) pairs on accounts not opened yet, to be
+        # checked against their Open entry once all of them have been seen.
+        self.deferred = []
+
+    def handlers(self):
+        return {Open: self.open, Transaction: self.transaction}
+
+    def open(self, entry):
+        self.open_map[entry.account] = entry
+
+    def transaction(self, entry):
+        for posting in entry.postings:
+            try:
+                open_entry = self.open_map[posting.account]
+            except KeyError:
+                self.deferred.append((entry, posting))
+                continue
+            self.check_posting(entry, posting, open_entry)
+
+    def check_posting(self, entry, posting, open_entry):
+        # Skip the check if the account specifies no valid currencies.
+        valid_currencies = open_entry.currencies
+        if not valid_currencies:
+            return
+
+        # Perform the check.
+        if posting.position.lot.currency not in valid_currencies:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Invalid currency {} for account '{}'".format(
+                        posting.position.lot.currency, posting.account),
+                    entry))
+
+    def finish(self):
+        for entry, posting in self.deferred:
+            open_entry = self.open_map.get(posting.account, None)
+            if open_entry is not None:
+                self.check_posting(entry, posting, open_entry)
+        return self.errors
 
 
 def validate_currency_constraints(entries, options_map):
@@ -231,42 +419,23 @@ def validate_currency_constraints(entries, options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
+    return run_validators(entries, options_map, [CurrencyConstraintsValidator])[0]
 
-    # Get all the open entries with currency constraints.
-    open_map = {entry.account: entry
-                for entry in entries
-                if isinstance(entry, Open) and entry.currencies}
 
-    errors = []
-    for entry in entries:
-        if not isinstance(entry, Transaction):
-            continue
+class DocumentsPathsValidator(Validator):
+    """See validate_documents_paths()."""
 
-        for posting in entry.postings:
-            # Look up the corresponding account's valid currencies; skip the
-            # check if there are none specified.
-            try:
-                open_entry = open_map[posting.account]
-                valid_currencies = open_entry.currencies
-                if not valid_currencies:
-                    continue
-            except KeyError:
-                continue
+    def handlers(self):
+        return {Document: self.document}
 
-            # Perform the check.
-            if posting.position.lot.currency not in valid_currencies:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Invalid currency {} for account '{}'".format(
-                            posting.position.lot.currency, posting.account),
-                        entry))
-
-    return errors
+    def document(self, entry):
+        if not path.isabs(entry.filename):
+            self.errors.append(
+                ValidationError(entry.meta, "Invalid relative path for entry", entry))
 
 
 def validate_documents_paths(entries, options_map):
@@ -278,14 +447,27 @@ def validate_documents_paths(entries, options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    return [ValidationError(entry.meta, "Invalid relative path for entry", entry)
-            for entry in entries
-            if (isinstance(entry, Document) and
-                not path.isabs(entry.filename))]
+    return run_validators(entries, options_map, [DocumentsPathsValidator])[0]
+
+
+class DataTypesValidator(Validator):
+    """See validate_data_types()."""
+
+    def handlers(self):
+        return {object: self.entry}
+
+    def entry(self, entry):
+        try:
+            data.sanity_check_types(entry)
+        except AssertionError as exc:
+            self.errors.append(
+                ValidationError(entry.meta,
+                                "Invalid data types: {}".format(exc),
+                                entry))
 
 
 def validate_data_types(entries, options_map):
@@ -298,57 +480,83 @@ def validate_data_types(entries, options_map):
 
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
-    for entry in entries:
+    return run_validators(entries, options_map, [DataTypesValidator])[0]
+
+
+class TransactionBalancesValidator(Validator):
+    """See validate_check_transaction_balances()."""
+
+    def __init__(self, options_map):
+        super().__init__(options_map)
+        self.default_tolerances = options_map['default_tolerance']
+        self.balanced_transactions = options_map.get('balanced_transactions', None) or {}
+
+    def handlers(self):
+        return {Transaction: self.transaction}
+
+    def transaction(self, entry):
+        # IMPORTANT: This validation is _crucial_ and cannot be skipped.
+        # This is where we actually detect and warn on unbalancing
+        # transactions. This _must_ come after the user routines, because
+        # unbalancing input is legal, as those types of transactions may be
+        # "fixed up" by a user-plugin. In other words, we want to allow
+        # users to input unbalancing transactions as long as the final
+        # transactions objects that appear on the stream (after processing
+        # the plugins) are balanced. See {9e6c14b51a59}.
+        #
+        # Skip the transactions which were found to balance during booking,
+        # if their postings have not been replaced or modified since.
         try:
-            data.sanity_check_types(entry)
-        except AssertionError as exc:
-            errors.append(
+            postings, contents = self.balanced_transactions[id(entry.postings)]
+            if (postings is entry.postings and
+                contents == interpolate.get_balance_contents(postings)):
+                return
+        except KeyError:
+            pass
+
+        # Detect complete sets of postings that have residual balance;
+        residual = interpolate.compute_residual(entry.postings)
+        tolerances = interpolate.infer_tolerances(entry.postings, self.options_map)
+        if not residual.is_small(tolerances, self.default_tolerances):
+            self.errors.append(
                 ValidationError(entry.meta,
-                                "Invalid data types: {}".format(exc),
+                                "Transaction does not balance: {}".format(residual),
                                 entry))
-    return errors
 
 
 def validate_check_transaction_balances(entries, options_map):
     """Check again that all transaction postings balance, as users may have
     transformed transactions.
 
+    If the options include the transactions which were found to balance during
+    booking, those whose postings have not been changed since are not checked
+    again.
+
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
     Returns:
       A list of new errors, if any were found.
     """
-    # Note: this is a bit slow; we could limit our checks to the original
-    # transactions by using the hash function in the loader.
-    errors = []
-    default_tolerances = options_map['default_tolerance']
-    for entry in entries:
-        if isinstance(entry, Transaction):
-            # IMPORTANT: This validation is _crucial_ and cannot be skipped.
-            # This is where we actually detect and warn on unbalancing
-            # transactions. This _must_ come after the user routines, because
-            # unbalancing input is legal, as those types of transactions may be
-            # "fixed up" by a user-plugin. In other words, we want to allow
-            # users to input unbalancing transactions as long as the final
-            # transactions objects that appear on the stream (after processing
-            # the plugins) are balanced. See {9e6c14b51a59}.
-            #
-            # Detect complete sets of postings that have residual balance;
-            residual = interpolate.compute_residual(entry.postings)
-            tolerances = interpolate.infer_tolerances(entry.postings, options_map)
-            if not residual.is_small(tolerances, default_tolerances):
-                errors.append(
-                    ValidationError(entry.meta,
-                                    "Transaction does not balance: {}".format(residual),
-                                    entry))
+    return run_validators(entries, options_map, [TransactionBalancesValidator])[0]
 
-    return errors
+
+# A mapping of the validation functions above to their Validator class, so that
+# validate() can run all of them in a single traversal of the entries.
+VALIDATOR_CLASSES = {
+    validate_open_close: OpenCloseValidator,
+    validate_active_accounts: ActiveAccountsValidator,
+    validate_currency_constraints: CurrencyConstraintsValidator,
+    validate_duplicate_balances: DuplicateBalancesValidator,
+    validate_duplicate_commodities: DuplicateCommoditiesValidator,
+    validate_documents_paths: DocumentsPathsValidator,
+    validate_data_types: DataTypesValidator,
+    validate_check_transaction_balances: TransactionBalancesValidator,
+    }
 
 
 # A list of reasonably fast validations to always run by default.
@@ -360,10 +568,10 @@ BASIC_VALIDATIONS = [validate_open_close,
                      validate_documents_paths,
                      validate_check_transaction_balances]
 
-# These are slow, and thus only turned on in the check() routine.
-# We're hoping to optimize these and make them decently fast, so
-# we're not providing an option at this moment, this can be enabled
-# by modifying the 'VALIDATIONS' attribute below.
+# These are slower, and thus only turned on in the check() routine. They share
+# the traversal of the basic validations, so they only add the cost of the
+# checks themselves. This can be enabled by modifying the 'VALIDATIONS'
+# attribute below.
 HARDCORE_VALIDATIONS = [validate_data_types]
 
 # The list of validations to run.
@@ -373,9 +581,13 @@ VALIDATIONS = BASIC_VALIDATIONS
 def validate(entries, options_map, log_timings=None, extra_validations=None):
     """Perform all the standard checks on parsed contents.
 
+    The validations which have a Validator class in VALIDATOR_CLASSES are all
+    run together, in a single traversal of the entries. Other validation
+    functions are called on their own.
+
     Args:
       entries: A list of directives.
-      unused_options_map: An options map.
+      options_map: An options map.
       log_timings: An optional function to use for logging the time of individual
         operations.
       extra_validations: A list of extra validation functions to run after loading
@@ -383,16 +595,32 @@ def validate(entries, options_map, log_timings=None, extra_validations=None):
     Returns:
       A list of new errors, if any were found.
     """
-    validation_tests = VALIDATIONS
+    validation_tests = list(VALIDATIONS)
     if extra_validations:
-        validation_tests += extra_validations
-
-    # Run various validation routines define above.
+        validation_tests.extend(extra_validations)
+
+    # Run the validators defined above in a single pass.
+    fused_tests = [validation_function
+                   for validation_function in validation_tests
+                   if validation_function in VALIDATOR_CLASSES]
+    with misc_utils.log_time('validators', log_timings, indent=2):
+        fused_errors = run_validators(
+            entries, options_map,
+            [VALIDATOR_CLASSES[validation_function]
+             for validation_function in fused_tests],
+            log_timings)
+    errors_map = dict(zip(fused_tests, fused_errors))
+
+    # Run the other validation routines and collect the errors in order.
     errors = []
     for validation_function in validation_tests:
-        with misc_utils.log_time('function: {}'.format(validation_function.__name__),
-                                 log_timings, indent=2):
-            new_errors = validation_function(entries, options_map)
+        try:
+            new_errors = errors_map[validation_function]
+        except KeyError:
+            with misc_utils.log_time(
+                    'function: {}'.format(validation_function.__name__),
+                    log_timings, indent=2):
+                new_errors = validation_function(entries, options_map)
         errors.extend(new_errors)
 
     return errors
@@ -2,8 +2,13 @@ __author__ = "Martin Blais <blais@furius.ca>"
 
 import datetime
 import re
+import unittest
+from unittest import mock
 
+from beancount.core.number import D
 from beancount.core import data
+from beancount.core import interpolate
+from beancount.core import position
 from beancount.parser import cmptest
 from beancount.ops import validation
 from beancount import loader
@@ -245,6 +250,39 @@ class TestValidateCurrencyConstraints(cmptest.TestCase):
                                      'expected' in entry.tags)],
                                 [error.entry for error in errors])
 
+    @loader.load_doc(expect_errors=True)
+    def test_validate_currency_constraints__before_open(self, entries, _, options_map):
+        """
+        2014-01-02 * "Posting before the account is open" #expected
+          Assets:Account1             1 CAD
+          Equity:Opening-Balances    -1 CAD
+
+        2014-01-03 open  Assets:Account1    USD
+        """
+        errors = validation.validate_currency_constraints(entries, options_map)
+        self.assertEqual([entries[0]], [error.entry for error in errors])
+
+    @loader.load_doc()
+    def test_validate_currency_constraints__unconstrained(self, entries, _, options_map):
+        """
+        2014-01-01 open  Assets:Account1
+        2014-01-01 open  Assets:Account2    USD
+        2014-01-01 open  Equity:Opening-Balances
+
+        2014-01-02 * "Postings on opened accounts"
+          Assets:Account1             1 CAD
+          Assets:Account2             1 USD
+          Equity:Opening-Balances    -1 CAD
+          Equity:Opening-Balances    -1 USD
+        """
+        validator = validation.CurrencyConstraintsValidator(options_map)
+        for entry in entries:
+            handler = validator.handlers().get(type(entry))
+            if handler is not None:
+                handler(entry)
+        self.assertEqual([], validator.deferred)
+        self.assertEqual([], validator.finish())
+
 
 class TestValidateDocumentPaths(cmptest.TestCase):
 
@@ -293,6 +331,46 @@ class TestValidateCheckTransactionBalances(cmptest.TestCase):
         valid_errors = validation.validate_check_transaction_balances(entries, options_map)
         self.assertEqual([validation.ValidationError], list(map(type, valid_errors)))
 
+    @loader.load_doc()
+    def test_validate_check_transaction_balances__balanced(self, entries, errors,
+                                                           options_map):
+        """
+        2014-01-01 open Assets:Investments:Stock
+        2014-01-01 open Assets:Investments:Cash
+
+        2014-06-24 * "Narration"
+          Assets:Investments:Stock  1 USD
+          Assets:Investments:Cash  -1 USD
+        """
+        # Unbalance the transaction in place and replace it.
+        entry = entries[-1]
+        posting = entry.postings[0]
+        entry.postings[0] = posting._replace(
+            position=position.Position(posting.position.lot, D('2')))
+        new_entry = entry._replace(postings=list(entry.postings))
+        self.assertEqual(2, len(validation.validate_check_transaction_balances(
+            [entry, new_entry], options_map)))
+
+        # Transactions recorded during booking aren't checked, unless their
+        # postings have changed.
+        original_contents = interpolate.get_balance_contents([posting,
+                                                              entry.postings[1]])
+        options_map = dict(options_map, balanced_transactions={
+            id(entry.postings): (entry.postings, original_contents),
+            id(new_entry.postings): (new_entry.postings,
+                                     interpolate.get_balance_contents(new_entry.postings))})
+        self.assertEqual([entry], [error.entry for error in
+                                   validation.validate_check_transaction_balances(
+                                       [entry], options_map)])
+        self.assertEqual([], validation.validate_check_transaction_balances(
+            [new_entry], options_map))
+
+        # Nor if the position of one of their postings is modified in place.
+        new_entry.postings[0].position.number = D('3')
+        self.assertEqual([new_entry], [error.entry for error in
+                                       validation.validate_check_transaction_balances(
+                                           [new_entry], options_map)])
+
 
 class TestValidate(cmptest.TestCase):
 
@@ -327,6 +405,67 @@ class TestValidate(cmptest.TestCase):
         self.assertEqual(1, len(validation_errors))
         self.assertRegexpMatches(validation_errors[0].message, 'Invalid currency')
 
+    @loader.load_doc(expect_errors=True)
+    def test_validate_extra_validations(self, entries, errors, options_map):
+        """
+        2014-01-01 open Assets:Investments:Cash
+        2014-01-01 open Assets:Investments:Cash
+        """
+        def validate_custom(entries, unused_options_map):
+            return [validation.ValidationError(entries[0].meta, "Custom", entries[0])]
+
+        basic_validations = list(validation.VALIDATIONS)
+        validation_errors = validation.validate(
+            entries, options_map,
+            extra_validations=[validate_custom, validation.validate_data_types])
+        self.assertEqual(basic_validations, validation.VALIDATIONS)
+        self.assertEqual(['Duplicate open directive for Assets:Investments:Cash',
+                          'Custom'],
+                         [error.message for error in validation_errors])
+
+    @loader.load_doc()
+    def test_validate_log_timings(self, entries, errors, options_map):
+        """
+        2014-01-01 open Assets:Investments:Cash
+        """
+        lines = []
+        validation.validate(entries, options_map, log_timings=lines.append)
+        for validator_class in validation.VALIDATOR_CLASSES.values():
+            if validator_class is validation.DataTypesValidator:
+                continue
+            self.assertTrue(any(validator_class.__name__ in line for line in lines),
+                            validator_class)
+
+
+class TestRunValidators(unittest.TestCase):
+
+    def test_run_validators(self):
+        meta = data.new_metadata('<validation_test>', 0)
+        date = datetime.date(2014, 3, 3)
+        entries = [data.Open(meta, date, 'Assets:Account1', None, None),
+                   data.Note(meta, date, 'Assets:Account1', 'Note'),
+                   data.Close(meta, date, 'Assets:Account1')]
+
+        class NoteValidator(validation.Validator):
+            def handlers(self):
+                return {data.Note: self.errors.append}
+
+        class AnyValidator(validation.Validator):
+            def handlers(self):
+                return {data.Open: self.errors.append,
+                        object: lambda entry: self.errors.append(type(entry))}
+
+        with mock.patch.object(validation, 'get_type_handlers',
+                               wraps=validation.get_type_handlers) as get_type_handlers:
+            errors_list = validation.run_validators(
+                entries + entries, {}, [NoteValidator, validation.Validator, AnyValidator])
+            # The handlers are looked up once per type.
+            self.assertEqual(3, get_type_handlers.call_count)
+        self.assertEqual([[entries[1], entries[1]],
+                          [],
+                          [entries[0], data.Note, data.Close] * 2],
+                         errors_list)
+
 
 class TestValidateTolerances(cmptest.TestCase):
 
@@ -98,6 +98,14 @@ def convert_lot_specs_to_lots(entries, unused_options_map):
     """
     new_entries = []
     errors = []
+
+    # A mapping of lot keys to a unique shared Lot instance. Most positions are
+    # held in a small number of distinct lots, so sharing the instances (and
+    # their cost Amount objects) saves a lot of memory. Lots compare equal
+    # regardless of the precision of their cost numbers, e.g. 501 and 501.00,
+    # so the key includes the digits and exponent of the number.
+    lots = {}
+
     for entry in entries:
         if not isinstance(entry, Transaction):
             new_entries.append(entry)
@@ -141,6 +149,16 @@ def convert_lot_specs_to_lots(entries, unused_options_map):
                                          'Cost is negative: "{}"'.format(cost), None))
 
                 lot = Lot(currency, cost, lot_date)
+                if cost is not None:
+                    lot_key = (currency,
+                               (cost.number.as_tuple()
+                                if cost.number is not None
+                                else None),
+                               cost.currency,
+                               lot_date)
+                else:
+                    lot_key = (currency, None, None, lot_date)
+                lot = lots.setdefault(lot_key, lot)
                 posting = posting._replace(position=Position(lot, pos.number))
 
             new_postings.append(posting)
@@ -166,15 +184,32 @@ def simple_interpolation(entries, options_map):
     """
     entries_with_lots, errors = convert_lot_specs_to_lots(entries, options_map)
 
+    # If requested, record the transactions which we find to balance, so that
+    # validation does not need to check them again. The legacy tolerances used
+    # to balance differ from those of validation, so they can't be reused.
+    balanced_transactions = options_map.get('balanced_transactions', None)
+    if options_map['use_legacy_fixed_tolerances']:
+        balanced_transactions = None
+    default_tolerances = options_map['default_tolerance']
+
     for entry in entries_with_lots:
         if not isinstance(entry, Transaction):
             continue
         # Balance incomplete auto-postings and set the parent link to this
         # entry as well.
-        balance_errors = interpolate.balance_incomplete_postings(entry, options_map)
+        (balance_errors,
+         residual,
+         tolerances) = interpolate.balance_incomplete_postings_residual(entry,
+                                                                        options_map)
         if balance_errors:
             errors.extend(balance_errors)
 
+        if (balanced_transactions is not None and
+            residual is not None and
+            residual.is_small(tolerances, default_tolerances)):
+            balanced_transactions[id(entry.postings)] = (
+                entry.postings, interpolate.get_balance_contents(entry.postings))
+
         # Check that the balance actually is empty.
         if __sanity_checks__:
             residual = interpolate.compute_residual(entry.postings)
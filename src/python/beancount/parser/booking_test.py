@@ -4,6 +4,7 @@ import re
 import textwrap
 
 from beancount.core.number import D
+from beancount.core import interpolate
 from beancount.parser import parser
 from beancount.parser import cmptest
 from beancount.parser import booking
@@ -24,6 +25,79 @@ class TestSimpleBooking(cmptest.TestCase):
         self.assertFalse(errors)
         self.assertEqual(D('-2505'), interpolated_entries[-1].postings[-1].position.number)
 
+    @parser.parse_doc(allow_incomplete=True)
+    def test_simple_interpolation__balanced_transactions(self, entries, _, options_map):
+        """
+          2013-05-02 *
+            Assets:Bank:Investing                 5 HOOL {501 USD}
+            Assets:Bank:Checking
+
+          2013-05-03 * "Does not balance"
+            Assets:Bank:Investing                 2 HOOL {501 USD}
+            Assets:Bank:Checking              -1000 USD
+
+          2013-05-04 *
+            Assets:Bank:Checking                 10.00 USD
+            Assets:Bank:Savings                 -10.00 USD
+        """
+        options_map['balanced_transactions'] = {}
+        new_entries, errors = booking.simple_interpolation(entries, options_map)
+        self.assertFalse(errors)
+        balanced_transactions = options_map['balanced_transactions']
+        self.assertEqual({id(new_entries[0].postings), id(new_entries[2].postings)},
+                         set(balanced_transactions))
+        postings, contents = balanced_transactions[id(new_entries[0].postings)]
+        self.assertIs(new_entries[0].postings, postings)
+        self.assertEqual(interpolate.get_balance_contents(new_entries[0].postings),
+                         contents)
+
+        # Nothing is recorded with legacy tolerances.
+        options_map['balanced_transactions'] = {}
+        options_map['use_legacy_fixed_tolerances'] = True
+        booking.simple_interpolation(entries, options_map)
+        self.assertEqual({}, options_map['balanced_transactions'])
+
+    @parser.parse_doc()
+    def test_convert_lot_specs_to_lots__shared(self, entries, _, options_map):
+        """
+          2013-05-02 *
+            Assets:Bank:Investing                 5 HOOL {501 USD}
+            Assets:Bank:Checking              -2505 USD
+
+          2013-05-03 *
+            Assets:Bank:Investing                 2 HOOL {501 USD}
+            Assets:Bank:Checking              -1002 USD
+        """
+        lot_entries, errors = booking.convert_lot_specs_to_lots(entries, options_map)
+        self.assertFalse(errors)
+        (hool1, usd1), (hool2, usd2) = [[posting.position.lot
+                                          for posting in entry.postings]
+                                         for entry in lot_entries]
+        self.assertIs(hool1, hool2)
+        self.assertIs(usd1, usd2)
+        self.assertIsNot(hool1, usd1)
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_convert_lot_specs_to_lots__shared_precision(self, entries, _, options_map):
+        """
+          2013-05-02 *
+            Assets:Bank:Investing                 5 HOOL {501 USD}
+            Assets:Bank:Checking
+
+          2013-05-03 *
+            Assets:Bank:Investing                 2 HOOL {501.00 USD}
+            Assets:Bank:Checking
+        """
+        # Equal lots whose costs have different precisions are not shared.
+        new_entries, errors = booking.simple_interpolation(entries, options_map)
+        self.assertFalse(errors)
+        lot1 = new_entries[0].postings[0].position.lot
+        lot2 = new_entries[1].postings[0].position.lot
+        self.assertIsNot(lot1, lot2)
+        self.assertEqual('501', str(lot1.cost.number))
+        self.assertEqual('501.00', str(lot2.cost.number))
+        self.assertEqual('-1002.00', str(new_entries[1].postings[1].position.number))
+
 
 class TestBookingErrors(cmptest.TestCase):
 
@@ -1,8 +1,9 @@
-/* A Bison parser, made by GNU Bison 3.0.4.  */
+/* A Bison parser, made by GNU Bison 3.8.2.  */
 
 /* Bison implementation for Yacc-like parsers in C
 
-   Copyright (C) 1984, 1989-1990, 2000-2015 Free Software Foundation, Inc.
+   Copyright (C) 1984, 1989-1990, 2000-2015, 2018-2021 Free Software Foundation,
+   Inc.
 
    This program is free software: you can redistribute it and/or modify
    it under the terms of the GNU General Public License as published by
@@ -15,7 +16,7 @@
    GNU General Public License for more details.
 
    You should have received a copy of the GNU General Public License
-   along with this program.  If not, see <http://www.gnu.org/licenses/>.  */
+   along with this program.  If not, see <https://www.gnu.org/licenses/>.  */
 
 /* As a special exception, you may create a larger work that contains
    part or all of the Bison parser skeleton and distribute that work
@@ -33,6 +34,10 @@
 /* C LALR(1) parser skeleton written by Richard Stallman, by
    simplifying the original so-called "semantic" parser.  */
 
+/* DO NOT RELY ON FEATURES THAT ARE NOT DOCUMENTED in the manual,
+   especially those whose name start with YY_ or yy_.  They are
+   private implementation details that can be changed or removed.  */
+
 /* All symbols defined below should begin with yy or YY, to avoid
    infringing on user name space.  This should be done even for local
    variables, as they might otherwise be expanded by user macros.
@@ -40,11 +45,11 @@
    define necessary library symbols; they are noted "INFRINGES ON
    USER NAME SPACE" below.  */
 
-/* Identify Bison output.  */
-#define YYBISON 1
+/* Identify Bison output, and Bison version.  */
+#define YYBISON 30802
 
-/* Bison version.  */
-#define YYBISON_VERSION "3.0.4"
+/* Bison version string.  */
+#define YYBISON_VERSION "3.8.2"
 
 /* Skeleton name.  */
 #define YYSKELETON_NAME "yacc.c"
@@ -61,8 +66,8 @@
 
 
 
-/* Copy the first part of user declarations.  */
-#line 11 "src/python/beancount/parser/grammar.y" 
+/* First part of user prologue.  */
+#line 11 "src/python/beancount/parser/grammar.y"
 
 
 #include <stdio.h>
@@ -85,6 +90,46 @@
     }
 
 
+/*
+ * Append an object to a list and store the list in the target, without calling
+ * back into the builder. This is by far the most frequently reduced rule: it
+ * runs for every posting, key-value pair, currency, lot component and entry.
+ * Avoiding a Python method call for each of those makes parsing substantially
+ * faster.
+ */
+#define BUILD_LIST(clean, target, object_list, new_object)                      \
+    target = build_list(object_list, new_object);                               \
+    clean;                                                                      \
+    if (target == NULL) {                                                       \
+        build_grammar_error_from_exception();                                   \
+        YYERROR;                                                                \
+    }
+
+
+/* Create a new reference to a list with an object appended to it. If
+ * 'object_list' is None, a new list is created; if 'new_object' is None, it is
+ * not appended. */
+static PyObject* build_list(PyObject* object_list, PyObject* new_object)
+{
+    if (object_list == Py_None) {
+        object_list = PyList_New(0);
+        if (object_list == NULL) {
+            return NULL;
+        }
+    }
+    else {
+        Py_INCREF(object_list);
+    }
+    if (new_object != Py_None) {
+        if (PyList_Append(object_list, new_object) != 0) {
+            Py_DECREF(object_list);
+            return NULL;
+        }
+    }
+    return object_list;
+}
+
+
 /* First line of reported file/line string. This is used as #line. */
 int yy_firstline;
 
@@ -166,166 +211,224 @@ const char* getTokenName(int token);
 #define DECREF6(x1, x2, x3, x4, x5, x6)    DECREF5(x1, x2, x3, x4, x5); Py_DECREF(x6);
 
 
-#line 170 "src/python/beancount/parser/grammar.c" 
+#line 215 "src/python/beancount/parser/grammar.c"
 
+# ifndef YY_CAST
+#  ifdef __cplusplus
+#   define YY_CAST(Type, Val) static_cast<Type> (Val)
+#   define YY_REINTERPRET_CAST(Type, Val) reinterpret_cast<Type> (Val)
+#  else
+#   define YY_CAST(Type, Val) ((Type) (Val))
+#   define YY_REINTERPRET_CAST(Type, Val) ((Type) (Val))
+#  endif
+# endif
 # ifndef YY_NULLPTR
-#  if defined __cplusplus && 201103L <= __cplusplus
-#   define YY_NULLPTR nullptr
+#  if defined __cplusplus
+#   if 201103L <= __cplusplus
+#    define YY_NULLPTR nullptr
+#   else
+#    define YY_NULLPTR 0
+#   endif
 #  else
-#   define YY_NULLPTR 0
+#   define YY_NULLPTR ((void*)0)
 #  endif
 # endif
 
-/* Enabling verbose error messages.  */
-#ifdef YYERROR_VERBOSE
-# undef YYERROR_VERBOSE
-# define YYERROR_VERBOSE 1
-#else
-# define YYERROR_VERBOSE 1
-#endif
-
-/* In a future release of Bison, this section will be replaced
-   by #include "grammar.h".  */
-#ifndef YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
-# define YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
-/* Debug traces.  */
-#ifndef YYDEBUG
-# define YYDEBUG 1
-#endif
-#if YYDEBUG
-extern int yydebug;
-#endif
-
-/* Token type.  */
-#ifndef YYTOKENTYPE
-# define YYTOKENTYPE
-  enum yytokentype
-  {
-    LEX_ERROR = 258,
-    INDENT = 259,
-    EOL = 260,
-    COMMENT = 261,
-    SKIPPED = 262,
-    PIPE = 263,
-    ATAT = 264,
-    AT = 265,
-    LCURLCURL = 266,
-    RCURLCURL = 267,
-    LCURL = 268,
-    RCURL = 269,
-    EQUAL = 270,
-    COMMA = 271,
-    TILDE = 272,
-    HASH = 273,
-    ASTERISK = 274,
-    SLASH = 275,
-    PLUS = 276,
-    MINUS = 277,
-    LPAREN = 278,
-    RPAREN = 279,
-    FLAG = 280,
-    TXN = 281,
-    BALANCE = 282,
-    OPEN = 283,
-    CLOSE = 284,
-    COMMODITY = 285,
-    PAD = 286,
-    EVENT = 287,
-    PRICE = 288,
-    NOTE = 289,
-    DOCUMENT = 290,
-    QUERY = 291,
-    PUSHTAG = 292,
-    POPTAG = 293,
-    OPTION = 294,
-    INCLUDE = 295,
-    PLUGIN = 296,
-    BOOL = 297,
-    DATE = 298,
-    ACCOUNT = 299,
-    CURRENCY = 300,
-    STRING = 301,
-    NUMBER = 302,
-    TAG = 303,
-    LINK = 304,
-    KEY = 305,
-    NEGATIVE = 306
-  };
-#endif
-
-/* Value type.  */
-#if ! defined YYSTYPE && ! defined YYSTYPE_IS_DECLARED
-
-union YYSTYPE
+#include "grammar.h"
+/* Symbol kind.  */
+enum yysymbol_kind_t
 {
-#line 130 "src/python/beancount/parser/grammar.y" 
-
-    char character;
-    const char* string;
-    PyObject* pyobj;
-    struct {
-        PyObject* pyobj1;
-        PyObject* pyobj2;
-    } pairobj;
-
-#line 272 "src/python/beancount/parser/grammar.c" 
+  YYSYMBOL_YYEMPTY = -2,
+  YYSYMBOL_YYEOF = 0,                      /* "end of file"  */
+  YYSYMBOL_YYerror = 1,                    /* error  */
+  YYSYMBOL_YYUNDEF = 2,                    /* "invalid token"  */
+  YYSYMBOL_LEX_ERROR = 3,                  /* LEX_ERROR  */
+  YYSYMBOL_INDENT = 4,                     /* INDENT  */
+  YYSYMBOL_EOL = 5,                        /* EOL  */
+  YYSYMBOL_COMMENT = 6,                    /* COMMENT  */
+  YYSYMBOL_SKIPPED = 7,                    /* SKIPPED  */
+  YYSYMBOL_PIPE = 8,                       /* PIPE  */
+  YYSYMBOL_ATAT = 9,                       /* ATAT  */
+  YYSYMBOL_AT = 10,                        /* AT  */
+  YYSYMBOL_LCURLCURL = 11,                 /* LCURLCURL  */
+  YYSYMBOL_RCURLCURL = 12,                 /* RCURLCURL  */
+  YYSYMBOL_LCURL = 13,                     /* LCURL  */
+  YYSYMBOL_RCURL = 14,                     /* RCURL  */
+  YYSYMBOL_EQUAL = 15,                     /* EQUAL  */
+  YYSYMBOL_COMMA = 16,                     /* COMMA  */
+  YYSYMBOL_TILDE = 17,                     /* TILDE  */
+  YYSYMBOL_HASH = 18,                      /* HASH  */
+  YYSYMBOL_ASTERISK = 19,                  /* ASTERISK  */
+  YYSYMBOL_SLASH = 20,                     /* SLASH  */
+  YYSYMBOL_PLUS = 21,                      /* PLUS  */
+  YYSYMBOL_MINUS = 22,                     /* MINUS  */
+  YYSYMBOL_LPAREN = 23,                    /* LPAREN  */
+  YYSYMBOL_RPAREN = 24,                    /* RPAREN  */
+  YYSYMBOL_FLAG = 25,                      /* FLAG  */
+  YYSYMBOL_TXN = 26,                       /* TXN  */
+  YYSYMBOL_BALANCE = 27,                   /* BALANCE  */
+  YYSYMBOL_OPEN = 28,                      /* OPEN  */
+  YYSYMBOL_CLOSE = 29,                     /* CLOSE  */
+  YYSYMBOL_COMMODITY = 30,                 /* COMMODITY  */
+  YYSYMBOL_PAD = 31,                       /* PAD  */
+  YYSYMBOL_EVENT = 32,                     /* EVENT  */
+  YYSYMBOL_PRICE = 33,                     /* PRICE  */
+  YYSYMBOL_NOTE = 34,                      /* NOTE  */
+  YYSYMBOL_DOCUMENT = 35,                  /* DOCUMENT  */
+  YYSYMBOL_QUERY = 36,                     /* QUERY  */
+  YYSYMBOL_PUSHTAG = 37,                   /* PUSHTAG  */
+  YYSYMBOL_POPTAG = 38,                    /* POPTAG  */
+  YYSYMBOL_OPTION = 39,                    /* OPTION  */
+  YYSYMBOL_INCLUDE = 40,                   /* INCLUDE  */
+  YYSYMBOL_PLUGIN = 41,                    /* PLUGIN  */
+  YYSYMBOL_BOOL = 42,                      /* BOOL  */
+  YYSYMBOL_DATE = 43,                      /* DATE  */
+  YYSYMBOL_ACCOUNT = 44,                   /* ACCOUNT  */
+  YYSYMBOL_CURRENCY = 45,                  /* CURRENCY  */
+  YYSYMBOL_STRING = 46,                    /* STRING  */
+  YYSYMBOL_NUMBER = 47,                    /* NUMBER  */
+  YYSYMBOL_TAG = 48,                       /* TAG  */
+  YYSYMBOL_LINK = 49,                      /* LINK  */
+  YYSYMBOL_KEY = 50,                       /* KEY  */
+  YYSYMBOL_NEGATIVE = 51,                  /* NEGATIVE  */
+  YYSYMBOL_YYACCEPT = 52,                  /* $accept  */
+  YYSYMBOL_empty = 53,                     /* empty  */
+  YYSYMBOL_txn = 54,                       /* txn  */
+  YYSYMBOL_eol = 55,                       /* eol  */
+  YYSYMBOL_empty_line = 56,                /* empty_line  */
+  YYSYMBOL_number_expr = 57,               /* number_expr  */
+  YYSYMBOL_txn_fields = 58,                /* txn_fields  */
+  YYSYMBOL_transaction = 59,               /* transaction  */
+  YYSYMBOL_optflag = 60,                   /* optflag  */
+  YYSYMBOL_price_annotation = 61,          /* price_annotation  */
+  YYSYMBOL_posting = 62,                   /* posting  */
+  YYSYMBOL_key_value = 63,                 /* key_value  */
+  YYSYMBOL_key_value_value = 64,           /* key_value_value  */
+  YYSYMBOL_posting_or_kv_list = 65,        /* posting_or_kv_list  */
+  YYSYMBOL_key_value_list = 66,            /* key_value_list  */
+  YYSYMBOL_currency_list = 67,             /* currency_list  */
+  YYSYMBOL_pushtag = 68,                   /* pushtag  */
+  YYSYMBOL_poptag = 69,                    /* poptag  */
+  YYSYMBOL_open = 70,                      /* open  */
+  YYSYMBOL_opt_booking = 71,               /* opt_booking  */
+  YYSYMBOL_close = 72,                     /* close  */
+  YYSYMBOL_commodity = 73,                 /* commodity  */
+  YYSYMBOL_pad = 74,                       /* pad  */
+  YYSYMBOL_balance = 75,                   /* balance  */
+  YYSYMBOL_amount = 76,                    /* amount  */
+  YYSYMBOL_amount_tolerance = 77,          /* amount_tolerance  */
+  YYSYMBOL_maybe_number = 78,              /* maybe_number  */
+  YYSYMBOL_compound_amount = 79,           /* compound_amount  */
+  YYSYMBOL_incomplete_amount = 80,         /* incomplete_amount  */
+  YYSYMBOL_position = 81,                  /* position  */
+  YYSYMBOL_lot_spec = 82,                  /* lot_spec  */
+  YYSYMBOL_lot_spec_total_legacy = 83,     /* lot_spec_total_legacy  */
+  YYSYMBOL_lot_comp_list = 84,             /* lot_comp_list  */
+  YYSYMBOL_lot_comp = 85,                  /* lot_comp  */
+  YYSYMBOL_price = 86,                     /* price  */
+  YYSYMBOL_event = 87,                     /* event  */
+  YYSYMBOL_query = 88,                     /* query  */
+  YYSYMBOL_note = 89,                      /* note  */
+  YYSYMBOL_filename = 90,                  /* filename  */
+  YYSYMBOL_document = 91,                  /* document  */
+  YYSYMBOL_entry = 92,                     /* entry  */
+  YYSYMBOL_option = 93,                    /* option  */
+  YYSYMBOL_include = 94,                   /* include  */
+  YYSYMBOL_plugin = 95,                    /* plugin  */
+  YYSYMBOL_directive = 96,                 /* directive  */
+  YYSYMBOL_declarations = 97,              /* declarations  */
+  YYSYMBOL_file = 98                       /* file  */
 };
+typedef enum yysymbol_kind_t yysymbol_kind_t;
 
-typedef union YYSTYPE YYSTYPE;
-# define YYSTYPE_IS_TRIVIAL 1
-# define YYSTYPE_IS_DECLARED 1
-#endif
-
-/* Location type.  */
-#if ! defined YYLTYPE && ! defined YYLTYPE_IS_DECLARED
-typedef struct YYLTYPE YYLTYPE;
-struct YYLTYPE
-{
-  int first_line;
-  int first_column;
-  int last_line;
-  int last_column;
-};
-# define YYLTYPE_IS_DECLARED 1
-# define YYLTYPE_IS_TRIVIAL 1
-#endif
 
 
 
-int yyparse (void);
+#ifdef short
+# undef short
+#endif
 
-#endif /* !YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED  */
+/* On compilers that do not define __PTRDIFF_MAX__ etc., make sure
+   <limits.h> and (if available) <stdint.h> are included
+   so that the code can choose integer types of a good width.  */
 
-/* Copy the second part of user declarations.  */
+#ifndef __PTRDIFF_MAX__
+# include <limits.h> /* INFRINGES ON USER NAME SPACE */
+# if defined __STDC_VERSION__ && 199901 <= __STDC_VERSION__
+#  include <stdint.h> /* INFRINGES ON USER NAME SPACE */
+#  define YY_STDINT_H
+# endif
+#endif
 
-#line 302 "src/python/beancount/parser/grammar.c" 
+/* Narrow types that promote to a signed type and that can represent a
+   signed or unsigned integer of at least N bits.  In tables they can
+   save space and decrease cache pressure.  Promoting to a signed type
+   helps avoid bugs in integer arithmetic.  */
 
-#ifdef short
-# undef short
+#ifdef __INT_LEAST8_MAX__
+typedef __INT_LEAST8_TYPE__ yytype_int8;
+#elif defined YY_STDINT_H
+typedef int_least8_t yytype_int8;
+#else
+typedef signed char yytype_int8;
 #endif
 
-#ifdef YYTYPE_UINT8
-typedef YYTYPE_UINT8 yytype_uint8;
+#ifdef __INT_LEAST16_MAX__
+typedef __INT_LEAST16_TYPE__ yytype_int16;
+#elif defined YY_STDINT_H
+typedef int_least16_t yytype_int16;
 #else
-typedef unsigned char yytype_uint8;
+typedef short yytype_int16;
 #endif
 
-#ifdef YYTYPE_INT8
-typedef YYTYPE_INT8 yytype_int8;
-#else
-typedef signed char yytype_int8;
+/* Work around bug in HP-UX 11.23, which defines these macros
+   incorrectly for preprocessor constants.  This workaround can likely
+   be removed in 2023, as HPE has promised support for HP-UX 11.23
+   (aka HP-UX 11i v2) only through the end of 2022; see Table 2 of
+   <https://h20195.www2.hpe.com/V2/getpdf.aspx/4AA4-7673ENW.pdf>.  */
+#ifdef __hpux
+# undef UINT_LEAST8_MAX
+# undef UINT_LEAST16_MAX
+# define UINT_LEAST8_MAX 255
+# define UINT_LEAST16_MAX 65535
 #endif
 
-#ifdef YYTYPE_UINT16
-typedef YYTYPE_UINT16 yytype_uint16;
+#if defined __UINT_LEAST8_MAX__ && __UINT_LEAST8_MAX__ <= __INT_MAX__
+typedef __UINT_LEAST8_TYPE__ yytype_uint8;
+#elif (!defined __UINT_LEAST8_MAX__ && defined YY_STDINT_H \
+       && UINT_LEAST8_MAX <= INT_MAX)
+typedef uint_least8_t yytype_uint8;
+#elif !defined __UINT_LEAST8_MAX__ && UCHAR_MAX <= INT_MAX
+typedef unsigned char yytype_uint8;
 #else
-typedef unsigned short int yytype_uint16;
+typedef short yytype_uint8;
 #endif
 
-#ifdef YYTYPE_INT16
-typedef YYTYPE_INT16 yytype_int16;
+#if defined __UINT_LEAST16_MAX__ && __UINT_LEAST16_MAX__ <= __INT_MAX__
+typedef __UINT_LEAST16_TYPE__ yytype_uint16;
+#elif (!defined __UINT_LEAST16_MAX__ && defined YY_STDINT_H \
+       && UINT_LEAST16_MAX <= INT_MAX)
+typedef uint_least16_t yytype_uint16;
+#elif !defined __UINT_LEAST16_MAX__ && USHRT_MAX <= INT_MAX
+typedef unsigned short yytype_uint16;
 #else
-typedef short int yytype_int16;
+typedef int yytype_uint16;
+#endif
+
+#ifndef YYPTRDIFF_T
+# if defined __PTRDIFF_TYPE__ && defined __PTRDIFF_MAX__
+#  define YYPTRDIFF_T __PTRDIFF_TYPE__
+#  define YYPTRDIFF_MAXIMUM __PTRDIFF_MAX__
+# elif defined PTRDIFF_MAX
+#  ifndef ptrdiff_t
+#   include <stddef.h> /* INFRINGES ON USER NAME SPACE */
+#  endif
+#  define YYPTRDIFF_T ptrdiff_t
+#  define YYPTRDIFF_MAXIMUM PTRDIFF_MAX
+# else
+#  define YYPTRDIFF_T long
+#  define YYPTRDIFF_MAXIMUM LONG_MAX
+# endif
 #endif
 
 #ifndef YYSIZE_T
@@ -333,15 +436,28 @@ typedef short int yytype_int16;
 #  define YYSIZE_T __SIZE_TYPE__
 # elif defined size_t
 #  define YYSIZE_T size_t
-# elif ! defined YYSIZE_T
+# elif defined __STDC_VERSION__ && 199901 <= __STDC_VERSION__
 #  include <stddef.h> /* INFRINGES ON USER NAME SPACE */
 #  define YYSIZE_T size_t
 # else
-#  define YYSIZE_T unsigned int
+#  define YYSIZE_T unsigned
 # endif
 #endif
 
-#define YYSIZE_MAXIMUM ((YYSIZE_T) -1)
+#define YYSIZE_MAXIMUM                                  \
+  YY_CAST (YYPTRDIFF_T,                                 \
+           (YYPTRDIFF_MAXIMUM < YY_CAST (YYSIZE_T, -1)  \
+            ? YYPTRDIFF_MAXIMUM                         \
+            : YY_CAST (YYSIZE_T, -1)))
+
+#define YYSIZEOF(X) YY_CAST (YYPTRDIFF_T, sizeof (X))
+
+
+/* Stored state numbers (used for stacks). */
+typedef yytype_uint8 yy_state_t;
+
+/* State numbers in computations.  */
+typedef int yy_state_fast_t;
 
 #ifndef YY_
 # if defined YYENABLE_NLS && YYENABLE_NLS
@@ -355,47 +471,43 @@ typedef short int yytype_int16;
 # endif
 #endif
 
-#ifndef YY_ATTRIBUTE
-# if (defined __GNUC__                                               \
-      && (2 < __GNUC__ || (__GNUC__ == 2 && 96 <= __GNUC_MINOR__)))  \
-     || defined __SUNPRO_C && 0x5110 <= __SUNPRO_C
-#  define YY_ATTRIBUTE(Spec) __attribute__(Spec)
-# else
-#  define YY_ATTRIBUTE(Spec) /* empty */
-# endif
-#endif
 
 #ifndef YY_ATTRIBUTE_PURE
-# define YY_ATTRIBUTE_PURE   YY_ATTRIBUTE ((__pure__))
+# if defined __GNUC__ && 2 < __GNUC__ + (96 <= __GNUC_MINOR__)
+#  define YY_ATTRIBUTE_PURE __attribute__ ((__pure__))
+# else
+#  define YY_ATTRIBUTE_PURE
+# endif
 #endif
 
 #ifndef YY_ATTRIBUTE_UNUSED
-# define YY_ATTRIBUTE_UNUSED YY_ATTRIBUTE ((__unused__))
-#endif
-
-#if !defined _Noreturn \
-     && (!defined __STDC_VERSION__ || __STDC_VERSION__ < 201112)
-# if defined _MSC_VER && 1200 <= _MSC_VER
-#  define _Noreturn __declspec (noreturn)
+# if defined __GNUC__ && 2 < __GNUC__ + (7 <= __GNUC_MINOR__)
+#  define YY_ATTRIBUTE_UNUSED __attribute__ ((__unused__))
 # else
-#  define _Noreturn YY_ATTRIBUTE ((__noreturn__))
+#  define YY_ATTRIBUTE_UNUSED
 # endif
 #endif
 
 /* Suppress unused-variable warnings by "using" E.  */
 #if ! defined lint || defined __GNUC__
-# define YYUSE(E) ((void) (E))
+# define YY_USE(E) ((void) (E))
 #else
-# define YYUSE(E) /* empty */
+# define YY_USE(E) /* empty */
 #endif
 
-#if defined __GNUC__ && 407 <= __GNUC__ * 100 + __GNUC_MINOR__
 /* Suppress an incorrect diagnostic about yylval being uninitialized.  */
-# define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN \
-    _Pragma ("GCC diagnostic push") \
-    _Pragma ("GCC diagnostic ignored \"-Wuninitialized\"")\
+#if defined __GNUC__ && ! defined __ICC && 406 <= __GNUC__ * 100 + __GNUC_MINOR__
+# if __GNUC__ * 100 + __GNUC_MINOR__ < 407
+#  define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN                           \
+    _Pragma ("GCC diagnostic push")                                     \
+    _Pragma ("GCC diagnostic ignored \"-Wuninitialized\"")
+# else
+#  define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN                           \
+    _Pragma ("GCC diagnostic push")                                     \
+    _Pragma ("GCC diagnostic ignored \"-Wuninitialized\"")              \
     _Pragma ("GCC diagnostic ignored \"-Wmaybe-uninitialized\"")
-# define YY_IGNORE_MAYBE_UNINITIALIZED_END \
+# endif
+# define YY_IGNORE_MAYBE_UNINITIALIZED_END      \
     _Pragma ("GCC diagnostic pop")
 #else
 # define YY_INITIAL_VALUE(Value) Value
@@ -408,8 +520,22 @@ typedef short int yytype_int16;
 # define YY_INITIAL_VALUE(Value) /* Nothing. */
 #endif
 
+#if defined __cplusplus && defined __GNUC__ && ! defined __ICC && 6 <= __GNUC__
+# define YY_IGNORE_USELESS_CAST_BEGIN                          \
+    _Pragma ("GCC diagnostic push")                            \
+    _Pragma ("GCC diagnostic ignored \"-Wuseless-cast\"")
+# define YY_IGNORE_USELESS_CAST_END            \
+    _Pragma ("GCC diagnostic pop")
+#endif
+#ifndef YY_IGNORE_USELESS_CAST_BEGIN
+# define YY_IGNORE_USELESS_CAST_BEGIN
+# define YY_IGNORE_USELESS_CAST_END
+#endif
+
+
+#define YY_ASSERT(E) ((void) (0 && (E)))
 
-#if ! defined yyoverflow || YYERROR_VERBOSE
+#if 1
 
 /* The parser invokes alloca or malloc; define the necessary symbols.  */
 
@@ -474,8 +600,7 @@ void free (void *); /* INFRINGES ON USER NAME SPACE */
 #   endif
 #  endif
 # endif
-#endif /* ! defined yyoverflow || YYERROR_VERBOSE */
-
+#endif /* 1 */
 
 #if (! defined yyoverflow \
      && (! defined __cplusplus \
@@ -485,18 +610,19 @@ void free (void *); /* INFRINGES ON USER NAME SPACE */
 /* A type that is properly aligned for any stack member.  */
 union yyalloc
 {
-  yytype_int16 yyss_alloc;
+  yy_state_t yyss_alloc;
   YYSTYPE yyvs_alloc;
   YYLTYPE yyls_alloc;
 };
 
 /* The size of the maximum gap between one aligned stack and the next.  */
-# define YYSTACK_GAP_MAXIMUM (sizeof (union yyalloc) - 1)
+# define YYSTACK_GAP_MAXIMUM (YYSIZEOF (union yyalloc) - 1)
 
 /* The size of an array large to enough to hold all stacks, each with
    N elements.  */
 # define YYSTACK_BYTES(N) \
-     ((N) * (sizeof (yytype_int16) + sizeof (YYSTYPE) + sizeof (YYLTYPE)) \
+     ((N) * (YYSIZEOF (yy_state_t) + YYSIZEOF (YYSTYPE) \
+             + YYSIZEOF (YYLTYPE)) \
       + 2 * YYSTACK_GAP_MAXIMUM)
 
 # define YYCOPY_NEEDED 1
@@ -509,11 +635,11 @@ union yyalloc
 # define YYSTACK_RELOCATE(Stack_alloc, Stack)                           \
     do                                                                  \
       {                                                                 \
-        YYSIZE_T yynewbytes;                                            \
+        YYPTRDIFF_T yynewbytes;                                         \
         YYCOPY (&yyptr->Stack_alloc, Stack, yysize);                    \
         Stack = &yyptr->Stack_alloc;                                    \
-        yynewbytes = yystacksize * sizeof (*Stack) + YYSTACK_GAP_MAXIMUM; \
-        yyptr += yynewbytes / sizeof (*yyptr);                          \
+        yynewbytes = yystacksize * YYSIZEOF (*Stack) + YYSTACK_GAP_MAXIMUM; \
+        yyptr += yynewbytes / YYSIZEOF (*yyptr);                        \
       }                                                                 \
     while (0)
 
@@ -525,12 +651,12 @@ union yyalloc
 # ifndef YYCOPY
 #  if defined __GNUC__ && 1 < __GNUC__
 #   define YYCOPY(Dst, Src, Count) \
-      __builtin_memcpy (Dst, Src, (Count) * sizeof (*(Src)))
+      __builtin_memcpy (Dst, Src, YY_CAST (YYSIZE_T, (Count)) * sizeof (*(Src)))
 #  else
 #   define YYCOPY(Dst, Src, Count)              \
       do                                        \
         {                                       \
-          YYSIZE_T yyi;                         \
+          YYPTRDIFF_T yyi;                      \
           for (yyi = 0; yyi < (Count); yyi++)   \
             (Dst)[yyi] = (Src)[yyi];            \
         }                                       \
@@ -553,17 +679,20 @@ union yyalloc
 /* YYNSTATES -- Number of states.  */
 #define YYNSTATES  212
 
-/* YYTRANSLATE[YYX] -- Symbol number corresponding to YYX as returned
-   by yylex, with out-of-bounds checking.  */
-#define YYUNDEFTOK  2
+/* YYMAXUTOK -- Last valid token kind.  */
 #define YYMAXUTOK   306
 
-#define YYTRANSLATE(YYX)                                                \
-  ((unsigned int) (YYX) <= YYMAXUTOK ? yytranslate[YYX] : YYUNDEFTOK)
+
+/* YYTRANSLATE(TOKEN-NUM) -- Symbol number corresponding to TOKEN-NUM
+   as returned by yylex, with out-of-bounds checking.  */
+#define YYTRANSLATE(YYX)                                \
+  (0 <= (YYX) && (YYX) <= YYMAXUTOK                     \
+   ? YY_CAST (yysymbol_kind_t, yytranslate[YYX])        \
+   : YYSYMBOL_YYUNDEF)
 
 /* YYTRANSLATE[TOKEN-NUM] -- Symbol number corresponding to TOKEN-NUM
-   as returned by yylex, without out-of-bounds checking.  */
-static const yytype_uint8 yytranslate[] =
+   as returned by yylex.  */
+static const yytype_int8 yytranslate[] =
 {
        0,     2,     2,     2,     2,     2,     2,     2,     2,     2,
        2,     2,     2,     2,     2,     2,     2,     2,     2,     2,
@@ -599,37 +728,44 @@ static const yytype_uint8 yytranslate[] =
 };
 
 #if YYDEBUG
-  /* YYRLINE[YYN] -- Source line where rule number YYN was defined.  */
-static const yytype_uint16 yyrline[] =
+/* YYRLINE[YYN] -- Source line where rule number YYN was defined.  */
+static const yytype_int16 yyrline[] =
 {
-       0,   253,   253,   256,   260,   264,   268,   273,   274,   278,
-     279,   280,   281,   282,   288,   292,   297,   302,   307,   312,
-     317,   321,   326,   334,   339,   344,   349,   356,   362,   366,
-     370,   374,   376,   380,   386,   391,   396,   401,   407,   413,
-     414,   415,   416,   417,   418,   419,   420,   424,   430,   435,
-     440,   446,   451,   457,   462,   467,   473,   479,   485,   492,
-     496,   502,   508,   514,   520,   526,   532,   540,   547,   552,
-     557,   562,   569,   575,   580,   586,   591,   597,   602,   608,
-     613,   618,   623,   639,   643,   647,   651,   658,   664,   670,
-     676,   682,   684,   690,   691,   692,   693,   694,   695,   696,
-     697,   698,   699,   700,   705,   711,   717,   722,   728,   729,
-     730,   731,   732,   733,   734,   737,   741,   746,   764,   771
+       0,   293,   293,   296,   300,   304,   308,   313,   314,   318,
+     319,   320,   321,   322,   328,   332,   337,   342,   347,   352,
+     357,   361,   366,   374,   379,   384,   389,   396,   402,   406,
+     410,   414,   416,   420,   426,   431,   436,   441,   447,   453,
+     454,   455,   456,   457,   458,   459,   460,   464,   470,   475,
+     480,   486,   491,   497,   502,   507,   513,   519,   525,   532,
+     536,   542,   548,   554,   560,   566,   572,   580,   587,   592,
+     597,   602,   609,   615,   620,   626,   631,   637,   642,   648,
+     653,   658,   663,   679,   683,   687,   691,   698,   704,   710,
+     716,   722,   724,   730,   731,   732,   733,   734,   735,   736,
+     737,   738,   739,   740,   745,   751,   757,   762,   768,   769,
+     770,   771,   772,   773,   774,   777,   781,   786,   804,   811
 };
 #endif
 
-#if YYDEBUG || YYERROR_VERBOSE || 1
+/** Accessing symbol of state STATE.  */
+#define YY_ACCESSING_SYMBOL(State) YY_CAST (yysymbol_kind_t, yystos[State])
+
+#if 1
+/* The user-facing name of the symbol whose (internal) number is
+   YYSYMBOL.  No bounds checking.  */
+static const char *yysymbol_name (yysymbol_kind_t yysymbol) YY_ATTRIBUTE_UNUSED;
+
 /* YYTNAME[SYMBOL-NUM] -- String name of the symbol SYMBOL-NUM.
    First, the terminals, then, starting at YYNTOKENS, nonterminals.  */
 static const char *const yytname[] =
 {
-  "$end", "error", "$undefined", "LEX_ERROR", "INDENT", "EOL", "COMMENT",
-  "SKIPPED", "PIPE", "ATAT", "AT", "LCURLCURL", "RCURLCURL", "LCURL",
-  "RCURL", "EQUAL", "COMMA", "TILDE", "HASH", "ASTERISK", "SLASH", "PLUS",
-  "MINUS", "LPAREN", "RPAREN", "FLAG", "TXN", "BALANCE", "OPEN", "CLOSE",
-  "COMMODITY", "PAD", "EVENT", "PRICE", "NOTE", "DOCUMENT", "QUERY",
-  "PUSHTAG", "POPTAG", "OPTION", "INCLUDE", "PLUGIN", "BOOL", "DATE",
-  "ACCOUNT", "CURRENCY", "STRING", "NUMBER", "TAG", "LINK", "KEY",
-  "NEGATIVE", "$accept", "empty", "txn", "eol", "empty_line",
+  "\"end of file\"", "error", "\"invalid token\"", "LEX_ERROR", "INDENT",
+  "EOL", "COMMENT", "SKIPPED", "PIPE", "ATAT", "AT", "LCURLCURL",
+  "RCURLCURL", "LCURL", "RCURL", "EQUAL", "COMMA", "TILDE", "HASH",
+  "ASTERISK", "SLASH", "PLUS", "MINUS", "LPAREN", "RPAREN", "FLAG", "TXN",
+  "BALANCE", "OPEN", "CLOSE", "COMMODITY", "PAD", "EVENT", "PRICE", "NOTE",
+  "DOCUMENT", "QUERY", "PUSHTAG", "POPTAG", "OPTION", "INCLUDE", "PLUGIN",
+  "BOOL", "DATE", "ACCOUNT", "CURRENCY", "STRING", "NUMBER", "TAG", "LINK",
+  "KEY", "NEGATIVE", "$accept", "empty", "txn", "eol", "empty_line",
   "number_expr", "txn_fields", "transaction", "optflag",
   "price_annotation", "posting", "key_value", "key_value_value",
   "posting_or_kv_list", "key_value_list", "currency_list", "pushtag",
@@ -640,34 +776,26 @@ static const char *const yytname[] =
   "filename", "document", "entry", "option", "include", "plugin",
   "directive", "declarations", "file", YY_NULLPTR
 };
-#endif
 
-# ifdef YYPRINT
-/* YYTOKNUM[NUM] -- (External) token number corresponding to the
-   (internal) symbol number NUM (which must be that of a token).  */
-static const yytype_uint16 yytoknum[] =
+static const char *
+yysymbol_name (yysymbol_kind_t yysymbol)
 {
-       0,   256,   257,   258,   259,   260,   261,   262,   263,   264,
-     265,   266,   267,   268,   269,   270,   271,   272,   273,   274,
-     275,   276,   277,   278,   279,   280,   281,   282,   283,   284,
-     285,   286,   287,   288,   289,   290,   291,   292,   293,   294,
-     295,   296,   297,   298,   299,   300,   301,   302,   303,   304,
-     305,   306
-};
-# endif
+  return yytname[yysymbol];
+}
+#endif
 
-#define YYPACT_NINF -186
+#define YYPACT_NINF (-186)
 
-#define yypact_value_is_default(Yystate) \
-  (!!((Yystate) == (-186)))
+#define yypact_value_is_default(Yyn) \
+  ((Yyn) == YYPACT_NINF)
 
-#define YYTABLE_NINF -120
+#define YYTABLE_NINF (-120)
 
-#define yytable_value_is_error(Yytable_value) \
+#define yytable_value_is_error(Yyn) \
   0
 
-  /* YYPACT[STATE-NUM] -- Index in YYTABLE of the portion describing
-     STATE-NUM.  */
+/* YYPACT[STATE-NUM] -- Index in YYTABLE of the portion describing
+   STATE-NUM.  */
 static const yytype_int16 yypact[] =
 {
     -186,  -186,    85,     5,  -186,    17,  -186,    23,  -186,    11,
@@ -694,10 +822,10 @@ static const yytype_int16 yypact[] =
     -186,  -186
 };
 
-  /* YYDEFACT[STATE-NUM] -- Default reduction number in state STATE-NUM.
-     Performed when YYTABLE does not specify something else to do.  Zero
-     means the default is an error.  */
-static const yytype_uint8 yydefact[] =
+/* YYDEFACT[STATE-NUM] -- Default reduction number in state STATE-NUM.
+   Performed when YYTABLE does not specify something else to do.  Zero
+   means the default is an error.  */
+static const yytype_int8 yydefact[] =
 {
        2,   118,     0,     0,   117,    12,     9,    13,   108,     0,
        0,     0,     0,     0,     0,   109,    93,   110,   111,    95,
@@ -723,7 +851,7 @@ static const yytype_uint8 yydefact[] =
       78,    71
 };
 
-  /* YYPGOTO[NTERM-NUM].  */
+/* YYPGOTO[NTERM-NUM].  */
 static const yytype_int16 yypgoto[] =
 {
     -186,     0,  -186,   -37,  -186,   -38,  -186,  -186,  -186,    30,
@@ -733,19 +861,19 @@ static const yytype_int16 yypgoto[] =
     -186,  -186,  -186,  -186,  -186,  -186,  -186
 };
 
-  /* YYDEFGOTO[NTERM-NUM].  */
-static const yytype_int16 yydefgoto[] =
+/* YYDEFGOTO[NTERM-NUM].  */
+static const yytype_uint8 yydefgoto[] =
 {
-      -1,   118,    56,    59,    15,   172,    76,    16,   157,   194,
+       0,   118,    56,    59,    15,   172,    76,    16,   157,   194,
      148,   140,   166,   129,   119,    88,    17,    18,    19,   117,
       20,    21,    22,    23,    94,    85,   173,   190,   195,   175,
      179,   180,   191,   192,    24,    25,    26,    27,    97,    28,
       29,    30,    31,    32,    33,     2,     3
 };
 
-  /* YYTABLE[YYPACT[STATE-NUM]] -- What to do in state STATE-NUM.  If
-     positive, shift that token.  If negative, reduce the rule whose
-     number is the opposite.  If YYTABLE_NINF, syntax error.  */
+/* YYTABLE[YYPACT[STATE-NUM]] -- What to do in state STATE-NUM.  If
+   positive, shift that token.  If negative, reduce the rule whose
+   number is the opposite.  If YYTABLE_NINF, syntax error.  */
 static const yytype_int16 yytable[] =
 {
        1,    60,   114,    62,    64,    34,   197,    57,    58,   153,
@@ -798,9 +926,9 @@ static const yytype_uint8 yycheck[] =
       12,    45,   182,   129,   168
 };
 
-  /* YYSTOS[STATE-NUM] -- The (internal number of the) accessing
-     symbol of state STATE-NUM.  */
-static const yytype_uint8 yystos[] =
+/* YYSTOS[STATE-NUM] -- The symbol kind of the accessing symbol of
+   state STATE-NUM.  */
+static const yytype_int8 yystos[] =
 {
        0,    53,    97,    98,     1,     4,     5,     6,     7,    37,
       38,    39,    40,    41,    43,    56,    59,    68,    69,    70,
@@ -826,8 +954,8 @@ static const yytype_uint8 yystos[] =
       12,    45
 };
 
-  /* YYR1[YYN] -- Symbol number of symbol that rule YYN derives.  */
-static const yytype_uint8 yyr1[] =
+/* YYR1[RULE-NUM] -- Symbol kind of the left-hand side of rule RULE-NUM.  */
+static const yytype_int8 yyr1[] =
 {
        0,    52,    53,    54,    54,    54,    54,    55,    55,    56,
       56,    56,    56,    56,    57,    57,    57,    57,    57,    57,
@@ -843,8 +971,8 @@ static const yytype_uint8 yyr1[] =
       96,    96,    96,    96,    96,    97,    97,    97,    97,    98
 };
 
-  /* YYR2[YYN] -- Number of symbols on the right hand side of rule YYN.  */
-static const yytype_uint8 yyr2[] =
+/* YYR2[RULE-NUM] -- Number of symbols on the right-hand side of rule RULE-NUM.  */
+static const yytype_int8 yyr2[] =
 {
        0,     2,     0,     1,     1,     1,     1,     1,     2,     1,
        2,     2,     1,     1,     1,     3,     3,     3,     3,     2,
@@ -861,39 +989,39 @@ static const yytype_uint8 yyr2[] =
 };
 
 
+enum { YYENOMEM = -2 };
+
 #define yyerrok         (yyerrstatus = 0)
 #define yyclearin       (yychar = YYEMPTY)
-#define YYEMPTY         (-2)
-#define YYEOF           0
 
 #define YYACCEPT        goto yyacceptlab
 #define YYABORT         goto yyabortlab
 #define YYERROR         goto yyerrorlab
+#define YYNOMEM         goto yyexhaustedlab
 
 
 #define YYRECOVERING()  (!!yyerrstatus)
 
-#define YYBACKUP(Token, Value)                                  \
-do                                                              \
-  if (yychar == YYEMPTY)                                        \
-    {                                                           \
-      yychar = (Token);                                         \
-      yylval = (Value);                                         \
-      YYPOPSTACK (yylen);                                       \
-      yystate = *yyssp;                                         \
-      goto yybackup;                                            \
-    }                                                           \
-  else                                                          \
-    {                                                           \
-      yyerror (YY_("syntax error: cannot back up")); \
-      YYERROR;                                                  \
-    }                                                           \
-while (0)
-
-/* Error token number */
-#define YYTERROR        1
-#define YYERRCODE       256
-
+#define YYBACKUP(Token, Value)                                    \
+  do                                                              \
+    if (yychar == YYEMPTY)                                        \
+      {                                                           \
+        yychar = (Token);                                         \
+        yylval = (Value);                                         \
+        YYPOPSTACK (yylen);                                       \
+        yystate = *yyssp;                                         \
+        goto yybackup;                                            \
+      }                                                           \
+    else                                                          \
+      {                                                           \
+        yyerror (YY_("syntax error: cannot back up")); \
+        YYERROR;                                                  \
+      }                                                           \
+  while (0)
+
+/* Backward compatibility with an undocumented macro.
+   Use YYerror or YYUNDEF. */
+#define YYERRCODE YYUNDEF
 
 /* YYLLOC_DEFAULT -- Set CURRENT to span from RHS[1] to RHS[N].
    If N is 0, then set CURRENT to the empty location which ends
@@ -937,20 +1065,27 @@ do {                                            \
 } while (0)
 
 
-/* YY_LOCATION_PRINT -- Print the location on the stream.
+/* YYLOCATION_PRINT -- Print the location on the stream.
    This macro was not mandated originally: define only if we know
    we won't break user code: when these are the locations we know.  */
 
-#ifndef YY_LOCATION_PRINT
-# if defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
+# ifndef YYLOCATION_PRINT
+
+#  if defined YY_LOCATION_PRINT
+
+   /* Temporary convenience wrapper in case some people defined the
+      undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YYLOCATION_PRINT(File, Loc)  YY_LOCATION_PRINT(File, *(Loc))
+
+#  elif defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
 
 /* Print *YYLOCP on YYO.  Private, do not rely on its existence. */
 
 YY_ATTRIBUTE_UNUSED
-static unsigned
+static int
 yy_location_print_ (FILE *yyo, YYLTYPE const * const yylocp)
 {
-  unsigned res = 0;
+  int res = 0;
   int end_col = 0 != yylocp->last_column ? yylocp->last_column - 1 : 0;
   if (0 <= yylocp->first_line)
     {
@@ -970,63 +1105,71 @@ yy_location_print_ (FILE *yyo, YYLTYPE const * const yylocp)
         res += YYFPRINTF (yyo, "-%d", end_col);
     }
   return res;
- }
+}
 
-#  define YY_LOCATION_PRINT(File, Loc)          \
-  yy_location_print_ (File, &(Loc))
+#   define YYLOCATION_PRINT  yy_location_print_
 
-# else
-#  define YY_LOCATION_PRINT(File, Loc) ((void) 0)
-# endif
-#endif
+    /* Temporary convenience wrapper in case some people defined the
+       undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YY_LOCATION_PRINT(File, Loc)  YYLOCATION_PRINT(File, &(Loc))
+
+#  else
+
+#   define YYLOCATION_PRINT(File, Loc) ((void) 0)
+    /* Temporary convenience wrapper in case some people defined the
+       undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YY_LOCATION_PRINT  YYLOCATION_PRINT
 
+#  endif
+# endif /* !defined YYLOCATION_PRINT */
 
-# define YY_SYMBOL_PRINT(Title, Type, Value, Location)                    \
+
+# define YY_SYMBOL_PRINT(Title, Kind, Value, Location)                    \
 do {                                                                      \
   if (yydebug)                                                            \
     {                                                                     \
       YYFPRINTF (stderr, "%s ", Title);                                   \
       yy_symbol_print (stderr,                                            \
-                  Type, Value, Location); \
+                  Kind, Value, Location); \
       YYFPRINTF (stderr, "\n");                                           \
     }                                                                     \
 } while (0)
 
 
-/*----------------------------------------.
-| Print this symbol's value on YYOUTPUT.  |
-`----------------------------------------*/
+/*-----------------------------------.
+| Print this symbol's value on YYO.  |
+`-----------------------------------*/
 
 static void
-yy_symbol_value_print (FILE *yyoutput, int yytype, YYSTYPE const * const yyvaluep, YYLTYPE const * const yylocationp)
+yy_symbol_value_print (FILE *yyo,
+                       yysymbol_kind_t yykind, YYSTYPE const * const yyvaluep, YYLTYPE const * const yylocationp)
 {
-  FILE *yyo = yyoutput;
-  YYUSE (yyo);
-  YYUSE (yylocationp);
+  FILE *yyoutput = yyo;
+  YY_USE (yyoutput);
+  YY_USE (yylocationp);
   if (!yyvaluep)
     return;
-# ifdef YYPRINT
-  if (yytype < YYNTOKENS)
-    YYPRINT (yyoutput, yytoknum[yytype], *yyvaluep);
-# endif
-  YYUSE (yytype);
+  YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN
+  YY_USE (yykind);
+  YY_IGNORE_MAYBE_UNINITIALIZED_END
 }
 
 
-/*--------------------------------.
-| Print this symbol on YYOUTPUT.  |
-`--------------------------------*/
+/*---------------------------.
+| Print this symbol on YYO.  |
+`---------------------------*/
 
 static void
-yy_symbol_print (FILE *yyoutput, int yytype, YYSTYPE const * const yyvaluep, YYLTYPE const * const yylocationp)
+yy_symbol_print (FILE *yyo,
+                 yysymbol_kind_t yykind, YYSTYPE const * const yyvaluep, YYLTYPE const * const yylocationp)
 {
-  YYFPRINTF (yyoutput, "%s %s (",
-             yytype < YYNTOKENS ? "token" : "nterm", yytname[yytype]);
+  YYFPRINTF (yyo, "%s %s (",
+             yykind < YYNTOKENS ? "token" : "nterm", yysymbol_name (yykind));
 
-  YY_LOCATION_PRINT (yyoutput, *yylocationp);
-  YYFPRINTF (yyoutput, ": ");
-  yy_symbol_value_print (yyoutput, yytype, yyvaluep, yylocationp);
-  YYFPRINTF (yyoutput, ")");
+  YYLOCATION_PRINT (yyo, yylocationp);
+  YYFPRINTF (yyo, ": ");
+  yy_symbol_value_print (yyo, yykind, yyvaluep, yylocationp);
+  YYFPRINTF (yyo, ")");
 }
 
 /*------------------------------------------------------------------.
@@ -1035,7 +1178,7 @@ yy_symbol_print (FILE *yyoutput, int yytype, YYSTYPE const * const yyvaluep, YYL
 `------------------------------------------------------------------*/
 
 static void
-yy_stack_print (yytype_int16 *yybottom, yytype_int16 *yytop)
+yy_stack_print (yy_state_t *yybottom, yy_state_t *yytop)
 {
   YYFPRINTF (stderr, "Stack now");
   for (; yybottom <= yytop; yybottom++)
@@ -1058,21 +1201,22 @@ do {                                                            \
 `------------------------------------------------*/
 
 static void
-yy_reduce_print (yytype_int16 *yyssp, YYSTYPE *yyvsp, YYLTYPE *yylsp, int yyrule)
+yy_reduce_print (yy_state_t *yyssp, YYSTYPE *yyvsp, YYLTYPE *yylsp,
+                 int yyrule)
 {
-  unsigned long int yylno = yyrline[yyrule];
+  int yylno = yyrline[yyrule];
   int yynrhs = yyr2[yyrule];
   int yyi;
-  YYFPRINTF (stderr, "Reducing stack by rule %d (line %lu):\n",
+  YYFPRINTF (stderr, "Reducing stack by rule %d (line %d):\n",
              yyrule - 1, yylno);
   /* The symbols being reduced.  */
   for (yyi = 0; yyi < yynrhs; yyi++)
     {
       YYFPRINTF (stderr, "   $%d = ", yyi + 1);
       yy_symbol_print (stderr,
-                       yystos[yyssp[yyi + 1 - yynrhs]],
-                       &(yyvsp[(yyi + 1) - (yynrhs)])
-                       , &(yylsp[(yyi + 1) - (yynrhs)])                       );
+                       YY_ACCESSING_SYMBOL (+yyssp[yyi + 1 - yynrhs]),
+                       &yyvsp[(yyi + 1) - (yynrhs)],
+                       &(yylsp[(yyi + 1) - (yynrhs)]));
       YYFPRINTF (stderr, "\n");
     }
 }
@@ -1087,8 +1231,8 @@ do {                                    \
    multiple parsers can coexist.  */
 int yydebug;
 #else /* !YYDEBUG */
-# define YYDPRINTF(Args)
-# define YY_SYMBOL_PRINT(Title, Type, Value, Location)
+# define YYDPRINTF(Args) ((void) 0)
+# define YY_SYMBOL_PRINT(Title, Kind, Value, Location)
 # define YY_STACK_PRINT(Bottom, Top)
 # define YY_REDUCE_PRINT(Rule)
 #endif /* !YYDEBUG */
@@ -1111,28 +1255,77 @@ int yydebug;
 #endif
 
 
-#if YYERROR_VERBOSE
+/* Context of a parse error.  */
+typedef struct
+{
+  yy_state_t *yyssp;
+  yysymbol_kind_t yytoken;
+  YYLTYPE *yylloc;
+} yypcontext_t;
+
+/* Put in YYARG at most YYARGN of the expected tokens given the
+   current YYCTX, and return the number of tokens stored in YYARG.  If
+   YYARG is null, return the number of expected tokens (guaranteed to
+   be less than YYNTOKENS).  Return YYENOMEM on memory exhaustion.
+   Return 0 if there are more than YYARGN expected tokens, yet fill
+   YYARG up to YYARGN. */
+static int
+yypcontext_expected_tokens (const yypcontext_t *yyctx,
+                            yysymbol_kind_t yyarg[], int yyargn)
+{
+  /* Actual size of YYARG. */
+  int yycount = 0;
+  int yyn = yypact[+*yyctx->yyssp];
+  if (!yypact_value_is_default (yyn))
+    {
+      /* Start YYX at -YYN if negative to avoid negative indexes in
+         YYCHECK.  In other words, skip the first -YYN actions for
+         this state because they are default actions.  */
+      int yyxbegin = yyn < 0 ? -yyn : 0;
+      /* Stay within bounds of both yycheck and yytname.  */
+      int yychecklim = YYLAST - yyn + 1;
+      int yyxend = yychecklim < YYNTOKENS ? yychecklim : YYNTOKENS;
+      int yyx;
+      for (yyx = yyxbegin; yyx < yyxend; ++yyx)
+        if (yycheck[yyx + yyn] == yyx && yyx != YYSYMBOL_YYerror
+            && !yytable_value_is_error (yytable[yyx + yyn]))
+          {
+            if (!yyarg)
+              ++yycount;
+            else if (yycount == yyargn)
+              return 0;
+            else
+              yyarg[yycount++] = YY_CAST (yysymbol_kind_t, yyx);
+          }
+    }
+  if (yyarg && yycount == 0 && 0 < yyargn)
+    yyarg[0] = YYSYMBOL_YYEMPTY;
+  return yycount;
+}
 
-# ifndef yystrlen
-#  if defined __GLIBC__ && defined _STRING_H
-#   define yystrlen strlen
-#  else
+
+
+
+#ifndef yystrlen
+# if defined __GLIBC__ && defined _STRING_H
+#  define yystrlen(S) (YY_CAST (YYPTRDIFF_T, strlen (S)))
+# else
 /* Return the length of YYSTR.  */
-static YYSIZE_T
+static YYPTRDIFF_T
 yystrlen (const char *yystr)
 {
-  YYSIZE_T yylen;
+  YYPTRDIFF_T yylen;
   for (yylen = 0; yystr[yylen]; yylen++)
     continue;
   return yylen;
 }
-#  endif
 # endif
+#endif
 
-# ifndef yystpcpy
-#  if defined __GLIBC__ && defined _STRING_H && defined _GNU_SOURCE
-#   define yystpcpy stpcpy
-#  else
+#ifndef yystpcpy
+# if defined __GLIBC__ && defined _STRING_H && defined _GNU_SOURCE
+#  define yystpcpy stpcpy
+# else
 /* Copy YYSRC to YYDEST, returning the address of the terminating '\0' in
    YYDEST.  */
 static char *
@@ -1146,10 +1339,10 @@ yystpcpy (char *yydest, const char *yysrc)
 
   return yyd - 1;
 }
-#  endif
 # endif
+#endif
 
-# ifndef yytnamerr
+#ifndef yytnamerr
 /* Copy to YYRES the contents of YYSTR after stripping away unnecessary
    quotes and backslashes, so that it's suitable for yyerror.  The
    heuristic is that double-quoting is unnecessary unless the string
@@ -1157,14 +1350,13 @@ yystpcpy (char *yydest, const char *yysrc)
    backslash-backslash).  YYSTR is taken from yytname.  If YYRES is
    null, do not copy; instead, return the length of what the result
    would have been.  */
-static YYSIZE_T
+static YYPTRDIFF_T
 yytnamerr (char *yyres, const char *yystr)
 {
   if (*yystr == '"')
     {
-      YYSIZE_T yyn = 0;
+      YYPTRDIFF_T yyn = 0;
       char const *yyp = yystr;
-
       for (;;)
         switch (*++yyp)
           {
@@ -1175,7 +1367,10 @@ yytnamerr (char *yyres, const char *yystr)
           case '\\':
             if (*++yyp != '\\')
               goto do_not_strip_quotes;
-            /* Fall through.  */
+            else
+              goto append;
+
+          append:
           default:
             if (yyres)
               yyres[yyn] = *yyp;
@@ -1190,36 +1385,20 @@ yytnamerr (char *yyres, const char *yystr)
     do_not_strip_quotes: ;
     }
 
-  if (! yyres)
+  if (yyres)
+    return yystpcpy (yyres, yystr) - yyres;
+  else
     return yystrlen (yystr);
-
-  return yystpcpy (yyres, yystr) - yyres;
 }
-# endif
+#endif
 
-/* Copy into *YYMSG, which is of size *YYMSG_ALLOC, an error message
-   about the unexpected token YYTOKEN for the state stack whose top is
-   YYSSP.
 
-   Return 0 if *YYMSG was successfully written.  Return 1 if *YYMSG is
-   not large enough to hold the message.  In that case, also set
-   *YYMSG_ALLOC to the required number of bytes.  Return 2 if the
-   required number of bytes is too large to store.  */
 static int
-yysyntax_error (YYSIZE_T *yymsg_alloc, char **yymsg,
-                yytype_int16 *yyssp, int yytoken)
+yy_syntax_error_arguments (const yypcontext_t *yyctx,
+                           yysymbol_kind_t yyarg[], int yyargn)
 {
-  YYSIZE_T yysize0 = yytnamerr (YY_NULLPTR, yytname[yytoken]);
-  YYSIZE_T yysize = yysize0;
-  enum { YYERROR_VERBOSE_ARGS_MAXIMUM = 5 };
-  /* Internationalized format string. */
-  const char *yyformat = YY_NULLPTR;
-  /* Arguments of yyformat. */
-  char const *yyarg[YYERROR_VERBOSE_ARGS_MAXIMUM];
-  /* Number of reported tokens (one for the "unexpected", one per
-     "expected"). */
+  /* Actual size of YYARG. */
   int yycount = 0;
-
   /* There are many possibilities here to consider:
      - If this state is a consistent state with a default action, then
        the only way this function was invoked is if the default action
@@ -1243,63 +1422,78 @@ yysyntax_error (YYSIZE_T *yymsg_alloc, char **yymsg,
        one exception: it will still contain any token that will not be
        accepted due to an error action in a later state.
   */
-  if (yytoken != YYEMPTY)
-    {
-      int yyn = yypact[*yyssp];
-      yyarg[yycount++] = yytname[yytoken];
-      if (!yypact_value_is_default (yyn))
-        {
-          /* Start YYX at -YYN if negative to avoid negative indexes in
-             YYCHECK.  In other words, skip the first -YYN actions for
-             this state because they are default actions.  */
-          int yyxbegin = yyn < 0 ? -yyn : 0;
-          /* Stay within bounds of both yycheck and yytname.  */
-          int yychecklim = YYLAST - yyn + 1;
-          int yyxend = yychecklim < YYNTOKENS ? yychecklim : YYNTOKENS;
-          int yyx;
-
-          for (yyx = yyxbegin; yyx < yyxend; ++yyx)
-            if (yycheck[yyx + yyn] == yyx && yyx != YYTERROR
-                && !yytable_value_is_error (yytable[yyx + yyn]))
-              {
-                if (yycount == YYERROR_VERBOSE_ARGS_MAXIMUM)
-                  {
-                    yycount = 1;
-                    yysize = yysize0;
-                    break;
-                  }
-                yyarg[yycount++] = yytname[yyx];
-                {
-                  YYSIZE_T yysize1 = yysize + yytnamerr (YY_NULLPTR, yytname[yyx]);
-                  if (! (yysize <= yysize1
-                         && yysize1 <= YYSTACK_ALLOC_MAXIMUM))
-                    return 2;
-                  yysize = yysize1;
-                }
-              }
-        }
+  if (yyctx->yytoken != YYSYMBOL_YYEMPTY)
+    {
+      int yyn;
+      if (yyarg)
+        yyarg[yycount] = yyctx->yytoken;
+      ++yycount;
+      yyn = yypcontext_expected_tokens (yyctx,
+                                        yyarg ? yyarg + 1 : yyarg, yyargn - 1);
+      if (yyn == YYENOMEM)
+        return YYENOMEM;
+      else
+        yycount += yyn;
     }
+  return yycount;
+}
+
+/* Copy into *YYMSG, which is of size *YYMSG_ALLOC, an error message
+   about the unexpected token YYTOKEN for the state stack whose top is
+   YYSSP.
+
+   Return 0 if *YYMSG was successfully written.  Return -1 if *YYMSG is
+   not large enough to hold the message.  In that case, also set
+   *YYMSG_ALLOC to the required number of bytes.  Return YYENOMEM if the
+   required number of bytes is too large to store.  */
+static int
+yysyntax_error (YYPTRDIFF_T *yymsg_alloc, char **yymsg,
+                const yypcontext_t *yyctx)
+{
+  enum { YYARGS_MAX = 5 };
+  /* Internationalized format string. */
+  const char *yyformat = YY_NULLPTR;
+  /* Arguments of yyformat: reported tokens (one for the "unexpected",
+     one per "expected"). */
+  yysymbol_kind_t yyarg[YYARGS_MAX];
+  /* Cumulated lengths of YYARG.  */
+  YYPTRDIFF_T yysize = 0;
+
+  /* Actual size of YYARG. */
+  int yycount = yy_syntax_error_arguments (yyctx, yyarg, YYARGS_MAX);
+  if (yycount == YYENOMEM)
+    return YYENOMEM;
 
   switch (yycount)
     {
-# define YYCASE_(N, S)                      \
+#define YYCASE_(N, S)                       \
       case N:                               \
         yyformat = S;                       \
-      break
+        break
+    default: /* Avoid compiler warnings. */
       YYCASE_(0, YY_("syntax error"));
       YYCASE_(1, YY_("syntax error, unexpected %s"));
       YYCASE_(2, YY_("syntax error, unexpected %s, expecting %s"));
       YYCASE_(3, YY_("syntax error, unexpected %s, expecting %s or %s"));
       YYCASE_(4, YY_("syntax error, unexpected %s, expecting %s or %s or %s"));
       YYCASE_(5, YY_("syntax error, unexpected %s, expecting %s or %s or %s or %s"));
-# undef YYCASE_
+#undef YYCASE_
     }
 
+  /* Compute error message size.  Don't count the "%s"s, but reserve
+     room for the terminator.  */
+  yysize = yystrlen (yyformat) - 2 * yycount + 1;
   {
-    YYSIZE_T yysize1 = yysize + yystrlen (yyformat);
-    if (! (yysize <= yysize1 && yysize1 <= YYSTACK_ALLOC_MAXIMUM))
-      return 2;
-    yysize = yysize1;
+    int yyi;
+    for (yyi = 0; yyi < yycount; ++yyi)
+      {
+        YYPTRDIFF_T yysize1
+          = yysize + yytnamerr (YY_NULLPTR, yytname[yyarg[yyi]]);
+        if (yysize <= yysize1 && yysize1 <= YYSTACK_ALLOC_MAXIMUM)
+          yysize = yysize1;
+        else
+          return YYENOMEM;
+      }
   }
 
   if (*yymsg_alloc < yysize)
@@ -1308,7 +1502,7 @@ yysyntax_error (YYSIZE_T *yymsg_alloc, char **yymsg,
       if (! (yysize <= *yymsg_alloc
              && *yymsg_alloc <= YYSTACK_ALLOC_MAXIMUM))
         *yymsg_alloc = YYSTACK_ALLOC_MAXIMUM;
-      return 1;
+      return -1;
     }
 
   /* Avoid sprintf, as that infringes on the user's name space.
@@ -1320,40 +1514,43 @@ yysyntax_error (YYSIZE_T *yymsg_alloc, char **yymsg,
     while ((*yyp = *yyformat) != '\0')
       if (*yyp == '%' && yyformat[1] == 's' && yyi < yycount)
         {
-          yyp += yytnamerr (yyp, yyarg[yyi++]);
+          yyp += yytnamerr (yyp, yytname[yyarg[yyi++]]);
           yyformat += 2;
         }
       else
         {
-          yyp++;
-          yyformat++;
+          ++yyp;
+          ++yyformat;
         }
   }
   return 0;
 }
-#endif /* YYERROR_VERBOSE */
+
 
 /*-----------------------------------------------.
 | Release the memory associated to this symbol.  |
 `-----------------------------------------------*/
 
 static void
-yydestruct (const char *yymsg, int yytype, YYSTYPE *yyvaluep, YYLTYPE *yylocationp)
+yydestruct (const char *yymsg,
+            yysymbol_kind_t yykind, YYSTYPE *yyvaluep, YYLTYPE *yylocationp)
 {
-  YYUSE (yyvaluep);
-  YYUSE (yylocationp);
+  YY_USE (yyvaluep);
+  YY_USE (yylocationp);
   if (!yymsg)
     yymsg = "Deleting";
-  YY_SYMBOL_PRINT (yymsg, yytype, yyvaluep, yylocationp);
+  YY_SYMBOL_PRINT (yymsg, yykind, yyvaluep, yylocationp);
 
   YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN
-  YYUSE (yytype);
+  YY_USE (yykind);
   YY_IGNORE_MAYBE_UNINITIALIZED_END
 }
 
 
 
 
+
+
 /*----------.
 | yyparse.  |
 `----------*/
@@ -1361,7 +1558,7 @@ yydestruct (const char *yymsg, int yytype, YYSTYPE *yyvaluep, YYLTYPE *yylocatio
 int
 yyparse (void)
 {
-/* The lookahead symbol.  */
+/* Lookahead token kind.  */
 int yychar;
 
 
@@ -1380,55 +1577,50 @@ static YYLTYPE yyloc_default
 YYLTYPE yylloc = yyloc_default;
 
     /* Number of syntax errors so far.  */
-    int yynerrs;
+    int yynerrs = 0;
 
-    int yystate;
+    yy_state_fast_t yystate = 0;
     /* Number of tokens to shift before error messages enabled.  */
-    int yyerrstatus;
+    int yyerrstatus = 0;
 
-    /* The stacks and their tools:
-       'yyss': related to states.
-       'yyvs': related to semantic values.
-       'yyls': related to locations.
-
-       Refer to the stacks through separate pointers, to allow yyoverflow
+    /* Refer to the stacks through separate pointers, to allow yyoverflow
        to reallocate them elsewhere.  */
 
-    /* The state stack.  */
-    yytype_int16 yyssa[YYINITDEPTH];
-    yytype_int16 *yyss;
-    yytype_int16 *yyssp;
+    /* Their size.  */
+    YYPTRDIFF_T yystacksize = YYINITDEPTH;
+
+    /* The state stack: array, bottom, top.  */
+    yy_state_t yyssa[YYINITDEPTH];
+    yy_state_t *yyss = yyssa;
+    yy_state_t *yyssp = yyss;
 
-    /* The semantic value stack.  */
+    /* The semantic value stack: array, bottom, top.  */
     YYSTYPE yyvsa[YYINITDEPTH];
-    YYSTYPE *yyvs;
-    YYSTYPE *yyvsp;
+    YYSTYPE *yyvs = yyvsa;
+    YYSTYPE *yyvsp = yyvs;
 
-    /* The location stack.  */
+    /* The location stack: array, bottom, top.  */
     YYLTYPE yylsa[YYINITDEPTH];
-    YYLTYPE *yyls;
-    YYLTYPE *yylsp;
-
-    /* The locations where the error started and ended.  */
-    YYLTYPE yyerror_range[3];
-
-    YYSIZE_T yystacksize;
+    YYLTYPE *yyls = yylsa;
+    YYLTYPE *yylsp = yyls;
 
   int yyn;
+  /* The return value of yyparse.  */
   int yyresult;
-  /* Lookahead token as an internal (translated) token number.  */
-  int yytoken = 0;
+  /* Lookahead symbol kind.  */
+  yysymbol_kind_t yytoken = YYSYMBOL_YYEMPTY;
   /* The variables used to return semantic value and location from the
      action routines.  */
   YYSTYPE yyval;
   YYLTYPE yyloc;
 
-#if YYERROR_VERBOSE
+  /* The locations where the error started and ended.  */
+  YYLTYPE yyerror_range[3];
+
   /* Buffer for error messages, and its allocated size.  */
   char yymsgbuf[128];
   char *yymsg = yymsgbuf;
-  YYSIZE_T yymsg_alloc = sizeof yymsgbuf;
-#endif
+  YYPTRDIFF_T yymsg_alloc = sizeof yymsgbuf;
 
 #define YYPOPSTACK(N)   (yyvsp -= (N), yyssp -= (N), yylsp -= (N))
 
@@ -1436,43 +1628,49 @@ YYLTYPE yylloc = yyloc_default;
      Keep to zero when no symbol should be popped.  */
   int yylen = 0;
 
-  yyssp = yyss = yyssa;
-  yyvsp = yyvs = yyvsa;
-  yylsp = yyls = yylsa;
-  yystacksize = YYINITDEPTH;
-
   YYDPRINTF ((stderr, "Starting parse\n"));
 
-  yystate = 0;
-  yyerrstatus = 0;
-  yynerrs = 0;
   yychar = YYEMPTY; /* Cause a token to be read.  */
+
   yylsp[0] = yylloc;
   goto yysetstate;
 
+
 /*------------------------------------------------------------.
-| yynewstate -- Push a new state, which is found in yystate.  |
+| yynewstate -- push a new state, which is found in yystate.  |
 `------------------------------------------------------------*/
- yynewstate:
+yynewstate:
   /* In all cases, when you get here, the value and location stacks
      have just been pushed.  So pushing a state here evens the stacks.  */
   yyssp++;
 
- yysetstate:
-  *yyssp = yystate;
+
+/*--------------------------------------------------------------------.
+| yysetstate -- set current state (the top of the stack) to yystate.  |
+`--------------------------------------------------------------------*/
+yysetstate:
+  YYDPRINTF ((stderr, "Entering state %d\n", yystate));
+  YY_ASSERT (0 <= yystate && yystate < YYNSTATES);
+  YY_IGNORE_USELESS_CAST_BEGIN
+  *yyssp = YY_CAST (yy_state_t, yystate);
+  YY_IGNORE_USELESS_CAST_END
+  YY_STACK_PRINT (yyss, yyssp);
 
   if (yyss + yystacksize - 1 <= yyssp)
+#if !defined yyoverflow && !defined YYSTACK_RELOCATE
+    YYNOMEM;
+#else
     {
       /* Get the current used size of the three stacks, in elements.  */
-      YYSIZE_T yysize = yyssp - yyss + 1;
+      YYPTRDIFF_T yysize = yyssp - yyss + 1;
 
-#ifdef yyoverflow
+# if defined yyoverflow
       {
         /* Give user a chance to reallocate the stack.  Use copies of
            these so that the &'s don't force the real ones into
            memory.  */
+        yy_state_t *yyss1 = yyss;
         YYSTYPE *yyvs1 = yyvs;
-        yytype_int16 *yyss1 = yyss;
         YYLTYPE *yyls1 = yyls;
 
         /* Each stack pointer address is followed by the size of the
@@ -1480,32 +1678,29 @@ YYLTYPE yylloc = yyloc_default;
            conditional around just the two extra args, but that might
            be undefined if yyoverflow is a macro.  */
         yyoverflow (YY_("memory exhausted"),
-                    &yyss1, yysize * sizeof (*yyssp),
-                    &yyvs1, yysize * sizeof (*yyvsp),
-                    &yyls1, yysize * sizeof (*yylsp),
+                    &yyss1, yysize * YYSIZEOF (*yyssp),
+                    &yyvs1, yysize * YYSIZEOF (*yyvsp),
+                    &yyls1, yysize * YYSIZEOF (*yylsp),
                     &yystacksize);
-
-        yyls = yyls1;
         yyss = yyss1;
         yyvs = yyvs1;
+        yyls = yyls1;
       }
-#else /* no yyoverflow */
-# ifndef YYSTACK_RELOCATE
-      goto yyexhaustedlab;
-# else
+# else /* defined YYSTACK_RELOCATE */
       /* Extend the stack our own way.  */
       if (YYMAXDEPTH <= yystacksize)
-        goto yyexhaustedlab;
+        YYNOMEM;
       yystacksize *= 2;
       if (YYMAXDEPTH < yystacksize)
         yystacksize = YYMAXDEPTH;
 
       {
-        yytype_int16 *yyss1 = yyss;
+        yy_state_t *yyss1 = yyss;
         union yyalloc *yyptr =
-          (union yyalloc *) YYSTACK_ALLOC (YYSTACK_BYTES (yystacksize));
+          YY_CAST (union yyalloc *,
+                   YYSTACK_ALLOC (YY_CAST (YYSIZE_T, YYSTACK_BYTES (yystacksize))));
         if (! yyptr)
-          goto yyexhaustedlab;
+          YYNOMEM;
         YYSTACK_RELOCATE (yyss_alloc, yyss);
         YYSTACK_RELOCATE (yyvs_alloc, yyvs);
         YYSTACK_RELOCATE (yyls_alloc, yyls);
@@ -1514,31 +1709,32 @@ YYLTYPE yylloc = yyloc_default;
           YYSTACK_FREE (yyss1);
       }
 # endif
-#endif /* no yyoverflow */
 
       yyssp = yyss + yysize - 1;
       yyvsp = yyvs + yysize - 1;
       yylsp = yyls + yysize - 1;
 
-      YYDPRINTF ((stderr, "Stack size increased to %lu\n",
-                  (unsigned long int) yystacksize));
+      YY_IGNORE_USELESS_CAST_BEGIN
+      YYDPRINTF ((stderr, "Stack size increased to %ld\n",
+                  YY_CAST (long, yystacksize)));
+      YY_IGNORE_USELESS_CAST_END
 
       if (yyss + yystacksize - 1 <= yyssp)
         YYABORT;
     }
+#endif /* !defined yyoverflow && !defined YYSTACK_RELOCATE */
 
-  YYDPRINTF ((stderr, "Entering state %d\n", yystate));
 
   if (yystate == YYFINAL)
     YYACCEPT;
 
   goto yybackup;
 
+
 /*-----------.
 | yybackup.  |
 `-----------*/
 yybackup:
-
   /* Do appropriate processing given the current state.  Read a
      lookahead token if we need one and don't already have one.  */
 
@@ -1549,18 +1745,30 @@ yybackup:
 
   /* Not known => get a lookahead token if don't already have one.  */
 
-  /* YYCHAR is either YYEMPTY or YYEOF or a valid lookahead symbol.  */
+  /* YYCHAR is either empty, or end-of-input, or a valid lookahead.  */
   if (yychar == YYEMPTY)
     {
-      YYDPRINTF ((stderr, "Reading a token: "));
+      YYDPRINTF ((stderr, "Reading a token\n"));
       yychar = yylex (&yylval, &yylloc);
     }
 
   if (yychar <= YYEOF)
     {
-      yychar = yytoken = YYEOF;
+      yychar = YYEOF;
+      yytoken = YYSYMBOL_YYEOF;
       YYDPRINTF ((stderr, "Now at end of input.\n"));
     }
+  else if (yychar == YYerror)
+    {
+      /* The scanner already issued an error message, process directly
+         to error recovery.  But do not keep the error token as
+         lookahead, it is too special and may lead us to an endless
+         loop in error recovery. */
+      yychar = YYUNDEF;
+      yytoken = YYSYMBOL_YYerror;
+      yyerror_range[1] = yylloc;
+      goto yyerrlab1;
+    }
   else
     {
       yytoken = YYTRANSLATE (yychar);
@@ -1588,15 +1796,14 @@ yybackup:
 
   /* Shift the lookahead token.  */
   YY_SYMBOL_PRINT ("Shifting", yytoken, &yylval, &yylloc);
-
-  /* Discard the shifted token.  */
-  yychar = YYEMPTY;
-
   yystate = yyn;
   YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN
   *++yyvsp = yylval;
   YY_IGNORE_MAYBE_UNINITIALIZED_END
   *++yylsp = yylloc;
+
+  /* Discard the shifted token.  */
+  yychar = YYEMPTY;
   goto yynewstate;
 
 
@@ -1611,7 +1818,7 @@ yydefault:
 
 
 /*-----------------------------.
-| yyreduce -- Do a reduction.  |
+| yyreduce -- do a reduction.  |
 `-----------------------------*/
 yyreduce:
   /* yyn is the number of a rule to reduce with.  */
@@ -1627,585 +1834,586 @@ yyreduce:
      GCC warning that YYVAL may be used uninitialized.  */
   yyval = yyvsp[1-yylen];
 
-  /* Default location.  */
+  /* Default location. */
   YYLLOC_DEFAULT (yyloc, (yylsp - yylen), yylen);
+  yyerror_range[1] = yyloc;
   YY_REDUCE_PRINT (yyn);
   switch (yyn)
     {
-        case 3:
-#line 257 "src/python/beancount/parser/grammar.y" 
+  case 3: /* txn: TXN  */
+#line 297 "src/python/beancount/parser/grammar.y"
     {
         (yyval.character) = '*';
     }
-#line 1641 "src/python/beancount/parser/grammar.c" 
+#line 1849 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 4:
-#line 261 "src/python/beancount/parser/grammar.y" 
+  case 4: /* txn: FLAG  */
+#line 301 "src/python/beancount/parser/grammar.y"
     {
         (yyval.character) = (yyvsp[0].character);
     }
-#line 1649 "src/python/beancount/parser/grammar.c" 
+#line 1857 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 5:
-#line 265 "src/python/beancount/parser/grammar.y" 
+  case 5: /* txn: ASTERISK  */
+#line 305 "src/python/beancount/parser/grammar.y"
     {
         (yyval.character) = '*';
     }
-#line 1657 "src/python/beancount/parser/grammar.c" 
+#line 1865 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 6:
-#line 269 "src/python/beancount/parser/grammar.y" 
+  case 6: /* txn: HASH  */
+#line 309 "src/python/beancount/parser/grammar.y"
     {
         (yyval.character) = '#';
     }
-#line 1665 "src/python/beancount/parser/grammar.c" 
+#line 1873 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 14:
-#line 289 "src/python/beancount/parser/grammar.y" 
-    {
+  case 14: /* number_expr: NUMBER  */
+#line 329 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = (yyvsp[0].pyobj);
             }
-#line 1673 "src/python/beancount/parser/grammar.c" 
+#line 1881 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 15:
-#line 293 "src/python/beancount/parser/grammar.y" 
-    {
+  case 15: /* number_expr: number_expr PLUS number_expr  */
+#line 333 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = PyNumber_Add((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 1682 "src/python/beancount/parser/grammar.c" 
+#line 1890 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 16:
-#line 298 "src/python/beancount/parser/grammar.y" 
-    {
+  case 16: /* number_expr: number_expr MINUS number_expr  */
+#line 338 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = PyNumber_Subtract((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 1691 "src/python/beancount/parser/grammar.c" 
+#line 1899 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 17:
-#line 303 "src/python/beancount/parser/grammar.y" 
-    {
+  case 17: /* number_expr: number_expr ASTERISK number_expr  */
+#line 343 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = PyNumber_Multiply((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 1700 "src/python/beancount/parser/grammar.c" 
+#line 1908 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 18:
-#line 308 "src/python/beancount/parser/grammar.y" 
-    {
+  case 18: /* number_expr: number_expr SLASH number_expr  */
+#line 348 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = PyNumber_TrueDivide((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 1709 "src/python/beancount/parser/grammar.c" 
+#line 1917 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 19:
-#line 313 "src/python/beancount/parser/grammar.y" 
-    {
+  case 19: /* number_expr: MINUS number_expr  */
+#line 353 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = PyNumber_Negative((yyvsp[0].pyobj));
                 DECREF1((yyvsp[0].pyobj));
             }
-#line 1718 "src/python/beancount/parser/grammar.c" 
+#line 1926 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 20:
-#line 318 "src/python/beancount/parser/grammar.y" 
-    {
+  case 20: /* number_expr: PLUS number_expr  */
+#line 358 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = (yyvsp[0].pyobj);
             }
-#line 1726 "src/python/beancount/parser/grammar.c" 
+#line 1934 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 21:
-#line 322 "src/python/beancount/parser/grammar.y" 
-    {
+  case 21: /* number_expr: LPAREN number_expr RPAREN  */
+#line 362 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = (yyvsp[-1].pyobj);
             }
-#line 1734 "src/python/beancount/parser/grammar.c" 
+#line 1942 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 22:
-#line 327 "src/python/beancount/parser/grammar.y" 
-    {
+  case 22: /* txn_fields: empty  */
+#line 367 "src/python/beancount/parser/grammar.y"
+           {
                /* Note: We're passing a bogus value here in order to avoid
                 * having to declare a second macro just for this one special
                 * case. */
                BUILDY(,
                       (yyval.pyobj), "txn_field_new", "O", Py_None);
            }
-#line 1746 "src/python/beancount/parser/grammar.c" 
+#line 1954 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 23:
-#line 335 "src/python/beancount/parser/grammar.y" 
-    {
+  case 23: /* txn_fields: txn_fields STRING  */
+#line 375 "src/python/beancount/parser/grammar.y"
+           {
                BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                       (yyval.pyobj), "txn_field_STRING", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
            }
-#line 1755 "src/python/beancount/parser/grammar.c" 
+#line 1963 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 24:
-#line 340 "src/python/beancount/parser/grammar.y" 
-    {
+  case 24: /* txn_fields: txn_fields LINK  */
+#line 380 "src/python/beancount/parser/grammar.y"
+           {
                BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                       (yyval.pyobj), "txn_field_LINK", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
            }
-#line 1764 "src/python/beancount/parser/grammar.c" 
+#line 1972 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 25:
-#line 345 "src/python/beancount/parser/grammar.y" 
-    {
+  case 25: /* txn_fields: txn_fields TAG  */
+#line 385 "src/python/beancount/parser/grammar.y"
+           {
                BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                       (yyval.pyobj), "txn_field_TAG", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
            }
-#line 1773 "src/python/beancount/parser/grammar.c" 
+#line 1981 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 26:
-#line 350 "src/python/beancount/parser/grammar.y" 
-    {
+  case 26: /* txn_fields: txn_fields PIPE  */
+#line 390 "src/python/beancount/parser/grammar.y"
+           {
                /* Mark PIPE as present for backwards compatibility and raise an error */
                BUILDY(DECREF1((yyvsp[-1].pyobj)),
                       (yyval.pyobj), "txn_field_PIPE", "OO", (yyvsp[-1].pyobj), Py_None);
            }
-#line 1783 "src/python/beancount/parser/grammar.c" 
+#line 1991 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 27:
-#line 357 "src/python/beancount/parser/grammar.y" 
-    {
+  case 27: /* transaction: DATE txn txn_fields eol posting_or_kv_list  */
+#line 397 "src/python/beancount/parser/grammar.y"
+            {
                 BUILDY(DECREF3((yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                        (yyval.pyobj), "transaction", "siObOO", FILE_LINE_ARGS, (yyvsp[-4].pyobj), (yyvsp[-3].character), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 1792 "src/python/beancount/parser/grammar.c" 
+#line 2000 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 28:
-#line 363 "src/python/beancount/parser/grammar.y" 
-    {
+  case 28: /* optflag: empty  */
+#line 403 "src/python/beancount/parser/grammar.y"
+        {
             (yyval.character) = '\0';
         }
-#line 1800 "src/python/beancount/parser/grammar.c" 
+#line 2008 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 29:
-#line 367 "src/python/beancount/parser/grammar.y" 
-    {
+  case 29: /* optflag: ASTERISK  */
+#line 407 "src/python/beancount/parser/grammar.y"
+        {
             (yyval.character) = '*';
         }
-#line 1808 "src/python/beancount/parser/grammar.c" 
+#line 2016 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 30:
-#line 371 "src/python/beancount/parser/grammar.y" 
-    {
+  case 30: /* optflag: HASH  */
+#line 411 "src/python/beancount/parser/grammar.y"
+        {
             (yyval.character) = '*';
         }
-#line 1816 "src/python/beancount/parser/grammar.c" 
+#line 2024 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 32:
-#line 377 "src/python/beancount/parser/grammar.y" 
-    {
+  case 32: /* price_annotation: incomplete_amount  */
+#line 417 "src/python/beancount/parser/grammar.y"
+                 {
                      (yyval.pyobj) = (yyvsp[0].pyobj);
                  }
-#line 1824 "src/python/beancount/parser/grammar.c" 
+#line 2032 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 33:
-#line 381 "src/python/beancount/parser/grammar.y" 
-    {
+  case 33: /* price_annotation: empty  */
+#line 421 "src/python/beancount/parser/grammar.y"
+                 {
                      BUILDY(,
                             (yyval.pyobj), "amount", "OO", Py_None, Py_None);
                  }
-#line 1833 "src/python/beancount/parser/grammar.c" 
+#line 2041 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 34:
-#line 387 "src/python/beancount/parser/grammar.y" 
-    {
+  case 34: /* posting: INDENT optflag ACCOUNT position eol  */
+#line 427 "src/python/beancount/parser/grammar.y"
+        {
             BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "siOOOOb", FILE_LINE_ARGS, (yyvsp[-2].pyobj), (yyvsp[-1].pyobj), Py_None, Py_False, (yyvsp[-3].character));
         }
-#line 1842 "src/python/beancount/parser/grammar.c" 
+#line 2050 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 35:
-#line 392 "src/python/beancount/parser/grammar.y" 
-    {
+  case 35: /* posting: INDENT optflag ACCOUNT position AT price_annotation eol  */
+#line 432 "src/python/beancount/parser/grammar.y"
+        {
             BUILDY(DECREF3((yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "siOOOOb", FILE_LINE_ARGS, (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), Py_False, (yyvsp[-5].character));
         }
-#line 1851 "src/python/beancount/parser/grammar.c" 
+#line 2059 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 36:
-#line 397 "src/python/beancount/parser/grammar.y" 
-    {
+  case 36: /* posting: INDENT optflag ACCOUNT position ATAT price_annotation eol  */
+#line 437 "src/python/beancount/parser/grammar.y"
+        {
             BUILDY(DECREF3((yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "siOOOOb", FILE_LINE_ARGS, (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), Py_True, (yyvsp[-5].character));
         }
-#line 1860 "src/python/beancount/parser/grammar.c" 
+#line 2068 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 37:
-#line 402 "src/python/beancount/parser/grammar.y" 
-    {
+  case 37: /* posting: INDENT optflag ACCOUNT eol  */
+#line 442 "src/python/beancount/parser/grammar.y"
+        {
             BUILDY(DECREF1((yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "siOOOOb", FILE_LINE_ARGS, (yyvsp[-1].pyobj), Py_None, Py_None, Py_False, (yyvsp[-2].character));
         }
-#line 1869 "src/python/beancount/parser/grammar.c" 
+#line 2077 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 38:
-#line 408 "src/python/beancount/parser/grammar.y" 
-    {
+  case 38: /* key_value: INDENT KEY key_value_value eol  */
+#line 448 "src/python/beancount/parser/grammar.y"
+          {
               BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                      (yyval.pyobj), "key_value", "OO", (yyvsp[-2].pyobj), (yyvsp[-1].pyobj));
           }
-#line 1878 "src/python/beancount/parser/grammar.c" 
+#line 2086 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 46:
-#line 421 "src/python/beancount/parser/grammar.y" 
-    {
+  case 46: /* key_value_value: amount  */
+#line 461 "src/python/beancount/parser/grammar.y"
+                {
                     (yyval.pyobj) = (yyvsp[0].pyobj);
                 }
-#line 1886 "src/python/beancount/parser/grammar.c" 
+#line 2094 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 47:
-#line 425 "src/python/beancount/parser/grammar.y" 
-    {
+  case 47: /* key_value_value: empty  */
+#line 465 "src/python/beancount/parser/grammar.y"
+                {
                     Py_INCREF(Py_None);
                     (yyval.pyobj) = Py_None;
                 }
-#line 1895 "src/python/beancount/parser/grammar.c" 
+#line 2103 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 48:
-#line 431 "src/python/beancount/parser/grammar.y" 
-    {
+  case 48: /* posting_or_kv_list: empty  */
+#line 471 "src/python/beancount/parser/grammar.y"
+                   {
                        Py_INCREF(Py_None);
                        (yyval.pyobj) = Py_None;
                    }
-#line 1904 "src/python/beancount/parser/grammar.c" 
+#line 2112 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 49:
-#line 436 "src/python/beancount/parser/grammar.y" 
-    {
-                       BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                              (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+  case 49: /* posting_or_kv_list: posting_or_kv_list key_value  */
+#line 476 "src/python/beancount/parser/grammar.y"
+                   {
+                       BUILD_LIST(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                  (yyval.pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                    }
-#line 1913 "src/python/beancount/parser/grammar.c" 
+#line 2121 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 50:
-#line 441 "src/python/beancount/parser/grammar.y" 
-    {
-                       BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                              (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+  case 50: /* posting_or_kv_list: posting_or_kv_list posting  */
+#line 481 "src/python/beancount/parser/grammar.y"
+                   {
+                       BUILD_LIST(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                  (yyval.pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                    }
-#line 1922 "src/python/beancount/parser/grammar.c" 
+#line 2130 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 51:
-#line 447 "src/python/beancount/parser/grammar.y" 
-    {
+  case 51: /* key_value_list: empty  */
+#line 487 "src/python/beancount/parser/grammar.y"
+               {
                    Py_INCREF(Py_None);
                    (yyval.pyobj) = Py_None;
                }
-#line 1931 "src/python/beancount/parser/grammar.c" 
+#line 2139 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 52:
-#line 452 "src/python/beancount/parser/grammar.y" 
-    {
-                   BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                          (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+  case 52: /* key_value_list: key_value_list key_value  */
+#line 492 "src/python/beancount/parser/grammar.y"
+               {
+                   BUILD_LIST(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                              (yyval.pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                }
-#line 1940 "src/python/beancount/parser/grammar.c" 
+#line 2148 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 53:
-#line 458 "src/python/beancount/parser/grammar.y" 
-    {
+  case 53: /* currency_list: empty  */
+#line 498 "src/python/beancount/parser/grammar.y"
+              {
                   Py_INCREF(Py_None);
                   (yyval.pyobj) = Py_None;
               }
-#line 1949 "src/python/beancount/parser/grammar.c" 
+#line 2157 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 54:
-#line 463 "src/python/beancount/parser/grammar.y" 
-    {
-                  BUILDY(DECREF1((yyvsp[0].pyobj)),
-                         (yyval.pyobj), "handle_list", "OO", Py_None, (yyvsp[0].pyobj));
+  case 54: /* currency_list: CURRENCY  */
+#line 503 "src/python/beancount/parser/grammar.y"
+              {
+                  BUILD_LIST(DECREF1((yyvsp[0].pyobj)),
+                             (yyval.pyobj), Py_None, (yyvsp[0].pyobj));
               }
-#line 1958 "src/python/beancount/parser/grammar.c" 
+#line 2166 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 55:
-#line 468 "src/python/beancount/parser/grammar.y" 
-    {
-                  BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
-                         (yyval.pyobj), "handle_list", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
+  case 55: /* currency_list: currency_list COMMA CURRENCY  */
+#line 508 "src/python/beancount/parser/grammar.y"
+              {
+                  BUILD_LIST(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                             (yyval.pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
               }
-#line 1967 "src/python/beancount/parser/grammar.c" 
+#line 2175 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 56:
-#line 474 "src/python/beancount/parser/grammar.y" 
-    {
+  case 56: /* pushtag: PUSHTAG TAG eol  */
+#line 514 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF1((yyvsp[-1].pyobj)),
                     (yyval.pyobj), "pushtag", "O", (yyvsp[-1].pyobj));
          }
-#line 1976 "src/python/beancount/parser/grammar.c" 
+#line 2184 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 57:
-#line 480 "src/python/beancount/parser/grammar.y" 
-    {
+  case 57: /* poptag: POPTAG TAG eol  */
+#line 520 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF1((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "poptag", "O", (yyvsp[-1].pyobj));
        }
-#line 1985 "src/python/beancount/parser/grammar.c" 
+#line 2193 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 58:
-#line 486 "src/python/beancount/parser/grammar.y" 
-    {
+  case 58: /* open: DATE OPEN ACCOUNT currency_list opt_booking eol key_value_list  */
+#line 526 "src/python/beancount/parser/grammar.y"
+     {
          BUILDY(DECREF5((yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                 (yyval.pyobj), "open", "siOOOOO", FILE_LINE_ARGS, (yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          ;
      }
-#line 1995 "src/python/beancount/parser/grammar.c" 
+#line 2203 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 59:
-#line 493 "src/python/beancount/parser/grammar.y" 
-    {
+  case 59: /* opt_booking: STRING  */
+#line 533 "src/python/beancount/parser/grammar.y"
+            {
                 (yyval.pyobj) = (yyvsp[0].pyobj);
             }
-#line 2003 "src/python/beancount/parser/grammar.c" 
+#line 2211 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 60:
-#line 497 "src/python/beancount/parser/grammar.y" 
-    {
+  case 60: /* opt_booking: empty  */
+#line 537 "src/python/beancount/parser/grammar.y"
+            {
                 Py_INCREF(Py_None);
                 (yyval.pyobj) = Py_None;
             }
-#line 2012 "src/python/beancount/parser/grammar.c" 
+#line 2220 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 61:
-#line 503 "src/python/beancount/parser/grammar.y" 
-    {
+  case 61: /* close: DATE CLOSE ACCOUNT eol key_value_list  */
+#line 543 "src/python/beancount/parser/grammar.y"
+      {
           BUILDY(DECREF3((yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "close", "siOOO", FILE_LINE_ARGS, (yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2021 "src/python/beancount/parser/grammar.c" 
+#line 2229 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 62:
-#line 509 "src/python/beancount/parser/grammar.y" 
-    {
+  case 62: /* commodity: DATE COMMODITY CURRENCY eol key_value_list  */
+#line 549 "src/python/beancount/parser/grammar.y"
+          {
               BUILDY(DECREF3((yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                      (yyval.pyobj), "commodity", "siOOO", FILE_LINE_ARGS, (yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
           }
-#line 2030 "src/python/beancount/parser/grammar.c" 
+#line 2238 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 63:
-#line 515 "src/python/beancount/parser/grammar.y" 
+  case 63: /* pad: DATE PAD ACCOUNT ACCOUNT eol key_value_list  */
+#line 555 "src/python/beancount/parser/grammar.y"
     {
         BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                (yyval.pyobj), "pad", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
     }
-#line 2039 "src/python/beancount/parser/grammar.c" 
+#line 2247 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 64:
-#line 521 "src/python/beancount/parser/grammar.y" 
-    {
+  case 64: /* balance: DATE BALANCE ACCOUNT amount_tolerance eol key_value_list  */
+#line 561 "src/python/beancount/parser/grammar.y"
+        {
             BUILDY(DECREF5((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[0].pyobj), (yyvsp[-2].pairobj).pyobj1, (yyvsp[-2].pairobj).pyobj2),
                    (yyval.pyobj), "balance", "siOOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pairobj).pyobj1, (yyvsp[-2].pairobj).pyobj2, (yyvsp[0].pyobj));
         }
-#line 2048 "src/python/beancount/parser/grammar.c" 
+#line 2256 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 65:
-#line 527 "src/python/beancount/parser/grammar.y" 
-    {
+  case 65: /* amount: number_expr CURRENCY  */
+#line 567 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                   (yyval.pyobj), "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
        }
-#line 2057 "src/python/beancount/parser/grammar.c" 
+#line 2265 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 66:
-#line 533 "src/python/beancount/parser/grammar.y" 
-    {
+  case 66: /* amount_tolerance: number_expr CURRENCY  */
+#line 573 "src/python/beancount/parser/grammar.y"
+                 {
                      BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                             (yyval.pairobj).pyobj1, "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                      (yyval.pairobj).pyobj2 = Py_None;
                      Py_INCREF(Py_None);
                      ;
                  }
-#line 2069 "src/python/beancount/parser/grammar.c" 
+#line 2277 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 67:
-#line 541 "src/python/beancount/parser/grammar.y" 
-    {
+  case 67: /* amount_tolerance: number_expr TILDE number_expr CURRENCY  */
+#line 581 "src/python/beancount/parser/grammar.y"
+                 {
                      BUILDY(DECREF2((yyvsp[-3].pyobj), (yyvsp[0].pyobj)),
                             (yyval.pairobj).pyobj1, "amount", "OO", (yyvsp[-3].pyobj), (yyvsp[0].pyobj));
                      (yyval.pairobj).pyobj2 = (yyvsp[-1].pyobj);
                  }
-#line 2079 "src/python/beancount/parser/grammar.c" 
+#line 2287 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 68:
-#line 548 "src/python/beancount/parser/grammar.y" 
-    {
+  case 68: /* maybe_number: empty  */
+#line 588 "src/python/beancount/parser/grammar.y"
+             {
                  Py_INCREF(Py_None);
                  (yyval.pyobj) = Py_None;
              }
-#line 2088 "src/python/beancount/parser/grammar.c" 
+#line 2296 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 69:
-#line 553 "src/python/beancount/parser/grammar.y" 
-    {
+  case 69: /* maybe_number: number_expr  */
+#line 593 "src/python/beancount/parser/grammar.y"
+             {
                  (yyval.pyobj) = (yyvsp[0].pyobj);
              }
-#line 2096 "src/python/beancount/parser/grammar.c" 
+#line 2304 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 70:
-#line 558 "src/python/beancount/parser/grammar.y" 
-    {
+  case 70: /* compound_amount: maybe_number CURRENCY  */
+#line 598 "src/python/beancount/parser/grammar.y"
+                {
                     BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                            (yyval.pyobj), "compound_amount", "OOO", (yyvsp[-1].pyobj), Py_None, (yyvsp[0].pyobj));
                 }
-#line 2105 "src/python/beancount/parser/grammar.c" 
+#line 2313 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 71:
-#line 563 "src/python/beancount/parser/grammar.y" 
-    {
+  case 71: /* compound_amount: maybe_number HASH maybe_number CURRENCY  */
+#line 603 "src/python/beancount/parser/grammar.y"
+                {
                     BUILDY(DECREF3((yyvsp[-3].pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                            (yyval.pyobj), "compound_amount", "OOO", (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                     ;
                 }
-#line 2115 "src/python/beancount/parser/grammar.c" 
+#line 2323 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 72:
-#line 570 "src/python/beancount/parser/grammar.y" 
-    {
+  case 72: /* incomplete_amount: maybe_number CURRENCY  */
+#line 610 "src/python/beancount/parser/grammar.y"
+                  {
                       BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                              (yyval.pyobj), "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                  }
-#line 2124 "src/python/beancount/parser/grammar.c" 
+#line 2332 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 73:
-#line 576 "src/python/beancount/parser/grammar.y" 
-    {
+  case 73: /* position: incomplete_amount  */
+#line 616 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF1((yyvsp[0].pyobj)),
                     (yyval.pyobj), "position", "siOO", FILE_LINE_ARGS, (yyvsp[0].pyobj), Py_None);
          }
-#line 2133 "src/python/beancount/parser/grammar.c" 
+#line 2341 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 74:
-#line 581 "src/python/beancount/parser/grammar.y" 
-    {
+  case 74: /* position: incomplete_amount lot_spec  */
+#line 621 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                     (yyval.pyobj), "position", "siOO", FILE_LINE_ARGS, (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
          }
-#line 2142 "src/python/beancount/parser/grammar.c" 
+#line 2350 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 75:
-#line 587 "src/python/beancount/parser/grammar.y" 
-    {
+  case 75: /* lot_spec: LCURL lot_comp_list RCURL  */
+#line 627 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF1((yyvsp[-1].pyobj)),
                     (yyval.pyobj), "lot_spec", "O", (yyvsp[-1].pyobj));
          }
-#line 2151 "src/python/beancount/parser/grammar.c" 
+#line 2359 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 76:
-#line 592 "src/python/beancount/parser/grammar.y" 
-    {
+  case 76: /* lot_spec: lot_spec_total_legacy  */
+#line 632 "src/python/beancount/parser/grammar.y"
+         {
              (yyval.pyobj) = (yyvsp[0].pyobj);
          }
-#line 2159 "src/python/beancount/parser/grammar.c" 
+#line 2367 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 77:
-#line 598 "src/python/beancount/parser/grammar.y" 
-    {
+  case 77: /* lot_spec_total_legacy: LCURLCURL amount RCURLCURL  */
+#line 638 "src/python/beancount/parser/grammar.y"
+                      {
                           BUILDY(DECREF1((yyvsp[-1].pyobj)),
                                  (yyval.pyobj), "lot_spec_total_legacy", "OO", (yyvsp[-1].pyobj), Py_None);
                       }
-#line 2168 "src/python/beancount/parser/grammar.c" 
+#line 2376 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 78:
-#line 603 "src/python/beancount/parser/grammar.y" 
-    {
+  case 78: /* lot_spec_total_legacy: LCURLCURL amount SLASH DATE RCURLCURL  */
+#line 643 "src/python/beancount/parser/grammar.y"
+                      {
                           BUILDY(DECREF2((yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                                  (yyval.pyobj), "lot_spec_total_legacy", "OO", (yyvsp[-3].pyobj), (yyvsp[-1].pyobj));
                       }
-#line 2177 "src/python/beancount/parser/grammar.c" 
+#line 2385 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 79:
-#line 609 "src/python/beancount/parser/grammar.y" 
-    {
+  case 79: /* lot_comp_list: empty  */
+#line 649 "src/python/beancount/parser/grammar.y"
+              {
                   Py_INCREF(Py_None);
                   (yyval.pyobj) = Py_None;
               }
-#line 2186 "src/python/beancount/parser/grammar.c" 
+#line 2394 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 80:
-#line 614 "src/python/beancount/parser/grammar.y" 
-    {
-                  BUILDY(DECREF1((yyvsp[0].pyobj)),
-                         (yyval.pyobj), "handle_list", "OO", Py_None, (yyvsp[0].pyobj));
+  case 80: /* lot_comp_list: lot_comp  */
+#line 654 "src/python/beancount/parser/grammar.y"
+              {
+                  BUILD_LIST(DECREF1((yyvsp[0].pyobj)),
+                             (yyval.pyobj), Py_None, (yyvsp[0].pyobj));
               }
-#line 2195 "src/python/beancount/parser/grammar.c" 
+#line 2403 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 81:
-#line 619 "src/python/beancount/parser/grammar.y" 
-    {
-                  BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
-                         (yyval.pyobj), "handle_list", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
+  case 81: /* lot_comp_list: lot_comp_list COMMA lot_comp  */
+#line 659 "src/python/beancount/parser/grammar.y"
+              {
+                  BUILD_LIST(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                             (yyval.pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
               }
-#line 2204 "src/python/beancount/parser/grammar.c" 
+#line 2412 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 82:
-#line 624 "src/python/beancount/parser/grammar.y" 
-    {
+  case 82: /* lot_comp_list: lot_comp_list SLASH lot_comp  */
+#line 664 "src/python/beancount/parser/grammar.y"
+              {
                   /*
                    * FIXME: Add this warning once the new booking method is the main method.
                    * In the meantime, we allow it interchangeably. Also see {a6127ff32048}.
@@ -2216,154 +2424,154 @@ yyreduce:
                   /*     "Usage of slash (/) as cost separator is deprecated; use a comma instead"); */
                   /* Py_DECREF(rv); */
 
-                  BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
-                         (yyval.pyobj), "handle_list", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
+                  BUILD_LIST(DECREF2((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                             (yyval.pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
               }
-#line 2223 "src/python/beancount/parser/grammar.c" 
+#line 2431 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 83:
-#line 640 "src/python/beancount/parser/grammar.y" 
-    {
+  case 83: /* lot_comp: compound_amount  */
+#line 680 "src/python/beancount/parser/grammar.y"
+         {
              (yyval.pyobj) = (yyvsp[0].pyobj);
          }
-#line 2231 "src/python/beancount/parser/grammar.c" 
+#line 2439 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 84:
-#line 644 "src/python/beancount/parser/grammar.y" 
-    {
+  case 84: /* lot_comp: DATE  */
+#line 684 "src/python/beancount/parser/grammar.y"
+         {
              (yyval.pyobj) = (yyvsp[0].pyobj);
          }
-#line 2239 "src/python/beancount/parser/grammar.c" 
+#line 2447 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 85:
-#line 648 "src/python/beancount/parser/grammar.y" 
-    {
+  case 85: /* lot_comp: STRING  */
+#line 688 "src/python/beancount/parser/grammar.y"
+         {
              (yyval.pyobj) = (yyvsp[0].pyobj);
          }
-#line 2247 "src/python/beancount/parser/grammar.c" 
+#line 2455 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 86:
-#line 652 "src/python/beancount/parser/grammar.y" 
-    {
+  case 86: /* lot_comp: ASTERISK  */
+#line 692 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(,
                     (yyval.pyobj), "lot_merge", "O", Py_None);
          }
-#line 2256 "src/python/beancount/parser/grammar.c" 
+#line 2464 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 87:
-#line 659 "src/python/beancount/parser/grammar.y" 
-    {
+  case 87: /* price: DATE PRICE CURRENCY amount eol key_value_list  */
+#line 699 "src/python/beancount/parser/grammar.y"
+      {
           BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "price", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2265 "src/python/beancount/parser/grammar.c" 
+#line 2473 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 88:
-#line 665 "src/python/beancount/parser/grammar.y" 
-    {
+  case 88: /* event: DATE EVENT STRING STRING eol key_value_list  */
+#line 705 "src/python/beancount/parser/grammar.y"
+      {
           BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "event", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2274 "src/python/beancount/parser/grammar.c" 
+#line 2482 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 89:
-#line 671 "src/python/beancount/parser/grammar.y" 
-    {
+  case 89: /* query: DATE QUERY STRING STRING eol key_value_list  */
+#line 711 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                     (yyval.pyobj), "query", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          }
-#line 2283 "src/python/beancount/parser/grammar.c" 
+#line 2491 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 90:
-#line 677 "src/python/beancount/parser/grammar.y" 
-    {
+  case 90: /* note: DATE NOTE ACCOUNT STRING eol key_value_list  */
+#line 717 "src/python/beancount/parser/grammar.y"
+      {
           BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "note", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2292 "src/python/beancount/parser/grammar.c" 
+#line 2500 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 92:
-#line 685 "src/python/beancount/parser/grammar.y" 
-    {
+  case 92: /* document: DATE DOCUMENT ACCOUNT filename eol key_value_list  */
+#line 725 "src/python/beancount/parser/grammar.y"
+         {
              BUILDY(DECREF4((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                     (yyval.pyobj), "document", "siOOOO", FILE_LINE_ARGS, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          }
-#line 2301 "src/python/beancount/parser/grammar.c" 
+#line 2509 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 103:
-#line 701 "src/python/beancount/parser/grammar.y" 
-    {
+  case 103: /* entry: query  */
+#line 741 "src/python/beancount/parser/grammar.y"
+      {
           (yyval.pyobj) = (yyvsp[0].pyobj);
       }
-#line 2309 "src/python/beancount/parser/grammar.c" 
+#line 2517 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 104:
-#line 706 "src/python/beancount/parser/grammar.y" 
-    {
+  case 104: /* option: OPTION STRING STRING eol  */
+#line 746 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                   (yyval.pyobj), "option", "siOO", FILE_LINE_ARGS, (yyvsp[-2].pyobj), (yyvsp[-1].pyobj));
        }
-#line 2318 "src/python/beancount/parser/grammar.c" 
+#line 2526 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 105:
-#line 712 "src/python/beancount/parser/grammar.y" 
-    {
+  case 105: /* include: INCLUDE STRING eol  */
+#line 752 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF1((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "include", "siO", FILE_LINE_ARGS, (yyvsp[-1].pyobj));
        }
-#line 2327 "src/python/beancount/parser/grammar.c" 
+#line 2535 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 106:
-#line 718 "src/python/beancount/parser/grammar.y" 
-    {
+  case 106: /* plugin: PLUGIN STRING eol  */
+#line 758 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF1((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "plugin", "siOO", FILE_LINE_ARGS, (yyvsp[-1].pyobj), Py_None);
        }
-#line 2336 "src/python/beancount/parser/grammar.c" 
+#line 2544 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 107:
-#line 723 "src/python/beancount/parser/grammar.y" 
-    {
+  case 107: /* plugin: PLUGIN STRING STRING eol  */
+#line 763 "src/python/beancount/parser/grammar.y"
+       {
            BUILDY(DECREF2((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                   (yyval.pyobj), "plugin", "siOO", FILE_LINE_ARGS, (yyvsp[-2].pyobj), (yyvsp[-1].pyobj));
        }
-#line 2345 "src/python/beancount/parser/grammar.c" 
+#line 2553 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 115:
-#line 738 "src/python/beancount/parser/grammar.y" 
-    {
+  case 115: /* declarations: declarations directive  */
+#line 778 "src/python/beancount/parser/grammar.y"
+             {
                  (yyval.pyobj) = (yyvsp[-1].pyobj);
              }
-#line 2353 "src/python/beancount/parser/grammar.c" 
+#line 2561 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 116:
-#line 742 "src/python/beancount/parser/grammar.y" 
-    {
-                 BUILDY(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                        (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+  case 116: /* declarations: declarations entry  */
+#line 782 "src/python/beancount/parser/grammar.y"
+             {
+                 BUILD_LIST(DECREF2((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                            (yyval.pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
              }
-#line 2362 "src/python/beancount/parser/grammar.c" 
+#line 2570 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 117:
-#line 747 "src/python/beancount/parser/grammar.y" 
-    {
+  case 117: /* declarations: declarations error  */
+#line 787 "src/python/beancount/parser/grammar.y"
+             {
                  /*
                   * Ignore the error and continue reducing ({3d95e55b654e}).
                   * Note that with the matching rule above, "error" will
@@ -2380,29 +2588,30 @@ yyreduce:
                   */
                  (yyval.pyobj) = (yyvsp[-1].pyobj);
              }
-#line 2384 "src/python/beancount/parser/grammar.c" 
+#line 2592 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 118:
-#line 765 "src/python/beancount/parser/grammar.y" 
-    {
+  case 118: /* declarations: empty  */
+#line 805 "src/python/beancount/parser/grammar.y"
+             {
                   Py_INCREF(Py_None);
                   (yyval.pyobj) = Py_None;
              }
-#line 2393 "src/python/beancount/parser/grammar.c" 
+#line 2601 "src/python/beancount/parser/grammar.c"
     break;
 
-  case 119:
-#line 772 "src/python/beancount/parser/grammar.y" 
-    {
+  case 119: /* file: declarations  */
+#line 812 "src/python/beancount/parser/grammar.y"
+     {
          BUILDY(,
                 (yyval.pyobj), "store_result", "O", (yyvsp[0].pyobj));
      }
-#line 2402 "src/python/beancount/parser/grammar.c" 
+#line 2610 "src/python/beancount/parser/grammar.c"
     break;
 
 
-#line 2406 "src/python/beancount/parser/grammar.c" 
+#line 2614 "src/python/beancount/parser/grammar.c"
+
       default: break;
     }
   /* User semantic actions sometimes alter yychar, and that requires
@@ -2416,11 +2625,10 @@ yyreduce:
      case of YYERROR or YYBACKUP, subsequent parser actions might lead
      to an incorrect destructor call or verbose syntax error message
      before the lookahead is translated.  */
-  YY_SYMBOL_PRINT ("-> $$ =", yyr1[yyn], &yyval, &yyloc);
+  YY_SYMBOL_PRINT ("-> $$ =", YY_CAST (yysymbol_kind_t, yyr1[yyn]), &yyval, &yyloc);
 
   YYPOPSTACK (yylen);
   yylen = 0;
-  YY_STACK_PRINT (yyss, yyssp);
 
   *++yyvsp = yyval;
   *++yylsp = yyloc;
@@ -2428,14 +2636,13 @@ yyreduce:
   /* Now 'shift' the result of the reduction.  Determine what state
      that goes to, based on the state we popped back to and the rule
      number reduced by.  */
-
-  yyn = yyr1[yyn];
-
-  yystate = yypgoto[yyn - YYNTOKENS] + *yyssp;
-  if (0 <= yystate && yystate <= YYLAST && yycheck[yystate] == *yyssp)
-    yystate = yytable[yystate];
-  else
-    yystate = yydefgoto[yyn - YYNTOKENS];
+  {
+    const int yylhs = yyr1[yyn] - YYNTOKENS;
+    const int yyi = yypgoto[yylhs] + *yyssp;
+    yystate = (0 <= yyi && yyi <= YYLAST && yycheck[yyi] == *yyssp
+               ? yytable[yyi]
+               : yydefgoto[yylhs]);
+  }
 
   goto yynewstate;
 
@@ -2446,50 +2653,45 @@ yyreduce:
 yyerrlab:
   /* Make sure we have latest lookahead translation.  See comments at
      user semantic actions for why this is necessary.  */
-  yytoken = yychar == YYEMPTY ? YYEMPTY : YYTRANSLATE (yychar);
-
+  yytoken = yychar == YYEMPTY ? YYSYMBOL_YYEMPTY : YYTRANSLATE (yychar);
   /* If not already recovering from an error, report this error.  */
   if (!yyerrstatus)
     {
       ++yynerrs;
-#if ! YYERROR_VERBOSE
-      yyerror (YY_("syntax error"));
-#else
-# define YYSYNTAX_ERROR yysyntax_error (&yymsg_alloc, &yymsg, \
-                                        yyssp, yytoken)
       {
+        yypcontext_t yyctx
+          = {yyssp, yytoken, &yylloc};
         char const *yymsgp = YY_("syntax error");
         int yysyntax_error_status;
-        yysyntax_error_status = YYSYNTAX_ERROR;
+        yysyntax_error_status = yysyntax_error (&yymsg_alloc, &yymsg, &yyctx);
         if (yysyntax_error_status == 0)
           yymsgp = yymsg;
-        else if (yysyntax_error_status == 1)
+        else if (yysyntax_error_status == -1)
           {
             if (yymsg != yymsgbuf)
               YYSTACK_FREE (yymsg);
-            yymsg = (char *) YYSTACK_ALLOC (yymsg_alloc);
-            if (!yymsg)
+            yymsg = YY_CAST (char *,
+                             YYSTACK_ALLOC (YY_CAST (YYSIZE_T, yymsg_alloc)));
+            if (yymsg)
               {
-                yymsg = yymsgbuf;
-                yymsg_alloc = sizeof yymsgbuf;
-                yysyntax_error_status = 2;
+                yysyntax_error_status
+                  = yysyntax_error (&yymsg_alloc, &yymsg, &yyctx);
+                yymsgp = yymsg;
               }
             else
               {
-                yysyntax_error_status = YYSYNTAX_ERROR;
-                yymsgp = yymsg;
+                yymsg = yymsgbuf;
+                yymsg_alloc = sizeof yymsgbuf;
+                yysyntax_error_status = YYENOMEM;
               }
           }
         yyerror (yymsgp);
-        if (yysyntax_error_status == 2)
-          goto yyexhaustedlab;
+        if (yysyntax_error_status == YYENOMEM)
+          YYNOMEM;
       }
-# undef YYSYNTAX_ERROR
-#endif
     }
 
   yyerror_range[1] = yylloc;
-
   if (yyerrstatus == 3)
     {
       /* If just tried and failed to reuse lookahead token after an
@@ -2518,14 +2720,12 @@ yyerrlab:
 | yyerrorlab -- error raised explicitly by YYERROR.  |
 `---------------------------------------------------*/
 yyerrorlab:
+  /* Pacify compilers when the user code never invokes YYERROR and the
+     label yyerrorlab therefore never appears in user code.  */
+  if (0)
+    YYERROR;
+  ++yynerrs;
 
-  /* Pacify compilers like GCC when the user code never invokes
-     YYERROR and the label yyerrorlab therefore never appears in user
-     code.  */
-  if (/*CONSTCOND*/ 0)
-     goto yyerrorlab;
-
-  yyerror_range[1] = yylsp[1-yylen];
   /* Do not reclaim the symbols of the rule whose action triggered
      this YYERROR.  */
   YYPOPSTACK (yylen);
@@ -2541,13 +2741,14 @@ yyerrorlab:
 yyerrlab1:
   yyerrstatus = 3;      /* Each real token shifted decrements this.  */
 
+  /* Pop stack until we find a state that shifts the error token.  */
   for (;;)
     {
       yyn = yypact[yystate];
       if (!yypact_value_is_default (yyn))
         {
-          yyn += YYTERROR;
-          if (0 <= yyn && yyn <= YYLAST && yycheck[yyn] == YYTERROR)
+          yyn += YYSYMBOL_YYerror;
+          if (0 <= yyn && yyn <= YYLAST && yycheck[yyn] == YYSYMBOL_YYerror)
             {
               yyn = yytable[yyn];
               if (0 < yyn)
@@ -2561,7 +2762,7 @@ yyerrlab1:
 
       yyerror_range[1] = *yylsp;
       yydestruct ("Error: popping",
-                  yystos[yystate], yyvsp, yylsp);
+                  YY_ACCESSING_SYMBOL (yystate), yyvsp, yylsp);
       YYPOPSTACK (1);
       yystate = *yyssp;
       YY_STACK_PRINT (yyss, yyssp);
@@ -2572,13 +2773,11 @@ yyerrlab1:
   YY_IGNORE_MAYBE_UNINITIALIZED_END
 
   yyerror_range[2] = yylloc;
-  /* Using YYLLOC is tempting, but would change the location of
-     the lookahead.  YYLOC is available though.  */
-  YYLLOC_DEFAULT (yyloc, yyerror_range, 2);
-  *++yylsp = yyloc;
+  ++yylsp;
+  YYLLOC_DEFAULT (*yylsp, yyerror_range, 2);
 
   /* Shift the error token.  */
-  YY_SYMBOL_PRINT ("Shifting", yystos[yyn], yyvsp, yylsp);
+  YY_SYMBOL_PRINT ("Shifting", YY_ACCESSING_SYMBOL (yyn), yyvsp, yylsp);
 
   yystate = yyn;
   goto yynewstate;
@@ -2589,26 +2788,30 @@ yyerrlab1:
 `-------------------------------------*/
 yyacceptlab:
   yyresult = 0;
-  goto yyreturn;
+  goto yyreturnlab;
+
 
 /*-----------------------------------.
 | yyabortlab -- YYABORT comes here.  |
 `-----------------------------------*/
 yyabortlab:
   yyresult = 1;
-  goto yyreturn;
+  goto yyreturnlab;
 
-#if !defined yyoverflow || YYERROR_VERBOSE
-/*-------------------------------------------------.
-| yyexhaustedlab -- memory exhaustion comes here.  |
-`-------------------------------------------------*/
+
+/*-----------------------------------------------------------.
+| yyexhaustedlab -- YYNOMEM (memory exhaustion) comes here.  |
+`-----------------------------------------------------------*/
 yyexhaustedlab:
   yyerror (YY_("memory exhausted"));
   yyresult = 2;
-  /* Fall through.  */
-#endif
+  goto yyreturnlab;
+
 
-yyreturn:
+/*----------------------------------------------------------.
+| yyreturnlab -- parsing is finished, clean up and return.  |
+`----------------------------------------------------------*/
+yyreturnlab:
   if (yychar != YYEMPTY)
     {
       /* Make sure we have latest lookahead translation.  See comments at
@@ -2624,20 +2827,19 @@ yyreturn:
   while (yyssp != yyss)
     {
       yydestruct ("Cleanup: popping",
-                  yystos[*yyssp], yyvsp, yylsp);
+                  YY_ACCESSING_SYMBOL (+*yyssp), yyvsp, yylsp);
       YYPOPSTACK (1);
     }
 #ifndef yyoverflow
   if (yyss != yyssa)
     YYSTACK_FREE (yyss);
 #endif
-#if YYERROR_VERBOSE
   if (yymsg != yymsgbuf)
     YYSTACK_FREE (yymsg);
-#endif
   return yyresult;
 }
-#line 780 "src/python/beancount/parser/grammar.y" 
+
+#line 820 "src/python/beancount/parser/grammar.y"
 
 
 /* A function that will convert a token name to a string, used in debugging. */
@@ -1,8 +1,9 @@
-/* A Bison parser, made by GNU Bison 3.0.4.  */
+/* A Bison parser, made by GNU Bison 3.8.2.  */
 
 /* Bison interface for Yacc-like parsers in C
 
-   Copyright (C) 1984, 1989-1990, 2000-2015 Free Software Foundation, Inc.
+   Copyright (C) 1984, 1989-1990, 2000-2015, 2018-2021 Free Software Foundation,
+   Inc.
 
    This program is free software: you can redistribute it and/or modify
    it under the terms of the GNU General Public License as published by
@@ -15,7 +16,7 @@
    GNU General Public License for more details.
 
    You should have received a copy of the GNU General Public License
-   along with this program.  If not, see <http://www.gnu.org/licenses/>.  */
+   along with this program.  If not, see <https://www.gnu.org/licenses/>.  */
 
 /* As a special exception, you may create a larger work that contains
    part or all of the Bison parser skeleton and distribute that work
@@ -30,6 +31,10 @@
    This special exception was added by the Free Software Foundation in
    version 2.2 of Bison.  */
 
+/* DO NOT RELY ON FEATURES THAT ARE NOT DOCUMENTED in the manual,
+   especially those whose name start with YY_ or yy_.  They are
+   private implementation details that can be changed or removed.  */
+
 #ifndef YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
 # define YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
 /* Debug traces.  */
@@ -40,69 +45,73 @@
 extern int yydebug;
 #endif
 
-/* Token type.  */
+/* Token kinds.  */
 #ifndef YYTOKENTYPE
 # define YYTOKENTYPE
   enum yytokentype
   {
-    LEX_ERROR = 258,
-    INDENT = 259,
-    EOL = 260,
-    COMMENT = 261,
-    SKIPPED = 262,
-    PIPE = 263,
-    ATAT = 264,
-    AT = 265,
-    LCURLCURL = 266,
-    RCURLCURL = 267,
-    LCURL = 268,
-    RCURL = 269,
-    EQUAL = 270,
-    COMMA = 271,
-    TILDE = 272,
-    HASH = 273,
-    ASTERISK = 274,
-    SLASH = 275,
-    PLUS = 276,
-    MINUS = 277,
-    LPAREN = 278,
-    RPAREN = 279,
-    FLAG = 280,
-    TXN = 281,
-    BALANCE = 282,
-    OPEN = 283,
-    CLOSE = 284,
-    COMMODITY = 285,
-    PAD = 286,
-    EVENT = 287,
-    PRICE = 288,
-    NOTE = 289,
-    DOCUMENT = 290,
-    QUERY = 291,
-    PUSHTAG = 292,
-    POPTAG = 293,
-    OPTION = 294,
-    INCLUDE = 295,
-    PLUGIN = 296,
-    BOOL = 297,
-    DATE = 298,
-    ACCOUNT = 299,
-    CURRENCY = 300,
-    STRING = 301,
-    NUMBER = 302,
-    TAG = 303,
-    LINK = 304,
-    KEY = 305,
-    NEGATIVE = 306
+    YYEMPTY = -2,
+    YYEOF = 0,                     /* "end of file"  */
+    YYerror = 256,                 /* error  */
+    YYUNDEF = 257,                 /* "invalid token"  */
+    LEX_ERROR = 258,               /* LEX_ERROR  */
+    INDENT = 259,                  /* INDENT  */
+    EOL = 260,                     /* EOL  */
+    COMMENT = 261,                 /* COMMENT  */
+    SKIPPED = 262,                 /* SKIPPED  */
+    PIPE = 263,                    /* PIPE  */
+    ATAT = 264,                    /* ATAT  */
+    AT = 265,                      /* AT  */
+    LCURLCURL = 266,               /* LCURLCURL  */
+    RCURLCURL = 267,               /* RCURLCURL  */
+    LCURL = 268,                   /* LCURL  */
+    RCURL = 269,                   /* RCURL  */
+    EQUAL = 270,                   /* EQUAL  */
+    COMMA = 271,                   /* COMMA  */
+    TILDE = 272,                   /* TILDE  */
+    HASH = 273,                    /* HASH  */
+    ASTERISK = 274,                /* ASTERISK  */
+    SLASH = 275,                   /* SLASH  */
+    PLUS = 276,                    /* PLUS  */
+    MINUS = 277,                   /* MINUS  */
+    LPAREN = 278,                  /* LPAREN  */
+    RPAREN = 279,                  /* RPAREN  */
+    FLAG = 280,                    /* FLAG  */
+    TXN = 281,                     /* TXN  */
+    BALANCE = 282,                 /* BALANCE  */
+    OPEN = 283,                    /* OPEN  */
+    CLOSE = 284,                   /* CLOSE  */
+    COMMODITY = 285,               /* COMMODITY  */
+    PAD = 286,                     /* PAD  */
+    EVENT = 287,                   /* EVENT  */
+    PRICE = 288,                   /* PRICE  */
+    NOTE = 289,                    /* NOTE  */
+    DOCUMENT = 290,                /* DOCUMENT  */
+    QUERY = 291,                   /* QUERY  */
+    PUSHTAG = 292,                 /* PUSHTAG  */
+    POPTAG = 293,                  /* POPTAG  */
+    OPTION = 294,                  /* OPTION  */
+    INCLUDE = 295,                 /* INCLUDE  */
+    PLUGIN = 296,                  /* PLUGIN  */
+    BOOL = 297,                    /* BOOL  */
+    DATE = 298,                    /* DATE  */
+    ACCOUNT = 299,                 /* ACCOUNT  */
+    CURRENCY = 300,                /* CURRENCY  */
+    STRING = 301,                  /* STRING  */
+    NUMBER = 302,                  /* NUMBER  */
+    TAG = 303,                     /* TAG  */
+    LINK = 304,                    /* LINK  */
+    KEY = 305,                     /* KEY  */
+    NEGATIVE = 306                 /* NEGATIVE  */
   };
+  typedef enum yytokentype yytoken_kind_t;
 #endif
 
 /* Value type.  */
 #if ! defined YYSTYPE && ! defined YYSTYPE_IS_DECLARED
-
 union YYSTYPE
 {
-#line 130 "src/python/beancount/parser/grammar.y" 
+#line 170 "src/python/beancount/parser/grammar.y"
 
     char character;
     const char* string;
@@ -112,9 +121,9 @@ union YYSTYPE
         PyObject* pyobj2;
     } pairobj;
 
-#line 116 "src/python/beancount/parser/grammar.h" 
-};
+#line 125 "src/python/beancount/parser/grammar.h"
 
+};
 typedef union YYSTYPE YYSTYPE;
 # define YYSTYPE_IS_TRIVIAL 1
 # define YYSTYPE_IS_DECLARED 1
@@ -136,6 +145,8 @@ struct YYLTYPE
 
 
 
+
 int yyparse (void);
 
+
 #endif /* !YY_YY_SRC_PYTHON_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED  */
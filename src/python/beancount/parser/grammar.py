@@ -479,27 +479,17 @@ class Builder(lexer.LexBuilder):
         Returns:
           A new instance of Position.
         """
+        # Note: This is invoked for every posting; construct the LotSpec directly
+        # rather than using _replace(), which is substantially slower.
         if lot_spec is None:
-            lot_spec = LotSpec(None, None, None, None, None)
-        # FIXME: Remove this assert for performance reasons.
-        assert isinstance(lot_spec, LotSpec), (
-            "Invalid type for Position.lot: %s (%s)".format(type(lot_spec), lot_spec))
-        return Position(lot_spec._replace(currency=amount.currency), amount.number)
-
-    def handle_list(self, object_list, new_object):
-        """Handle a recursive list grammar rule, generically.
-
-        Args:
-          object_list: the current list of objects.
-          new_object: the new object to be added.
-        Returns:
-          The new, updated list of objects.
-        """
-        if object_list is None:
-            object_list = []
-        if new_object is not None:
-            object_list.append(new_object)
-        return object_list
+            lot_spec = LotSpec(amount.currency, None, None, None, None)
+        else:
+            # FIXME: Remove this assert for performance reasons.
+            assert isinstance(lot_spec, LotSpec), (
+                "Invalid type for Position.lot: %s (%s)".format(type(lot_spec), lot_spec))
+            _, compound_cost, lot_date, label, merge = lot_spec
+            lot_spec = LotSpec(amount.currency, compound_cost, lot_date, label, merge)
+        return Position(lot_spec, amount.number)
 
     def open(self, filename, lineno, date, account, currencies, booking, kvlist):
         """Process an open directive.
@@ -5,7 +5,9 @@ __author__ = "Martin Blais <blais@furius.ca>"
 import collections
 import datetime
 import re
+import sys
 import tempfile
+import threading
 
 from beancount.core import data
 from beancount.core.number import Decimal
@@ -15,6 +17,20 @@ from beancount.parser import _parser
 LexerError = collections.namedtuple('LexerError', 'source message entry')
 
 
+# The C extension keeps the state of the lexer and parser (the input buffers,
+# the current builder, filename and line number) in global variables and calls
+# back into Python code while running, so it is not reentrant: two threads
+# lexing or parsing at the same time corrupt each other's state and crash the
+# process. Every use of the extension's lexer and parser functions, from
+# initialization to finalization, must hold this lock. It is reentrant so that
+# the builder callbacks, which run with the lock held, may query the lexer's
+# location. Note that starting a new parse in a thread which is already in the
+# middle of lexing or parsing is not supported. If you need to parse files
+# concurrently, use separate processes (see the 'processes' option of
+# loader.load_file()).
+parser_lock = threading.RLock()
+
+
 class LexBuilder(object):
     """A builder used only for building lexer objects.
 
@@ -54,8 +70,9 @@ class LexBuilder(object):
         return 'Equity:InvalidAccountName'
 
     def get_lexer_location(self):
-        return data.new_metadata(_parser.get_yyfilename(),
-                                 _parser.get_yylineno())
+        with parser_lock:
+            return data.new_metadata(_parser.get_yyfilename(),
+                                     _parser.get_yylineno())
 
     # Note: We could simplify the code by removing this if we could find a good
     # way to have the lexer communicate the error contents to the parser.
@@ -114,6 +131,10 @@ class LexBuilder(object):
           A new currency object; for now, these are simply represented
           as the currency name.
         """
+        # Intern the currency strings. There are only a handful of distinct
+        # currencies but they appear on every amount, cost and price, so
+        # sharing a single string instance for each saves a lot of memory.
+        currency_name = sys.intern(currency_name)
         self.commodities.add(currency_name)
         return currency_name
 
@@ -197,6 +218,10 @@ def lex_iter(file, builder=None, encoding=None):
     Yields:
       Tuples of the token (a string), the matched text (a string), and the line
       no (an integer).
+
+    Note that the entire file is lexed on the first call to next(), while
+    holding the parser's lock, and the tokens are yielded after releasing it, so
+    that an iterator which is not consumed does not block other threads.
     """
     if isinstance(file, str):
         filename = file
@@ -204,13 +229,18 @@ def lex_iter(file, builder=None, encoding=None):
         filename = file.name
     if builder is None:
         builder = LexBuilder()
-    _parser.lexer_initialize(filename, builder, encoding)
-    while 1:
-        token_tuple = _parser.lexer_next()
-        if token_tuple is None:
-            break
-        yield token_tuple
-    _parser.lexer_finalize()
+    tokens = []
+    with parser_lock:
+        _parser.lexer_initialize(filename, builder, encoding)
+        try:
+            while 1:
+                token_tuple = _parser.lexer_next()
+                if token_tuple is None:
+                    break
+                tokens.append(token_tuple)
+        finally:
+            _parser.lexer_finalize()
+    yield from tokens
 
 
 def lex_iter_string(string, builder=None, encoding=None):
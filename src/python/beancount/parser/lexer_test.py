@@ -106,6 +106,15 @@ class TestLexer(unittest.TestCase):
             ('EOL', 12, '\x00', None)
             ], tokens)
 
+    @lex_tokens
+    def test_currency_interned(self, tokens, errors):
+        """\
+          USD HOOL USD
+        """
+        currencies = [token[3] for token in tokens if token[0] == 'CURRENCY']
+        self.assertEqual(['USD', 'HOOL', 'USD'], currencies)
+        self.assertIs(currencies[0], currencies[2])
+
     @lex_tokens
     def test_lex_indent(self, tokens, errors):
         """\
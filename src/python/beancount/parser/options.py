@@ -158,8 +158,9 @@ PRIVATE_OPTION_GROUPS = [
 
     OptGroup("""
       A list of other filenames to include. This is output from the parser and
-      processed by the loader but the list should otherwise have been cleared by the
-      time it gets to the top-level loader.load_*() function that invoked it.
+      processed by the loader, which replaces it by the list of all the files
+      included by the top-level file, directly or indirectly, by the time it
+      gets to the top-level loader.load_*() function that invoked it.
       The filenames are absolute. Relative include filenames are resolved against
       the file that contains the include directives.
     """, [Opt("include", [], "some-other-file.beancount")]),
@@ -175,6 +176,40 @@ PRIVATE_OPTION_GROUPS = [
       This is mainly used for efficiency, best computed once at parse time.
     """, [Opt("commodities", set())]),
 
+    OptGroup("""
+      An instance of PriceMap, built by the loader from the final list of
+      entries, so that reports and queries over the same entries do not need to
+      build their own. Its 'entries' attribute refers to that list. It may be
+      updated in place with new Price entries via its add_prices() method. This
+      is None if the options did not come from the loader.
+    """, [Opt("price_map", None)]),
+
+    OptGroup("""
+      An instance of compare.EntryHashCache, created by the loader, which
+      memoizes the stable hashes of the final entries computed by plugins and
+      other consumers of the same entries, e.g., to look up entries by hash. The
+      hashes of other entries are not memoized. This is None if the options did
+      not come from the loader.
+    """, [Opt("entry_hashes", None)]),
+
+    OptGroup("""
+      A dict of the transactions that were found to balance during booking, used
+      by the validation to avoid checking them again. It maps the id() of the
+      list of postings of each transaction to a pair of that list and a snapshot
+      of the contents of its postings at the time (see
+      interpolate.get_balance_contents()), so that changes made to the postings
+      by plugins can be detected. This is set by the loader and reset to None
+      after validation.
+    """, [Opt("balanced_transactions", None)]),
+
+    OptGroup("""
+      An instance of summarize.BalanceSnapshots for the entries produced by the
+      loader, which caches the balances of the accounts at the beginning of each
+      month, so that summarizing these entries at some date does not have to
+      accumulate them from the very first one. This is None if the options did
+      not come from the loader.
+    """, [Opt("balance_snapshots", None)]),
+
     ]
 
 
@@ -439,6 +474,13 @@ OPTIONS_DEFAULTS = {desc.name: desc.default_value
 READ_ONLY_OPTIONS = {"filename"}
 
 
+# A set of the options holding the objects built by the loader at runtime,
+# rather than values parsed from the input file. These are not meant to be
+# printed.
+RUNTIME_OPTIONS = {"price_map", "entry_hashes", "balanced_transactions",
+                   "balance_snapshots"}
+
+
 def get_account_types(options):
     """Extract the account type names from the parser's options.
 
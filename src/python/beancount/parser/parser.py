@@ -41,6 +41,7 @@ from os import path
 
 from beancount.parser import _parser
 from beancount.parser import grammar
+from beancount.parser import lexer
 from beancount.parser import printer
 from beancount.parser import hashsrc
 from beancount.core import data
@@ -78,6 +79,11 @@ def parse_file(filename, **kw):
     """Parse a beancount input file and return Ledger with the list of
     transactions and tree of accounts.
 
+    This may be called from multiple threads, but the C parser is not
+    reentrant, so the calls are serialized with a module-wide lock (see
+    lexer.parser_lock) and do not run in parallel. Use separate processes to
+    parse files concurrently.
+
     Args:
       filename: the name of the file to be parsed.
       kw: a dict of keywords to be applied to the C parser.
@@ -89,7 +95,8 @@ def parse_file(filename, **kw):
     """
     abs_filename = path.abspath(filename) if filename else None
     builder = grammar.Builder(abs_filename)
-    _parser.parse_file(filename, builder, **kw)
+    with lexer.parser_lock:
+        _parser.parse_file(filename, builder, **kw)
     return builder.finalize()
 
 # Alias, for compatibility.
@@ -111,7 +118,8 @@ def parse_string(string, **kw):
     if kw.pop('dedent', None):
         string = textwrap.dedent(string)
     builder = grammar.Builder(None)
-    _parser.parse_string(string, builder, **kw)
+    with lexer.parser_lock:
+        _parser.parse_string(string, builder, **kw)
     builder.options['filename'] = '<string>'
     return builder.finalize()
 
@@ -8,8 +8,10 @@ import tempfile
 import textwrap
 import sys
 import subprocess
+import threading
 
 from beancount.parser import parser
+from beancount.parser import lexer
 from beancount.utils import test_utils
 
 
@@ -124,6 +126,82 @@ class TestParserInputs(unittest.TestCase):
             entries, errors, _ = parser.parse_string("something", None, report_filename)
 
 
+class TestParserThreads(unittest.TestCase):
+
+    def test_parse_string_concurrently(self):
+        inputs = ["""
+          2013-05-{:02d} * "Dinner number {}"
+            Expenses:Restaurant         {} USD
+            Assets:US:Cash
+        """.format(day, day, day) * 50 for day in range(1, 9)]
+        expected = [parser.parse_string(input_string, dedent=True)[0]
+                    for input_string in inputs]
+
+        results = [[] for _ in inputs]
+        def parse(index):
+            for _ in range(10):
+                entries, _, __ = parser.parse_string(inputs[index], dedent=True)
+                results[index].append(entries)
+        threads = [threading.Thread(target=parse, args=(index,))
+                   for index in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for entries, entries_list in zip(expected, results):
+            self.assertEqual([entries] * 10, entries_list)
+
+    def test_parse_and_lex_file_concurrently(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(textwrap.dedent("""
+              2013-05-01 open Assets:US:Cash
+              2013-05-01 open Expenses:Restaurant
+            """))
+            for day in range(1, 29):
+                file.write(textwrap.dedent("""
+                  2013-05-{:02d} * "Dinner number {}"
+                    Expenses:Restaurant         {} USD
+                    Assets:US:Cash
+                """.format(day, day, day)) * 10)
+            file.flush()
+            expected_entries = parser.parse_file(file.name)[0]
+            expected_tokens = list(lexer.lex_iter(file.name))
+
+            results = []
+            def parse():
+                for _ in range(10):
+                    results.append(parser.parse_file(file.name)[0] == expected_entries)
+            def lex():
+                for _ in range(10):
+                    results.append(list(lexer.lex_iter(file.name)) == expected_tokens)
+            threads = [threading.Thread(target=target)
+                       for target in (parse, parse, lex, lex)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([True] * 40, results)
+
+    def test_lex_iter_partially_consumed(self):
+        # A lexer iterator left half-consumed does not block parsing elsewhere.
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(textwrap.dedent("""
+              2013-05-01 open Assets:US:Cash
+              2013-05-01 open Expenses:Restaurant
+            """))
+            file.flush()
+            tokens = lexer.lex_iter(file.name)
+            next(tokens)
+            results = []
+            thread = threading.Thread(
+                target=lambda: results.append(parser.parse_file(file.name)[0]))
+            thread.start()
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(2, len(results[0]))
+            self.assertTrue(list(tokens))
+
+
 class TestUnicodeErrors(unittest.TestCase):
 
     test_utf8_string = textwrap.dedent("""
@@ -6,6 +6,7 @@ from beancount.query import query_parser
 from beancount.query import query_compile
 from beancount.query import query_env
 from beancount.query import query_execute
+from beancount.query import query_optimize
 from beancount.query import numberify as numberify_lib
 
 
@@ -41,6 +42,7 @@ def run_query(entries, options_map, query, *format_args, numberify=False):
                                     env_targets,
                                     env_postings,
                                     env_entries)
+    c_query = query_optimize.optimize(c_query)
 
     # Execute it to obtain the result rows.
     rtypes, rrows = query_execute.execute_query(c_query, entries, options_map)
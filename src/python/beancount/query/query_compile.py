@@ -43,12 +43,26 @@ class EvalNode:
                                          for child in self.__slots__))
     __repr__ = __str__
 
+    @classmethod
+    def attributes(cls):
+        """Returns the names of the attributes of the nodes of this class.
+
+        Unlike __slots__, which only lists the attributes declared by the class
+        itself, this includes those declared by all its base classes.
+
+        Returns:
+          A list of attribute names.
+        """
+        return [attr
+                for klass in reversed(cls.__mro__)
+                for attr in klass.__dict__.get('__slots__', ())]
+
     def childnodes(self):
         """Returns the child nodes of this node.
         Yields:
           A list of EvalNode instances.
         """
-        for attr in self.__slots__:
+        for attr in self.attributes():
             child = getattr(self, attr)
             if isinstance(child, EvalNode):
                 yield child
@@ -71,6 +85,23 @@ class EvalNode:
         """
         raise NotImplementedError
 
+    def evaluate_batch(self, context, table, rows):
+        """Evaluate this node over a batch of rows of a posting table.
+
+        The default implementation evaluates the node one row at a time.
+        Subclasses override this to process entire columns at once.
+
+        Args:
+          context: A RowContext instance, which provides the global attributes
+            used by some of the accessors.
+          table: An instance of query_table.PostingTable.
+          rows: A sequence of integer row indexes into 'table'.
+        Returns:
+          A list of the evaluated values, one for each row.
+        """
+        return [self(row_context)
+                for row_context in table.iter_contexts(context, rows)]
+
 
 class EvalConstant(EvalNode):
     __slots__ = ('value',)
@@ -82,6 +113,9 @@ class EvalConstant(EvalNode):
     def __call__(self, _):
         return self.value
 
+    def evaluate_batch(self, context, table, rows):
+        return [self.value] * len(rows)
+
 
 class EvalUnaryOp(EvalNode):
     __slots__ = ('operand', 'operator')
@@ -94,6 +128,10 @@ class EvalUnaryOp(EvalNode):
     def __call__(self, context):
         return self.operator(self.operand(context))
 
+    def evaluate_batch(self, context, table, rows):
+        return list(map(self.operator,
+                        self.operand.evaluate_batch(context, table, rows)))
+
 class EvalNot(EvalUnaryOp):
 
     def __init__(self, operand):
@@ -112,6 +150,22 @@ class EvalBinaryOp(EvalNode):
     def __call__(self, context):
         return self.operator(self.left(context), self.right(context))
 
+    def evaluate_batch(self, context, table, rows):
+        if isinstance(self.right, EvalConstant):
+            # Comparisons of an ordered column against a constant may be
+            # vectorized by the table.
+            if isinstance(self.left, EvalColumn) and self.left.array_name:
+                result = table.compare(self.left.array_name, self.operator,
+                                       self.right.value, rows)
+                if result is not None:
+                    return result
+            value = self.right.value
+            return [self.operator(left, value)
+                    for left in self.left.evaluate_batch(context, table, rows)]
+        return list(map(self.operator,
+                        self.left.evaluate_batch(context, table, rows),
+                        self.right.evaluate_batch(context, table, rows)))
+
 class EvalEqual(EvalBinaryOp):
 
     def __init__(self, left, right):
@@ -122,11 +176,33 @@ class EvalAnd(EvalBinaryOp):
     def __init__(self, left, right):
         super().__init__(operator.and_, left, right, bool)
 
+    def __call__(self, context):
+        # Short-circuit the evaluation of the right operand.
+        return self.left(context) and self.right(context)
+
+    def evaluate_batch(self, context, table, rows):
+        # Evaluate the right operand only on the rows where it is needed.
+        left = self.left.evaluate_batch(context, table, rows)
+        right = iter(self.right.evaluate_batch(
+            context, table, [row for row, value in zip(rows, left) if value]))
+        return [next(right) if value else value for value in left]
+
 class EvalOr(EvalBinaryOp):
 
     def __init__(self, left, right):
         super().__init__(operator.or_, left, right, bool)
 
+    def __call__(self, context):
+        # Short-circuit the evaluation of the right operand.
+        return self.left(context) or self.right(context)
+
+    def evaluate_batch(self, context, table, rows):
+        # Evaluate the right operand only on the rows where it is needed.
+        left = self.left.evaluate_batch(context, table, rows)
+        right = iter(self.right.evaluate_batch(
+            context, table, [row for row, value in zip(rows, left) if not value]))
+        return [value if value else next(right) for value in left]
+
 class EvalGreater(EvalBinaryOp):
 
     def __init__(self, left, right):
@@ -173,6 +249,11 @@ class EvalContains(EvalBinaryOp):
         arg_right = self.right(context)
         return self.operator(arg_right, arg_left)
 
+    def evaluate_batch(self, context, table, rows):
+        return list(map(self.operator,
+                        self.right.evaluate_batch(context, table, rows),
+                        self.left.evaluate_batch(context, table, rows)))
+
 
 # Interpreter nodes.
 OPERATORS = {
@@ -226,9 +307,19 @@ class EvalFunction(EvalNode):
 class EvalColumn(EvalNode):
     "Base class for all column accessors."
 
+    # The name of the posting table array for this column, if the column can be
+    # compared against constants in a vectorized fashion. See
+    # query_table.PostingTable.get_array().
+    array_name = None
+
 class EvalAggregator(EvalFunction):
     "Base class for all aggregator evaluator types."
 
+    # True if the partial aggregates of separate shards of the rows can be
+    # combined with merge(). Aggregators which implement merge() set this, and
+    # only queries whose aggregators all set it are aggregated in parallel.
+    mergeable = False
+
     # We should not have to recurse any further because there should be no
     # aggregations under an aggregation node.
 
@@ -264,6 +355,36 @@ class EvalAggregator(EvalFunction):
         """
         # Do nothing by default.
 
+    def update_batch(self, store, context, table, rows):
+        """Update this node's aggregate data with a batch of rows.
+
+        The default implementation calls update() one row at a time. Override
+        this method to aggregate entire columns at once.
+
+        Args:
+          store: An object indexable by handles appropriated during allocate().
+          context: A RowContext instance (see EvalNode.evaluate_batch()).
+          table: An instance of query_table.PostingTable.
+          rows: A sequence of integer row indexes into 'table'.
+        """
+        for row_context in table.iter_contexts(context, rows):
+            self.update(store, row_context)
+
+    def merge(self, store, other_store):
+        """Merge the aggregate data of a partial aggregation into this one.
+
+        This is used to combine the results of aggregating separate shards of
+        the rows. 'other_store' holds the aggregate of rows that follow those
+        aggregated in 'store'. Only aggregators whose 'mergeable' attribute is
+        true implement this method.
+
+        Args:
+          store: An object indexable by handles appropriated during allocate().
+          other_store: Another such object, initialized and updated, but not
+            finalized.
+        """
+        raise NotImplementedError
+
     def finalize(self, store):
         """Finalize this node's aggregate data and return it.
 
@@ -419,6 +540,21 @@ def _get_columns_and_aggregates(node, columns, aggregates):
             _get_columns_and_aggregates(child, columns, aggregates)
 
 
+def get_conjuncts(node):
+    """Split a logical expression into the list of its conjuncts.
+
+    Args:
+      node: An instance of EvalNode.
+    Returns:
+      A list of EvalNode instances, the operands of the tree of EvalAnd nodes at
+      the root of 'node', in evaluation order. If 'node' is not an EvalAnd node,
+      the list contains only 'node' itself.
+    """
+    if isinstance(node, EvalAnd):
+        return get_conjuncts(node.left) + get_conjuncts(node.right)
+    return [node]
+
+
 def is_aggregate(node):
     """Return true if the node is an aggregate.
 
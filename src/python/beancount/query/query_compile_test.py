@@ -171,6 +171,31 @@ class TestCompileDataTypes(unittest.TestCase):
         self.assertEqual(bool, c_or.dtype)
 
 
+class TestEvalShortCircuit(unittest.TestCase):
+
+    class EvalRaise(qc.EvalNode):
+        def __init__(self):
+            super().__init__(bool)
+        def __call__(self, context):
+            raise AssertionError("Should not be evaluated")
+
+    def test_and(self):
+        c_and = qc.EvalAnd(qc.EvalConstant(False), self.EvalRaise())
+        self.assertFalse(c_and(None))
+
+    def test_or(self):
+        c_or = qc.EvalOr(qc.EvalConstant(True), self.EvalRaise())
+        self.assertTrue(c_or(None))
+
+    def test_get_conjuncts(self):
+        c_left, c_middle, c_right = (qc.EvalConstant(1), qc.EvalConstant(2),
+                                     qc.EvalConstant(3))
+        self.assertEqual([c_left, c_middle, c_right], qc.get_conjuncts(
+            qc.EvalAnd(qc.EvalAnd(c_left, c_middle), c_right)))
+        c_or = qc.EvalOr(c_left, c_right)
+        self.assertEqual([c_or], qc.get_conjuncts(c_or))
+
+
 class TestCompileMisc(unittest.TestCase):
 
     def test_find_unique_names(self):
@@ -26,6 +26,7 @@ from beancount.core import data
 from beancount.core import getters
 from beancount.ops import prices
 from beancount.query import query_compile
+from beancount.query import query_table
 
 
 # Non-agreggating functions. These functionals maintain no state.
@@ -300,10 +301,10 @@ class ConvertInventory(query_compile.EvalFunction):
         args = self.eval_args(context)
         inventory_, currency = args
         converted_inventory = inventory.Inventory()
-        for position_ in inventory_:
-            amount_ = position_.get_cost()
-            converted_amount = prices.convert_amount(context.price_map,
-                                                     currency, amount_)
+        amounts = [position_.get_cost() for position_ in inventory_]
+        converted_amounts = prices.convert_amounts(context.price_map,
+                                                   currency, amounts)
+        for amount_, converted_amount in zip(amounts, converted_amounts):
             if converted_amount is None:
                 logging.warn('Could not convert Inventory position "{}" to USD'.format(
                     amount_))
@@ -371,6 +372,7 @@ SIMPLE_FUNCTIONS = {
 class Count(query_compile.EvalAggregator):
     "Count the number of occurrences of the argument."
     __intypes__ = [object]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, int)
@@ -384,12 +386,19 @@ class Count(query_compile.EvalAggregator):
     def update(self, store, unused_ontext):
         store[self.handle] += 1
 
+    def update_batch(self, store, unused_context, unused_table, rows):
+        store[self.handle] += len(rows)
+
+    def merge(self, store, other_store):
+        store[self.handle] += other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
 class Sum(query_compile.EvalAggregator):
     "Calculate the sum of the numerical argument."
     __intypes__ = [(int, float, Decimal)]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, operands[0].dtype)
@@ -404,10 +413,18 @@ class Sum(query_compile.EvalAggregator):
         value = self.eval_args(context)[0]
         store[self.handle] += value
 
+    def update_batch(self, store, context, table, rows):
+        values = self.operands[0].evaluate_batch(context, table, rows)
+        store[self.handle] = sum(values, store[self.handle])
+
+    def merge(self, store, other_store):
+        store[self.handle] += other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
 class SumBase(query_compile.EvalAggregator):
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, inventory.Inventory)
@@ -418,6 +435,9 @@ class SumBase(query_compile.EvalAggregator):
     def initialize(self, store):
         store[self.handle] = inventory.Inventory()
 
+    def merge(self, store, other_store):
+        store[self.handle].add_inventory(other_store[self.handle])
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -430,6 +450,11 @@ class SumAmount(SumBase):
         value = self.eval_args(context)[0]
         store[self.handle].add_amount(value)
 
+    def update_batch(self, store, context, table, rows):
+        add_amount = store[self.handle].add_amount
+        for value in self.operands[0].evaluate_batch(context, table, rows):
+            add_amount(value)
+
 class SumPosition(SumBase):
     "Calculate the sum of the position. The result is an Inventory."
     __intypes__ = [position.Position]
@@ -438,6 +463,11 @@ class SumPosition(SumBase):
         value = self.eval_args(context)[0]
         store[self.handle].add_position(value)
 
+    def update_batch(self, store, context, table, rows):
+        add_position = store[self.handle].add_position
+        for value in self.operands[0].evaluate_batch(context, table, rows):
+            add_position(value)
+
 class SumInventory(SumBase):
     "Calculate the sum of the inventories. The result is an Inventory."
     __intypes__ = [inventory.Inventory]
@@ -446,9 +476,15 @@ class SumInventory(SumBase):
         value = self.eval_args(context)[0]
         store[self.handle].add_inventory(value)
 
+    def update_batch(self, store, context, table, rows):
+        add_inventory = store[self.handle].add_inventory
+        for value in self.operands[0].evaluate_batch(context, table, rows):
+            add_inventory(value)
+
 class First(query_compile.EvalAggregator):
     "Keep the first of the values seen."
     __intypes__ = [object]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, operands[0].dtype)
@@ -464,12 +500,24 @@ class First(query_compile.EvalAggregator):
             value = self.eval_args(context)[0]
             store[self.handle] = value
 
+    def update_batch(self, store, context, table, rows):
+        if store[self.handle] is None:
+            for value in self.operands[0].evaluate_batch(context, table, rows):
+                if value is not None:
+                    store[self.handle] = value
+                    break
+
+    def merge(self, store, other_store):
+        if store[self.handle] is None:
+            store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
 class Last(query_compile.EvalAggregator):
     "Keep the last of the values seen."
     __intypes__ = [object]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, operands[0].dtype)
@@ -484,12 +532,23 @@ class Last(query_compile.EvalAggregator):
         value = self.eval_args(context)[0]
         store[self.handle] = value
 
+    def update_batch(self, store, context, table, rows):
+        if rows:
+            store[self.handle] = self.operands[0].evaluate_batch(
+                context, table, rows[-1:])[0]
+
+    def merge(self, store, other_store):
+        # A partial store is only created for a shard with rows in its group,
+        # so the other store always holds a later value.
+        store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
 class Min(query_compile.EvalAggregator):
     "Compute the minimum of the values."
     __intypes__ = [object]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, operands[0].dtype)
@@ -505,12 +564,22 @@ class Min(query_compile.EvalAggregator):
         if value < store[self.handle]:
             store[self.handle] = value
 
+    def update_batch(self, store, context, table, rows):
+        for value in self.operands[0].evaluate_batch(context, table, rows):
+            if value < store[self.handle]:
+                store[self.handle] = value
+
+    def merge(self, store, other_store):
+        if other_store[self.handle] < store[self.handle]:
+            store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
 class Max(query_compile.EvalAggregator):
     "Compute the maximum of the values."
     __intypes__ = [object]
+    mergeable = True
 
     def __init__(self, operands):
         super().__init__(operands, operands[0].dtype)
@@ -526,6 +595,15 @@ class Max(query_compile.EvalAggregator):
         if value > store[self.handle]:
             store[self.handle] = value
 
+    def update_batch(self, store, context, table, rows):
+        for value in self.operands[0].evaluate_batch(context, table, rows):
+            if value > store[self.handle]:
+                store[self.handle] = value
+
+    def merge(self, store, other_store):
+        if other_store[self.handle] > store[self.handle]:
+            store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -832,9 +910,14 @@ class DateColumn(query_compile.EvalColumn):
     def __init__(self):
         super().__init__(datetime.date)
 
+    array_name = 'date'
+
     def __call__(self, context):
         return context.entry.date
 
+    def evaluate_batch(self, context, table, rows):
+        return query_table.take(table.dates, rows)
+
 class YearColumn(query_compile.EvalColumn):
     "The year of the date of the parent transaction for this posting."
     __equivalent__ = 'entry.date.year'
@@ -843,9 +926,15 @@ class YearColumn(query_compile.EvalColumn):
     def __init__(self):
         super().__init__(int)
 
+    array_name = 'year'
+
     def __call__(self, context):
         return context.entry.date.year
 
+    def evaluate_batch(self, context, table, rows):
+        dates = table.dates
+        return [dates[row].year for row in rows]
+
 class MonthColumn(query_compile.EvalColumn):
     "The month of the date of the parent transaction for this posting."
     __equivalent__ = 'entry.date.month'
@@ -854,9 +943,15 @@ class MonthColumn(query_compile.EvalColumn):
     def __init__(self):
         super().__init__(int)
 
+    array_name = 'month'
+
     def __call__(self, context):
         return context.entry.date.month
 
+    def evaluate_batch(self, context, table, rows):
+        dates = table.dates
+        return [dates[row].month for row in rows]
+
 class DayColumn(query_compile.EvalColumn):
     "The day of the date of the parent transaction for this posting."
     __equivalent__ = 'entry.date.day'
@@ -865,9 +960,15 @@ class DayColumn(query_compile.EvalColumn):
     def __init__(self):
         super().__init__(int)
 
+    array_name = 'day'
+
     def __call__(self, context):
         return context.entry.date.day
 
+    def evaluate_batch(self, context, table, rows):
+        dates = table.dates
+        return [dates[row].day for row in rows]
+
 class FlagColumn(query_compile.EvalColumn):
     "The flag of the parent transaction for this posting."
     __equivalent__ = 'entry.flag'
@@ -960,6 +1061,11 @@ class AccountColumn(query_compile.EvalColumn):
     def __call__(self, context):
         return context.posting.account
 
+    def evaluate_batch(self, context, table, rows):
+        accounts = table.accounts
+        account_ids = table.account_ids
+        return [accounts[account_ids[row]] for row in rows]
+
 class NumberColumn(query_compile.EvalColumn):
     "The number of units of the posting."
     __equivalent__ = 'posting.position.number'
@@ -971,6 +1077,9 @@ class NumberColumn(query_compile.EvalColumn):
     def __call__(self, context):
         return context.posting.position.number
 
+    def evaluate_batch(self, context, table, rows):
+        return query_table.take(table.numbers, rows)
+
 class CurrencyColumn(query_compile.EvalColumn):
     "The currency of the posting."
     __equivalent__ = 'posting.position.currency'
@@ -982,6 +1091,11 @@ class CurrencyColumn(query_compile.EvalColumn):
     def __call__(self, context):
         return context.posting.position.lot.currency
 
+    def evaluate_batch(self, context, table, rows):
+        currencies = table.currencies
+        currency_ids = table.currency_ids
+        return [currencies[currency_ids[row]] for row in rows]
+
 class CostNumberColumn(query_compile.EvalColumn):
     "The number of cost units of the posting."
     __equivalent__ = 'posting.position.lot.cost'
@@ -994,6 +1108,10 @@ class CostNumberColumn(query_compile.EvalColumn):
         cost = context.posting.position.lot.cost
         return cost.number if cost else ZERO
 
+    def evaluate_batch(self, context, table, rows):
+        costs = table.costs
+        return [(costs[row].number if costs[row] else ZERO) for row in rows]
+
 class CostCurrencyColumn(query_compile.EvalColumn):
     "The cost currency of the posting."
     __equivalent__ = 'posting.lot.cost.cost_currency'
@@ -1006,6 +1124,10 @@ class CostCurrencyColumn(query_compile.EvalColumn):
         cost = context.posting.position.lot.cost
         return cost.currency if cost else ''
 
+    def evaluate_batch(self, context, table, rows):
+        costs = table.costs
+        return [(costs[row].currency if costs[row] else '') for row in rows]
+
 class PositionColumn(query_compile.EvalColumn):
     "The position for the posting. These can be summed into inventories."
     __equivalent__ = 'posting.position'
@@ -1017,6 +1139,10 @@ class PositionColumn(query_compile.EvalColumn):
     def __call__(self, context):
         return context.posting.position
 
+    def evaluate_batch(self, context, table, rows):
+        postings = table.postings
+        return [postings[row].position for row in rows]
+
 class PriceColumn(query_compile.EvalColumn):
     "The price attached to the posting."
     __equivalent__ = 'posting.price'
@@ -4,10 +4,14 @@ __author__ = "Martin Blais <blais@furius.ca>"
 
 import collections
 import datetime
+import heapq
 import itertools
+import multiprocessing
+import os
 
 from beancount.query import query_compile
 from beancount.query import query_env
+from beancount.query import query_table
 from beancount.core import data
 from beancount.core import position
 from beancount.core import inventory
@@ -103,6 +107,73 @@ class Allocator:
         return [None] * self.size
 
 
+class QueryIndexes:
+    """Data structures derived from a list of entries, computed on demand.
+
+    Some of the column accessors and functions require global data structures
+    that are expensive to compute, e.g., the price map. This object computes
+    them lazily and memoizes them, so that an instance can be shared by all the
+    queries run against the same list of entries. It must be discarded when
+    the entries change.
+    """
+    def __init__(self, entries, options_map):
+        """Create a new cache of derived data structures.
+
+        Args:
+          entries: A list of directives.
+          options_map: A parser's option_map.
+        """
+        self.entries = entries
+        self.options_map = options_map
+        self._cache = {}
+
+    def _get(self, name, function, *args):
+        """Return a memoized value, computing it if necessary.
+
+        Args:
+          name: A string, the key to memoize the value under.
+          function: A callable that computes the value.
+          *args: The arguments to call 'function' with.
+        Returns:
+          The value returned by 'function'.
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = function(*args)
+            return value
+
+    @property
+    def account_types(self):
+        "An AccountTypes tuple of the account types."
+        return self._get('account_types', options.get_account_types, self.options_map)
+
+    @property
+    def open_close_map(self):
+        "A dict of account name strings to (open, close) entries for those accounts."
+        return self._get('open_close_map', getters.get_account_open_close, self.entries)
+
+    @property
+    def commodity_map(self):
+        "A dict of commodity names to Commodity entries."
+        return self._get('commodity_map', getters.get_commodity_map,
+                         self.entries, self.options_map)
+
+    @property
+    def price_map(self):
+        """A price dict as computed by build_price_map(). The loader's price map is
+        used if the options have one and it was built from these very entries."""
+        price_map = self.options_map.get('price_map') if self.options_map else None
+        if price_map is not None and price_map.entries is self.entries:
+            return price_map
+        return self._get('price_map', prices.build_price_map, self.entries)
+
+    @property
+    def posting_table(self):
+        "A columnar PostingTable of all the postings of the entries."
+        return self._get('posting_table', query_table.PostingTable, self.entries)
+
+
 class RowContext:
     """A dumb container for information used by a row expression."""
 
@@ -118,14 +189,29 @@ class RowContext:
     # The parser's options_map.
     options_map = None
 
-    # An AccountTypes tuple of the account types.
-    account_types = None
+    # A QueryIndexes instance, which provides the derived data structures
+    # below on demand.
+    indexes = None
+
+    @property
+    def account_types(self):
+        "An AccountTypes tuple of the account types."
+        return self.indexes.account_types
 
-    # A dict of account name strings to (open, close) entries for those accounts.
-    open_close_map = None
+    @property
+    def open_close_map(self):
+        "A dict of account name strings to (open, close) entries for those accounts."
+        return self.indexes.open_close_map
 
-    # A price dict as computed by build_price_map()
-    price_map = None
+    @property
+    def commodity_map(self):
+        "A dict of commodity names to Commodity entries."
+        return self.indexes.commodity_map
+
+    @property
+    def price_map(self):
+        "A price dict as computed by build_price_map()."
+        return self.indexes.price_map
 
 
 def uses_balance_column(c_expr):
@@ -140,19 +226,245 @@ def uses_balance_column(c_expr):
             any(uses_balance_column(c_node) for c_node in c_expr.childnodes()))
 
 
-def execute_query(query, entries, options_map):
+def uses_balance(query):
+    """Return true if a query accesses the special 'balance' column.
+
+    Such queries have to accumulate the running balance one posting at a time,
+    so they are evaluated row by row, without the posting table and its indexes.
+
+    Args:
+      query: An instance of a query_compile.Query.
+    Returns:
+      A boolean, true if any of the targets or the WHERE clause use the balance.
+    """
+    return any(uses_balance_column(c_expr)
+               for c_expr in itertools.chain(
+                   [c_target.c_expr for c_target in query.c_targets],
+                   [query.c_where] if query.c_where else []))
+
+
+def iter_postings(entries, context, c_where):
+    """Iterate over the postings of the given entries that match a filter.
+
+    This is the row-at-a-time evaluation path, used when the query requires
+    accumulating a running balance.
+
+    Args:
+      entries: A list of directives.
+      context: A RowContext instance whose 'entry' and 'posting' attributes are
+        set for each posting. If its 'balance' attribute is not None, the
+        position of each matching posting is added to it.
+      c_where: A compiled expression tree (an EvalNode node) for filtering
+        postings, or None.
+    Yields:
+      The 'context' instance, updated for each matching posting in turn.
+    """
+    balance = context.balance
+    for entry in entries:
+        if isinstance(entry, data.Transaction):
+            context.entry = entry
+            for posting in entry.postings:
+                context.posting = posting
+                if c_where is None or c_where(context):
+                    # Compute the balance.
+                    if balance is not None:
+                        balance.add_position(posting.position)
+                    yield context
+
+
+# The number of rows evaluated at once when streaming the results of a
+# non-aggregated query.
+BATCH_SIZE = 4096
+
+# The minimum number of rows of an aggregated query for it to be worth
+# distributing to worker processes.
+PARALLEL_MIN_ROWS = 100000
+
+
+def iter_batch_values(c_exprs, context, table, rows):
+    """Evaluate expressions over the rows of a posting table, a batch at a time.
+
+    Args:
+      c_exprs: A list of compiled expression trees (EvalNode nodes).
+      context: A RowContext instance.
+      table: An instance of query_table.PostingTable.
+      rows: A sequence of integer row indexes into 'table'.
+    Yields:
+      A tuple of the values of the expressions, for each row in turn.
+    """
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        yield from zip(*[c_expr.evaluate_batch(context, table, batch)
+                         for c_expr in c_exprs])
+
+
+def aggregate_rows(c_nonaggregate_exprs, c_aggregate_exprs, allocator,
+                   context, table, rows):
+    """Aggregate the rows of a posting table by the values of the group keys.
+
+    Args:
+      c_nonaggregate_exprs: A list of compiled expressions (EvalNode nodes)
+        whose values form the key of the groups.
+      c_aggregate_exprs: A list of allocated aggregate nodes (EvalAggregator
+        nodes) to compute for each group.
+      allocator: The Allocator instance used to allocate the aggregate nodes.
+      context: A RowContext instance.
+      table: An instance of query_table.PostingTable.
+      rows: A sequence of integer row indexes into 'table'.
+    Returns:
+      A dict of group key tuples to aggregate stores, in the order in which the
+      keys first occur in the rows. The stores are not finalized.
+    """
+    # Partition the rows by the values of the non-aggregate expressions.
+    key_columns = [c_expr.evaluate_batch(context, table, rows)
+                   for c_expr in c_nonaggregate_exprs]
+    row_groups = {}
+    for row, row_key in zip(rows, (zip(*key_columns)
+                                   if key_columns
+                                   else itertools.repeat(()))):
+        try:
+            row_groups[row_key].append(row)
+        except KeyError:
+            row_groups[row_key] = [row]
+
+    # Aggregate each of the groups of rows at once.
+    agg_store = {}
+    for row_key, group_rows in row_groups.items():
+        store = allocator.create_store()
+        for c_expr in c_aggregate_exprs:
+            c_expr.initialize(store)
+            c_expr.update_batch(store, context, table, group_rows)
+        agg_store[row_key] = store
+    return agg_store
+
+
+def is_mergeable(c_expr):
+    """Return true if the partial aggregates of an aggregator can be merged.
+
+    Args:
+      c_expr: An EvalAggregator instance.
+    Returns:
+      A boolean.
+    """
+    return c_expr.mergeable
+
+
+# The arguments of aggregate_rows() for the worker processes of a parallel
+# aggregation. This is set before forking the workers, which inherit it, so
+# that the compiled query and the posting table need not be serialized.
+_shard_arguments = None
+
+def _aggregate_shard(start, stop):
+    """Aggregate a shard of the rows, in a worker process.
+
+    Args:
+      start: The index of the first row of the shard in the rows.
+      stop: The index past the last row of the shard in the rows.
+    Returns:
+      A dict of group key tuples to partial aggregate stores.
+    """
+    (c_nonaggregate_exprs, c_aggregate_exprs, allocator,
+     context, table, rows) = _shard_arguments
+    return aggregate_rows(c_nonaggregate_exprs, c_aggregate_exprs, allocator,
+                          context, table, rows[start:stop])
+
+
+def aggregate_rows_parallel(c_nonaggregate_exprs, c_aggregate_exprs, allocator,
+                            context, table, rows, processes):
+    """Aggregate the rows of a posting table in a pool of worker processes.
+
+    The rows are split into contiguous shards, i.e., by date, since the table
+    is sorted by date. Each shard is aggregated in a worker process and the
+    partial aggregates are merged in the order of the shards, so the result is
+    identical to that of aggregate_rows(). All the aggregate nodes must be
+    mergeable. This requires the 'fork' start method.
+
+    Args:
+      processes: An integer, the number of worker processes.
+      See aggregate_rows() for the other arguments.
+    Returns:
+      See aggregate_rows().
+    """
+    global _shard_arguments  # pylint: disable=global-statement
+    num_rows = len(rows)
+    bounds = [num_rows * index // processes for index in range(processes + 1)]
+    _shard_arguments = (c_nonaggregate_exprs, c_aggregate_exprs, allocator,
+                        context, table, rows)
+    try:
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            partial_stores = pool.starmap(_aggregate_shard,
+                                          zip(bounds[:-1], bounds[1:]))
+    finally:
+        _shard_arguments = None
+
+    # Merge the partial aggregates, in the order of the shards.
+    agg_store = {}
+    for partial_store in partial_stores:
+        for row_key, store in partial_store.items():
+            try:
+                merged_store = agg_store[row_key]
+            except KeyError:
+                agg_store[row_key] = store
+                continue
+            for c_expr in c_aggregate_exprs:
+                c_expr.merge(merged_store, store)
+    return agg_store
+
+
+def execute_query(query, entries, options_map, indexes=None, processes=None):
     """Given a compiled select statement, execute the query.
 
     Args:
       query: An instance of a query_compile.Query
       entries: A list of directives.
       options_map: A parser's option_map.
+      indexes: An optional QueryIndexes instance for 'entries', used to share
+        derived data structures between queries. If not provided, a new one is
+        created for this query.
+      processes: An integer or None, the number of worker processes to compute
+        large aggregations with. If None, the value of the
+        BEANCOUNT_QUERY_PROCESSES environment variable is used, if set.
+        Otherwise aggregations are computed in this process.
     Returns:
       A pair of:
         result_types: A list of (name, data-type) item pairs.
         result_rows: A list of ResultRow tuples of length and types described by
           'result_types'.
     """
+    result_types, result_rows = execute_query_iter(query, entries, options_map, indexes,
+                                                   processes)
+    return (result_types, list(result_rows))
+
+
+def execute_query_iter(query, entries, options_map, indexes=None, processes=None):
+    """Given a compiled select statement, execute the query lazily.
+
+    This is like execute_query() but returns an iterator over the result rows,
+    which avoids holding all of the result rows in memory where possible: the
+    rows of non-aggregated queries without an ORDER BY clause are produced as
+    they get computed, and only the top rows are kept for queries with both an
+    ORDER BY and a LIMIT clause. This does not make the query run in constant
+    memory: the columnar table of all the postings (see
+    query_table.PostingTable) and the indexes of the selected rows are still
+    built in full before the first row is produced. The iterator must be
+    consumed before the entries are modified.
+
+    Args:
+      query: An instance of a query_compile.Query
+      entries: A list of directives.
+      options_map: A parser's option_map.
+      indexes: An optional QueryIndexes instance for 'entries' (see
+        execute_query()).
+      processes: An integer or None (see execute_query()).
+    Returns:
+      A pair of:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: An iterator of ResultRow tuples of length and types
+          described by 'result_types'.
+    """
+    if processes is None and os.getenv('BEANCOUNT_QUERY_PROCESSES'):
+        processes = int(os.getenv('BEANCOUNT_QUERY_PROCESSES'))
+
     # Filter the entries using the WHERE clause.
     filt_entries = (filter_entries(query.c_from, entries, options_map)
                     if query.c_from is not None else
@@ -183,25 +495,34 @@ def execute_query(query, entries, options_map):
 
     # Figure out if we need to compute balance.
     balance = None
-    if any(uses_balance_column(c_expr)
-           for c_expr in itertools.chain(
-               [c_target.c_expr for c_target in query.c_targets],
-               [query.c_where] if query.c_where else [])):
+    if uses_balance(query):
         balance = inventory.Inventory()
 
     # Create the context container which we will use to evaluate rows.
     context = RowContext()
     context.balance = balance
 
-    # Initialize some global properties for use by some of the accessors.
+    # Initialize some global properties for use by some of the accessors. The
+    # derived data structures are only computed if the query requires them.
+    if indexes is None:
+        indexes = QueryIndexes(entries, options_map)
+    assert indexes.entries is entries, "Indexes were computed for other entries."
     context.options_map = options_map
-    context.account_types = options.get_account_types(options_map)
-    context.open_close_map = getters.get_account_open_close(entries)
-    context.price_map = prices.build_price_map(entries)
+    context.indexes = indexes
+
+    # Materialize the postings into a columnar table and evaluate the
+    # expressions over entire columns at once. The running balance has to be
+    # accumulated one posting at a time, so queries that use it are evaluated
+    # row by row.
+    if balance is not None:
+        table = None
+    elif filt_entries is entries:
+        table = indexes.posting_table
+    else:
+        table = query_table.PostingTable(filt_entries)
 
     # Dispatch between the non-aggregated queries and aggregated queries.
     c_where = query.c_where
-    schwartz_rows = []
     if query.group_indexes is None:
         # This is a non-aggregated query.
 
@@ -210,27 +531,14 @@ def execute_query(query, entries, options_map):
         c_target_exprs = [c_target.c_expr
                           for c_target in query.c_targets]
 
-        # Iterate over all the postings once and produce schwartzian rows.
-        for entry in filt_entries:
-            if isinstance(entry, data.Transaction):
-                context.entry = entry
-                for posting in entry.postings:
-                    context.posting = posting
-                    if c_where is None or c_where(context):
-                        # Compute the balance.
-                        if balance is not None:
-                            balance.add_position(posting.position)
-
-                        # Evaluate all the values.
-                        values = [c_expr(context) for c_expr in c_target_exprs]
-
-                        # Compute result and sort-key objects.
-                        result = ResultRow._make(values[index]
-                                                 for index in result_indexes)
-                        sortkey = (tuple(values[index] for index in order_indexes)
-                                   if order_indexes is not None
-                                   else None)
-                        schwartz_rows.append((sortkey, result))
+        # Evaluate all the values lazily, either by column or by row.
+        if table is not None:
+            rows = query_table.select_rows(table, context, c_where)
+            values_iter = iter_batch_values(c_target_exprs, context, table, rows)
+        else:
+            values_iter = ([c_expr(row_context) for c_expr in c_target_exprs]
+                           for row_context in iter_postings(filt_entries,
+                                                            context, c_where))
     else:
         # This is an aggregated query.
 
@@ -254,37 +562,43 @@ def execute_query(query, entries, options_map):
         for c_expr in c_aggregate_exprs:
             c_expr.allocate(allocator)
 
-        # Iterate over all the postings to evaluate the aggregates.
         agg_store = {}
-        for entry in filt_entries:
-            if isinstance(entry, data.Transaction):
-                context.entry = entry
-                for posting in entry.postings:
-                    context.posting = posting
-                    if c_where is None or c_where(context):
-                        # Compute the balance.
-                        if balance is not None:
-                            balance.add_position(posting.position)
-
-                        # Compute the non-aggregate expressions.
-                        row_key = tuple(c_expr(context)
-                                        for c_expr in c_nonaggregate_exprs)
-
-                        # Get an appropriate store for the unique key of this row.
-                        try:
-                            store = agg_store[row_key]
-                        except KeyError:
-                            # This is a row; create a new store.
-                            store = allocator.create_store()
-                            for c_expr in c_aggregate_exprs:
-                                c_expr.initialize(store)
-                            agg_store[row_key] = store
-
-                        # Update the aggregate expressions.
-                        for c_expr in c_aggregate_exprs:
-                            c_expr.update(store, context)
-
-        # Iterate over all the aggregations to produce the schwartzian rows.
+        if table is not None:
+            rows = query_table.select_rows(table, context, c_where)
+            if (processes is not None and processes > 1 and
+                len(rows) >= PARALLEL_MIN_ROWS and
+                'fork' in multiprocessing.get_all_start_methods() and
+                all(is_mergeable(c_expr) for c_expr in c_aggregate_exprs)):
+                agg_store = aggregate_rows_parallel(c_nonaggregate_exprs,
+                                                    c_aggregate_exprs,
+                                                    allocator, context, table, rows,
+                                                    processes)
+            else:
+                agg_store = aggregate_rows(c_nonaggregate_exprs, c_aggregate_exprs,
+                                           allocator, context, table, rows)
+        else:
+            # Iterate over all the postings to evaluate the aggregates.
+            for row_context in iter_postings(filt_entries, context, c_where):
+                # Compute the non-aggregate expressions.
+                row_key = tuple(c_expr(row_context)
+                                for c_expr in c_nonaggregate_exprs)
+
+                # Get an appropriate store for the unique key of this row.
+                try:
+                    store = agg_store[row_key]
+                except KeyError:
+                    # This is a row; create a new store.
+                    store = allocator.create_store()
+                    for c_expr in c_aggregate_exprs:
+                        c_expr.initialize(store)
+                    agg_store[row_key] = store
+
+                # Update the aggregate expressions.
+                for c_expr in c_aggregate_exprs:
+                    c_expr.update(store, row_context)
+
+        # Iterate over all the aggregations to produce the values.
+        values_list = []
         for key, store in agg_store.items():
             key_iter = iter(key)
             values = []
@@ -300,34 +614,36 @@ def execute_query(query, entries, options_map):
                 else:
                     value = c_target.c_expr(context)
                 values.append(value)
-
-            # Compute result and sort-key objects.
-            result = ResultRow._make(values[index]
-                                     for index in result_indexes)
-            sortkey = (tuple(values[index] for index in order_indexes)
-                       if order_indexes is not None
-                       else None)
-            schwartz_rows.append((sortkey, result))
+            values_list.append(values)
+        values_iter = iter(values_list)
 
     # Order results if requested.
     if order_indexes is not None:
-        schwartz_rows.sort(key=lambda x: x[0],
-                           reverse=(query.ordering == 'DESC'))
+        sortkey = lambda values: tuple(values[index] for index in order_indexes)
+        reverse = (query.ordering == 'DESC')
+        if query.limit is not None and not query.distinct:
+            # Only the top rows are needed; don't sort all of them. This is
+            # equivalent to a stable sort followed by truncation.
+            select_top = heapq.nlargest if reverse else heapq.nsmallest
+            values_iter = iter(select_top(query.limit, values_iter, key=sortkey))
+        else:
+            values_iter = iter(sorted(values_iter, key=sortkey, reverse=reverse))
 
     # Extract final results, in sorted order at this point.
-    result_rows = [x[1] for x in schwartz_rows]
+    result_rows = (ResultRow._make(values[index] for index in result_indexes)
+                   for values in values_iter)
 
     # Apply distinct.
     if query.distinct:
-        result_rows = list(misc_utils.uniquify(result_rows))
+        result_rows = misc_utils.uniquify(result_rows)
 
     # Apply limit.
     if query.limit is not None:
-        result_rows = result_rows[:query.limit]
+        result_rows = itertools.islice(result_rows, query.limit)
 
     # Flatten inventories if requested.
     if query.flatten:
-        result_types, result_rows = flatten_results(result_types, result_rows)
+        result_types, result_rows = iter_flatten_results(result_types, result_rows)
 
     return (result_types, result_rows)
 
@@ -349,32 +665,61 @@ def flatten_results(result_types, result_rows):
           'result_types'. All inventories from the input should have been converted
           to Position types.
     """
+    output_types, output_rows = iter_flatten_results(result_types, result_rows)
+    return output_types, list(output_rows)
+
+
+def iter_flatten_results(result_types, result_rows):
+    """Convert inventories in result types to have a row for each, lazily.
+
+    This is like flatten_results(), but accepts and returns iterators of rows.
+
+    Args:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: An iterable of ResultRow tuples of length and types
+          described by 'result_types'.
+    Returns:
+        result_types: A list of (name, data-type) item pairs. There should be no
+          Inventory types anymore.
+        result_rows: An iterator of ResultRow tuples of length and types
+          described by 'result_types'.
+    """
     indexes = set(index
                   for index, (name, result_type) in enumerate(result_types)
                   if result_type is inventory.Inventory)
     if not indexes:
-        return (result_types, result_rows)
+        return (result_types, iter(result_rows))
+
+    # Convert the types.
+    output_types = [(name, (position.Position
+                            if result_type is inventory.Inventory
+                            else result_type))
+                    for name, result_type in result_types]
+
+    return output_types, _flatten_rows(indexes, len(result_types), result_rows)
 
-    ResultRow = type(result_rows[0])  # pylint: disable=invalid-name
 
-    # We have to make at least some conversions.
-    num_columns = len(result_types)
-    output_rows = []
+def _flatten_rows(indexes, num_columns, result_rows):
+    """Expand the inventories of result rows into a row for each position.
+
+    Args:
+      indexes: A set of the integer indexes of the inventory columns.
+      num_columns: The number of columns of the rows.
+      result_rows: An iterable of ResultRow tuples.
+    Yields:
+      ResultRow tuples, with the inventories replaced by positions.
+    """
     for result_row in result_rows:
-        max_rows = max(len(result_row[icol]) for icol in indexes)
+        ResultRow = type(result_row)  # pylint: disable=invalid-name
+        positions = {icol: list(result_row[icol]) for icol in indexes}
+        max_rows = max(len(column_positions) for column_positions in positions.values())
         for irow in range(max_rows):
             output_row = []
             for icol in range(num_columns):
-                value = result_row[icol]
                 if icol in indexes:
-                    value = value[irow] if irow < len(value) else None
+                    column_positions = positions[icol]
+                    value = column_positions[irow] if irow < len(column_positions) else None
+                else:
+                    value = result_row[icol]
                 output_row.append(value)
-            output_rows.append(ResultRow._make(output_row))
-
-    # Convert the types.
-    output_types = [(name, (position.Position
-                            if result_type is inventory.Inventory
-                            else result_type))
-                    for name, result_type in result_types]
-
-    return output_types, output_rows
+            yield ResultRow._make(output_row)
@@ -1,17 +1,23 @@
 __author__ = "Martin Blais <blais@furius.ca>"
 
 import datetime
+import heapq
 import io
 import unittest
 import textwrap
+from unittest import mock
 
 from beancount.core.number import D
 from beancount.core.number import Decimal
 from beancount.core import inventory
+from beancount.core import amount
+from beancount.core import position
+from beancount.ops import prices
 from beancount.query import query_parser
 from beancount.query import query_compile as qc
 from beancount.query import query_env as qe
 from beancount.query import query_execute as qx
+from beancount.query import query_table
 from beancount.parser import cmptest
 from beancount.utils import misc_utils
 from beancount import loader
@@ -314,6 +320,60 @@ class TestBalanceColumn(unittest.TestCase):
         self.assertFalse(qx.uses_balance_column(c_subexpr_not))
 
 
+class TestQueryIndexes(QueryBase):
+
+    @loader.load_doc()
+    def test_indexes_lazy_and_shared(self, entries, _, options_map):
+        """
+        2010-01-01 open Assets:Bank:Checking
+        2010-01-01 open Assets:Investments
+
+        2010-02-23 * "Buy"
+          Assets:Investments          2 HOOL {100.00 USD}
+          Assets:Bank:Checking
+
+        2010-03-01 price HOOL  110.00 USD
+        """
+        # Ignore the loader's price map to exercise building it on demand.
+        options_map = dict(options_map, price_map=None)
+        indexes = qx.QueryIndexes(entries, options_map)
+        with mock.patch('beancount.ops.prices.build_price_map',
+                        wraps=prices.build_price_map) as build_price_map:
+            # The price map is not needed by this query.
+            query = self.compile("SELECT account, open_date(account);")
+            qx.execute_query(query, entries, options_map, indexes)
+            self.assertEqual(0, build_price_map.call_count)
+
+            # It is computed once and then reused.
+            query = self.compile("SELECT convert(position, 'USD') AS value;")
+            for _ in range(2):
+                _, rows = qx.execute_query(query, entries, options_map, indexes)
+            self.assertEqual(1, build_price_map.call_count)
+            self.assertEqual(amount.from_string('200.00 USD'), rows[0].value)
+
+        self.assertIs(indexes.posting_table, indexes.posting_table)
+        self.assertIs(indexes.open_close_map, indexes.open_close_map)
+        self.assertEqual({'HOOL', 'USD'}, set(indexes.commodity_map))
+        self.assertEqual('Assets', indexes.account_types.assets)
+
+        with self.assertRaises(AssertionError):
+            qx.execute_query(query, list(entries), options_map, indexes)
+
+    @loader.load_doc()
+    def test_indexes_loader_price_map(self, entries, _, options_map):
+        """
+        2010-03-01 price HOOL  110.00 USD
+        2010-04-01 price HOOL  120.00 USD
+        """
+        # The loader's price map is only used for the entries it was built from.
+        price_map = options_map['price_map']
+        self.assertIs(price_map, qx.QueryIndexes(entries, options_map).price_map)
+        other_entries = entries[:1]
+        other_price_map = qx.QueryIndexes(other_entries, options_map).price_map
+        self.assertIsNot(price_map, other_price_map)
+        self.assertEqual(prices.build_price_map(other_entries), other_price_map)
+
+
 
 
 
@@ -816,6 +876,189 @@ class TestExecuteOptions(QueryBase):
                 ('Assets:AssetD', D('2.00')),
                 ])
 
+    def test_limit_desc(self):
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT account, number ORDER BY number DESC LIMIT 2;
+            """,
+            [
+                ('account', str),
+                ('number', Decimal),
+                ],
+            [
+                ('Assets:AssetA', D('5.00')),
+                ('Assets:AssetB', D('4.00')),
+                ])
+
+    def test_limit_stable(self):
+        # Rows with equal sort keys are kept in their original order, as with a
+        # full sort.
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT account, year ORDER BY year LIMIT 3;
+            """,
+            [
+                ('account', str),
+                ('year', int),
+                ],
+            [
+                ('Assets:AssetA', 2010),
+                ('Assets:AssetD', 2010),
+                ('Assets:AssetB', 2010),
+                ])
+
+    def test_limit_distinct(self):
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT DISTINCT year ORDER BY year LIMIT 2;
+            """,
+            [
+                ('year', int),
+                ],
+            [
+                (2010,),
+                ])
+
+
+class TestExecuteIter(QueryBase):
+
+    INPUT = """
+
+      2010-02-23 *
+        Assets:AssetA       5.00 USD
+        Assets:AssetB       4.00 USD
+        Equity:Rest
+
+    """
+
+    def test_streaming(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        query = self.compile("SELECT account, number LIMIT 2;")
+        with mock.patch.object(qx, 'BATCH_SIZE', 1):
+            result_types, result_rows = qx.execute_query_iter(query, entries, options_map)
+            self.assertEqual([('account', str), ('number', Decimal)], result_types)
+            self.assertFalse(isinstance(result_rows, list))
+            self.assertEqual([('Assets:AssetA', D('5.00')),
+                              ('Assets:AssetB', D('4.00'))], list(result_rows))
+
+    def test_top_rows(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        query = self.compile("SELECT account ORDER BY number LIMIT 1;")
+        with mock.patch('heapq.nsmallest', wraps=heapq.nsmallest) as nsmallest:
+            _, result_rows = qx.execute_query(query, entries, options_map)
+            self.assertEqual([('Equity:Rest',)], result_rows)
+            self.assertEqual(1, nsmallest.call_count)
+
+
+class TestExecuteParallel(QueryBase):
+
+    INPUT = """
+
+      2010-01-01 open Assets:Bank
+      2010-01-01 open Assets:Investments
+      2010-01-01 open Expenses:Food
+      2010-01-01 open Expenses:Rent
+
+      2010-02-23 * "A"
+        Expenses:Food       5.00 USD
+        Assets:Bank
+
+      2010-03-01 * "B"
+        Expenses:Rent       1000.00 USD
+        Assets:Bank
+
+      2011-01-05 * "C"
+        Assets:Investments   2 HOOL {500.00 USD}
+        Assets:Bank
+
+      2011-02-10 * "D"
+        Expenses:Food       7.00 USD
+        Assets:Bank
+
+      2012-07-14 * "E"
+        Expenses:Food       3.00 USD
+        Assets:Bank
+
+    """
+
+    def test_parallel_equals_serial(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        for bql_string in [
+                """
+                SELECT account, year, sum(position), sum(number), count(position),
+                       first(narration), last(narration), min(number), max(number)
+                GROUP BY account, year ORDER BY account, year;
+                """,
+                """
+                SELECT year, sum(position), last(date) GROUP BY year;
+                """,
+                """
+                SELECT sum(number), count(number);
+                """]:
+            query = self.compile(bql_string)
+            serial = qx.execute_query(query, entries, options_map)
+            with mock.patch.object(qx, 'PARALLEL_MIN_ROWS', 0), \
+                 mock.patch.object(qx, 'aggregate_rows_parallel',
+                                   wraps=qx.aggregate_rows_parallel) as parallel:
+                for processes in 2, 3:
+                    query = self.compile(bql_string)
+                    self.assertEqual(serial, qx.execute_query(query, entries, options_map,
+                                                              processes=processes))
+                self.assertEqual(2, parallel.call_count)
+
+    def test_parallel_small_is_serial(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        query = self.compile("SELECT account, count(position) GROUP BY account;")
+        with mock.patch.object(qx, 'aggregate_rows_parallel') as parallel:
+            qx.execute_query(query, entries, options_map, processes=2)
+            self.assertFalse(parallel.called)
+
+    def test_merge(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        table = query_table.PostingTable(entries)
+        context = qx.RowContext()
+        operands = {
+            'sum': [qe.NumberColumn()],
+            'count': [qe.PositionColumn()],
+            'first': [qe.AccountColumn()],
+            'last': [qe.AccountColumn()],
+            'min': [qe.NumberColumn()],
+            'max': [qe.NumberColumn()],
+            ('sum', amount.Amount): [qe.WeightColumn()],
+            ('sum', position.Position): [qe.PositionColumn()],
+            }
+        for name, aggregator_cls in qe.AGGREGATOR_FUNCTIONS.items():
+            if name not in operands:
+                continue
+            c_aggregator = aggregator_cls(operands[name])
+            self.assertTrue(qx.is_mergeable(c_aggregator))
+            allocator = qx.Allocator()
+            c_aggregator.allocate(allocator)
+
+            stores = []
+            for rows in [range(0, 10), range(0, 3), range(3, 7), range(7, 10)]:
+                store = allocator.create_store()
+                c_aggregator.initialize(store)
+                c_aggregator.update_batch(store, context, table, rows)
+                stores.append(store)
+            full_store, merged_store = stores[0], stores[1]
+            for store in stores[2:]:
+                c_aggregator.merge(merged_store, store)
+            self.assertEqual(full_store, merged_store, name)
+
+    def test_is_mergeable(self):
+        # Aggregators are only merged when they declare it.
+        class Collect(qc.EvalAggregator):
+            __intypes__ = [object]
+            def __init__(self, operands):
+                super().__init__(operands, list)
+        c_aggregator = Collect([qe.AccountColumn()])
+        self.assertFalse(qx.is_mergeable(c_aggregator))
+        self.assertRaises(NotImplementedError, c_aggregator.merge, {}, {})
+
 
 class TestExecuteFlatten(QueryBase):
 
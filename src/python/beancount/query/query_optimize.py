@@ -0,0 +1,398 @@
+"""Optimizer for compiled queries.
+
+This code runs between the compiler and the executor. It rewrites the compiled
+expression trees of a query into an equivalent but cheaper form:
+
+* Operators applied to constants are folded into constants, and logical
+  operators with a constant operand are simplified.
+
+* Conditions of the WHERE clause on the date of the transaction are merged into
+  a single date range, which the executor resolves with a binary search over
+  the postings, which are sorted by date.
+
+* Conditions of the WHERE clause on the account name are evaluated once for each
+  unique account, and resolved using an index of the postings by account.
+
+The remaining conditions are evaluated on the surviving postings only.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import bisect
+import copy
+import datetime
+import itertools
+import operator
+
+from beancount.query import query_compile
+from beancount.query import query_env
+from beancount.query import query_execute
+
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+class EvalDateRange(query_compile.EvalNode):
+    """A filter on the date of the transaction of a posting.
+
+    The date must lie within the half-open interval [begin, end). Either bound
+    may be None, in which case it is unbounded.
+    """
+    __slots__ = ('begin', 'end')
+
+    def __init__(self, begin, end):
+        super().__init__(bool)
+        self.begin = begin
+        self.end = end
+
+    def __str__(self):
+        return "{}({}, {})".format(type(self).__name__, self.begin, self.end)
+    __repr__ = __str__
+
+    def contains(self, date):
+        """Return true if the date lies within this range.
+
+        Args:
+          date: A datetime.date instance.
+        Returns:
+          A boolean.
+        """
+        return ((self.begin is None or self.begin <= date) and
+                (self.end is None or date < self.end))
+
+    def __call__(self, context):
+        return self.contains(context.entry.date)
+
+    def evaluate_batch(self, context, table, rows):
+        dates = table.dates
+        contains = self.contains
+        return [contains(dates[row]) for row in rows]
+
+    def select_rows(self, table, rows):
+        """Narrow down a selection of rows to those within this date range.
+
+        Args:
+          table: An instance of query_table.PostingTable.
+          rows: A sequence of integer row indexes, in increasing order.
+        Returns:
+          A sequence of integer row indexes, in increasing order.
+        """
+        if not (isinstance(rows, range) and table.is_sorted()):
+            return list(itertools.compress(rows, self.evaluate_batch(None, table, rows)))
+        dates = table.dates
+        start, stop = rows.start, rows.stop
+        if self.begin is not None:
+            start = bisect.bisect_left(dates, self.begin, start, stop)
+        if self.end is not None:
+            stop = bisect.bisect_left(dates, self.end, start, stop)
+        return range(start, stop)
+
+
+class EvalAccountFilter(query_compile.EvalNode):
+    """A filter on the account name of a posting.
+
+    The account is compared against a constant value with a binary operator,
+    the account being its left operand.
+    """
+    __slots__ = ('operator', 'value', 'description')
+
+    def __init__(self, operator_, value, description):
+        super().__init__(bool)
+        self.operator = operator_
+        self.value = value
+        self.description = description
+
+    def __str__(self):
+        return "{}({})".format(type(self).__name__, self.description)
+    __repr__ = __str__
+
+    def __call__(self, context):
+        return self.operator(context.posting.account, self.value)
+
+    def evaluate_batch(self, context, table, rows):
+        matches = [self.operator(account, self.value) for account in table.accounts]
+        account_ids = table.account_ids
+        return [matches[account_ids[row]] for row in rows]
+
+    def select_rows(self, table, rows):
+        """Narrow down a selection of rows to those whose accounts match.
+
+        The filter is evaluated only once for each unique account name.
+
+        Args:
+          table: An instance of query_table.PostingTable.
+          rows: A sequence of integer row indexes, in increasing order.
+        Returns:
+          A sequence of integer row indexes, in increasing order.
+        """
+        account_rows = table.get_account_rows()
+        selected = sorted(itertools.chain.from_iterable(
+            account_rows[account_id]
+            for account_id, account in enumerate(table.accounts)
+            if self.operator(account, self.value)))
+        if isinstance(rows, range):
+            start, stop = rows.start, rows.stop
+            return [row for row in selected if start <= row < stop]
+        else:
+            row_set = set(rows)
+            return [row for row in selected if row in row_set]
+
+
+# A mapping of comparison node types to the ones to use when their operands are
+# swapped.
+SWAPPED_COMPARISONS = {
+    query_compile.EvalEqual: query_compile.EvalEqual,
+    query_compile.EvalLess: query_compile.EvalGreater,
+    query_compile.EvalLessEq: query_compile.EvalGreaterEq,
+    query_compile.EvalGreater: query_compile.EvalLess,
+    query_compile.EvalGreaterEq: query_compile.EvalLessEq,
+    }
+
+
+def get_column_comparison(c_expr, column_types):
+    """Match a comparison of a column against a constant.
+
+    Args:
+      c_expr: A compiled expression (an EvalNode instance).
+      column_types: A tuple of EvalColumn types to match.
+    Returns:
+      A triple of (comparison type, column node, constant value), normalized
+      such that the column is the left operand, or None, if the expression is
+      not a comparison between a column of the given types and a constant.
+    """
+    node_type = type(c_expr)
+    if node_type not in SWAPPED_COMPARISONS:
+        return None
+    left, right = c_expr.left, c_expr.right
+    if isinstance(right, column_types) and isinstance(left, query_compile.EvalConstant):
+        left, right = right, left
+        node_type = SWAPPED_COMPARISONS[node_type]
+    if isinstance(left, column_types) and isinstance(right, query_compile.EvalConstant):
+        return node_type, left, right.value
+    return None
+
+
+def get_date_range(c_expr):
+    """Convert a comparison on the date or year of a posting to a date range.
+
+    Args:
+      c_expr: A compiled expression (an EvalNode instance).
+    Returns:
+      A pair of (begin, end) dates, either of which may be None, describing
+      the half-open interval of dates the expression accepts, or None, if the
+      expression is not such a comparison.
+    """
+    comparison = get_column_comparison(c_expr, (query_env.DateColumn,
+                                                query_env.YearColumn))
+    if comparison is None:
+        return None
+    node_type, column, value = comparison
+
+    # Convert the value to the first date of the interval it designates and the
+    # first date past it.
+    try:
+        if isinstance(column, query_env.DateColumn):
+            if not isinstance(value, datetime.date):
+                return None
+            first, past = value, value + ONE_DAY
+        else:
+            if not isinstance(value, int) or isinstance(value, bool):
+                return None
+            first, past = datetime.date(value, 1, 1), datetime.date(value + 1, 1, 1)
+    except (ValueError, OverflowError):
+        return None
+
+    if node_type is query_compile.EvalEqual:
+        return (first, past)
+    elif node_type is query_compile.EvalLess:
+        return (None, first)
+    elif node_type is query_compile.EvalLessEq:
+        return (None, past)
+    elif node_type is query_compile.EvalGreater:
+        return (past, None)
+    else:
+        return (first, None)
+
+
+def get_account_filter(c_expr):
+    """Convert a comparison on the account of a posting to an account filter.
+
+    Args:
+      c_expr: A compiled expression (an EvalNode instance).
+    Returns:
+      An instance of EvalAccountFilter, or None, if the expression is not an
+      equality or a regular expression match on the account.
+    """
+    if (isinstance(c_expr, query_compile.EvalMatch) and
+        isinstance(c_expr.left, query_env.AccountColumn) and
+        isinstance(c_expr.right, query_compile.EvalConstant)):
+        pattern = c_expr.right.value
+        return EvalAccountFilter(c_expr.operator, pattern,
+                                 "account ~ {!r}".format(pattern))
+
+    comparison = get_column_comparison(c_expr, query_env.AccountColumn)
+    if comparison is not None:
+        node_type, _, value = comparison
+        if node_type is query_compile.EvalEqual and isinstance(value, str):
+            return EvalAccountFilter(operator.eq, value,
+                                     "account = {!r}".format(value))
+    return None
+
+
+def fold_constants(c_expr):
+    """Fold the operators applied to constant operands into constants.
+
+    Logical operators with a constant operand are also simplified, where this
+    preserves the value of the expression.
+
+    Args:
+      c_expr: A compiled expression (an EvalNode instance).
+    Returns:
+      An equivalent compiled expression. The input nodes are not modified.
+    """
+    # Process the children first, copying this node if any of them changed.
+    new_expr = c_expr
+    for attr in c_expr.attributes():
+        child = getattr(c_expr, attr)
+        if isinstance(child, query_compile.EvalNode):
+            new_child = fold_constants(child)
+            changed = new_child is not child
+        elif isinstance(child, list):
+            new_child = [fold_constants(element)
+                         if isinstance(element, query_compile.EvalNode)
+                         else element
+                         for element in child]
+            changed = any(new_element is not element
+                          for new_element, element in zip(new_child, child))
+        else:
+            continue
+        if changed:
+            if new_expr is c_expr:
+                new_expr = copy.copy(c_expr)
+            setattr(new_expr, attr, new_child)
+    c_expr = new_expr
+
+    is_constant = lambda node: isinstance(node, query_compile.EvalConstant)
+
+    if isinstance(c_expr, (query_compile.EvalAnd, query_compile.EvalOr)):
+        left, right = c_expr.left, c_expr.right
+        is_and = isinstance(c_expr, query_compile.EvalAnd)
+        if is_constant(left):
+            # The left operand alone decides whether the right one is evaluated.
+            if bool(left.value) is is_and:
+                return right
+            else:
+                return left
+        if is_constant(right) and left.dtype is bool and isinstance(right.value, bool):
+            if right.value is is_and:
+                return left
+            else:
+                return right
+
+    elif isinstance(c_expr, (query_compile.EvalUnaryOp, query_compile.EvalBinaryOp)):
+        if all(is_constant(child) for child in c_expr.childnodes()):
+            try:
+                return query_compile.EvalConstant(c_expr(None))
+            except Exception:  # pylint: disable=broad-except
+                # Leave errors to be raised at execution time.
+                pass
+
+    return c_expr
+
+
+def optimize_where(c_where):
+    """Rewrite a WHERE clause to use the posting indexes where possible.
+
+    Args:
+      c_where: A compiled expression (an EvalNode instance), or None.
+    Returns:
+      An equivalent compiled expression, or None. The conjuncts which can be
+      resolved using indexes come first: a single EvalDateRange node, followed
+      by EvalAccountFilter nodes, followed by the remaining conditions.
+    """
+    if c_where is None:
+        return None
+
+    c_where = fold_constants(c_where)
+    if isinstance(c_where, query_compile.EvalConstant):
+        # Don't bother, this either filters nothing or everything.
+        return c_where
+
+    begin, end = None, None
+    has_date_range = False
+    account_filters = []
+    residuals = []
+    for c_expr in query_compile.get_conjuncts(c_where):
+        date_range = get_date_range(c_expr)
+        if date_range is not None:
+            # Intersect with the other date ranges.
+            has_date_range = True
+            range_begin, range_end = date_range
+            if range_begin is not None and (begin is None or range_begin > begin):
+                begin = range_begin
+            if range_end is not None and (end is None or range_end < end):
+                end = range_end
+            continue
+
+        account_filter = get_account_filter(c_expr)
+        if account_filter is not None:
+            account_filters.append(account_filter)
+            continue
+
+        residuals.append(c_expr)
+
+    conjuncts = []
+    if has_date_range:
+        conjuncts.append(EvalDateRange(begin, end))
+    conjuncts.extend(account_filters)
+    conjuncts.extend(residuals)
+
+    new_where = conjuncts[0]
+    for c_expr in conjuncts[1:]:
+        new_where = query_compile.EvalAnd(new_where, c_expr)
+    return new_where
+
+
+def optimize(query):
+    """Optimize a compiled query.
+
+    Args:
+      query: An instance of query_compile.EvalQuery.
+    Returns:
+      An equivalent instance of query_compile.EvalQuery.
+    """
+    c_targets = [c_target._replace(c_expr=fold_constants(c_target.c_expr))
+                 for c_target in query.c_targets]
+    return query._replace(c_targets=c_targets,
+                          c_where=optimize_where(query.c_where))
+
+
+def explain(query):
+    """Describe the plan used to filter the postings of a compiled query.
+
+    This follows the choices made by query_execute.execute_query_iter().
+
+    Args:
+      query: An instance of query_compile.EvalQuery, normally optimized.
+    Returns:
+      A list of strings, one for each step of the plan.
+    """
+    steps = []
+    c_conjuncts = (query_compile.get_conjuncts(query.c_where)
+                   if query.c_where is not None
+                   else [])
+    if query_execute.uses_balance(query):
+        # The postings are evaluated one at a time, without the indexes.
+        steps.append('Scan all postings, one at a time for the running balance')
+        steps.extend('Filter postings: {}'.format(c_expr) for c_expr in c_conjuncts)
+        return steps
+    if not (c_conjuncts and hasattr(c_conjuncts[0], 'select_rows')):
+        steps.append('Scan all postings')
+    for c_expr in c_conjuncts:
+        if isinstance(c_expr, EvalDateRange):
+            steps.append('Bisect postings by date: [{}, {})'.format(
+                c_expr.begin or '-inf', c_expr.end or '+inf'))
+        elif isinstance(c_expr, EvalAccountFilter):
+            steps.append('Lookup postings by account: {}'.format(c_expr.description))
+        else:
+            steps.append('Filter postings: {}'.format(c_expr))
+    return steps
@@ -3,6 +3,7 @@
 __author__ = "Martin Blais <blais@furius.ca>"
 
 import collections
+import csv
 import datetime
 import math
 from itertools import zip_longest
@@ -534,6 +535,50 @@ def render_text(result_types, result_rows, dcontext, file, boxed=False, spaced=F
         file.write(bottom_line)
 
 
+def render_csv(result_types, result_rows, dcontext, file):
+    """Render the result of executing a query in CSV format.
+
+    Unlike render_text(), this does not need to compute the widths of the
+    columns ahead of time, so the rows are written out as they are consumed,
+    without holding all of them in memory.
+
+    Args:
+      result_types: A list of items describing the names and data types of the items in
+        each column.
+      result_rows: An iterable of ResultRow instances.
+      dcontext: A DisplayContext object prepared for rendering numbers.
+      file: A file object to render the results to.
+    """
+    dformat = dcontext.build()
+    writer = csv.writer(file)
+    writer.writerow([name for name, _ in result_types])
+    for row in result_rows:
+        writer.writerow([format_csv_value(value, dformat) for value in row])
+
+
+def format_csv_value(value, dformat):
+    """Convert a single value of a result row to a CSV field.
+
+    Args:
+      value: A value of any of the data types supported by the renderers.
+      dformat: A DisplayFormatter object.
+    Returns:
+      A string.
+    """
+    if value is None:
+        return ''
+    elif isinstance(value, str):
+        return value
+    elif isinstance(value, (set, frozenset)):
+        return ','.join(sorted(value))
+    elif isinstance(value, inventory.Inventory):
+        return ', '.join(position_.to_string(dformat) for position_ in value)
+    elif isinstance(value, (amount.Amount, position.Position)):
+        return value.to_string(dformat)
+    else:
+        return str(value)
+
+
 # A mapping of data-type -> (render-function, alignment)
 RENDERERS = {renderer_cls.dtype: renderer_cls
              for renderer_cls in [StringRenderer,
@@ -251,6 +251,24 @@ class TestQueryRender(unittest.TestCase):
         # with box():
         #     print(oss.getvalue())
 
+    def test_render_csv(self):
+        types = [('date', datetime.date), ('tags', set), ('number', Decimal),
+                 ('amount', A('1 USD').__class__), ('position', position.Position),
+                 ('balance', inventory.Inventory)]
+        Row = collections.namedtuple('TestRow', [name for name, type in types])
+        def rows():
+            yield Row(datetime.date(2014, 1, 2), {'b', 'a'}, D('123.1'), A('3.00 USD'),
+                      position.from_string('5 HOOL {500.23 USD}'),
+                      inventory.from_string('1.00 USD, 2.00 CAD'))
+            yield Row(None, set(), None, None, None, inventory.Inventory())
+        oss = io.StringIO()
+        query_render.render_csv(types, rows(), self.dcontext, oss)
+        self.assertEqual(
+            ('date,tags,number,amount,position,balance\r\n'
+             '2014-01-02,"a,b",123.1,3.00 USD,5 HOOL {500.23 USD},"1.00 USD, 2.00 CAD"\r\n'
+             ',,,,,\r\n'),
+            oss.getvalue())
+
 
 # Add a test like this, where the column's result ends up being zero wide.
 # bean-query $L  "select account, sum(units(position)) from open on 2014-01-01
@@ -0,0 +1,252 @@
+"""A columnar table of postings, for batched evaluation of queries.
+
+The row-at-a-time executor iterates over the postings of all the transactions,
+sets up a RowContext for each of them and invokes a tree of evaluation nodes on
+it. For large ledgers this overhead dominates. This module materializes the
+postings once into a set of parallel columns, so that evaluation nodes may
+process whole columns at a time (see EvalNode.evaluate_batch()).
+
+If NumPy is installed, a few of the ordered columns (dates and their
+components) are also made available as arrays, so that comparisons against
+constants can be vectorized.
+"""
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import datetime
+import itertools
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from beancount.core import data
+from beancount.query import query_compile
+
+
+# The set of operators that can be applied to entire arrays at once.
+VECTORIZED_OPERATORS = frozenset([operator.eq,
+                                  operator.lt,
+                                  operator.le,
+                                  operator.gt,
+                                  operator.ge])
+
+
+class PostingTable:
+    """A materialized table of postings, stored as parallel columns.
+
+    Each of the columns is a list with one element per posting. Rows are
+    referenced by their integer index in those lists.
+
+    Attributes:
+      entries: A list of the Transaction directives the postings come from.
+      entry_index: A list of integers, the index of each posting's parent
+        transaction in 'entries'.
+      postings: A list of Posting instances.
+      dates: A list of datetime.date instances, the date of each posting's
+        parent transaction.
+      accounts: A list of the unique account names in the table.
+      account_ids: A list of integers, the index of each posting's account in
+        'accounts'.
+      currencies: A list of the unique currencies in the table.
+      currency_ids: A list of integers, the index of each posting's currency in
+        'currencies'.
+      numbers: A list of Decimal instances, the number of units of each posting.
+      costs: A list of Amount instances, the per-unit cost of each posting, or
+        None, if the posting is not held at cost.
+    """
+    def __init__(self, entries):
+        """Materialize the postings of the given entries.
+
+        Args:
+          entries: A list of directives. Only Transaction directives contribute
+            rows to the table.
+        """
+        self.entries = []
+        self.entry_index = []
+        self.postings = []
+        self.dates = []
+        self.accounts = []
+        self.account_ids = []
+        self.currencies = []
+        self.currency_ids = []
+        self.numbers = []
+        self.costs = []
+
+        # Indexes and NumPy arrays derived from the columns, computed lazily.
+        self._arrays = {}
+        self._is_sorted = None
+        self._account_rows = None
+
+        account_map = {}
+        currency_map = {}
+        for entry in entries:
+            if not isinstance(entry, data.Transaction):
+                continue
+            index = len(self.entries)
+            self.entries.append(entry)
+            date = entry.date
+            for posting in entry.postings:
+                position = posting.position
+                lot = position.lot
+
+                account_id = account_map.get(posting.account, None)
+                if account_id is None:
+                    account_id = account_map[posting.account] = len(self.accounts)
+                    self.accounts.append(posting.account)
+
+                currency_id = currency_map.get(lot.currency, None)
+                if currency_id is None:
+                    currency_id = currency_map[lot.currency] = len(self.currencies)
+                    self.currencies.append(lot.currency)
+
+                self.entry_index.append(index)
+                self.postings.append(posting)
+                self.dates.append(date)
+                self.account_ids.append(account_id)
+                self.currency_ids.append(currency_id)
+                self.numbers.append(position.number)
+                self.costs.append(lot.cost)
+
+    def __len__(self):
+        return len(self.postings)
+
+    def iter_contexts(self, context, rows):
+        """Set up a row context for each of the given rows.
+
+        This is used to evaluate nodes which do not support batch evaluation
+        one row at a time.
+
+        Args:
+          context: A RowContext instance. Its 'entry' and 'posting' attributes
+            get overwritten for each row.
+          rows: A sequence of integer row indexes.
+        Yields:
+          The 'context' instance, updated for each row in turn.
+        """
+        entries = self.entries
+        entry_index = self.entry_index
+        postings = self.postings
+        for row in rows:
+            context.entry = entries[entry_index[row]]
+            context.posting = postings[row]
+            yield context
+
+    def is_sorted(self):
+        """Return true if the rows are sorted by date.
+
+        Returns:
+          A boolean.
+        """
+        if self._is_sorted is None:
+            dates = self.dates
+            self._is_sorted = all(dates[index] <= dates[index + 1]
+                                  for index in range(len(dates) - 1))
+        return self._is_sorted
+
+    def get_account_rows(self):
+        """Return an index of the rows by account.
+
+        Returns:
+          A list with one element per account in 'accounts', each of which is
+          the list of rows for that account, in increasing order.
+        """
+        if self._account_rows is None:
+            account_rows = [[] for _ in self.accounts]
+            for row, account_id in enumerate(self.account_ids):
+                account_rows[account_id].append(row)
+            self._account_rows = account_rows
+        return self._account_rows
+
+    def get_array(self, name):
+        """Return one of the ordered columns as a NumPy array.
+
+        Args:
+          name: A string, the name of the column, one of 'date', 'year', 'month'
+            or 'day'.
+        Returns:
+          A NumPy array, or None, if NumPy is not available or if the column
+          does not exist.
+        """
+        if numpy is None:
+            return None
+        try:
+            return self._arrays[name]
+        except KeyError:
+            pass
+        if name == 'date':
+            array = numpy.array(self.dates, dtype='datetime64[D]')
+        elif name in ('year', 'month', 'day'):
+            array = numpy.array([getattr(date, name) for date in self.dates],
+                                dtype=numpy.int32)
+        else:
+            return None
+        self._arrays[name] = array
+        return array
+
+    def compare(self, name, comparator, value, rows):
+        """Compare one of the ordered columns against a constant value.
+
+        Args:
+          name: A string, the name of an ordered column (see get_array()).
+          comparator: A binary comparison operator, one of VECTORIZED_OPERATORS.
+          value: The constant value to compare the column against.
+          rows: A sequence of integer row indexes.
+        Returns:
+          A list of booleans, one for each row, or None, if the comparison
+          cannot be vectorized and should be carried out element by element.
+        """
+        if comparator not in VECTORIZED_OPERATORS:
+            return None
+        array = self.get_array(name)
+        if array is None:
+            return None
+        if name == 'date':
+            if not isinstance(value, datetime.date):
+                return None
+            value = numpy.datetime64(value, 'D')
+        elif not isinstance(value, int) or isinstance(value, bool):
+            return None
+        return comparator(array[list(rows)], value).tolist()
+
+
+def take(column, rows):
+    """Select the elements of a column at the given rows.
+
+    Args:
+      column: A list of values, one of the columns of a PostingTable.
+      rows: A sequence of integer row indexes.
+    Returns:
+      A list of the selected values.
+    """
+    return [column[row] for row in rows]
+
+
+def select_rows(table, context, c_where):
+    """Compute the rows of a table which satisfy a filter expression.
+
+    Args:
+      table: An instance of PostingTable.
+      context: A RowContext instance, used for evaluating nodes that do not
+        support batch evaluation.
+      c_where: A compiled expression tree (an EvalNode node), or None.
+    Returns:
+      A sequence of integer row indexes.
+    """
+    rows = range(len(table))
+    if c_where is None:
+        return rows
+
+    # Narrow down the rows one conjunct at a time, so that each condition is
+    # evaluated only on the rows that passed the previous ones. Conditions
+    # which can be resolved using the indexes of the table provide a
+    # select_rows() method (see query_optimize).
+    for c_expr in query_compile.get_conjuncts(c_where):
+        select = getattr(c_expr, 'select_rows', None)
+        if select is not None:
+            rows = select(table, rows)
+        else:
+            mask = c_expr.evaluate_batch(context, table, rows)
+            rows = list(itertools.compress(rows, mask))
+    return rows
@@ -0,0 +1,118 @@
+__author__ = "Martin Blais <blais@furius.ca>"
+
+import datetime
+import operator
+import unittest
+
+from beancount.query import query_compile as qc
+from beancount.query import query_env as qe
+from beancount.query import query_execute as qx
+from beancount.query import query_parser
+from beancount.query import query_table
+from beancount import loader
+
+
+class TestPostingTable(unittest.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Bank:Checking
+        2014-01-01 open Assets:Investments
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-03 * "Dinner"
+          Expenses:Restaurant        50.02 USD
+          Assets:Bank:Checking
+
+        2014-03-04 * "Buy"
+          Assets:Investments          5 HOOL {500 USD}
+          Assets:Bank:Checking
+
+        2015-04-05 * "Lunch"
+          Expenses:Restaurant        12.00 USD
+          Assets:Bank:Checking
+        """
+        self.entries = entries
+        self.table = query_table.PostingTable(entries)
+        self.context = qx.RowContext()
+        self.context.options_map = options_map
+
+    def test_columns(self):
+        table = self.table
+        self.assertEqual(6, len(table))
+        self.assertEqual(3, len(table.entries))
+        self.assertEqual([0, 0, 1, 1, 2, 2], table.entry_index)
+        self.assertEqual(['Expenses:Restaurant', 'Assets:Bank:Checking',
+                          'Assets:Investments'], table.accounts)
+        self.assertEqual([0, 1, 2, 1, 0, 1], table.account_ids)
+        self.assertEqual(['USD', 'HOOL'], table.currencies)
+        self.assertEqual([0, 0, 1, 0, 0, 0], table.currency_ids)
+        self.assertEqual([None, None, 'USD', None, None, None],
+                         [cost and cost.currency for cost in table.costs])
+
+    def test_evaluate_batch__columns(self):
+        # Check that batch evaluation agrees with row evaluation for all columns.
+        rows = [4, 0, 2, 3]
+        for name, column_cls in sorted(qe.FilterPostingsEnvironment.columns.items()):
+            if column_cls is qe.BalanceColumn:
+                continue
+            c_column = column_cls()
+            expected = [c_column(context)
+                        for context in self.table.iter_contexts(self.context, rows)]
+            self.assertEqual(expected,
+                             c_column.evaluate_batch(self.context, self.table, rows),
+                             name)
+
+    def test_select_rows(self):
+        environ = qe.FilterPostingsEnvironment()
+        def select(where_string):
+            expr = query_parser.Parser().parse(
+                'SELECT * WHERE {}'.format(where_string)).where_clause
+            c_where = qc.compile_expression(expr, environ)
+            return query_table.select_rows(self.table, self.context, c_where)
+
+        self.assertEqual(range(6), query_table.select_rows(self.table, self.context, None))
+        self.assertEqual([0, 1, 2, 3], select('date < 2015-01-01'))
+        self.assertEqual([4, 5], select('year = 2015'))
+        self.assertEqual([1, 3, 5], select('account ~ "Bank"'))
+        self.assertEqual([2], select('currency = "HOOL" AND month = 3'))
+        self.assertEqual([0, 2, 4], select('NOT (account ~ "Bank")'))
+        self.assertEqual([2, 3], select('"Buy" ~ narration'))
+
+    def test_update_batch__aggregators(self):
+        rows = [0, 2, 4]
+        operands = {
+            'sum': [qe.NumberColumn()],
+            'count': [qe.PositionColumn()],
+            'first': [qe.AccountColumn()],
+            'last': [qe.AccountColumn()],
+            'min': [qe.NumberColumn()],
+            'max': [qe.NumberColumn()],
+            }
+        for name, aggregator_cls in qe.AGGREGATOR_FUNCTIONS.items():
+            if isinstance(name, tuple):
+                continue
+            batch_store, row_store = [], []
+            for store in batch_store, row_store:
+                allocator = qx.Allocator()
+                c_aggregator = aggregator_cls(operands[name])
+                c_aggregator.allocate(allocator)
+                store.extend(allocator.create_store())
+                c_aggregator.initialize(store)
+            c_aggregator.update_batch(batch_store, self.context, self.table, rows)
+            for context in self.table.iter_contexts(self.context, rows):
+                c_aggregator.update(row_store, context)
+            self.assertEqual(row_store, batch_store, name)
+
+    @unittest.skipIf(query_table.numpy is None, "NumPy is not installed")
+    def test_compare__vectorized(self):
+        self.assertEqual([True, True, False, False, False, False],
+                         self.table.compare('date', operator.lt,
+                                            datetime.date(2014, 3, 1), range(6)))
+        self.assertIsNone(self.table.compare('date', operator.lt, 'abc', range(6)))
+
+    def test_compare__not_vectorizable(self):
+        self.assertIsNone(self.table.compare('account', operator.eq, 'USD', range(6)))
+        self.assertIsNone(self.table.compare('date', operator.contains,
+                                             datetime.date(2014, 3, 1), range(6)))
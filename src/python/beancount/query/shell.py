@@ -19,6 +19,7 @@ from beancount.query import query_parser
 from beancount.query import query_compile
 from beancount.query import query_env
 from beancount.query import query_execute
+from beancount.query import query_optimize
 from beancount.query import query_render
 from beancount.parser import printer
 from beancount.core import data
@@ -270,6 +271,9 @@ class BQLShell(DispatchingShell):
         self.errors = None
         self.options_map = None
 
+        # Data structures derived from the entries, shared between queries.
+        self.indexes = None
+
         self.env_targets = query_env.TargetsEnvironment()
         self.env_entries = query_env.FilterEntriesEnvironment()
         self.env_postings = query_env.FilterPostingsEnvironment()
@@ -279,6 +283,7 @@ class BQLShell(DispatchingShell):
         Reload the input file without restarting the shell.
         """
         self.entries, self.errors, self.options_map = self.loadfun()
+        self.indexes = query_execute.QueryIndexes(self.entries, self.options_map)
         if self.is_interactive:
             print_statistics(self.entries, self.options_map, self.outfile)
 
@@ -379,17 +384,37 @@ class BQLShell(DispatchingShell):
             print('ERROR: {}.'.format(str(exc).rstrip('.')), file=self.outfile)
             return
 
+        # Optimize the compiled query.
+        c_query = query_optimize.optimize(c_query)
+
+        # The CSV format does not require all the result rows up front; stream
+        # them out as they get computed.
+        output_format = self.vars['format']
+        if output_format == 'csv':
+            result_types, result_rows = query_execute.execute_query_iter(c_query,
+                                                                         self.entries,
+                                                                         self.options_map,
+                                                                         self.indexes)
+            if self.outfile is sys.stdout:
+                with self.get_pager() as file:
+                    query_render.render_csv(result_types, result_rows,
+                                            self.options_map['dcontext'], file)
+            else:
+                query_render.render_csv(result_types, result_rows,
+                                        self.options_map['dcontext'], self.outfile)
+            return
+
         # Execute it to obtain the result rows.
         result_types, result_rows = query_execute.execute_query(c_query,
                                                                 self.entries,
-                                                                self.options_map)
+                                                                self.options_map,
+                                                                self.indexes)
 
         # Output the resulting rows.
         if not result_rows:
             print("(empty)", file=self.outfile)
         else:
             # FIXME: Implement output to other formats; use 'formats' to dispatch.
-            output_format = self.vars['format']
             if output_format != 'text':
                 print("Unsupported output format '{}'.".format(output_format), file=self.outfile)
 
@@ -459,6 +484,17 @@ class BQLShell(DispatchingShell):
         pr("Compiled query:")
         pr("  {}".format(query))
         pr()
+
+        if isinstance(query, query_compile.EvalQuery):
+            query = query_optimize.optimize(query)
+            pr("Optimized query:")
+            pr("  {}".format(query))
+            pr()
+            pr("Plan:")
+            for step in query_optimize.explain(query):
+                pr("  {}".format(step))
+            pr()
+
         pr("Targets:")
         for c_target in query.c_targets:
             pr("  '{}'{}: {}".format(
@@ -3,6 +3,7 @@
 __author__ = "Martin Blais <blais@furius.ca>"
 
 import collections
+import itertools
 from os import path
 
 from beancount.core import data
@@ -40,7 +41,7 @@ Row = collections.namedtuple('Row',
                              'description links amount_str balance_str')
 
 
-def iterate_html_postings(txn_postings, formatter):
+def iterate_html_postings(txn_postings, formatter, start=0, checkpoints=None):
     """Iterate through the list of transactions with rendered HTML strings for each cell.
 
     This pre-renders all the data for each row to HTML. This is reused by the entries
@@ -50,10 +51,13 @@ def iterate_html_postings(txn_postings, formatter):
       txn_postings: A list of TxnPosting or directive instances.
       formatter: An instance of HTMLFormatter, to be render accounts,
         inventories, links and docs.
+      start: An integer, the number of rows to skip at the beginning.
+      checkpoints: An optional instance of realization.BalanceCheckpoints for
+        'txn_postings', used to skip rows without recomputing their balances.
     Yields:
       Instances of Row tuples. See above.
     """
-    for entry_line in realization.iterate_with_balance(txn_postings):
+    for entry_line in realization.iterate_with_balance(txn_postings, start, checkpoints):
         entry, leg_postings, change, entry_balance = entry_line
 
         # Prepare the data to be rendered for this row.
@@ -123,7 +127,8 @@ def iterate_html_postings(txn_postings, formatter):
                   flag, description, links, amount_str, balance_str)
 
 
-def html_entries_table_with_balance(oss, txn_postings, formatter, render_postings=True):
+def html_entries_table_with_balance(oss, txn_postings, formatter, render_postings=True,
+                                    offset=0, limit=None, reverse=False, checkpoints=None):
     """Render a list of entries into an HTML table, with a running balance.
 
     (This function returns nothing, it write to oss as a side-effect.)
@@ -135,10 +140,36 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
         inventories, links and docs.
       render_postings: A boolean; if true, render the postings as rows under the
         main transaction row.
+      offset: An integer, the number of rows to skip.
+      limit: An integer, the maximum number of rows to render, or None, to
+        render all of them.
+      reverse: A boolean; if true, render the rows newest first, and count the
+        offset from the end of the list.
+      checkpoints: An optional instance of realization.BalanceCheckpoints for
+        'txn_postings'. Provide this to avoid recomputing the running balance
+        from the beginning when rendering a page deep into the list.
     """
-    write = lambda data: (oss.write(data), oss.write('\n'))
+    for html in iter_html_entries_table_with_balance(txn_postings, formatter,
+                                                     render_postings,
+                                                     offset, limit, reverse,
+                                                     checkpoints):
+        oss.write(html)
 
-    write('''
+
+def iter_html_entries_table_with_balance(txn_postings, formatter, render_postings=True,
+                                         offset=0, limit=None, reverse=False,
+                                         checkpoints=None):
+    """Render a list of entries into an HTML table incrementally.
+
+    This is the same as html_entries_table_with_balance(), except that the HTML
+    is generated in chunks, so that it can be streamed as it is rendered.
+
+    Args:
+      See html_entries_table_with_balance().
+    Yields:
+      Strings of HTML.
+    """
+    yield '''
       <table class="entry-table">
       <thead>
         <tr>
@@ -151,17 +182,52 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
          <th class="change">Change</th>
          <th class="balance">Balance</th>
       </thead>
-    ''')
+    ''' + '\n'
 
-    for row in iterate_html_postings(txn_postings, formatter):
-        entry = row.entry
+    if reverse:
+        # The running balance is always accumulated in date order, so select the
+        # page of rows in that order and reverse them after rendering.
+        if checkpoints is None:
+            checkpoints = realization.compute_balance_checkpoints(txn_postings)
+        stop = max(0, checkpoints.num_rows - offset)
+        start = max(0, stop - limit) if limit is not None else 0
+        rows = list(itertools.islice(
+            iterate_html_postings(txn_postings, formatter, start, checkpoints),
+            stop - start))
+        rows.reverse()
+    else:
+        rows = itertools.islice(
+            iterate_html_postings(txn_postings, formatter, offset, checkpoints),
+            limit)
 
-        description = row.description
-        if row.links:
-            description += render_links(row.links)
+    for row in rows:
+        yield render_row_with_balance(row, formatter, render_postings)
 
-        # Render a row.
-        write('''
+    yield '</table>\n'
+
+
+def render_row_with_balance(row, formatter, render_postings=True):
+    """Render a single row of an entries table with a running balance.
+
+    Args:
+      row: An instance of Row, as produced by iterate_html_postings().
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      render_postings: A boolean; if true, render the postings as rows under the
+        main transaction row.
+    Returns:
+      A string of HTML.
+    """
+    entry = row.entry
+    lines = []
+    write = lambda data: (lines.append(data), lines.append('\n'))
+
+    description = row.description
+    if row.links:
+        description += render_links(row.links)
+
+    # Render a row.
+    write('''
           <tr class="{} {}" title="{}">
             <td class="datecell"><a href="{}">{}</a></td>
             <td class="flag">{}</td>
@@ -175,16 +241,16 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
                    row.flag, description,
                    row.amount_str, row.balance_str))
 
-        if render_postings and isinstance(entry, data.Transaction):
-            for posting in entry.postings:
+    if render_postings and isinstance(entry, data.Transaction):
+        for posting in entry.postings:
 
-                classes = ['Posting']
-                if posting.flag == flags.FLAG_WARNING:
-                    classes.append('warning')
-                if posting in row.leg_postings:
-                    classes.append('leg')
+            classes = ['Posting']
+            if posting.flag == flags.FLAG_WARNING:
+                classes.append('warning')
+            if posting in row.leg_postings:
+                classes.append('leg')
 
-                write('''
+            write('''
                   <tr class="{}">
                     <td class="datecell"></td>
                     <td class="flag">{}</td>
@@ -202,7 +268,7 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
                            posting.price or '',
                            interpolate.get_posting_weight(posting)))
 
-    write('</table>')
+    return ''.join(lines)
 
 
 def html_entries_table(oss, txn_postings, formatter, render_postings=True):
@@ -98,6 +98,42 @@ class TestJournalRender(unittest.TestCase):
         self.assertTrue(isinstance(html, str))
         self.assertTrue(re.search('<table', html))
 
+    def test_html_entries_table_with_balance__paginated(self):
+        formatter = html_formatter.HTMLFormatter(display_context.DEFAULT_DISPLAY_CONTEXT)
+        txn_postings = self.real_account.txn_postings
+        def render_rows(**kwargs):
+            oss = io.StringIO()
+            journal_html.html_entries_table_with_balance(
+                oss, txn_postings, formatter, True, **kwargs)
+            return re.findall(r'<tr class="[^"]*" title="([^"]*)"', oss.getvalue())
+
+        all_rows = render_rows()
+        self.assertEqual(11, len(all_rows))
+        checkpoints = realization.compute_balance_checkpoints(txn_postings, 2)
+        for offset in range(0, 13, 3):
+            self.assertEqual(all_rows[offset:offset + 4],
+                             render_rows(offset=offset, limit=4))
+            self.assertEqual(all_rows[offset:offset + 4],
+                             render_rows(offset=offset, limit=4, checkpoints=checkpoints))
+
+            expected = list(reversed(all_rows))[offset:offset + 4]
+            self.assertEqual(expected,
+                             render_rows(offset=offset, limit=4, reverse=True))
+            self.assertEqual(expected,
+                             render_rows(offset=offset, limit=4, reverse=True,
+                                         checkpoints=checkpoints))
+        self.assertEqual(list(reversed(all_rows)), render_rows(reverse=True))
+
+    def test_iter_html_entries_table_with_balance(self):
+        formatter = html_formatter.HTMLFormatter(display_context.DEFAULT_DISPLAY_CONTEXT)
+        oss = io.StringIO()
+        journal_html.html_entries_table_with_balance(
+            oss, self.real_account.txn_postings, formatter, True)
+        chunks = list(journal_html.iter_html_entries_table_with_balance(
+            self.real_account.txn_postings, formatter, True))
+        self.assertEqual(13, len(chunks))
+        self.assertEqual(oss.getvalue(), ''.join(chunks))
+
     def test_html_entries_table(self):
         oss = io.StringIO()
         formatter = html_formatter.HTMLFormatter(display_context.DEFAULT_DISPLAY_CONTEXT)
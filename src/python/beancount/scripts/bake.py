@@ -116,13 +116,15 @@ def save_scraped_document(output_dir, url, response, contents, html_root, skippe
         outfile.write(contents)
 
 
-def bake_to_directory(webargs, output_dir, quiet=False):
+def bake_to_directory(webargs, output_dir, quiet=False, num_workers=1):
     """Serve and bake a Beancount's web to a directory.
 
     Args:
       webargs: An argparse parsed options object with the web app arguments.
       output_dir: A directory name. We don't check here whether it exists or not.
       quiet: A boolean, True to suppress web server fetch log.
+      num_workers: An integer, the number of server processes to fetch the
+        pages from concurrently.
     Returns:
       True on success, False otherwise.
     """
@@ -135,7 +137,8 @@ def bake_to_directory(webargs, output_dir, quiet=False):
                                                  webargs.port,
                                                  '/(context|view/component|.*/doc)/',
                                                  quiet,
-                                                 webargs)
+                                                 webargs,
+                                                 num_workers)
 
 
 def archive(command_template, directory, archive, quiet=False):
@@ -188,7 +191,9 @@ def main():
     parser = argparse.ArgumentParser(description=__doc__)
 
     web_group = web.add_web_arguments(parser)
-    web_group.set_defaults(port=9475)
+    # Render the journals on a single page, the scraper does not follow the
+    # query strings of pagination links.
+    web_group.set_defaults(port=9475, journal_page_size=0)
 
     group = parser.add_argument_group("Bake process arguments")
 
@@ -201,6 +206,11 @@ def main():
     group.add_argument('-q', '--quiet', action='store_true',
                        help="Don't even print out web server log")
 
+    group.add_argument('-j', '--jobs', action='store', type=int, default=1,
+                       help=("The number of server processes to fetch pages from "
+                             "concurrently, on consecutive ports. Each loads the "
+                             "ledger and builds its own share of the views."))
+
     opts = parser.parse_args()
 
     # Figure out the archival method.
@@ -223,7 +233,7 @@ def main():
             "ERROR: Output directory already exists '{}'".format(output_directory))
 
     # Bake to a directory hierarchy of files with local links.
-    bake_to_directory(opts, output_directory, opts.quiet)
+    bake_to_directory(opts, output_directory, opts.quiet, opts.jobs)
 
     # Verify the bake output files. This is just a sanity checking step.
     # You can also use "bean-doctor validate_html <file> to run this manually.
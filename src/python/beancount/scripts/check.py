@@ -35,7 +35,7 @@ def main():
             opts.filename,
             log_timings=logging.info,
             log_errors=sys.stderr,
-            # Force slow and hardcore validations, just for check.
+            # Force the hardcore validations, just for check.
             extra_validations=validation.HARDCORE_VALIDATIONS)
 
     # Exit with an error code if there were any errors, so this can be used in a
@@ -152,8 +152,12 @@ def do_print_options(filename, *args):
       unused_args: Ignored.
     """
     from beancount import loader
+    from beancount.parser import options
     _, __, options_map = loader.load_file(filename)
     for key, value in sorted(options_map.items()):
+        # Skip the objects built by the loader, which aren't options per se.
+        if key in options.RUNTIME_OPTIONS:
+            continue
         print('{}: {}'.format(key, value))
 
 
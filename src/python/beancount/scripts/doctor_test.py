@@ -5,6 +5,7 @@ import re
 from os import path
 
 from beancount.parser import cmptest
+from beancount.parser import options
 from beancount.utils import test_utils
 from beancount.scripts import doctor
 from beancount.scripts import directories_test
@@ -76,6 +77,20 @@ class TestScriptDoctor(test_utils.TestCase):
             test_utils.run_with_args(doctor.main, ['list_options'])
             test_utils.run_with_args(doctor.main, ['list-options'])
 
+    @test_utils.docfile
+    def test_print_options(self, filename):
+        """
+        option "title" "Print options"
+
+        2013-01-01 open Assets:Cash
+        """
+        with test_utils.capture() as stdout:
+            test_utils.run_with_args(doctor.main, ['print_options', filename])
+        keys = {line.split(':')[0] for line in stdout.getvalue().splitlines()}
+        self.assertIn('title', keys)
+        self.assertIn('operating_currency', keys)
+        self.assertFalse(keys & options.RUNTIME_OPTIONS)
+
     def test_checkdeps(self):
         with test_utils.capture():
             test_utils.run_with_args(doctor.main, ['checkdeps'])
@@ -15,10 +15,9 @@ from beancount.query import shell
 def main():
     parser = argparse.ArgumentParser(description=__doc__)
 
-    ## FIXME: implement this.
-    # parser.add_argument('-f', '--format', default=None,
-    #                     choices=['text', 'csv', 'html', 'htmldiv', 'beancount', 'xls'],
-    #                     help="Output format.")
+    parser.add_argument('-f', '--format', default=None,
+                        choices=['text', 'csv'],
+                        help="Output format.")
 
     parser.add_argument('-o', '--output', action='store',
                         help=("Output filename. If not specified, the output goes "
@@ -36,13 +35,15 @@ def main():
 
     args = parser.parse_args()
 
-    # Parse the input file.
+    # Parse the input file. Keep a cache of the parsed files across reloads.
+    parse_cache = {}
     def load():
         errors_file = None if args.no_errors else sys.stderr
         with misc_utils.log_time('beancount.loader (total)', logging.info):
             return loader.load_file(args.filename,
                                     log_timings=logging.info,
-                                    log_errors=errors_file)
+                                    log_errors=errors_file,
+                                    parse_cache=parse_cache)
 
     # Create a receiver for output.
     outfile = sys.stdout if args.output is None else open(args.output, 'w')
@@ -52,6 +53,12 @@ def main():
     shell_obj = shell.BQLShell(is_interactive, load, outfile)
     shell_obj.on_Reload()
 
+    # Select the output format, from the output filename if not specified.
+    if args.format is not None:
+        shell_obj.vars['format'] = args.format
+    elif args.output is not None and args.output.endswith('.csv'):
+        shell_obj.vars['format'] = 'csv'
+
     # Run interactively if we're a TTY and no query is supplied.
     if is_interactive:
         try:
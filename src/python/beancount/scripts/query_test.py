@@ -29,3 +29,13 @@ class TestScriptQuery(test_utils.TestCase):
         with test_utils.capture() as stdout:
             test_utils.run_with_args(query.main, [filename, "SELECT 1;"])
         self.assertTrue(stdout.getvalue())
+
+        with test_utils.capture() as stdout:
+            test_utils.run_with_args(query.main, [
+                '--format=csv', filename,
+                "SELECT account, number WHERE account ~ 'Account1';"])
+        self.assertEqual(['account,number',
+                          'Assets:Account1,5000',
+                          'Assets:Account1,-3000',
+                          'Assets:Account1,-1000'],
+                         stdout.getvalue().splitlines())
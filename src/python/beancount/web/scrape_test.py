@@ -95,6 +95,30 @@ class TestScrapeURLs(test_utils.TestCase):
                              '/path/to/image.png'}, set(self.results.keys()))
 
 
+    @mock.patch('urllib.request.urlopen', fetch_url)
+    def test_scrape_urls__concurrent(self):
+        url_formats = ['http://something{}', 'http://otherthing{}']
+        orders = []
+        for _ in range(2):
+            self.results = {}
+            processed_urls, skipped_urls = scrape.scrape_urls(
+                url_formats, self.callback, ignore_regexp='^/doc', num_workers=2)
+            self.assertSetEqual({'/',
+                                 '/path/to/file1',
+                                 '/path/to/image.png'}, set(self.results.keys()))
+            self.assertSetEqual(set(self.results.keys()), processed_urls)
+            orders.append(list(self.results.keys()))
+        self.assertEqual(orders[0], orders[1])
+
+    def test_get_view_key(self):
+        self.assertEqual('/view/all', scrape.get_view_key('/view/all/balsheet'))
+        self.assertEqual('/view/year/2014',
+                         scrape.get_view_key('/view/year/2014/journal/Assets'))
+        self.assertEqual('/view/tag/trip', scrape.get_view_key('/view/tag/trip/'))
+        self.assertEqual('/errors', scrape.get_view_key('/errors'))
+        self.assertEqual('/', scrape.get_view_key('/'))
+
+
 class TestScrapeVerification(test_utils.TestCase):
 
     def test_validate_local_links(self):
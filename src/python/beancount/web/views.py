@@ -2,16 +2,41 @@
 """
 __author__ = "Martin Blais <blais@furius.ca>"
 
+import collections
+import copy
 import datetime
 import logging
+import sys
+import threading
 
 from beancount.core import data
+from beancount.core import number
+from beancount.core import position
 from beancount.ops import summarize
 from beancount.core import realization
 from beancount.parser import options
 from beancount.utils import misc_utils
 
 
+# Options which do not affect the contents of a view, and which are ignored
+# when checking whether a view is still valid for a new list of entries.
+VIEW_INDEPENDENT_OPTIONS = ({'dcontext', 'commodities', 'include'} |
+                            options.RUNTIME_OPTIONS)
+
+
+def get_view_options(options_map):
+    """Select the options which affect the contents of views.
+
+    Args:
+      options_map: A dict of options, as produced by the parser.
+    Returns:
+      A dict of options.
+    """
+    return {key: value
+            for key, value in options_map.items()
+            if key not in VIEW_INDEPENDENT_OPTIONS}
+
+
 class View:
     """A container for filtering a subset of entries and realizing that for
     display."""
@@ -44,6 +69,13 @@ class View:
         self.opening_real_accounts = None
         self.closing_real_accounts = None
 
+        # A cache of the lists of postings and balance checkpoints of the
+        # journals rendered from this view. See get_journal().
+        self.journal_cache = {}
+
+        # The options the view was created with, to detect changes.
+        self.view_options = get_view_options(options_map)
+
         # Realize now, we don't need to do this lazily because we create these
         # view objects on-demand and cache them.
         self._initialize(options_map)
@@ -82,6 +114,92 @@ class View:
         assert self.real_accounts is not None
         assert self.closing_real_accounts is not None
 
+    def update(self, all_entries, options_map):
+        """Create a copy of this view updated for a new list of entries.
+
+        This is used to carry over views when the input file is reloaded: the
+        filter of this view is applied to the new entries, and if the result is
+        the same as before, the realizations are kept as they are. Otherwise,
+        the entries which differ are removed from and added to copies of the
+        realizations with realization.update(), instead of realizing all the
+        entries again. This view itself is not modified, as it may still be in
+        use for rendering.
+
+        Args:
+          all_entries: The new full list of directives.
+          options_map: The new options dict.
+        Returns:
+          A new instance of View for the new entries, or None, if the options
+          affecting the view have changed, or if too many of its entries have
+          changed for an update to be worthwhile; a new view should be created
+          instead.
+        """
+        if get_view_options(options_map) != self.view_options:
+            return None
+        entries, begin_index = self.apply_filter(all_entries, options_map)
+
+        view = copy.copy(self)
+        view.all_entries = all_entries
+
+        entries, removed, added = diff_entries(self.entries, entries)
+        if not (removed or added) and begin_index == self.begin_index:
+            return view
+        if len(removed) + len(added) > len(entries) // 2:
+            return None
+
+        opening_entries = (entries[:begin_index]
+                           if begin_index is not None
+                           else [])
+        opening_entries, opening_removed, opening_added = diff_entries(
+            self.opening_entries, opening_entries)
+        closing_entries, closing_removed, closing_added = diff_entries(
+            self.closing_entries, summarize.cap_opt(entries, options_map))
+
+        view.entries = entries
+        view.begin_index = begin_index
+        view.opening_entries = opening_entries
+        view.closing_entries = closing_entries
+        view.opening_real_accounts = update_realization(
+            self.opening_real_accounts, opening_added, opening_removed)
+        view.real_accounts = update_realization(
+            self.real_accounts, added, removed)
+        view.closing_real_accounts = update_realization(
+            self.closing_real_accounts, closing_added, closing_removed)
+        view.journal_cache = {}
+        return view
+
+    def get_journal(self, account_name, closing=False):
+        """Get the postings of an account and its children, for rendering a journal.
+
+        The postings are gathered and the running balance checkpoints computed
+        on the first request for an account, and cached in this view.
+
+        Args:
+          account_name: A string, the name of the account, or the empty string
+            for the postings of all the accounts.
+          closing: A boolean, true to fetch the postings from the closing
+            realization instead of the realization of the period.
+        Returns:
+          A pair of a sorted list of postings or directives and an instance of
+          realization.BalanceCheckpoints for it, or None, if the account does
+          not exist.
+        """
+        key = (account_name, closing)
+        try:
+            return self.journal_cache[key]
+        except KeyError:
+            pass
+        real_root = self.closing_real_accounts if closing else self.real_accounts
+        real_account = (realization.get(real_root, account_name)
+                        if account_name
+                        else real_root)
+        if real_account is None:
+            return None
+        txn_postings = realization.get_postings(real_account)
+        checkpoints = realization.compute_balance_checkpoints(txn_postings)
+        journal = self.journal_cache[key] = (txn_postings, checkpoints)
+        return journal
+
     def apply_filter(self, entries):
         """Filter the list of entries.
 
@@ -244,3 +362,285 @@ class ComponentView(View):
                              if data.has_entry_account_component(entry, component)]
 
         return component_entries, None
+
+
+# Estimates of the sizes, in bytes, of the objects held by the views, which are
+# not worth measuring individually.
+TXN_POSTING_SIZE = sys.getsizeof(data.TxnPosting(None, None))
+POSITION_SIZE = sum(map(sys.getsizeof, [
+    position.Position(position.Lot('USD', None, None), number.ZERO),
+    position.Lot('USD', None, None),
+    number.ZERO]))
+
+
+def estimate_inventory_size(inv):
+    """Estimate the memory used by an inventory.
+
+    Args:
+      inv: An instance of Inventory.
+    Returns:
+      An integer, a number of bytes.
+    """
+    return (sys.getsizeof(inv) +
+            sys.getsizeof(inv._positions) +  # pylint: disable=protected-access
+            len(inv) * POSITION_SIZE)
+
+
+def estimate_realization_size(real_root):
+    """Estimate the memory used by a realization tree.
+
+    Args:
+      real_root: An instance of RealAccount, the root of the tree.
+    Returns:
+      An integer, a number of bytes.
+    """
+    size = 0
+    for real_account in realization.iter_children(real_root):
+        size += (sys.getsizeof(real_account) +
+                 sys.getsizeof(real_account.txn_postings) +
+                 len(real_account.txn_postings) * TXN_POSTING_SIZE +
+                 estimate_inventory_size(real_account.balance))
+    return size
+
+
+def diff_entries(old_entries, new_entries):
+    """Find the entries which differ between two versions of a list of entries.
+
+    The lists are compared from both ends, so this is cheap when the changes
+    are localized, e.g., when entries were appended at the end.
+
+    Args:
+      old_entries: A list of directives.
+      new_entries: A list of directives.
+    Returns:
+      A triple of a list of entries equal to 'new_entries', in which the
+      unchanged entries are the instances from 'old_entries', the list of old
+      entries which were removed, and the list of new entries which were added.
+    """
+    num_old, num_new = len(old_entries), len(new_entries)
+    max_common = min(num_old, num_new)
+    prefix = 0
+    while prefix < max_common and old_entries[prefix] == new_entries[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < max_common - prefix and
+           old_entries[num_old - suffix - 1] == new_entries[num_new - suffix - 1]):
+        suffix += 1
+    removed = old_entries[prefix:num_old - suffix]
+    added = new_entries[prefix:num_new - suffix]
+    if not (removed or added):
+        return old_entries, removed, added
+    return (old_entries[:prefix] + added + old_entries[num_old - suffix:],
+            removed, added)
+
+
+def update_realization(real_root, added_entries, removed_entries):
+    """Apply added and removed entries to a copy of a realization.
+
+    The tree of accounts is copied, but not the lists of postings and balances,
+    which realization.update() replaces rather than modifies.
+
+    Args:
+      real_root: An instance of RealAccount, the root of a realization.
+      added_entries: A list of directives to add.
+      removed_entries: A list of directives to remove.
+    Returns:
+      A new instance of RealAccount, or 'real_root' itself if there are no
+      changes.
+    """
+    if not (added_entries or removed_entries):
+        return real_root
+    def copy_tree(real_account):
+        new_account = real_account.copy()
+        for key, real_child in real_account.items():
+            dict.__setitem__(new_account, key, copy_tree(real_child))
+        return new_account
+    new_root = copy_tree(real_root)
+    realization.update(new_root, added_entries, removed_entries)
+    return new_root
+
+
+def estimate_view_size(view):
+    """Estimate the memory used by a view.
+
+    This accounts for the realizations, the lists of filtered entries and the
+    cached journals of the view. The directives themselves are mostly shared
+    with the full list of entries and are not counted.
+
+    Args:
+      view: An instance of View.
+    Returns:
+      An integer, a number of bytes.
+    """
+    size = sys.getsizeof(view)
+    for entries in (view.entries, view.opening_entries, view.closing_entries):
+        size += sys.getsizeof(entries)
+    for real_root in (view.opening_real_accounts,
+                      view.real_accounts,
+                      view.closing_real_accounts):
+        size += estimate_realization_size(real_root)
+    for txn_postings, checkpoints in view.journal_cache.values():
+        size += (sys.getsizeof(txn_postings) +
+                 sys.getsizeof(checkpoints.indexes) +
+                 sys.getsizeof(checkpoints.rows) +
+                 sys.getsizeof(checkpoints.balances) +
+                 sum(map(estimate_inventory_size, checkpoints.balances)))
+    return size
+
+
+class ViewCache:
+    """A cache of views, bounded in number of views and estimated memory.
+
+    When either budget is exceeded, the least recently used views are evicted
+    (they are recreated on demand). The most recently used view is always
+    kept, even if it alone exceeds the memory budget.
+
+    Attributes:
+      max_entries: An integer, the maximum number of views to keep, or None,
+        if unbounded.
+      max_bytes: An integer, the maximum estimated size of the views to keep,
+        or None, if unbounded.
+      hits: An integer, the number of lookups that found their view.
+      misses: An integer, the number of lookups that did not.
+      evictions: An integer, the number of views evicted to fit the budgets.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        """Create an empty cache.
+
+        Args:
+          max_entries: An integer, the maximum number of views, or None.
+          max_bytes: An integer, the maximum estimated number of bytes, or None.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # An ordered dict of view id to a pair of (view, estimated size), in
+        # order of least to most recently used.
+        self._views = collections.OrderedDict()
+        self._total_bytes = 0
+
+        # The cache is shared between the server threads and the reloader.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._views)
+
+    def __contains__(self, viewid):
+        return viewid in self._views
+
+    @property
+    def total_bytes(self):
+        """The estimated size of all the views in the cache."""
+        return self._total_bytes
+
+    def get(self, viewid):
+        """Look up a view and mark it as most recently used.
+
+        Args:
+          viewid: A string, the id of the view.
+        Returns:
+          An instance of View, or None, if it is not in the cache.
+        """
+        with self._lock:
+            try:
+                view, _ = self._views[viewid]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._views.move_to_end(viewid)
+            self.hits += 1
+            return view
+
+    def put(self, viewid, view):
+        """Insert a view as most recently used, evicting others to fit the budgets.
+
+        Args:
+          viewid: A string, the id of the view.
+          view: An instance of View.
+        """
+        size = estimate_view_size(view)
+        with self._lock:
+            self._insert(viewid, view, size)
+            self._evict()
+
+    def resize(self, viewid):
+        """Update the estimated size of a view after it has grown.
+
+        Views grow as their journals get cached; call this after rendering a
+        page from a view. This does nothing if the view has been evicted.
+
+        Args:
+          viewid: A string, the id of the view.
+        """
+        with self._lock:
+            try:
+                view, _ = self._views[viewid]
+            except KeyError:
+                return
+        size = estimate_view_size(view)
+        with self._lock:
+            if viewid in self._views:
+                self._views.move_to_end(viewid)
+                self._insert(viewid, view, size)
+                self._evict()
+
+    def _insert(self, viewid, view, size):
+        """Insert or replace a view, as most recently used. Hold the lock."""
+        try:
+            _, old_size = self._views.pop(viewid)
+            self._total_bytes -= old_size
+        except KeyError:
+            pass
+        self._views[viewid] = (view, size)
+        self._total_bytes += size
+
+    def _evict(self):
+        """Evict the least recently used views until within budget. Hold the lock."""
+        while len(self._views) > 1 and (
+                (self.max_entries is not None and len(self._views) > self.max_entries) or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)):
+            viewid, (_, size) = self._views.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            logging.info('Evicted view %s (%d bytes)', viewid, size)
+
+    def items(self):
+        """List the cached views.
+
+        Returns:
+          A list of triples of (view id, view, estimated size), in order of least
+          to most recently used.
+        """
+        with self._lock:
+            return [(viewid, view, size)
+                    for viewid, (view, size) in self._views.items()]
+
+    def carry_over(self, all_entries, options_map):
+        """Create a cache for a new list of entries, with the views still valid.
+
+        Each view is updated with View.update(); those which cannot be updated
+        are dropped. The budgets and statistics are carried over.
+
+        Args:
+          all_entries: The new full list of directives.
+          options_map: The new options dict.
+        Returns:
+          A new instance of ViewCache.
+        """
+        new_cache = ViewCache(self.max_entries, self.max_bytes)
+        new_cache.hits = self.hits
+        new_cache.misses = self.misses
+        new_cache.evictions = self.evictions
+        for viewid, view, size in self.items():
+            new_view = view.update(all_entries, options_map)
+            if new_view is None:
+                continue
+            if new_view.entries is not view.entries:
+                size = estimate_view_size(new_view)
+            new_cache._insert(viewid, new_view, size)  # pylint: disable=protected-access
+        new_cache._evict()  # pylint: disable=protected-access
+        return new_cache
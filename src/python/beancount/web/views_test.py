@@ -4,7 +4,10 @@ import unittest
 
 from beancount import loader
 from beancount.parser import options
+from beancount.core import compare
+from beancount.core import data
 from beancount.core import realization
+from beancount.ops import summarize
 from beancount.web import views
 
 
@@ -159,3 +162,159 @@ class TestViews(unittest.TestCase):
         self.assertNotEqual(self.empty_realization, view.real_accounts)
         self.assertEqual(self.empty_realization, view.opening_real_accounts)
         self.assertNotEqual(self.empty_realization, view.closing_real_accounts)
+
+    def test_get_journal(self):
+        view = views.AllView(self.entries, self.options_map, 'All')
+        txn_postings, checkpoints = view.get_journal('Assets')
+        self.assertEqual(realization.get_postings(
+            realization.get(view.real_accounts, 'Assets')), txn_postings)
+        self.assertEqual(7, checkpoints.num_rows)
+
+        # The journal is cached.
+        self.assertIs(txn_postings, view.get_journal('Assets')[0])
+        self.assertIsNot(txn_postings, view.get_journal('Assets', True)[0])
+
+        self.assertIsNotNone(view.get_journal(''))
+        self.assertIsNone(view.get_journal('Assets:Invalid'))
+
+    def test_update(self):
+        new_entries, _, options_map = loader.load_string("""
+          2014-03-01 *
+            Assets:Checking        1 USD
+            Income:MoneyFountain
+        """)
+        entries = data.sorted(self.entries + new_entries)
+
+        # Unaffected views keep their realizations.
+        view = views.YearView(self.entries, self.options_map, 'Year', 2013)
+        new_view = view.update(entries, self.options_map)
+        self.assertIs(self.entries, view.all_entries)
+        self.assertIs(entries, new_view.all_entries)
+        self.assertIs(view.real_accounts, new_view.real_accounts)
+        self.assertIs(view.closing_real_accounts, new_view.closing_real_accounts)
+
+        # Affected views are updated incrementally, leaving the original intact.
+        for view in [views.YearView(self.entries, self.options_map, 'Year', 2014),
+                     views.AllView(self.entries, self.options_map, 'All')]:
+            real_accounts = realization.realize(view.entries)
+            new_view = view.update(entries, self.options_map)
+            expected_view = type(view)(entries, self.options_map, view.title,
+                                       *([2014] if isinstance(view, views.YearView)
+                                         else []))
+            self.assertEqual(expected_view.entries, new_view.entries)
+            self.assertEqual(expected_view.opening_entries, new_view.opening_entries)
+            self.assertEqual(expected_view.closing_entries, new_view.closing_entries)
+            for attribute in ('opening_real_accounts', 'real_accounts',
+                              'closing_real_accounts'):
+                self.assertEqual(
+                    realization.dump_balances(getattr(expected_view, attribute)),
+                    realization.dump_balances(getattr(new_view, attribute)))
+                self.assertEqual(
+                    realization.get_postings(getattr(expected_view, attribute)),
+                    realization.get_postings(getattr(new_view, attribute)))
+            self.assertEqual(realization.get_postings(real_accounts),
+                             realization.get_postings(view.real_accounts))
+
+        view = views.AllView(self.entries, self.options_map, 'All')
+        self.assertIs(view.real_accounts,
+                      view.update(list(self.entries), self.options_map).real_accounts)
+
+        # Views with too many changes have to be recreated.
+        self.assertIsNone(view.update(new_entries, self.options_map))
+
+        # Changes to the options invalidate the views.
+        view = views.YearView(self.entries, self.options_map, 'Year', 2013)
+        options_map = dict(self.options_map, title='Another title')
+        self.assertIsNone(view.update(self.entries, options_map))
+
+        # But not the new objects computed by the loader.
+        options_map = dict(self.options_map,
+                           entry_hashes=compare.EntryHashCache(),
+                           balance_snapshots=summarize.BalanceSnapshots(entries))
+        self.assertIsNotNone(view.update(entries, options_map))
+
+    def test_diff_entries(self):
+        entries = self.entries
+        self.assertEqual((entries, [], []), views.diff_entries(entries, list(entries)))
+        new_entries, removed, added = views.diff_entries(entries[:-1], entries)
+        self.assertEqual(entries, new_entries)
+        self.assertEqual([], removed)
+        self.assertEqual([entries[-1]], added)
+        new_entries, removed, added = views.diff_entries(entries, entries[1:])
+        self.assertEqual(entries[1:], new_entries)
+        self.assertEqual([entries[0]], removed)
+        self.assertEqual([], added)
+        new_entries, removed, added = views.diff_entries(entries, entries[:3] + entries[4:])
+        self.assertEqual([entries[3]], removed)
+        self.assertEqual([], added)
+
+    def test_estimate_view_size(self):
+        view = views.AllView(self.entries, self.options_map, 'All')
+        size = views.estimate_view_size(view)
+        self.assertGreater(size, 0)
+        view.get_journal('Assets:Checking')
+        self.assertGreater(views.estimate_view_size(view), size)
+
+    def test_view_cache_lru(self):
+        view_cache = views.ViewCache(max_entries=2)
+        all_view = views.AllView(self.entries, self.options_map, 'All')
+        view_cache.put('/view/all', all_view)
+        self.assertIsNone(view_cache.get('/view/year/2013'))
+        view_cache.put('/view/year/2013',
+                       views.YearView(self.entries, self.options_map, 'Year', 2013))
+        self.assertIs(all_view, view_cache.get('/view/all'))
+
+        # The least recently used view is evicted.
+        view_cache.put('/view/year/2014',
+                       views.YearView(self.entries, self.options_map, 'Year', 2014))
+        self.assertEqual(2, len(view_cache))
+        self.assertNotIn('/view/year/2013', view_cache)
+        self.assertIn('/view/all', view_cache)
+        self.assertEqual((1, 1, 1),
+                         (view_cache.hits, view_cache.misses, view_cache.evictions))
+        self.assertEqual(['/view/all', '/view/year/2014'],
+                         [viewid for viewid, _, __ in view_cache.items()])
+
+    def test_view_cache_bytes(self):
+        view = views.AllView(self.entries, self.options_map, 'All')
+        size = views.estimate_view_size(view)
+
+        view_cache = views.ViewCache(max_bytes=size + 1)
+        view_cache.put('/view/all', view)
+        self.assertEqual(size, view_cache.total_bytes)
+
+        # The view grows past the budget, but it is the only one; keep it.
+        view.get_journal('')
+        view_cache.resize('/view/all')
+        self.assertGreater(view_cache.total_bytes, size)
+        self.assertEqual(1, len(view_cache))
+
+        view_cache.put('/view/year/2013',
+                       views.YearView(self.entries, self.options_map, 'Year', 2013))
+        self.assertEqual(['/view/year/2013'],
+                         [viewid for viewid, _, __ in view_cache.items()])
+        self.assertEqual(1, view_cache.evictions)
+
+    def test_view_cache_carry_over(self):
+        new_entries, _, _ = loader.load_string("""
+          2014-03-01 *
+            Assets:Checking        1 USD
+            Income:MoneyFountain
+        """)
+        entries = data.sorted(self.entries + new_entries)
+
+        view_cache = views.ViewCache(max_entries=10)
+        view_cache.put('/view/year/2013',
+                       views.YearView(self.entries, self.options_map, 'Year', 2013))
+        view_cache.put('/view/year/2014',
+                       views.YearView(self.entries, self.options_map, 'Year', 2014))
+        view_cache.get('/view/year/2013')
+        new_cache = view_cache.carry_over(entries, self.options_map)
+        self.assertEqual(10, new_cache.max_entries)
+        self.assertEqual(1, new_cache.hits)
+        self.assertEqual(['/view/year/2014', '/view/year/2013'],
+                         [viewid for viewid, _, __ in new_cache.items()])
+
+        # Views whose options changed are dropped.
+        options_map = dict(self.options_map, title='Another title')
+        self.assertEqual(0, len(view_cache.carry_over(entries, options_map)))
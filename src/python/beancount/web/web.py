@@ -6,12 +6,18 @@ __author__ = "Martin Blais <blais@furius.ca>"
 
 import argparse
 from os import path
+import collections
 import io
+import itertools
 import logging
+import multiprocessing
 import re
+import socket
 import sys
 import time
 import threading
+import types
+import urllib.parse
 
 import bottle
 from bottle import response
@@ -23,7 +29,6 @@ from beancount.core import account
 from beancount.core import account_types
 from beancount.core import compare
 from beancount.ops import basicops
-from beancount.ops import prices
 from beancount.utils import misc_utils
 from beancount.utils import text_utils
 from beancount.web import bottle_utils
@@ -51,12 +56,16 @@ class HTMLFormatter(html_formatter.HTMLFormatter):
     Attributes:
       build_url: A function used to render links to a Bottle application.
       leafonly: a boolean, if true, render only the name of the leaf nodes.
+      entry_hashes: The EntryHashCache of the ledger state being rendered.
     """
     def __init__(self, dcontext, build_url, leaf_only, view_links=True):
         super().__init__(dcontext)
         self.build_url = build_url
         self.leaf_only = leaf_only
         self.view_links = view_links
+        # Note: capture this here, because journals may be rendered lazily,
+        # after the request handler has returned.
+        self.entry_hashes = request.ledger.options['entry_hashes']
 
     def build_global(self, *args, **kwds):
         "Render to global application."
@@ -103,7 +112,7 @@ class HTMLFormatter(html_formatter.HTMLFormatter):
         # Note: rendering to global application.
         # Note(2): we could avoid rendering links to summarizing and transfer
         # entries which are not going to be found.
-        return self.build_global('context', ehash=compare.hash_entry(entry))
+        return self.build_global('context', ehash=self.entry_hashes.hash_entry(entry))
 
     def render_link(self, link):
         """See base class."""
@@ -147,7 +156,7 @@ def render_report(report_class, entries, args=None,
     Returns:
       A string, the rendered report.
     """
-    formatter = HTMLFormatter(app.options['dcontext'],
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
                               request.app.get_url, leaf_only)
     oss = io.StringIO()
     if center:
@@ -156,7 +165,7 @@ def render_report(report_class, entries, args=None,
                                      formatter=formatter,
                                      css_id=css_id,
                                      css_class=css_class)
-    report_.render_htmldiv(entries, app.errors, app.options, oss)
+    report_.render_htmldiv(entries, request.ledger.errors, request.ledger.options, oss)
     if center:
         oss.write('</center>\n')
     return oss.getvalue()
@@ -176,11 +185,11 @@ def render_real_report(report_class, real_root, args=None, leaf_only=False):
     Returns:
       A string, the rendered report.
     """
-    formatter = HTMLFormatter(app.options['dcontext'],
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
                               request.app.get_url, leaf_only)
     oss = io.StringIO()
     report_ = report_class.from_args(args, formatter=formatter)
-    report_.render_real_htmldiv(real_root, app.options, oss)
+    report_.render_real_htmldiv(real_root, request.ledger.options, oss)
     return oss.getvalue()
 
 
@@ -219,6 +228,52 @@ def render_overlay():
     # out.
 
 
+# A placeholder for the contents of the page, used to split the template for
+# streaming.
+CONTENTS_PLACEHOLDER = '\0CONTENTS\0'
+
+
+def stream_view(contents, *args, **kw):
+    """Render a view page, streaming its contents.
+
+    The page template is rendered immediately, and the contents are produced
+    lazily, as the response is being sent.
+
+    Args:
+      contents: An iterable of strings, the contents of the page.
+      *args: A tuple of values for the HTML template.
+      *kw: A dict of optional values for the HTML template.
+    Returns:
+      A generator of strings of HTML.
+    """
+    header, footer = render_view(*args, contents=CONTENTS_PLACEHOLDER, **kw).split(
+        CONTENTS_PLACEHOLDER)
+    def iter_page():
+        yield header
+        yield from contents
+        yield footer
+    return iter_page()
+
+
+def get_url_builder():
+    """Create a function to build URLs for the current application and request.
+
+    Bottle builds URLs relative to the script name of the request at the time
+    they are built, and this is no longer valid when the body of a streamed
+    response is being generated, after the handler has returned. The function
+    returned here captures it beforehand.
+
+    Returns:
+      A function with the same signature as Bottle.get_url().
+    """
+    router = request.app.router
+    base_url = urllib.parse.urljoin(
+        '/', request.environ.get('SCRIPT_NAME', '').strip('/') + '/')
+    def build_url(routename, **kwargs):
+        return urllib.parse.urljoin(base_url, router.build(routename, **kwargs).lstrip('/'))
+    return build_url
+
+
 def render_global(*args, **kw):
     """Render the title and contents in our standard template for a global page.
 
@@ -231,7 +286,7 @@ def render_global(*args, **kw):
     response.content_type = 'text/html'
     kw['A'] = A # Application mapper
     kw['V'] = V # View mapper
-    kw['title'] = app.options['title']
+    kw['title'] = request.ledger.options['title']
     kw['view_title'] = ''
     kw['navigation'] = GLOBAL_NAVIGATION
     kw['scripts'] = kw.get('scripts', '')
@@ -249,7 +304,8 @@ def root():
 
 @app.route('/index', name='toc')
 def toc():
-    entries_no_open_close = [entry for entry in app.entries
+    entries = request.ledger.entries
+    entries_no_open_close = [entry for entry in entries
                              if not isinstance(entry, (data.Open, data.Close))]
     if entries_no_open_close:
         mindate, maxdate = None, None
@@ -275,15 +331,15 @@ def toc():
         viewboxes.append(
             ('year', 'By Year',
              [(view_url('year', year=year), 'Year {}'.format(year))
-              for year in reversed(list(getters.get_active_years(app.entries)))]))
+              for year in reversed(list(getters.get_active_years(entries)))]))
 
         # By tag views.
         viewboxes.append(('tag', 'Tags',
                           [(view_url('tag', tag=tag), '#{}'.format(tag))
-                           for tag in getters.get_all_tags(app.entries)]))
+                           for tag in getters.get_all_tags(entries)]))
 
         # By component.
-        components = getters.get_account_components(app.entries)
+        components = getters.get_account_components(entries)
         viewboxes.append(
             ('component', 'Component',
              [(view_url('component', component=component), '{}'.format(component))
@@ -332,7 +388,7 @@ def source():
         contents.write("Source hidden.")
     else:
         contents.write('<div id="source">')
-        for i, line in enumerate(app.source.splitlines()):
+        for i, line in enumerate(request.ledger.source.splitlines()):
             lineno = i+1
             contents.write(
                 '<pre id="{}">{}  {}</pre>\n'.format(
@@ -345,14 +401,52 @@ def source():
         )
 
 
+@app.route('/cache', name='cache')
+def cache():
+    "Render the statistics and contents of the cache of views."
+    view_cache = request.ledger.views
+    oss = io.StringIO()
+
+    def budget(value, unit=''):
+        return 'unlimited' if value is None else '{:,}{}'.format(value, unit)
+
+    oss.write('<table>\n')
+    for name, value in [
+            ("Views", '{:,} / {}'.format(len(view_cache),
+                                        budget(view_cache.max_entries))),
+            ("Estimated Size", '{:,} / {}'.format(view_cache.total_bytes,
+                                                  budget(view_cache.max_bytes,
+                                                         ' bytes'))),
+            ("Hits", '{:,}'.format(view_cache.hits)),
+            ("Misses", '{:,}'.format(view_cache.misses)),
+            ("Evictions", '{:,}'.format(view_cache.evictions)),
+    ]:
+        oss.write('<tr><td>{}</td><td class="num">{}</td></tr>\n'.format(name, value))
+    oss.write('</table>\n')
+
+    oss.write('<h2>Cached Views (most recently used first)</h2>\n')
+    oss.write('<table>\n')
+    oss.write('<thead><tr><th>View</th><th>Title</th><th>Journals</th>'
+              '<th>Estimated Size</th></tr></thead>\n')
+    for viewid, view, size in reversed(view_cache.items()):
+        oss.write('<tr><td><a href="{}/">{}</a></td><td>{}</td>'
+                  '<td class="num">{}</td><td class="num">{:,}</td></tr>\n'.format(
+                      viewid, viewid, view.title, len(view.journal_cache), size))
+    oss.write('</table>\n')
+
+    return render_global(
+        pagetitle="View Cache",
+        contents=oss.getvalue())
+
+
 @app.route('/link/<link:re:.*>', name='link')
 def link(link=None):
     "Serve journals for links."
 
-    linked_entries = basicops.filter_link(link, app.entries)
+    linked_entries = basicops.filter_link(link, request.ledger.entries)
 
     oss = io.StringIO()
-    formatter = HTMLFormatter(app.options['dcontext'],
+    formatter = HTMLFormatter(request.ledger.options['dcontext'],
                               request.app.get_url, False, view_links=False)
     journal_html.html_entries_table_with_balance(oss, linked_entries, formatter)
     return render_global(
@@ -364,9 +458,7 @@ def link(link=None):
 def context_(ehash=None):
     "Render the before & after context around a transaction entry."
 
-    matching_entries = [entry
-                        for entry in app.entries
-                        if ehash == compare.hash_entry(entry)]
+    matching_entries = get_entry_index(request.ledger).get(ehash, [])
 
     oss = io.StringIO()
     if len(matching_entries) == 0:
@@ -377,15 +469,15 @@ def context_(ehash=None):
         print("ERROR: Ambiguous entries for '{}'".format(ehash),
               file=oss)
         print(file=oss)
-        dcontext = app.options['dcontext']
+        dcontext = request.ledger.options['dcontext']
         printer.print_entries(matching_entries, dcontext, file=oss)
 
     else:
-        dcontext = app.options['dcontext']
+        dcontext = request.ledger.options['dcontext']
         oss.write("<pre>\n")
         for entry in matching_entries:
             oss.write(context.render_entry_context(
-                app.entries, app.options, dcontext,
+                request.ledger.entries, request.ledger.options, dcontext,
                 entry.meta["filename"], entry.meta["lineno"]))
         oss.write("</pre>\n")
 
@@ -439,7 +531,7 @@ def doc(filename=None):
 
     # Check that there is a document directive that has this filename.
     # This is for security; we don't want to be able to serve just any file.
-    for entry in misc_utils.filter_type(app.entries, data.Document):
+    for entry in misc_utils.filter_type(request.ledger.entries, data.Document):
         if entry.filename == filename:
             break
     else:
@@ -469,7 +561,7 @@ def render_view(*args, **kw):
     response.content_type = 'text/html'
     kw['A'] = A # Application mapper
     kw['V'] = V # View mapper
-    kw['title'] = app.options['title']
+    kw['title'] = request.ledger.options['title']
     kw['view_title'] = ' - ' + request.view.title
     kw['navigation'] = APP_NAVIGATION.render(A=A, V=V, view_title=request.view.title)
     kw['scripts'] = kw.get('scripts', '')
@@ -654,32 +746,83 @@ def journal_(account_name=None):
     account_name = account_name.strip('/').replace('/', account.sep)
 
     # Figure out which account to render this from.
-    real_accounts = request.view.real_accounts
-    if account_name:
-        if account_name and account_types.is_balance_sheet_account(account_name,
-                                                                   app.account_types):
-            real_accounts = request.view.closing_real_accounts
-
-    # Render the report.
-    args = []
-    if account_name:
-        args.append('--account={}'.format(account_name))
+    closing = bool(account_name and
+                   account_types.is_balance_sheet_account(account_name,
+                                                          request.ledger.account_types))
+    journal = request.view.get_journal(account_name, closing)
+    if journal is None:
+        raise bottle.HTTPError(404, "Invalid account name: {}".format(account_name))
+    txn_postings, checkpoints = journal
+
+    # Get the page to render. By default, render the most recent entries first.
+    try:
+        offset = int(request.params.get('offset', 0))
+        limit = int(request.params.get('limit', app.args.journal_page_size))
+    except ValueError:
+        raise bottle.HTTPError(400, "Invalid offset or limit")
+    order = request.params.get('order', 'desc')
+    if offset < 0 or limit < 0 or order not in ('asc', 'desc'):
+        raise bottle.HTTPError(400, "Invalid offset, limit or order")
 
     render_postings = request.params.get('postings', True)
     if isinstance(render_postings, str):
         render_postings = render_postings.lower() in ('1', 'true')
-    if render_postings:
-        args.append('--verbose')
 
-    try:
-        html_journal = render_real_report(journal_reports.JournalReport,
-                                          real_accounts, args, leaf_only=False)
-    except KeyError as e:
-        raise bottle.HTTPError(404, '{}'.format(e))
+    formatter = HTMLFormatter(request.ledger.options['dcontext'], get_url_builder(), False)
+    pagination = render_journal_pagination(account_name, offset, limit, order,
+                                           checkpoints.num_rows)
+    contents = itertools.chain(
+        [pagination],
+        journal_html.iter_html_entries_table_with_balance(txn_postings, formatter,
+                                                          render_postings,
+                                                          offset, limit or None,
+                                                          order == 'desc',
+                                                          checkpoints),
+        [pagination])
 
-    return render_view(pagetitle='{}'.format(account_name or
-                                             'General Ledger (All Accounts)'),
-                       contents=html_journal)
+    return stream_view(contents,
+                       pagetitle='{}'.format(account_name or
+                                             'General Ledger (All Accounts)'))
+
+
+def render_journal_pagination(account_name, offset, limit, order, num_rows):
+    """Render links to the previous and next pages of a journal.
+
+    Args:
+      account_name: A string, the name of the account of the journal.
+      offset: An integer, the number of rows skipped to render this page.
+      limit: An integer, the number of rows on a page, or zero, if the journal
+        is not paginated.
+      order: A string, 'asc' or 'desc', the order of the rows.
+      num_rows: An integer, the total number of rows of the journal.
+    Returns:
+      A string of HTML, empty if the journal fits on a single page.
+    """
+    if not limit or (offset == 0 and num_rows <= limit):
+        return ''
+
+    def page_link(page_offset, title):
+        url = '{}?{}'.format(
+            request.app.get_url('journal', account_name=account_name),
+            urllib.parse.urlencode([('offset', page_offset),
+                                    ('limit', limit),
+                                    ('order', order)]))
+        return '<a href="{}">{}</a>'.format(url, title)
+
+    links = []
+    if offset > 0:
+        links.append(page_link(max(0, min(offset, num_rows) - limit),
+                               'Newer' if order == 'desc' else 'Previous'))
+    if offset < num_rows:
+        links.append('Rows {}-{} of {}'.format(offset + 1,
+                                               min(offset + limit, num_rows),
+                                               num_rows))
+    else:
+        links.append('{} rows'.format(num_rows))
+    if offset + limit < num_rows:
+        links.append(page_link(offset + limit,
+                               'Older' if order == 'desc' else 'Next'))
+    return '<div class="pagination">{}</div>\n'.format(' | '.join(links))
 
 
 @viewapp.route('/conversions', name='conversions')
@@ -741,7 +884,7 @@ def event(event=None):
         bottle.redirect(app.get_url('event_index'))
     return render_view(
         pagetitle="Event: {}".format(event),
-        contents=render_report(misc_reports.EventsReport, app.entries,
+        contents=render_report(misc_reports.EventsReport, request.ledger.entries,
                                ['--expr', event]))
 
 
@@ -784,10 +927,6 @@ def stats_postings():
 # Views.
 
 
-# A cache for views that have been created (on access).
-app.views = {}
-
-
 def handle_view(path_depth):
     """A decorator for handlers which create views lazily.
     If you decorate a method with this, the wrapper does the redirect
@@ -803,17 +942,23 @@ def handle_view(path_depth):
         def wrapper(*args, **kwargs):
             components = request.path.split('/')
             viewid = '/'.join(components[:path_depth+1])
-            try:
-                # Try fetching the view from the cache.
-                view = app.views[viewid]
-            except KeyError:
+            # Try fetching the view from the cache.
+            view_cache = request.ledger.views
+            view = view_cache.get(viewid)
+            if view is None:
                 # We need to create the view.
-                view = app.views[viewid] = callback(*args, **kwargs)
+                view = callback(*args, **kwargs)
+                view_cache.put(viewid, view)
 
             # Save the view for the subrequest and redirect. populate_view()
             # picks this up and saves it in request.view.
             request.environ['VIEW'] = view
-            return bottle_utils.internal_redirect(viewapp, path_depth)
+            contents = bottle_utils.internal_redirect(viewapp, path_depth)
+
+            # Rendering the page may have grown the view, e.g. by caching a
+            # journal; account for it.
+            view_cache.resize(viewid)
+            return contents
         return wrapper
     return view_populator
 
@@ -876,7 +1021,8 @@ def get_all_view(app):
     Returns:
       An instance of AllView, that covers all transactions.
     """
-    return views.AllView(app.entries, app.options, 'All Transactions')
+    return views.AllView(request.ledger.entries, request.ledger.options,
+                         'All Transactions')
 
 
 @app.route(r'/view/all/<path:re:.*>', name='all')
@@ -890,25 +1036,28 @@ def all(path=None):
 def year(year=None, path=None):
     year = int(year)
     first_month = app.args.first_month
-    return views.YearView(app.entries, app.options, 'Year {:4d}'.format(year),
+    return views.YearView(request.ledger.entries, request.ledger.options,
+                          'Year {:4d}'.format(year),
                           year, first_month)
 
 
 @app.route(r'/view/tag/<tag:re:[^/]*>/<path:re:.*>', name='tag')
 @handle_view(3)
 def tag(tag=None, path=None):
-    return views.TagView(app.entries, app.options, 'Tag {}'.format(tag), set([tag]))
+    return views.TagView(request.ledger.entries, request.ledger.options,
+                         'Tag {}'.format(tag), set([tag]))
 
 
 @app.route(r'/view/payee/<payee:re:[^/]*>/<path:re:.*>', name='payee')
 @handle_view(3)
 def payee(payee=None, path=None):
-    return views.PayeeView(app.entries, app.options, 'Payee {}'.format(payee), payee)
+    return views.PayeeView(request.ledger.entries, request.ledger.options,
+                           'Payee {}'.format(payee), payee)
 
 @app.route(r'/view/component/<component:re:[^/]*>/<path:re:.*>', name='component')
 @handle_view(3)
 def component(component=None, path=None):
-    return views.ComponentView(app.entries, app.options,
+    return views.ComponentView(request.ledger.entries, request.ledger.options,
                                'Component: {}'.format(component), component)
 
 
@@ -916,48 +1065,200 @@ def component(component=None, path=None):
 # Bootstrapping and main program.
 
 
-def auto_reload_input_file(callback):
-    """A plugin that automatically reloads the input file if it changed since the
-    last page was loaded."""
-    def wrapper(*posargs, **kwargs):
-        filename = app.args.filename
-        mtime = path.getmtime(filename)
-        if mtime > app.last_mtime:
-            app.last_mtime = mtime
+# The state of the loaded ledger, as served by the application. This is replaced
+# as a whole when the input files change, so that the requests being served
+# keep using the state they started with (see request.ledger).
+#
+# Attributes:
+#   entries: A list of directives, as loaded from the input file.
+#   errors: A list of errors from loading the input file.
+#   options: A dict of options, as produced by the parser.
+#   account_types: An instance of AccountTypes, for the options.
+#   price_map: A price map of the entries, as built by the loader.
+#   source: A string, the contents of the top-level input file.
+#   mtimes: A dict of the absolute names of all the input files, including the
+#     included ones, to their modification times when they were loaded, or None,
+#     if they did not exist.
+#   views: An instance of views.ViewCache, a cache of the views that have been
+#     created (on access).
+#   entry_index: A dict of entry hash to the list of entries with that hash,
+#     filled in on first access. See get_entry_index().
+LedgerState = collections.namedtuple(
+    'LedgerState',
+    'entries errors options account_types price_map source mtimes views entry_index')
+
+
+def get_entry_index(ledger):
+    """Return the index of the entries of a ledger state by hash.
+
+    The index is built on the first call for each ledger state and reused by
+    the following requests. It reuses the entry hashes computed by the loader,
+    e.g., by the noduplicates plugin.
+
+    Args:
+      ledger: An instance of LedgerState.
+    Returns:
+      A dict of hash strings to lists of entries.
+    """
+    if not ledger.entry_index and ledger.entries:
+        # Note: concurrent requests may build it at the same time; this is
+        # harmless, they compute the same contents.
+        ledger.entry_index.update(compare.index_entries(
+            ledger.entries, ledger.options['entry_hashes']))
+    return ledger.entry_index
 
-            logging.info('Reloading...')
 
-            # Save the source for later, to render.
-            with open(filename, encoding='utf8') as f:
-                app.source = f.read()
+def get_mtimes(filenames):
+    """Get the modification times of a list of files.
 
-            # Parse the beancount file.
-            entries, errors, options_map = loader.load_file(filename)
+    Args:
+      filenames: A list of strings, the names of the files.
+    Returns:
+      A dict of filename to modification time, or None, if the file does not
+      exist.
+    """
+    mtimes = {}
+    for filename in filenames:
+        try:
+            mtimes[filename] = path.getmtime(filename)
+        except OSError:
+            mtimes[filename] = None
+    return mtimes
 
-            # Print out the list of errors.
-            if errors:
-                request.params['render_overlay'] = True
-                print(',----------------------------------------------------------------')
-                printer.print_errors(errors, file=sys.stdout)
-                print('`----------------------------------------------------------------')
 
-            # Save globals in the global app.
-            app.entries = entries
-            app.errors = errors
-            app.options = options_map
-            app.account_types = options.get_account_types(options_map)
+def load_ledger(filename, parse_cache, previous=None):
+    """Load the input file and prepare a new state for the application.
 
-            # Pre-compute the price database.
-            app.price_map = prices.build_price_map(app.entries)
+    The views cached in the previous state whose entries are unaffected by the
+    changes to the input are carried over to the new state.
 
-            # Reset the view cache.
-            app.views.clear()
+    Args:
+      filename: A string, the name of the top-level input file.
+      parse_cache: A dict, a cache of parsed files for the loader.
+      previous: An instance of LedgerState, the state being replaced, or None.
+    Returns:
+      An instance of LedgerState.
+    """
+    logging.info('Reloading...')
+
+    # Note the modification times first, so that changes made while we are
+    # loading trigger another reload.
+    filenames = [filename]
+    if previous is not None:
+        filenames.extend(previous.options['include'])
+    mtimes = get_mtimes(filenames)
+
+    # Save the source for later, to render.
+    with open(filename, encoding='utf8') as f:
+        source = f.read()
+
+    # Parse the beancount file.
+    entries, errors, options_map = loader.load_file(filename, parse_cache=parse_cache)
+
+    # Print out the list of errors.
+    if errors:
+        print(',----------------------------------------------------------------')
+        printer.print_errors(errors, file=sys.stdout)
+        print('`----------------------------------------------------------------')
+
+    # Watch the set of files that was actually included this time.
+    for include_filename in options_map['include']:
+        if include_filename not in mtimes:
+            mtimes.update(get_mtimes([include_filename]))
+
+    # Carry over the views that are unaffected by the changes.
+    if previous is not None:
+        views_cache = previous.views.carry_over(entries, options_map)
+        logging.info('Kept %d of %d views', len(views_cache), len(previous.views))
+    else:
+        views_cache = views.ViewCache(app.args.view_cache_entries or None,
+                                      (app.args.view_cache_megabytes * 1024 * 1024
+                                       or None))
+
+    return LedgerState(entries,
+                       errors,
+                       options_map,
+                       options.get_account_types(options_map),
+                       options_map['price_map'],
+                       source,
+                       mtimes,
+                       views_cache,
+                       {})
+
+
+ReloadError = collections.namedtuple('ReloadError', 'source message entry')
+
+
+def reload_failed(previous, mtimes, exc):
+    """Prepare the state to keep serving after a failed reload.
+
+    The previous entries keep being served, and the failure is reported along
+    with their errors, in place of that of an earlier failed reload.
+
+    Args:
+      previous: An instance of LedgerState, the state that failed to reload.
+      mtimes: A dict of filename to modification time, those of the attempt.
+      exc: The exception raised by the reload.
+    Returns:
+      An instance of LedgerState.
+    """
+    errors = [error
+              for error in previous.errors
+              if not isinstance(error, ReloadError)]
+    errors.append(ReloadError(data.new_metadata(app.args.filename, 0),
+                              "Could not reload the input file: {}".format(exc),
+                              None))
+    return previous._replace(errors=errors, mtimes=mtimes)
+
+
+def reload_ledger():
+    """Reload the input file in a background thread.
+
+    The new state is swapped in when it is ready; until then, the current
+    state keeps being served. This does nothing if a reload is already in
+    progress. If the reload fails, the current state keeps being served with
+    the failure added to its errors (see reload_failed()), until the input
+    files change again.
+    """
+    with app.reload_lock:
+        if app.reload_thread is not None and app.reload_thread.is_alive():
+            return
+        previous = app.ledger
+
+        def reload_target():
+            # Note the modification times of the attempt, so that a failed
+            # reload is not retried until the files change again.
+            mtimes = get_mtimes(previous.mtimes.keys())
+            try:
+                app.ledger = load_ledger(app.args.filename, app.parse_cache, previous)
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.exception('Could not reload the input file')
+                app.ledger = reload_failed(previous, mtimes, exc)
+
+        app.reload_thread = threading.Thread(target=reload_target)
+        app.reload_thread.daemon = True
+        app.reload_thread.start()
 
-        else:
-            # For now, the overlay is a link to the errors page. Always render
-            # it on the right when there are errors.
-            if app.errors:
-                request.params['render_overlay'] = True
+
+def auto_reload_input_file(callback):
+    """A plugin that automatically reloads the input file if it or any of the files
+    it includes changed since it was last loaded."""
+    def wrapper(*posargs, **kwargs):
+        if app.ledger is None:
+            # Load the file for the first time; there is nothing to serve yet.
+            with app.reload_lock:
+                if app.ledger is None:
+                    app.ledger = load_ledger(app.args.filename, app.parse_cache)
+        elif get_mtimes(app.ledger.mtimes.keys()) != app.ledger.mtimes:
+            reload_ledger()
+
+        # Use the same state for the entire request.
+        request.ledger = app.ledger
+
+        # For now, the overlay is a link to the errors page. Always render
+        # it on the right when there are errors.
+        if request.ledger.errors:
+            request.params['render_overlay'] = True
 
         return callback(*posargs, **kwargs)
     return wrapper
@@ -976,9 +1277,12 @@ def incognito(callback):
     def wrapper(*posargs, **kwargs):
         contents = callback(*posargs, **kwargs)
         # pylint: disable=bad-continuation
-        if (response.content_type in ('text/html', '') and
-            isinstance(contents, str)):
-            contents = text_utils.replace_numbers(contents)
+        if response.content_type in ('text/html', ''):
+            if isinstance(contents, str):
+                contents = text_utils.replace_numbers(contents)
+            elif isinstance(contents, types.GeneratorType):
+                # A streamed page (see stream_view()).
+                contents = map(text_utils.replace_numbers, contents)
         return contents
 
     return wrapper
@@ -1009,8 +1313,13 @@ def run_app(args, quiet=None):
         app.install(url_restrictor)
         app_installs.append(url_restrictor)
 
-    # Initialize to a small value in order to insure a reload on the first page.
-    app.last_mtime = 0
+    # Clear the state in order to insure a load on the first page.
+    app.ledger = None
+    app.reload_lock = threading.Lock()
+    app.reload_thread = None
+
+    # A cache of parsed input files, so that reloads only reparse modified files.
+    app.parse_cache = {}
 
     # Load templates.
     with open(path.join(path.dirname(__file__), 'web.html')) as f:
@@ -1097,6 +1406,18 @@ def add_web_arguments(argparser):
     group.add_argument('--first-month', action='store', type=int, default=1,
                        help="The first month of the calendar year.")
 
+    group.add_argument('--journal-page-size', action='store', type=int, default=1000,
+                       help=("The number of rows to render on each page of a journal, "
+                             "or 0 to render the journals on a single page."))
+
+    group.add_argument('--view-cache-entries', action='store', type=int, default=32,
+                       help=("The maximum number of views to keep in memory, "
+                             "or 0 for no limit. See the /cache page for statistics."))
+
+    group.add_argument('--view-cache-megabytes', action='store', type=int, default=512,
+                       help=("The maximum estimated memory used by the views kept "
+                             "in memory, in megabytes, or 0 for no limit."))
+
     return group
 
 
@@ -1147,3 +1468,45 @@ def thread_server_shutdown(thread):
     # Note that because we daemonize, we could forego this elegant detail.
     shutdown()
     thread.join()
+
+
+def process_server_start(web_args):
+    """Start a server in a new process.
+
+    Unlike servers started with thread_server_start(), any number of these may
+    run at the same time, on different ports.
+
+    Args:
+      web_args: An argparse parsed options object, with all the options
+        from add_web_arguments().
+    Returns:
+      A new multiprocessing.Process instance.
+    Raises:
+      OSError: If the server exits before accepting connections.
+    """
+    process = multiprocessing.Process(target=run_app, args=(web_args,))
+    process.daemon = True # Automatically exit if this process comes down.
+    process.start()
+
+    # Ensure the server accepts connections before running the scraper.
+    while True:
+        try:
+            socket.create_connection(('localhost', web_args.port)).close()
+            break
+        except OSError:
+            if not process.is_alive():
+                raise OSError("Server on port {} exited with code {}".format(
+                    web_args.port, process.exitcode))
+            time.sleep(0.05)
+
+    return process
+
+
+def process_server_shutdown(process):
+    """Shutdown the server running in the given process.
+
+    Args:
+      process: A multiprocessing.Process instance.
+    """
+    process.terminate()
+    process.join()
@@ -4,8 +4,10 @@ import argparse
 import unittest
 import urllib.parse
 from os import path
+from unittest import mock
 
 from beancount.web import scrape
+from beancount.web import web
 from beancount.utils import test_utils
 
 
@@ -49,6 +51,9 @@ class TestWeb(unittest.TestCase):
                     extra_args=argparse.Namespace(view='year/2013')
 )
 
+    def test_scrape_basic__processes(self):
+        self.scrape('simple/basic.beancount', num_workers=2)
+
     def test_scrape_starterkit(self):
         self.scrape('simple/starter.beancount')
 
@@ -56,3 +61,24 @@ class TestWeb(unittest.TestCase):
     # find some way to enable this on demand.
     def __test_scrape_example(self):
         self.scrape('example.beancount')
+
+
+class TestReloadFailed(unittest.TestCase):
+
+    @mock.patch.object(web.app, 'args', argparse.Namespace(filename='/tmp/input'),
+                       create=True)
+    def test_reload_failed(self):
+        previous = web.LedgerState([], ['parse error'], {}, None, None, '',
+                                   {'/tmp/input': 1.0}, None, {})
+        ledger = web.reload_failed(previous, {'/tmp/input': None},
+                                   OSError('No such file'))
+        self.assertEqual({'/tmp/input': None}, ledger.mtimes)
+        self.assertEqual('parse error', ledger.errors[0])
+        self.assertIsInstance(ledger.errors[1], web.ReloadError)
+        self.assertRegex(ledger.errors[1].message, 'No such file')
+
+        # The failure of an earlier reload is replaced.
+        ledger = web.reload_failed(ledger, {'/tmp/input': 2.0},
+                                   OSError('Permission denied'))
+        self.assertEqual(2, len(ledger.errors))
+        self.assertRegex(ledger.errors[1].message, 'Permission denied')